@@ -1,4 +1,3 @@
-from app.api import auth, collection, ludopedia_auth
-
-__all__ = ["auth", "collection", "ludopedia_auth"]
+from app.api import auth, collection, ludopedia_auth, imports, profiles
 
+__all__ = ["auth", "collection", "ludopedia_auth", "imports", "profiles"]
@@ -1,10 +1,14 @@
+import logging
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
-from datetime import timedelta
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app import schemas, models, utils
-from app.config import settings
+from app.services.auth_tokens import auth_tokens, RefreshTokenError
+from app.services.google_oauth import google_oauth
+from app.utils.auth import CurrentUser, get_current_admin_user
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -71,28 +75,81 @@ async def login(
     user.last_login = datetime.utcnow()
     db.commit()
     
-    # Cria token de acesso
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = utils.create_access_token(
-        data={"sub": user.username},
-        expires_delta=access_token_expires
-    )
-    
-    return {"access_token": access_token, "token_type": "bearer"}
+    # Cria token de acesso (com as claims do usuário) e token de renovação
+    return auth_tokens.issue(db, user)
+
+
+@router.post("/refresh", response_model=schemas.Token)
+async def refresh_access_token(
+    request: schemas.RefreshTokenRequest,
+    db: Session = Depends(get_db)
+):
+    """Troca o token de renovação por um novo par de tokens"""
+    try:
+        return auth_tokens.refresh(db, request.refresh_token)
+    except RefreshTokenError as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=str(e),
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    current_user: CurrentUser = Depends(utils.get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Encerra todas as sessões do usuário (tokens de acesso e de renovação)"""
+    auth_tokens.revoke_user(db, current_user.id, "logout")
 
 
 @router.get("/me", response_model=schemas.UserResponse)
 async def get_current_user_info(
-    current_user: models.User = Depends(utils.get_current_active_user)
+    current_user: models.User = Depends(utils.get_current_db_user)
 ):
     """Retorna informações do usuário atual"""
     return current_user
 
 
+@router.post("/users/{user_id}/deactivate", response_model=schemas.UserResponse)
+async def deactivate_user(
+    user_id: int,
+    db: Session = Depends(get_db),
+    admin: CurrentUser = Depends(get_current_admin_user)
+):
+    """Desativa um usuário (apenas administradores); os tokens emitidos deixam de valer em segundos"""
+    user = utils.get_user_by_id(db, user_id=user_id)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    auth_tokens.set_active(db, user, False)
+    return user
+
+
+@router.post("/users/{user_id}/activate", response_model=schemas.UserResponse)
+async def activate_user(
+    user_id: int,
+    db: Session = Depends(get_db),
+    admin: CurrentUser = Depends(get_current_admin_user)
+):
+    """Reativa um usuário (apenas administradores)"""
+    user = utils.get_user_by_id(db, user_id=user_id)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    auth_tokens.set_active(db, user, True)
+    return user
+
+
 @router.get("/users/{user_id}", response_model=schemas.UserResponse)
 async def get_user(
     user_id: int,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Retorna informações de um usuário"""
     user = utils.get_user_by_id(db, user_id=user_id)
@@ -107,35 +164,13 @@ async def get_user(
 @router.get("/google/login")
 async def google_login():
     """Inicia o fluxo de login com Google"""
-    from google_auth_oauthlib.flow import Flow
-    from app.config import settings
-    
-    if not settings.GOOGLE_CLIENT_ID or not settings.GOOGLE_CLIENT_SECRET:
+    if not google_oauth.configured:
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail="Google OAuth not configured"
         )
     
-    flow = Flow.from_client_config(
-        {
-            "web": {
-                "client_id": settings.GOOGLE_CLIENT_ID,
-                "client_secret": settings.GOOGLE_CLIENT_SECRET,
-                "auth_uri": "https://accounts.google.com/o/oauth2/auth",
-                "token_uri": "https://oauth2.googleapis.com/token",
-                "redirect_uris": [settings.GOOGLE_REDIRECT_URI],
-            }
-        },
-        scopes=["openid", "https://www.googleapis.com/auth/userinfo.email", "https://www.googleapis.com/auth/userinfo.profile"],
-    )
-    flow.redirect_uri = settings.GOOGLE_REDIRECT_URI
-    
-    authorization_url, state = flow.authorization_url(
-        access_type="offline",
-        include_granted_scopes="true",
-    )
-    
-    return {"authorization_url": authorization_url}
+    return {"authorization_url": google_oauth.authorization_url()}
 
 
 @router.get("/google/callback")
@@ -144,33 +179,11 @@ async def google_callback(
     db: Session = Depends(get_db)
 ):
     """Callback do Google OAuth"""
-    from google_auth_oauthlib.flow import Flow
-    from google.oauth2 import id_token
-    from google.auth.transport import requests
-    from app.config import settings
     from fastapi.responses import RedirectResponse
     
     try:
-        flow = Flow.from_client_config(
-            {
-                "web": {
-                    "client_id": settings.GOOGLE_CLIENT_ID,
-                    "client_secret": settings.GOOGLE_CLIENT_SECRET,
-                    "auth_uri": "https://accounts.google.com/o/oauth2/auth",
-                    "token_uri": "https://oauth2.googleapis.com/token",
-                    "redirect_uris": [settings.GOOGLE_REDIRECT_URI],
-                }
-            },
-            scopes=["openid", "https://www.googleapis.com/auth/userinfo.email", "https://www.googleapis.com/auth/userinfo.profile"],
-        )
-        flow.redirect_uri = settings.GOOGLE_REDIRECT_URI
-        
-        flow.fetch_token(code=code)
-        
-        credentials = flow.credentials
-        idinfo = id_token.verify_oauth2_token(
-            credentials.id_token, requests.Request(), settings.GOOGLE_CLIENT_ID
-        )
+        # Troca do código e validação do id_token sem bloquear o event loop
+        idinfo = await google_oauth.authenticate(code)
         
         google_id = idinfo['sub']
         email = idinfo['email']
@@ -206,18 +219,15 @@ async def google_callback(
             user.last_login = datetime.utcnow()
             db.commit()
             
-            # Cria token de acesso
-            access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-            access_token = utils.create_access_token(
-                data={"sub": user.username},
-                expires_delta=access_token_expires
-            )
+            # Cria token de acesso (o de renovação não vai na URL)
+            access_token = auth_tokens.issue(db, user, with_refresh=False)["access_token"]
             
             # Redireciona para o frontend com o token
             frontend_url = "http://localhost:3000/auth/google/callback"
             return RedirectResponse(url=f"{frontend_url}?token={access_token}")
         
     except Exception as e:
+        logger.warning("Falha no login com Google: %s", e)
         # Em caso de erro, redireciona para login com mensagem de erro
         frontend_url = "http://localhost:3000/login"
         return RedirectResponse(url=f"{frontend_url}?error=google_auth_failed")
@@ -1,40 +1,95 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+import logging
+import os
+import tempfile
+from datetime import datetime
+
+from fastapi import APIRouter, BackgroundTasks, Depends, File, HTTPException, Request, UploadFile, status, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session, contains_eager
 from typing import List, Optional
 from pydantic import BaseModel
 
-from app.database import get_db
-from app.models import Game, User
+from app.config import settings
+from app.database import get_db, get_read_db, open_read_session
+from app.models import CatalogGame, CollectionItem, TagKind
 from app.schemas import (
     GameCreate, 
     GameUpdate, 
     GameResponse, 
-    UserCollectionResponse
+    UserCollectionResponse,
+    UploadImportResponse,
+    SimilarGameResponse,
+    CollectionAnalyticsResponse,
+    TagQueryResponse,
 )
-from app.utils.auth import get_current_active_user
-from app.services import ludopedia_service, bgg_service
+from app.utils.auth import CurrentUser, get_current_active_user, get_current_admin_user
+from app.core import encoding
+from app.services import (
+    ludopedia_service, bgg_service, import_pipeline, import_checkpoints, catalog_service,
+    collection_export, spreadsheet_import, collection_analytics, expansion_linker, game_tags,
+    similar_games,
+)
+from app.services.collection_export import FORMATS as EXPORT_FORMATS
+from app.services.spreadsheet_import import SpreadsheetError
+from app.services.game_tags import TagQueryError
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Colunas de ordenação da coleção (campos do título ficam no catálogo)
+SORT_COLUMNS = {
+    "order": CollectionItem.order,
+    "name": CatalogGame.name,
+    "year_published": CatalogGame.year_published,
+    "purchase_price": CollectionItem.purchase_price,
+    "rating": CatalogGame.rating,
+    "weight": CatalogGame.weight,
+    "ranking_position": CatalogGame.ranking_position,
+    "created_at": CollectionItem.created_at,
+}
+
+
+# Formatos alternativos da coleção (ver app.core.encoding)
+COLLECTION_MEDIA_TYPES = {
+    media_type: {"description": description}
+    for media_type, description in (
+        (encoding.MSGPACK, "Mesmo documento em MessagePack"),
+        (encoding.COLUMNAR_JSON, "Jogos em colunas, com condition e game_type codificados por dicionário"),
+        (encoding.COLUMNAR_MSGPACK, "Layout colunar em MessagePack"),
+    )
+}
 
 
-@router.get("/", response_model=UserCollectionResponse)
+@router.get(
+    "/",
+    response_model=UserCollectionResponse,
+    responses={200: {"content": {media_type: {} for media_type in COLLECTION_MEDIA_TYPES}}},
+)
 def get_collection(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user),
+    request: Request,
+    db: Session = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_active_user),
     sort_by: str = Query("order", alias="sortBy", description="Campo para ordenação (order, name, year_published, purchase_price, rating, weight, ranking_position)"),
-    sort_order: str = Query("asc", alias="sortOrder", description="Ordem de classificação (asc, desc)")
+    sort_order: str = Query("asc", alias="sortOrder", description="Ordem de classificação (asc, desc)"),
+    tags: Optional[str] = Query(None, description="Filtro por tags, ex.: cooperative-game AND NOT dice-rolling")
 ):
-    """Retorna a coleção completa do usuário"""
-    from sqlalchemy.orm import joinedload
+    """
+    Retorna a coleção completa do usuário.
+    O formato segue o cabeçalho Accept: JSON (padrão), MessagePack ou colunar.
+    """
+    tag_filter = None
+    if tags:
+        try:
+            tag_filter = game_tags.filter_items(db, current_user.id, tags)
+        except TagQueryError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    from sqlalchemy.orm import joinedload, contains_eager
     from sqlalchemy import desc, asc
     
-    # Log para debug
-    print(f"DEBUG COLLECTION - Parâmetros recebidos: sort_by={sort_by}, sort_order={sort_order}")
-    
     # Validar campo de ordenação
-    valid_sort_fields = ["order", "name", "year_published", "purchase_price", "rating", "weight", "ranking_position", "created_at"]
-    if sort_by not in valid_sort_fields:
-        print(f"DEBUG COLLECTION - Campo inválido, usando 'order'")
+    if sort_by not in SORT_COLUMNS:
+        logger.debug("Campo de ordenação inválido: %s; usando 'order'", sort_by)
         sort_by = "order"
     
     # Determinar ordem
@@ -45,50 +100,129 @@ def get_collection(
     from sqlalchemy import nullslast, nullsfirst
     
     if sort_order == "desc":
-        order_clause = nullsfirst(order_func(getattr(Game, sort_by)))
+        order_clause = nullsfirst(order_func(SORT_COLUMNS[sort_by]))
     else:
-        order_clause = nullslast(order_func(getattr(Game, sort_by)))
-    
-    games = db.query(Game).options(
-        joinedload(Game.base_game)
-    ).filter(Game.user_id == current_user.id).order_by(order_clause).all()
-    
-    # Log para debug
-    print(f"DEBUG COLLECTION - Ordenação: {sort_by} {sort_order}")
-    print(f"DEBUG COLLECTION - Total de jogos: {len(games)}")
-    if games:
-        print(f"DEBUG COLLECTION - Primeiros 3 jogos: {[{'id': g.id, 'name': g.name, 'order': g.order, 'year': g.year_published} for g in games[:3]]}")
-    
-    # Criar lista de jogos com nome do jogo base
-    games_with_base = []
-    for game in games:
-        game_dict = {
-            **{c.name: getattr(game, c.name) for c in game.__table__.columns},
-            'base_game_name': game.base_game.name if game.base_game else None
-        }
-        games_with_base.append(game_dict)
+        order_clause = nullslast(order_func(SORT_COLUMNS[sort_by]))
+    
+    query = db.query(CollectionItem).join(CollectionItem.catalog).options(
+        contains_eager(CollectionItem.catalog),
+        joinedload(CollectionItem.base_game)
+    ).filter(CollectionItem.user_id == current_user.id)
+    if tag_filter is not None:
+        # Só os itens que passam no filtro saem do banco (os IDs são da própria coleção)
+        query = query.filter(CollectionItem.id.in_(sorted(tag_filter)))
+    games = query.order_by(order_clause).all()
+    
+    logger.debug(
+        "Coleção carregada",
+        extra={"user_id": current_user.id, "sort_by": sort_by, "sort_order": sort_order, "games": len(games)},
+    )
     
-    print(f"DEBUG COLLECTION - Retornando {len(games_with_base)} jogos")
+    # Itens expõem os campos do catálogo e o nome do jogo base
+    games_with_base = [GameResponse.model_validate(game) for game in games]
     
-    return UserCollectionResponse(
+    collection = UserCollectionResponse(
         user_id=current_user.id,
         total_games=len(games),
         games=games_with_base
     )
+    
+    media_type = encoding.negotiate(request)
+    if media_type == encoding.JSON:
+        return collection
+    return encoding.encoded_response(
+        media_type, collection.model_dump(mode="json"), "games", GameResponse.model_fields
+    )
+
+
+@router.get("/analytics", response_model=CollectionAnalyticsResponse)
+def get_collection_analytics(
+    db: Session = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
+):
+    """
+    Distribuições da coleção: jogadores, duração, peso, década de publicação,
+    gasto por ano de entrada e valor pedido vs. pago nos jogos à venda.
+    O resultado fica em cache até a coleção mudar.
+    """
+    return collection_analytics.get(db, current_user.id)
+
+
+@router.get("/analytics/all", response_model=CollectionAnalyticsResponse)
+def get_all_collections_analytics(
+    db: Session = Depends(get_read_db),
+    admin: CurrentUser = Depends(get_current_admin_user)
+):
+    """
+    Mesmas distribuições somadas sobre as coleções de todos os usuários (apenas administradores).
+    A tabela é lida em blocos de ANALYTICS_CHUNK_SIZE linhas.
+    """
+    return collection_analytics.get(db)
+
+
+@router.get("/tags", response_model=TagQueryResponse)
+def query_collection_tags(
+    q: Optional[str] = Query(None, description="Expressão com AND, OR, NOT e parênteses, ex.: cooperative-game AND NOT dice-rolling"),
+    kind: Optional[TagKind] = Query(None, description="Contar apenas tags deste tipo"),
+    db: Session = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
+):
+    """
+    Filtra a coleção por categorias, mecânicas, designers e editoras.
+    Termos são slugs das tags, opcionalmente com o tipo (mechanic:dice-rolling).
+    Retorna os itens que satisfazem a consulta e a contagem de cada tag entre eles.
+    """
+    try:
+        return game_tags.query(db, current_user.id, q, kind)
+    except TagQueryError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.get("/export")
+def export_collection(
+    request: Request,
+    format: str = Query("csv", pattern="^(csv|xlsx|parquet)$", description="Formato do arquivo (csv, xlsx, parquet)"),
+    current_user: CurrentUser = Depends(get_current_active_user)
+):
+    """
+    Exporta a coleção completa em CSV, XLSX ou Parquet.
+    As linhas saem de um cursor do banco direto para o arquivo, sem montar a lista em memória.
+    """
+    media_type, extension = EXPORT_FORMATS[format]
+    user_id = current_user.id
+    filename = f"colecao-{current_user.username}-{datetime.now():%Y%m%d}.{extension}"
+    
+    def content():
+        # A sessão vive enquanto o arquivo é transmitido
+        db = open_read_session(request)
+        try:
+            yield from collection_export.stream(db, user_id, format)
+        finally:
+            db.close()
+    
+    logger.info("Exportação da coleção iniciada", extra={"user_id": user_id, "format": format})
+    return StreamingResponse(
+        content(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
 
 @router.post("/games", response_model=GameResponse, status_code=status.HTTP_201_CREATED)
 def add_game_to_collection(
     game_data: GameCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: CurrentUser = Depends(get_current_active_user)
 ):
     """Adiciona um jogo à coleção do usuário"""
     # Verifica se já existe um jogo com o mesmo ludopedia_id ou bgg_id
-    if game_data.ludopedia_id:
-        existing = db.query(Game).filter(
-            Game.user_id == current_user.id,
-            Game.ludopedia_id == game_data.ludopedia_id
+    for field in ("ludopedia_id", "bgg_id"):
+        value = getattr(game_data, field)
+        if not value:
+            continue
+        existing = db.query(CollectionItem).join(CollectionItem.catalog).filter(
+            CollectionItem.user_id == current_user.id,
+            getattr(CatalogGame, field) == value
         ).first()
         if existing:
             raise HTTPException(
@@ -96,40 +230,27 @@ def add_game_to_collection(
                 detail="Este jogo já está na sua coleção"
             )
     
-    if game_data.bgg_id:
-        existing = db.query(Game).filter(
-            Game.user_id == current_user.id,
-            Game.bgg_id == game_data.bgg_id
-        ).first()
-        if existing:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Este jogo já está na sua coleção"
-            )
+    # Reutiliza o título do catálogo e cria o item na coleção
+    catalog_data, item_data = catalog_service.split(game_data.model_dump())
+    catalog = catalog_service.get_or_create(db, catalog_data, current_user.id)
+    new_game = CollectionItem(user_id=current_user.id, catalog=catalog, **item_data)
+    db.add(new_game)
     
-    # Cria o novo jogo
-    new_game = Game(
-        user_id=current_user.id,
-        **game_data.model_dump()
+    # Dados informados que divergem do título compartilhado ficam em uma cópia privada
+    catalog_service.update_for_item(
+        db, new_game, {k: v for k, v in catalog_data.items() if v is not None}
     )
     
-    db.add(new_game)
     db.commit()
     db.refresh(new_game)
     
     return new_game
 
 
-@router.get("/games/{game_id}", response_model=GameResponse)
-def get_game(
-    game_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
-):
-    """Busca um jogo específico da coleção do usuário"""
-    game = db.query(Game).filter(
-        Game.id == game_id,
-        Game.user_id == current_user.id
+def _get_user_game(db: Session, game_id: int, user_id: int) -> CollectionItem:
+    game = db.query(CollectionItem).filter(
+        CollectionItem.id == game_id,
+        CollectionItem.user_id == user_id
     ).first()
     
     if not game:
@@ -141,30 +262,79 @@ def get_game(
     return game
 
 
+@router.get("/games/{game_id}", response_model=GameResponse)
+def get_game(
+    game_id: int,
+    db: Session = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
+):
+    """Busca um jogo específico da coleção do usuário"""
+    return _get_user_game(db, game_id, current_user.id)
+
+
+@router.get("/games/{game_id}/similar", response_model=List[SimilarGameResponse])
+def get_similar_games(
+    game_id: int,
+    scope: str = Query("catalog", pattern="^(catalog|for_sale)$", description="catalog (todo o catálogo) ou for_sale (seus jogos à venda)"),
+    limit: int = Query(10, ge=1, le=50, description="Número máximo de resultados"),
+    db: Session = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
+):
+    """
+    Jogos parecidos com um jogo da coleção (categorias, mecânicas, peso, jogadores e duração).
+    Com scope=for_sale, sugere outros jogos à venda do próprio usuário
+    ("quem se interessar por X pode gostar também de Y").
+    """
+    game = _get_user_game(db, game_id, current_user.id)
+    
+    if scope == "catalog":
+        ranked = similar_games.similar(db, game.catalog_id, limit)
+        catalog = {c.id: c for c in db.query(CatalogGame).filter(CatalogGame.id.in_([cid for cid, _ in ranked]))}
+        return [
+            SimilarGameResponse(
+                catalog_id=cid, name=catalog[cid].name, year_published=catalog[cid].year_published,
+                bgg_id=catalog[cid].bgg_id, ludopedia_id=catalog[cid].ludopedia_id,
+                image_url=catalog[cid].image_url, similarity=score,
+            )
+            for cid, score in ranked if cid in catalog
+        ]
+    
+    for_sale = db.query(CollectionItem).join(CollectionItem.catalog).options(
+        contains_eager(CollectionItem.catalog)
+    ).filter(
+        CollectionItem.user_id == current_user.id,
+        CollectionItem.is_for_sale.is_(True),
+        CollectionItem.id != game.id,
+    ).all()
+    items = {item.catalog_id: item for item in for_sale}
+    ranked = similar_games.rank(db, game.catalog_id, list(items), limit)
+    return [
+        SimilarGameResponse(
+            catalog_id=cid, item_id=items[cid].id, name=items[cid].name,
+            year_published=items[cid].year_published, bgg_id=items[cid].bgg_id,
+            ludopedia_id=items[cid].ludopedia_id, image_url=items[cid].image_url,
+            price=items[cid].price, similarity=score,
+        )
+        for cid, score in ranked
+    ]
+
+
 @router.put("/games/{game_id}", response_model=GameResponse)
 def update_game(
     game_id: int,
     game_data: GameUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: CurrentUser = Depends(get_current_active_user)
 ):
     """Atualiza um jogo da coleção"""
     # Busca o jogo
-    game = db.query(Game).filter(
-        Game.id == game_id,
-        Game.user_id == current_user.id
-    ).first()
-    
-    if not game:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Jogo não encontrado na sua coleção"
-        )
+    game = _get_user_game(db, game_id, current_user.id)
     
     # Atualiza os campos fornecidos
-    update_data = game_data.model_dump(exclude_unset=True)
-    for field, value in update_data.items():
+    catalog_data, item_data = catalog_service.split(game_data.model_dump(exclude_unset=True))
+    for field, value in item_data.items():
         setattr(game, field, value)
+    catalog_service.update_for_item(db, game, catalog_data)
     
     db.commit()
     db.refresh(game)
@@ -176,21 +346,13 @@ def update_game(
 def remove_game(
     game_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: CurrentUser = Depends(get_current_active_user)
 ):
     """Remove um jogo da coleção"""
     # Busca o jogo
-    game = db.query(Game).filter(
-        Game.id == game_id,
-        Game.user_id == current_user.id
-    ).first()
-    
-    if not game:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Jogo não encontrado na sua coleção"
-        )
+    game = _get_user_game(db, game_id, current_user.id)
     
+    catalog_service.release(db, game)
     db.delete(game)
     db.commit()
     
@@ -200,13 +362,14 @@ def remove_game(
 @router.delete("/", status_code=status.HTTP_200_OK)
 def clear_collection(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: CurrentUser = Depends(get_current_active_user)
 ):
     """Remove todos os jogos da coleção do usuário"""
-    games = db.query(Game).filter(Game.user_id == current_user.id).all()
+    games = db.query(CollectionItem).filter(CollectionItem.user_id == current_user.id).all()
     count = len(games)
     
     for game in games:
+        catalog_service.release(db, game)
         db.delete(game)
     
     db.commit()
@@ -262,11 +425,12 @@ async def get_bgg_game_details(bgg_id: int):
 @router.post("/import/bgg", response_model=List[GameResponse], status_code=status.HTTP_201_CREATED)
 async def import_from_bgg(
     request: ImportGamesRequest,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: CurrentUser = Depends(get_current_active_user)
 ):
     """Importa jogos do BoardGameGeek para a coleção do usuário"""
-    imported_games = []
+    games_data = []
     
     for bgg_id in request.game_ids:
         # Busca detalhes do jogo no BGG
@@ -275,120 +439,136 @@ async def import_from_bgg(
         if not game_details:
             continue
         
-        # Valida se o jogo tem nome
-        name = game_details.get("name")
-        if not name or name.strip() == "":
-            continue
-        
-        # Verifica se já existe na coleção
-        existing = db.query(Game).filter(
-            Game.user_id == current_user.id,
-            Game.bgg_id == bgg_id
-        ).first()
-        
-        if existing:
-            continue
-        
-        # Cria o jogo na coleção
-        new_game = Game(
-            user_id=current_user.id,
-            name=name,
-            description=game_details.get("description"),
-            year_published=game_details.get("year_published"),
-            game_type="BASE",  # Por padrão, todos os jogos importados são base
-            bgg_id=bgg_id,
-            min_players=game_details.get("min_players"),
-            max_players=game_details.get("max_players"),
-            min_playtime=game_details.get("min_playtime"),
-            max_playtime=game_details.get("max_playtime"),
-            min_age=game_details.get("min_age"),
-            rating=game_details.get("rating"),
-            weight=game_details.get("weight"),
-            image_url=game_details.get("image_url"),
-            is_for_trade=False,
-            is_for_sale=False
-        )
-        
-        db.add(new_game)
-        imported_games.append(new_game)
+        # O tipo (base ou expansão) vem do /thing
+        games_data.append({**game_details, "bgg_id": bgg_id})
     
-    db.commit()
-    
-    # Refresh dos jogos importados
-    for game in imported_games:
-        db.refresh(game)
+    result = import_pipeline.run(db, current_user.id, games_data, provider="bgg")
+    expansion_linker.schedule(background_tasks, current_user.id)
+    return result.games
+
+
+@router.post("/import/upload", response_model=UploadImportResponse)
+def import_from_spreadsheet(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(..., description="Planilha CSV ou XLSX com uma linha por jogo"),
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
+):
+    """
+    Importa jogos de uma planilha CSV ou XLSX.
+    Cada linha segue as regras de GameCreate; linhas inválidas são listadas no relatório
+    e as válidas são gravadas em lotes. Jogos sem IDs de provedor são associados ao
+    catálogo pelo nome quando possível.
+    """
+    extension = os.path.splitext(file.filename or "")[1].lower()
+    if extension in (".csv", ".txt") or file.content_type == "text/csv":
+        file_format = "csv"
+    elif extension == ".xlsx":
+        file_format = "xlsx"
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Formato não suportado. Envie um arquivo .csv ou .xlsx"
+        )
     
-    return imported_games
+    # Copia em blocos para UPLOAD_DIR, respeitando MAX_UPLOAD_SIZE
+    os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=settings.UPLOAD_DIR, suffix=extension) as upload:
+        size = 0
+        while chunk := file.file.read(1024 * 1024):
+            size += len(chunk)
+            if size > settings.MAX_UPLOAD_SIZE:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"Arquivo maior que o limite de {settings.MAX_UPLOAD_SIZE // (1024 * 1024)} MB"
+                )
+            upload.write(chunk)
+        upload.seek(0)
+        
+        try:
+            result = spreadsheet_import.run(db, current_user.id, upload, file_format)
+        except SpreadsheetError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    expansion_linker.schedule(background_tasks, current_user.id)
+    return UploadImportResponse(
+        **{k: v for k, v in vars(result).items() if k != "errors"},
+        errors=[vars(error) for error in result.errors],
+        errors_truncated=result.error_count > len(result.errors),
+    )
 
 
 @router.post("/import-collection/bgg", response_model=List[GameResponse], status_code=status.HTTP_201_CREATED)
 async def import_collection_from_bgg(
+    background_tasks: BackgroundTasks,
     username: str = Query(..., description="Nome de usuário no BoardGameGeek"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: CurrentUser = Depends(get_current_active_user)
 ):
-    """Importa a coleção completa de um usuário do BoardGameGeek"""
-    # Busca a coleção do usuário no BGG
-    games_data = await bgg_service.get_user_collection(username)
-    
-    if not games_data:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Usuário '{username}' não encontrado no BoardGameGeek ou coleção vazia"
-        )
-    
-    imported_games = []
+    """
+    Importa a coleção completa de um usuário do BoardGameGeek.
+    Se uma importação anterior foi interrompida, ela é retomada do checkpoint.
+    """
+    checkpoint = import_checkpoints.open(db, current_user.id, "bgg", source=username)
     
-    for game_data in games_data:
-        # Valida se o jogo tem nome
-        name = game_data.get("name")
-        if not name or name.strip() == "":
-            continue
+    try:
+        # Busca a coleção do usuário no BGG
+        games_data = await bgg_service.get_user_collection(username, checkpoint=checkpoint)
         
-        # Verifica se já existe na coleção
-        existing = db.query(Game).filter(
-            Game.user_id == current_user.id,
-            Game.bgg_id == game_data["bgg_id"]
-        ).first()
+        if checkpoint.failed:
+            raise HTTPException(
+                status_code=status.HTTP_502_BAD_GATEWAY,
+                detail="Importação do BoardGameGeek interrompida. Tente novamente para continuar de onde parou."
+            )
         
-        if existing:
-            continue
+        if not games_data:
+            await checkpoint.complete()
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Usuário '{username}' não encontrado no BoardGameGeek ou coleção vazia"
+            )
         
-        # Cria o jogo na coleção
-        new_game = Game(
-            user_id=current_user.id,
-            name=name,
-            year_published=game_data.get("year_published"),
-            game_type="BASE",  # Por padrão, todos os jogos importados são base
-            bgg_id=game_data["bgg_id"],
-            min_players=game_data.get("min_players"),
-            max_players=game_data.get("max_players"),
-            min_playtime=game_data.get("min_playtime"),
-            max_playtime=game_data.get("max_playtime"),
-            min_age=game_data.get("min_age"),
-            rating=game_data.get("rating"),
-            weight=game_data.get("weight"),
-            is_for_trade=False,
-            is_for_sale=False
-        )
+        # A coleção do BGG não informa o tipo: tudo entra como base e as
+        # expansões são classificadas e ligadas em segundo plano
+        games_data = [{**game_data, "game_type": "BASE"} for game_data in games_data]
         
-        db.add(new_game)
-        imported_games.append(new_game)
-    
-    db.commit()
-    
-    # Refresh dos jogos importados
-    for game in imported_games:
-        db.refresh(game)
-    
-    return imported_games
+        result = import_pipeline.run(
+            db, current_user.id, games_data, provider="bgg", on_batch=checkpoint.batch_committed
+        )
+        await checkpoint.complete(result.imported_count)
+    except HTTPException:
+        raise
+    except Exception as e:
+        # Encerra a importação (e o stream de eventos); o progresso fica para a retomada
+        db.rollback()
+        if not checkpoint.finished:
+            await checkpoint.fail(str(e))
+        raise
+    expansion_linker.schedule(background_tasks, current_user.id)
+    return result.games
+
+
+@router.post("/link-expansions")
+async def link_expansions(
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
+):
+    """
+    Classifica as expansões da coleção e liga cada uma ao seu jogo base.
+    Roda sozinho após as importações; aqui pode ser disparado sob demanda.
+    """
+    result = await expansion_linker.link_user(db, current_user.id)
+    return {
+        "message": f"{result.linked} expansões ligadas ao jogo base.",
+        **vars(result),
+    }
 
 
 @router.post("/import/ludopedia", response_model=List[GameResponse], status_code=status.HTTP_201_CREATED)
 async def import_from_ludopedia(
     request: ImportGamesRequest,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: CurrentUser = Depends(get_current_active_user)
 ):
     """
     Importa jogos da Ludopedia para a coleção do usuário.
@@ -404,7 +584,7 @@ async def import_from_ludopedia(
 async def import_collection_from_ludopedia(
     username: str = Query(..., description="Nome de usuário na Ludopedia"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: CurrentUser = Depends(get_current_active_user)
 ):
     """
     Importa a coleção completa de um usuário da Ludopedia.
@@ -0,0 +1,137 @@
+import json
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Header, Request
+from fastapi.responses import StreamingResponse
+from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy.orm import Session
+
+from app.database import get_db
+from app.models import ImportJob, ImportStatus
+from app.schemas import ImportJobResponse
+from app.utils.auth import CurrentUser, get_current_active_user, get_user_from_token
+from app.services.import_checkpoint import import_checkpoints
+from app.services.import_events import import_events, TERMINAL_EVENTS
+
+router = APIRouter()
+
+# EventSource não envia cabeçalhos, então o stream também aceita ?token=
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login", auto_error=False)
+
+# Intervalo de reconexão sugerido ao cliente (ms)
+SSE_RETRY_MS = 3000
+
+
+async def get_stream_user(
+    header_token: Optional[str] = Depends(optional_oauth2_scheme),
+    token: Optional[str] = Query(None, description="Token de acesso (para clientes EventSource)"),
+    db: Session = Depends(get_db)
+) -> CurrentUser:
+    """Obtém o usuário ativo a partir do cabeçalho Authorization ou do parâmetro token"""
+    user = get_user_from_token(db, header_token or token) if (header_token or token) else None
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    if not user.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return user
+
+
+def _get_user_import(db: Session, import_id: int, user_id: int) -> ImportJob:
+    job = db.query(ImportJob).filter(
+        ImportJob.id == import_id,
+        ImportJob.user_id == user_id
+    ).first()
+
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Importação não encontrada"
+        )
+
+    return job
+
+
+@router.get("/", response_model=List[ImportJobResponse])
+def list_imports(
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
+):
+    """Lista as importações recentes do usuário (a primeira em andamento pode ser acompanhada via /events)"""
+    jobs = db.query(ImportJob).filter(
+        ImportJob.user_id == current_user.id
+    ).order_by(ImportJob.id.desc()).limit(20).all()
+
+    counts = import_checkpoints.processed_counts(db, jobs)
+    return [ImportJobResponse.from_job(job, counts[job.id]) for job in jobs]
+
+
+@router.get("/{import_id}", response_model=ImportJobResponse)
+def get_import(
+    import_id: int,
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
+):
+    """Retorna o estado atual de uma importação"""
+    job = _get_user_import(db, import_id, current_user.id)
+    return ImportJobResponse.from_job(job, import_checkpoints.processed_counts(db, [job])[job.id])
+
+
+@router.get("/{import_id}/events")
+async def stream_import_events(
+    import_id: int,
+    request: Request,
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_stream_user)
+):
+    """
+    Stream Server-Sent Events com o progresso de uma importação.
+
+    Eventos: snapshot, page, game, fetched, batch, completed, failed.
+    Envia heartbeats periódicos e, ao reconectar com Last-Event-ID,
+    reenvia apenas os eventos ainda não recebidos.
+    """
+    job = _get_user_import(db, import_id, current_user.id)
+    snapshot = ImportJobResponse.from_job(job, import_checkpoints.processed_counts(db, [job])[job.id]).model_dump(mode="json")
+    finished = job.status in (ImportStatus.COMPLETED, ImportStatus.FAILED)
+
+    # Libera a conexão do pool; o stream pode durar vários minutos
+    db.close()
+
+    try:
+        last_id = int(last_event_id) if last_event_id else 0
+    except ValueError:
+        last_id = 0
+
+    async def event_stream():
+        yield f"retry: {SSE_RETRY_MS}\n\n"
+
+        # Estado inicial sem id, para não alterar o Last-Event-ID do cliente
+        snapshot_event = snapshot["status"].lower() if finished else "snapshot"
+        yield f"event: {snapshot_event}\ndata: {json.dumps(snapshot)}\n\n"
+        if finished:
+            return
+
+        async for item in import_events.stream(import_id, last_id):
+            if item is None:
+                if await request.is_disconnected():
+                    return
+                yield ": heartbeat\n\n"
+                continue
+
+            yield item.to_sse()
+            if item.event in TERMINAL_EVENTS:
+                return
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        },
+    )
@@ -1,15 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+import logging
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
 from typing import Optional
 from pydantic import BaseModel
 
 from app.database import get_db
 from app.models import User
-from app.utils.auth import get_current_active_user
-from app.services import ludopedia_service
+from app.utils.auth import CurrentUser, get_current_active_user, get_current_db_user
+from app.services import ludopedia_service, import_pipeline, import_checkpoints, catalog_service, expansion_linker, entity_resolver
 from app.config import settings
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 
 class LudopediaTokenRequest(BaseModel):
@@ -49,7 +52,7 @@ def ludopedia_authorize():
 async def ludopedia_callback(
     request: LudopediaTokenRequest,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_db_user)
 ):
     """
     Callback OAuth da Ludopedia
@@ -102,86 +105,58 @@ async def ludopedia_callback(
 
 @router.post("/import-collection")
 async def import_collection_from_ludopedia(
+    background_tasks: BackgroundTasks,
     access_token: str = Query(..., description="Access token da Ludopedia"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: CurrentUser = Depends(get_current_active_user)
 ):
     """
-    Importa a coleção completa do usuário da Ludopedia
+    Importa a coleção completa do usuário da Ludopedia.
+    Se uma importação anterior foi interrompida, ela é retomada do checkpoint.
     """
+    checkpoint = None
     try:
+        checkpoint = import_checkpoints.open(db, current_user.id, "ludopedia")
+        
         # Buscar coleção da Ludopedia
-        print(f"DEBUG - Buscando coleção com access_token: {access_token[:20]}...")
-        games_data = await ludopedia_service.get_user_collection(access_token)
-        print(f"DEBUG - Jogos retornados: {len(games_data)}")
+        logger.info("Importando coleção da Ludopedia", extra={"user_id": current_user.id, "import_id": checkpoint.id})
+        games_data = await ludopedia_service.get_user_collection(access_token, checkpoint=checkpoint)
+        
+        if checkpoint.failed:
+            raise HTTPException(
+                status_code=status.HTTP_502_BAD_GATEWAY,
+                detail=f"Importação da Ludopedia interrompida na página {checkpoint.page}. Tente novamente para continuar de onde parou."
+            )
         
         if not games_data:
+            await checkpoint.complete()
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Coleção vazia ou não encontrada na Ludopedia"
             )
         
-        from app.models import Game
-        
-        imported_games = []
-        
-        for game_data in games_data:
-            # Valida se o jogo tem nome
-            name = game_data.get("name")
-            if not name or name.strip() == "":
-                continue
-            
-            # Verifica se já existe na coleção
-            existing = db.query(Game).filter(
-                Game.user_id == current_user.id,
-                Game.ludopedia_id == game_data.get("ludopedia_id")
-            ).first()
-            
-            if existing:
-                continue
-            
-            # Cria o jogo na coleção
-            new_game = Game(
-                user_id=current_user.id,
-                name=name,
-                description=game_data.get("description"),
-                year_published=game_data.get("year_published"),
-                game_type=game_data.get("game_type", "BASE"),
-                ludopedia_id=game_data.get("ludopedia_id"),
-                min_players=game_data.get("min_players"),
-                max_players=game_data.get("max_players"),
-                min_playtime=game_data.get("min_playtime"),
-                max_playtime=game_data.get("max_playtime"),
-                min_age=game_data.get("min_age"),
-                rating=game_data.get("rating"),
-                weight=game_data.get("weight"),
-                ranking_position=game_data.get("ranking_position"),
-                purchase_price=game_data.get("purchase_price"),
-                image_url=game_data.get("image_url"),
-                is_for_trade=False,
-                is_for_sale=False
-            )
-            
-            db.add(new_game)
-            imported_games.append(new_game)
-        
-        print(f"DEBUG - Total de jogos para importar: {len(imported_games)}")
-        db.commit()
-        
-        # Refresh dos jogos importados
-        for game in imported_games:
-            db.refresh(game)
+        result = import_pipeline.run(
+            db, current_user.id, games_data, provider="ludopedia", on_batch=checkpoint.batch_committed
+        )
+        await checkpoint.complete(result.imported_count)
+        expansion_linker.schedule(background_tasks, current_user.id)
         
-        print(f"DEBUG - Importação concluída: {len(imported_games)} jogos importados")
+        logger.info(
+            "Importação da Ludopedia concluída",
+            extra={"user_id": current_user.id, "imported": result.imported_count, "found": len(games_data)},
+        )
         return {
-            "message": f"Coleção importada com sucesso! {len(imported_games)} jogos adicionados.",
-            "imported_count": len(imported_games),
+            "message": f"Coleção importada com sucesso! {result.imported_count} jogos adicionados.",
+            "imported_count": result.imported_count,
             "total_found": len(games_data)
         }
         
     except HTTPException:
         raise
     except Exception as e:
+        # Encerra a importação (e o stream de eventos); o progresso fica para a retomada
+        if checkpoint is not None and not checkpoint.finished:
+            await checkpoint.fail(str(e))
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Erro ao importar coleção: {str(e)}"
@@ -190,9 +165,10 @@ async def import_collection_from_ludopedia(
 
 @router.post("/sync-collection")
 async def sync_collection_from_ludopedia(
+    background_tasks: BackgroundTasks,
     access_token: Optional[str] = Query(None, description="Access token da Ludopedia (opcional se já autorizou antes)"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_db_user)
 ):
     """
     Sincroniza a coleção do usuário com a Ludopedia:
@@ -200,6 +176,7 @@ async def sync_collection_from_ludopedia(
     - Atualiza jogos existentes
     - Remove jogos que não estão mais na Ludopedia
     """
+    checkpoint = None
     try:
         # Usar token salvo se não fornecido
         if not access_token:
@@ -211,18 +188,26 @@ async def sync_collection_from_ludopedia(
                 detail="Token de acesso da Ludopedia não encontrado. Por favor, autorize sua conta primeiro."
             )
         
+        checkpoint = import_checkpoints.open(db, current_user.id, "ludopedia")
+        
         # Buscar coleção da Ludopedia
-        print(f"DEBUG SYNC - Buscando coleção da Ludopedia...")
-        ludopedia_games_data = await ludopedia_service.get_user_collection(access_token)
-        print(f"DEBUG SYNC - Jogos na Ludopedia: {len(ludopedia_games_data)}")
+        logger.info("Sincronizando coleção da Ludopedia", extra={"user_id": current_user.id, "import_id": checkpoint.id})
+        ludopedia_games_data = await ludopedia_service.get_user_collection(access_token, checkpoint=checkpoint)
+        
+        if checkpoint.failed:
+            raise HTTPException(
+                status_code=status.HTTP_502_BAD_GATEWAY,
+                detail=f"Sincronização com a Ludopedia interrompida na página {checkpoint.page}. Tente novamente para continuar de onde parou."
+            )
         
         if not ludopedia_games_data:
+            await checkpoint.complete()
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Coleção vazia ou não encontrada na Ludopedia"
             )
         
-        from app.models import Game
+        from app.models import CollectionItem
         from typing import Dict, Any
         
         # Criar dicionário de jogos da Ludopedia por ludopedia_id
@@ -232,101 +217,72 @@ async def sync_collection_from_ludopedia(
             if ludopedia_id:
                 ludopedia_games_dict[ludopedia_id] = game_data
         
-        # Buscar jogos locais
-        local_games = db.query(Game).filter(
-            Game.user_id == current_user.id
+        # Buscar jogos locais (o título do catálogo vem junto)
+        local_games = db.query(CollectionItem).filter(
+            CollectionItem.user_id == current_user.id
         ).all()
+        local_games_dict = {game.ludopedia_id: game for game in local_games if game.ludopedia_id}
         
         ludopedia_ids = set(ludopedia_games_dict.keys())
-        local_ludopedia_ids = {game.ludopedia_id for game in local_games if game.ludopedia_id}
+        local_ludopedia_ids = set(local_games_dict.keys())
         
         # Calcular estatísticas
         to_add = ludopedia_ids - local_ludopedia_ids
         to_update = ludopedia_ids & local_ludopedia_ids
         to_remove = local_ludopedia_ids - ludopedia_ids
         
-        added_count = 0
         updated_count = 0
         removed_count = 0
         
         # Adicionar jogos novos
-        for ludopedia_id in to_add:
-            game_data = ludopedia_games_dict[ludopedia_id]
-            name = game_data.get("name")
-            if not name or name.strip() == "":
-                continue
-            
-            # Usar apenas dados básicos da coleção para evitar rate limiting
-            # Detalhes podem ser buscados posteriormente se necessário
-            
-            new_game = Game(
-                user_id=current_user.id,
-                name=name,
-                description=game_data.get("description"),
-                year_published=game_data.get("year_published"),
-                game_type=game_data.get("game_type", "BASE"),
-                base_game_id=game_data.get("base_game_id"),
-                ludopedia_id=ludopedia_id,
-                order=game_data.get("order"),
-                min_players=game_data.get("min_players"),
-                max_players=game_data.get("max_players"),
-                min_playtime=game_data.get("min_playtime"),
-                max_playtime=game_data.get("max_playtime"),
-                min_age=game_data.get("min_age"),
-                rating=game_data.get("rating"),
-                weight=game_data.get("weight"),
-                ranking_position=game_data.get("ranking_position"),
-                purchase_price=game_data.get("purchase_price"),
-                image_url=game_data.get("image_url"),
-                is_for_trade=False,
-                is_for_sale=False
-            )
-            db.add(new_game)
-            added_count += 1
+        # Usar apenas dados básicos da coleção para evitar rate limiting
+        # Detalhes podem ser buscados posteriormente se necessário
+        added = import_pipeline.run(
+            db,
+            current_user.id,
+            (ludopedia_games_dict[ludopedia_id] for ludopedia_id in to_add),
+            provider="ludopedia",
+            # Títulos ligados aos do BGG que o usuário já tem também contam como existentes
+            existing_ids=local_ludopedia_ids | entity_resolver.counterpart_ids(db, current_user.id, "ludopedia"),
+            on_batch=checkpoint.batch_committed,
+        )
+        added_count = added.imported_count
         
         # Atualizar jogos existentes
         for ludopedia_id in to_update:
             game_data = ludopedia_games_dict[ludopedia_id]
             
             # Usar apenas dados básicos da coleção para evitar rate limiting
-            existing_game = db.query(Game).filter(
-                Game.user_id == current_user.id,
-                Game.ludopedia_id == ludopedia_id
-            ).first()
+            existing_game = local_games_dict.get(ludopedia_id)
             
             if existing_game:
-                # Atualizar campos (exceto is_for_trade, is_for_sale, price, condition, notes)
-                existing_game.name = game_data.get("name")
-                existing_game.description = game_data.get("description")
-                existing_game.year_published = game_data.get("year_published")
-                existing_game.game_type = game_data.get("game_type", "BASE")
-                existing_game.base_game_id = game_data.get("base_game_id")
+                # Metadados atualizam o título compartilhado; cópias privadas mantêm as edições do usuário
+                catalog_service.apply_provider_data(existing_game.catalog, game_data)
+                
+                # Atualizar campos do item (exceto is_for_trade, is_for_sale, price, condition, notes)
+                # A Ludopedia não informa o jogo base; a ligação feita pelo BGG é mantida
+                if game_data.get("base_game_id") is not None:
+                    existing_game.base_game_id = game_data.get("base_game_id")
                 existing_game.order = game_data.get("order")
-                existing_game.min_players = game_data.get("min_players")
-                existing_game.max_players = game_data.get("max_players")
-                existing_game.min_playtime = game_data.get("min_playtime")
-                existing_game.max_playtime = game_data.get("max_playtime")
-                existing_game.min_age = game_data.get("min_age")
-                existing_game.rating = game_data.get("rating")
-                existing_game.weight = game_data.get("weight")
-                existing_game.rank = game_data.get("rank")
                 existing_game.purchase_price = game_data.get("purchase_price")
-                existing_game.image_url = game_data.get("image_url")
                 updated_count += 1
         
         # Remover jogos que não estão mais na Ludopedia
         for ludopedia_id in to_remove:
-            game_to_remove = db.query(Game).filter(
-                Game.user_id == current_user.id,
-                Game.ludopedia_id == ludopedia_id
-            ).first()
+            game_to_remove = local_games_dict.get(ludopedia_id)
             if game_to_remove:
+                catalog_service.release(db, game_to_remove)
                 db.delete(game_to_remove)
                 removed_count += 1
         
         db.commit()
+        await checkpoint.complete(added_count)
+        expansion_linker.schedule(background_tasks, current_user.id)
         
-        print(f"DEBUG SYNC - Concluído: +{added_count}, ~{updated_count}, -{removed_count}")
+        logger.info(
+            "Sincronização da Ludopedia concluída",
+            extra={"user_id": current_user.id, "added": added_count, "updated": updated_count, "removed": removed_count},
+        )
         return {
             "message": f"Sincronização concluída! +{added_count} adicionados, ~{updated_count} atualizados, -{removed_count} removidos.",
             "added": added_count,
@@ -339,6 +295,8 @@ async def sync_collection_from_ludopedia(
         raise
     except Exception as e:
         db.rollback()
+        if checkpoint is not None and not checkpoint.finished:
+            await checkpoint.fail(str(e))
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Erro ao sincronizar coleção da Ludopedia: {str(e)}"
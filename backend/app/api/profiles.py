@@ -0,0 +1,38 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import FileResponse
+
+from app.core.profiler import profile_store, verify_token
+
+router = APIRouter()
+
+
+def require_profile_token(
+    x_profile: Optional[str] = Header(None, alias="X-Profile"),
+    token: Optional[str] = Query(None, alias="__profile"),
+) -> None:
+    """Exige o token de profiling assinado (o mesmo usado para perfilar requisições)"""
+    if not verify_token(x_profile or token):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Token de profiling inválido ou expirado"
+        )
+
+
+@router.get("/", dependencies=[Depends(require_profile_token)])
+def list_profiles() -> List[dict]:
+    """Lista os relatórios de profiling salvos, do mais recente para o mais antigo"""
+    return profile_store.list()
+
+
+@router.get("/{profile_id}", dependencies=[Depends(require_profile_token)])
+def get_profile(profile_id: str):
+    """Baixa um relatório no formato do speedscope (abrir em https://www.speedscope.app)"""
+    path = profile_store.path(profile_id)
+    if path is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Relatório de profiling não encontrado"
+        )
+    return FileResponse(path, media_type="application/json", filename=f"{profile_id}.speedscope.json")
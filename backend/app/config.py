@@ -10,6 +10,29 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str = "postgresql://boardgame_user:boardgame_pass@db:5432/boardgame_db"
+    DATABASE_REPLICA_URLS: list = []  # Réplicas de leitura (opcional)
+    DATABASE_REPLICA_CHECK_SECONDS: int = 10  # Intervalo da verificação de saúde
+    READ_YOUR_WRITES_SECONDS: int = 5  # Tempo no primário após uma escrita
+    
+    # Instrumentação do banco
+    DB_SLOW_QUERY_MS: int = 200  # Consulta registrada como lenta
+    DB_SLOW_REQUEST_MS: int = 1000  # Tempo total no banco por requisição
+    DB_MAX_QUERIES_PER_REQUEST: int = 50
+    DB_N_PLUS_ONE_THRESHOLD: int = 10  # Repetições do mesmo formato de consulta
+    
+    # Logs
+    LOG_LEVEL: str = "INFO"
+    LOG_LEVELS: dict = {}  # Níveis por módulo, ex.: {"app.services.ludopedia_service": "DEBUG"}
+    LOG_FORMAT: str = "json"  # json ou text
+    LOG_DEBUG_SAMPLE_RATE: int = 100  # Linhas de debug por item: registra 1 a cada N
+    
+    # Profiler por requisição (ver app/core/profiler.py)
+    PROFILER_ENABLED: bool = False
+    PROFILER_DIR: str = "profiles"
+    PROFILER_MAX_REPORTS: int = 50  # Relatórios mais antigos são apagados
+    PROFILER_INTERVAL_MS: int = 5  # Intervalo de amostragem
+    PROFILER_MAX_PER_MINUTE: int = 6
+    PROFILER_MAX_SECONDS: int = 30  # Amostragem interrompida após este tempo
     
     # Redis
     REDIS_URL: str = "redis://redis:6379"
@@ -18,6 +41,12 @@ class Settings(BaseSettings):
     SECRET_KEY: str = "your-secret-key-change-in-production"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+    REVOCATION_SYNC_SECONDS: float = 2.0  # Atraso máximo para uma revogação valer em todos os workers
+    REVOCATION_REBUILD_SECONDS: int = 300  # Reconstrução do filtro (descarta revogações vencidas)
+    REVOCATION_BLOOM_CAPACITY: int = 100000  # Revogações recentes por filtro antes de dobrar
+    REVOCATION_BLOOM_FALSE_POSITIVE_RATE: float = 0.001  # Acertos falsos confirmados no banco
+    ADMIN_EMAILS: list = []  # E-mails com acesso às rotas administrativas
     
     # CORS
     CORS_ORIGINS: list = [
@@ -29,6 +58,15 @@ class Settings(BaseSettings):
     LUDOPEDIA_API_KEY: Optional[str] = None
     BGG_API_KEY: Optional[str] = None
     
+    # Provedores externos (sobrescreva para usar os provedores falsos de benchmarks/)
+    BGG_BASE_URL: str = "https://www.boardgamegeek.com/xmlapi2"
+    BGG_COLLECTION_RETRIES: int = 6  # Tentativas enquanto o BGG enfileira a coleção (202)
+    BGG_COLLECTION_RETRY_SECONDS: float = 2.0
+    LUDOPEDIA_BASE_URL: str = "https://ludopedia.com.br/api/v1"
+    LUDOPEDIA_REQUEST_DELAY_SECONDS: float = 0.5  # Pausa entre requisições de detalhes
+    BGG_THING_BATCH_SIZE: int = 20  # IDs por chamada /thing (limite do BGG)
+    BGG_THING_CACHE_DAYS: int = 30  # Validade do tipo/jogo base guardado de cada item
+    
     # Ludopedia OAuth
     LUDOPEDIA_APP_ID: Optional[str] = None
     LUDOPEDIA_APP_KEY: Optional[str] = None
@@ -38,15 +76,103 @@ class Settings(BaseSettings):
     GOOGLE_CLIENT_ID: Optional[str] = None
     GOOGLE_CLIENT_SECRET: Optional[str] = None
     GOOGLE_REDIRECT_URI: str = "http://localhost:8000/api/auth/google/callback"
+    GOOGLE_CERTS_DEFAULT_MAX_AGE: int = 3600  # Validade das chaves quando o Google não envia Cache-Control
+    GOOGLE_CERTS_REFRESH_MARGIN: float = 0.1  # Fração final da validade em que a renovação é feita em segundo plano
+    GOOGLE_CERTS_MIN_REFETCH_SECONDS: int = 60  # Intervalo mínimo entre buscas por kid desconhecido
     
     # File Upload
     MAX_UPLOAD_SIZE: int = 10 * 1024 * 1024  # 10MB
     UPLOAD_DIR: str = "uploads"
     
+    # Importação
+    IMPORT_CHECKPOINT_TTL_HOURS: int = 24  # Checkpoints mais antigos não são retomados
+    IMPORT_EVENTS_BACKEND: str = "memory"  # memory (um worker) ou redis (vários workers)
+    IMPORT_EVENTS_HEARTBEAT_SECONDS: int = 15
+    IMPORT_EVENTS_REDIS_TIMEOUT_SECONDS: float = 0.5  # Timeout de cada publicação no Redis
+    IMPORT_EVENTS_REDIS_RETRY_SECONDS: int = 5  # Tempo descartando eventos antes de tentar o Redis de novo
+    
+    # Ligação entre títulos da Ludopedia e do BGG (app/services/entity_resolution.py)
+    ENTITY_MATCH_INLINE: bool = True  # Ligar títulos novos durante as importações
+    ENTITY_MATCH_MIN_SIMILARITY: float = 0.5  # Similaridade de trigramas mínima de um candidato
+    ENTITY_MATCH_MIN_CONFIDENCE: float = 0.8  # Confiança mínima para gravar a ligação
+    ENTITY_MATCH_BATCH_SIZE: int = 1000
+    
+    # Ligação de expansões aos jogos base (app/services/expansion_linking.py)
+    EXPANSION_LINK_AFTER_IMPORT: bool = True  # Rodar em segundo plano após cada importação
+    
+    # Atualização dos metadados defasados (app/services/metadata_refresh.py)
+    METADATA_REFRESH_ENABLED: bool = False  # Agendador em segundo plano (um worker executa por vez)
+    METADATA_REFRESH_MAX_AGE_DAYS: int = 14  # Títulos sem atualização há mais tempo entram na fila
+    METADATA_REFRESH_SALE_MAX_AGE_DAYS: int = 3  # Idem para títulos à venda em alguma lista
+    METADATA_REFRESH_WINDOW_START_HOUR: int = 5  # Janela fora do pico, em UTC (5-9 = 2h-6h em Brasília)
+    METADATA_REFRESH_WINDOW_END_HOUR: int = 9
+    METADATA_REFRESH_REQUESTS_PER_MINUTE: int = 30  # Orçamento global de chamadas aos provedores
+    METADATA_REFRESH_MAX_PER_RUN: int = 5000  # Títulos por rodada
+    METADATA_REFRESH_INTERVAL_HOURS: int = 20  # Intervalo mínimo entre o início de duas rodadas
+    METADATA_REFRESH_CHECK_SECONDS: int = 300  # Intervalo entre verificações da janela
+    METADATA_REFRESH_LEASE_SECONDS: int = 300  # Validade do lease sem progresso (worker caído)
+    METADATA_REFRESH_LUDOPEDIA_TOKEN: Optional[str] = None  # Token da conta da aplicação na Ludopedia; sem ele, só o BGG é atualizado
+    
+    # Tags dos jogos (app/services/game_tags.py)
+    TAG_INDEX_CACHE_SIZE: int = 1024  # Índices de bitsets guardados (por usuário e versão da coleção)
+    
+    # Jogos parecidos (app/services/similar_games.py)
+    SIMILARITY_MAX_TAGS: int = 128  # Categorias e mecânicas mais comuns usadas como dimensões
+    SIMILARITY_TAG_WEIGHT: float = 0.7  # Peso das tags; o restante vai para peso, jogadores, duração e idade
+    SIMILARITY_SHARD_SIZE: int = 16384  # Linhas por matriz (memória: linhas x (tags + 5) x 4 bytes)
+    SIMILARITY_REFRESH_SECONDS: int = 30  # Intervalo mínimo entre verificações de títulos alterados
+    
+    # Idempotency-Key e single-flight das rotas caras (app/core/idempotency.py)
+    IDEMPOTENCY_BACKEND: str = "memory"  # memory (um worker) ou redis (vários workers, com fallback para memória)
+    IDEMPOTENCY_TTL_HOURS: int = 24  # Por quanto tempo uma resposta pode ser repetida
+    IDEMPOTENCY_WAIT_SECONDS: int = 900  # Espera máxima por uma execução em andamento
+    IDEMPOTENCY_LOCK_SECONDS: float = 60.0  # Validade do lock em andamento, renovada enquanto a requisição roda
+    
+    # Limites de requisições (baldes de tokens por IP e por usuário)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = "memory"  # memory (por worker) ou redis (todos os workers, com fallback para memória)
+    # Por grupo de rotas: "ip" para todos e, por plano, para usuários autenticados (N/second|minute|hour|day)
+    RATE_LIMITS: dict = {
+        "auth": {"ip": "10/minute"},
+        "search": {"ip": "120/minute", "free": "30/minute", "premium": "90/minute", "pro": "180/minute"},
+        "import": {"ip": "60/hour", "free": "10/hour", "premium": "30/hour", "pro": "60/hour"},
+        "default": {"ip": "1200/minute", "free": "300/minute", "premium": "600/minute", "pro": "1200/minute"},
+    }
+    RATE_LIMIT_TRUST_FORWARDED_FOR: bool = False  # Usa o IP do X-Forwarded-For (atrás de proxy confiável)
+    RATE_LIMIT_REDIS_TIMEOUT_SECONDS: float = 0.05  # Timeout do Redis antes de cair para a memória
+    RATE_LIMIT_REDIS_RETRY_SECONDS: int = 5  # Tempo na memória antes de tentar o Redis de novo
+    RATE_LIMIT_MEMORY_MAX_KEYS: int = 100000  # Baldes guardados por worker no modo memória
+    
+    # Controle de admissão (concorrência por classe de rota, por worker)
+    ADMISSION_ENABLED: bool = True
+    # limit: requisições simultâneas; queue: fila máxima; max_wait: espera máxima na fila (s);
+    # latency_target: latência alvo para o limite adaptativo (s, opcional)
+    ADMISSION_CLASSES: dict = {
+        "read": {"limit": 20, "queue": 200, "max_wait": 0.5, "latency_target": 0.25},
+        "write": {"limit": 6, "queue": 60, "max_wait": 2.0, "latency_target": 1.0},
+        "external": {"limit": 8, "queue": 32, "max_wait": 1.0},
+        "import": {"limit": 2, "queue": 8, "max_wait": 5.0},
+    }
+    ADMISSION_ADAPTIVE: bool = False  # Ajusta os limites por AIMD conforme a latência
+    ADMISSION_AIMD_DECREASE: float = 0.8  # Fator de redução quando a latência passa do alvo
+    
     # Pagination
     DEFAULT_PAGE_SIZE: int = 20
     MAX_PAGE_SIZE: int = 100
     
+    # Exportação da coleção (CSV, XLSX, Parquet)
+    EXPORT_BATCH_SIZE: int = 1000  # Linhas por lote lido do cursor
+    EXPORT_PARQUET_ROW_GROUP_ROWS: int = 65536
+    
+    # Análise da coleção (app/services/collection_analytics.py)
+    ANALYTICS_CHUNK_SIZE: int = 50000  # Linhas por bloco lido (limita a memória)
+    ANALYTICS_CACHE_SIZE: int = 1024  # Resultados guardados (por usuário e versão da coleção)
+    
+    # Compressão das respostas (gzip/brotli conforme o Accept-Encoding)
+    COMPRESSION_MIN_SIZE: int = 1024  # Bytes; respostas menores vão sem compressão
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4  # 0-11; acima de ~5 o custo de CPU cresce rápido
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
@@ -0,0 +1,251 @@
+"""
+Controle de admissão: concorrência limitada por classe de rota.
+
+Cada requisição em /api cai numa classe (leituras baratas, escritas,
+importações ou proxies externos) com um limite de requisições
+simultâneas e uma fila limitada. Quem não cabe espera na fila por até
+`max_wait` segundos; fila cheia ou espera vencida recebem 503 com
+Retry-After, em vez de todas as requisições ficarem lentas juntas quando
+o pool do banco satura. Como as classes não dividem vagas, um pico de
+importações não atrasa as leituras.
+
+Os limites padrão somam menos que pool_size + max_overflow do banco
+(os proxies externos quase não usam o banco). Com ADMISSION_ADAPTIVE, o
+limite das classes com `latency_target` se ajusta por AIMD: cai
+multiplicativamente quando a latência passa do alvo e volta a subir uma
+vaga por "rodada" de requisições, até o limite configurado.
+
+Streams de eventos (SSE) e rotas fora de /api não passam pela admissão.
+"""
+import asyncio
+import json
+import logging
+import math
+import re
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Pattern, Tuple
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.config import settings
+from app.core.metrics import CallbackGauge, admission_queue_wait_seconds, admission_rejected_total, registry
+
+logger = logging.getLogger(__name__)
+
+# (método, padrão do caminho, classe), na ordem de avaliação; None = sem admissão
+ADMISSION_ROUTES: List[Tuple[str, Pattern, Optional[str]]] = [
+    # Streams ficam abertos durante toda a importação
+    ("GET", re.compile(r"^/api/imports/\d+/events$"), None),
+    # Proxies para os provedores: esperam pela rede, não pelo banco
+    ("GET", re.compile(r"^/api/collection/(search|game-details)/"), "external"),
+    # Importações, sincronizações e exportações: longas e pesadas no banco
+    ("POST", re.compile(r"^/api/collection/(import|link-expansions)"), "import"),
+    ("POST", re.compile(r"^/api/ludopedia/(import|sync)-collection"), "import"),
+    ("GET", re.compile(r"^/api/collection/(export|analytics/all)"), "import"),
+]
+
+# Sem Retry-After calculável (nenhuma requisição concluída ainda)
+_DEFAULT_RETRY_AFTER = 1
+# Intervalo mínimo entre duas reduções do limite adaptativo
+_DECREASE_INTERVAL = 1.0
+# Peso da amostra mais recente na média de latência
+_EWMA_WEIGHT = 0.1
+
+
+def admission_class(method: str, path: str) -> Optional[str]:
+    """Classe de admissão da rota (None = sem controle, inclusive OPTIONS)"""
+    if method == "OPTIONS" or not path.startswith("/api/"):
+        return None
+    for route_method, pattern, name in ADMISSION_ROUTES:
+        if method == route_method and pattern.match(path):
+            return name
+    return "read" if method in ("GET", "HEAD") else "write"
+
+
+class AdmissionRejected(Exception):
+    """Requisição recusada pela admissão (fila cheia ou espera vencida)"""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _ClassLimiter:
+    """Vagas e fila FIFO de uma classe (roda no event loop, sem locks)"""
+
+    def __init__(self, name: str, limit: int, queue: int, max_wait: float, latency_target: Optional[float]):
+        self.name = name
+        self.max_limit = limit
+        self.limit = float(limit)
+        self.max_queue = queue
+        self.max_wait = max_wait
+        self.latency_target = latency_target
+        self.in_flight = 0
+        self.latency = 0.0  # Média móvel exponencial das requisições concluídas
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._decreased_at = 0.0
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def retry_after(self) -> int:
+        """Estimativa de quando haverá vaga: a fila atual escoando pelas vagas"""
+        if self.latency <= 0:
+            return _DEFAULT_RETRY_AFTER
+        rounds = (self.queued + 1) / max(self.limit, 1.0)
+        return max(math.ceil(self.latency * rounds), 1)
+
+    async def acquire(self) -> float:
+        """
+        Ocupa uma vaga, esperando na fila se preciso
+
+        Returns:
+            Tempo de espera na fila (s)
+
+        Raises:
+            AdmissionRejected: fila cheia ou espera maior que max_wait
+        """
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            return 0.0
+        if len(self._waiters) >= self.max_queue:
+            raise AdmissionRejected("queue_full", self.retry_after())
+
+        started = time.monotonic()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.max_wait)
+        except asyncio.TimeoutError:
+            self._abandon(waiter)
+            raise AdmissionRejected("timeout", self.retry_after())
+        except asyncio.CancelledError:
+            # Cliente desconectou enquanto esperava
+            self._abandon(waiter)
+            raise
+        return time.monotonic() - started
+
+    def _abandon(self, waiter: asyncio.Future) -> None:
+        if waiter.done() and not waiter.cancelled():
+            # A vaga foi entregue junto com o fim da espera: devolve
+            self.release(None)
+            return
+        waiter.cancel()
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def release(self, latency: Optional[float]) -> None:
+        """Libera a vaga (entregando-a ao próximo da fila) e alimenta o limite adaptativo"""
+        self.in_flight -= 1
+        if latency is not None:
+            self.latency = latency if self.latency <= 0 else self.latency + _EWMA_WEIGHT * (latency - self.latency)
+            if settings.ADMISSION_ADAPTIVE and self.latency_target is not None:
+                self._adapt(latency)
+
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def _adapt(self, latency: float) -> None:
+        """AIMD: redução multiplicativa acima do alvo, +1 vaga a cada `limit` respostas no alvo"""
+        now = time.monotonic()
+        if latency > self.latency_target:
+            if now - self._decreased_at >= _DECREASE_INTERVAL:
+                self.limit = max(1.0, self.limit * settings.ADMISSION_AIMD_DECREASE)
+                self._decreased_at = now
+                logger.info("Limite de admissão reduzido", extra={"class": self.name, "limit": int(self.limit)})
+        elif self.in_flight + 1 >= int(self.limit) or self._waiters:
+            # Só cresce quando há demanda para as vagas atuais
+            self.limit = min(float(self.max_limit), self.limit + 1.0 / self.limit)
+
+
+class AdmissionController:
+    """Limitadores por classe, criados a partir de ADMISSION_CLASSES"""
+
+    def __init__(self):
+        self._limiters: Optional[Dict[str, _ClassLimiter]] = None
+
+    @property
+    def limiters(self) -> Dict[str, _ClassLimiter]:
+        if self._limiters is None:
+            self._limiters = {
+                name: _ClassLimiter(
+                    name, int(config["limit"]), int(config["queue"]), float(config["max_wait"]),
+                    config.get("latency_target"),
+                )
+                for name, config in settings.ADMISSION_CLASSES.items()
+            }
+        return self._limiters
+
+    def _collect(self, attribute: str):
+        def collect():
+            for name, limiter in self.limiters.items():
+                yield (name,), getattr(limiter, attribute)
+        return collect
+
+    def register_metrics(self) -> None:
+        """Expõe vagas ocupadas, fila e limite atual de cada classe"""
+        registry.register(CallbackGauge(
+            "admission_in_flight", "Requisições em execução por classe de admissão", self._collect("in_flight"), ("class",),
+        ))
+        registry.register(CallbackGauge(
+            "admission_queued", "Requisições na fila por classe de admissão", self._collect("queued"), ("class",),
+        ))
+        registry.register(CallbackGauge(
+            "admission_limit", "Limite atual de concorrência por classe de admissão", self._collect("limit"), ("class",),
+        ))
+
+
+# Instância global
+admission = AdmissionController()
+
+
+class AdmissionMiddleware:
+    """Middleware ASGI que aplica o controle de admissão antes da rota"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not settings.ADMISSION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        name = admission_class(scope["method"], scope["path"])
+        limiter = admission.limiters.get(name) if name else None
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            waited = await limiter.acquire()
+        except AdmissionRejected as e:
+            admission_rejected_total.inc(name, e.reason)
+            body = json.dumps({"detail": "Server busy, try again later"}).encode()
+            await send({
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(e.retry_after).encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        admission_queue_wait_seconds.observe(waited, name)
+        started = time.monotonic()
+        latency = None
+        try:
+            await self.app(scope, receive, send)
+            latency = time.monotonic() - started
+        finally:
+            # Falhas não alimentam o limite adaptativo
+            limiter.release(latency)
@@ -0,0 +1,146 @@
+"""
+Compressão gzip/brotli das respostas acima de um tamanho mínimo.
+
+Middleware ASGI puro: respostas pequenas passam intactas (comprimir poucos
+bytes custa mais do que economiza), respostas inteiras são comprimidas de
+uma vez e respostas em streaming são comprimidas pedaço a pedaço (o corpo
+só é acumulado até passar do mínimo). Cada pedaço é esvaziado do
+compressor (sync flush), então o cliente descomprime o que já chegou sem
+esperar o fim do stream. Eventos SSE, formatos já comprimidos e respostas
+que já têm Content-Encoding nunca são tocados.
+"""
+import zlib
+from typing import List, Optional
+
+import brotli
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+from app.core.encoding import parse_accept
+
+# Preferência do servidor quando o cliente aceita os dois com o mesmo peso
+ENCODINGS = ("br", "gzip")
+# SSE precisa chegar sem buffer; XLSX e Parquet já são comprimidos
+SKIP_CONTENT_TYPES = (
+    "text/event-stream",
+    "application/vnd.openxmlformats-officedocument",
+    "application/vnd.apache.parquet",
+    "application/zip",
+)
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Codificação a usar segundo o Accept-Encoding (None = sem compressão)"""
+    weights = {name: quality for name, quality in parse_accept(accept_encoding)}
+    wildcard = weights.get("*", 0.0)
+    best, best_quality = None, 0.0
+    for name in ENCODINGS:
+        quality = weights.get(name, wildcard)
+        if quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+
+class _Compressor:
+    """Interface comum para zlib (gzip) e brotli em modo streaming"""
+
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+            self._zlib = None
+        else:
+            self._brotli = None
+            self._zlib = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, flush: bool = False) -> bytes:
+        """Comprime um pedaço; com flush, a saída já é decodificável até aqui"""
+        if self._brotli is not None:
+            chunk = self._brotli.process(data)
+            return chunk + self._brotli.flush() if flush else chunk
+        chunk = self._zlib.compress(data)
+        return chunk + self._zlib.flush(zlib.Z_SYNC_FLUSH) if flush else chunk
+
+    def finish(self) -> bytes:
+        if self._brotli is not None:
+            return self._brotli.finish()
+        return self._zlib.flush()
+
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, minimum_size: Optional[int] = None):
+        self.app = app
+        self.minimum_size = settings.COMPRESSION_MIN_SIZE if minimum_size is None else minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+        compressor: Optional[_Compressor] = None
+        passthrough = False
+        buffered: List[bytes] = []
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start, compressor, passthrough
+
+            if message["type"] == "http.response.start":
+                start = message
+                headers = Headers(raw=message["headers"])
+                passthrough = (
+                    "content-encoding" in headers
+                    or headers.get("content-type", "").startswith(SKIP_CONTENT_TYPES)
+                    or message["status"] in (204, 304)
+                )
+                if passthrough:
+                    await send(message)
+                return
+
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if compressor is None:
+                # Acumula até saber se a resposta passa do mínimo (middlewares
+                # baseados em BaseHTTPMiddleware entregam o corpo em pedaços)
+                buffered.append(body)
+                size = sum(len(chunk) for chunk in buffered)
+                if more_body and size < self.minimum_size:
+                    return
+                body = b"".join(buffered)
+                buffered.clear()
+                if not more_body and size < self.minimum_size:
+                    passthrough = True
+                    await send(start)
+                    await send({"type": "http.response.body", "body": body})
+                    return
+
+                compressor = _Compressor(encoding)
+                headers = MutableHeaders(raw=list(start["headers"]))
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                if more_body:
+                    del headers["Content-Length"]
+                    await send({**start, "headers": headers.raw})
+                else:
+                    compressed = compressor.compress(body) + compressor.finish()
+                    headers["Content-Length"] = str(len(compressed))
+                    await send({**start, "headers": headers.raw})
+                    await send({"type": "http.response.body", "body": compressed})
+                    return
+
+            chunk = compressor.compress(body, flush=more_body and bool(body))
+            if not more_body:
+                chunk += compressor.finish()
+            if chunk or not more_body:
+                await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,153 @@
+"""
+Instrumentação do banco de dados por requisição.
+
+Conta as consultas, o tempo total no banco e a consulta mais lenta de cada
+requisição, e sinaliza formatos de consulta repetidos (provável N+1).
+Em modo DEBUG os números vão nos cabeçalhos da resposta; consultas e
+requisições acima dos limites configurados são registradas no log.
+"""
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional, Tuple
+
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import settings
+
+
+logger = logging.getLogger("app.db")
+
+_PARAM_LIST = re.compile(r"\(\s*(?:\?|%\(\w+\)s)(?:\s*,\s*(?:\?|%\(\w+\)s))*\s*\)")
+_NAMED_PARAM = re.compile(r"%\(\w+\)s")
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """Normaliza uma consulta, removendo valores, para agrupar consultas iguais"""
+    shape = _PARAM_LIST.sub("(?)", statement)
+    shape = _NAMED_PARAM.sub("?", shape)
+    shape = _LITERAL.sub("?", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+class QueryStats:
+    """Estatísticas das consultas executadas em um contexto (requisição ou bloco)"""
+
+    __slots__ = ("count", "total_time", "slowest_time", "slowest_statement", "shapes")
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_statement: Optional[str] = None
+        self.shapes: Counter = Counter()
+
+    def record(self, statement: str, duration: float) -> None:
+        self.count += 1
+        self.total_time += duration
+        if duration > self.slowest_time:
+            self.slowest_time = duration
+            self.slowest_statement = statement
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated_shapes(self, threshold: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Formatos executados pelo menos `threshold` vezes (suspeita de N+1)"""
+        threshold = threshold or settings.DB_N_PLUS_ONE_THRESHOLD
+        return [(shape, n) for shape, n in self.shapes.most_common() if n >= threshold]
+
+
+_stats_stack: ContextVar[Tuple[QueryStats, ...]] = ContextVar("db_query_stats", default=())
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_start_time"].pop()
+    duration = time.perf_counter() - started
+
+    for stats in _stats_stack.get():
+        stats.record(statement, duration)
+
+    if duration * 1000 >= settings.DB_SLOW_QUERY_MS:
+        logger.warning("Consulta lenta (%.1f ms): %s", duration * 1000, statement_shape(statement)[:500])
+
+
+def install_query_instrumentation() -> None:
+    """Registra os eventos em todos os engines (primário e réplicas)"""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """Coleta as consultas executadas dentro do bloco (pode ser aninhado)"""
+    stats = QueryStats()
+    token = _stats_stack.set(_stats_stack.get() + (stats,))
+    try:
+        yield stats
+    finally:
+        _stats_stack.reset(token)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Número de consultas acima do orçamento"""
+
+
+@contextmanager
+def query_budget(max_queries: int) -> Iterator[QueryStats]:
+    """
+    Falha se o bloco executar mais consultas que o orçamento (para testes)
+
+    Exemplo (fixtures de tests/conftest.py; mais em tests/test_query_budgets.py):
+        async def test_get_collection_query_budget(client, auth_headers):
+            with query_budget(2):
+                await client.get("/api/collection/", headers=auth_headers)
+
+    O AsyncClient executa o app no mesmo processo, e a rota herda o
+    contexto, então suas consultas entram na contagem.
+    """
+    with track_queries() as stats:
+        yield stats
+
+    if stats.count > max_queries:
+        details = "\n".join(f"  {n}x {shape[:200]}" for shape, n in stats.shapes.most_common(5))
+        raise QueryBudgetExceeded(
+            f"{stats.count} consultas executadas, orçamento de {max_queries}.\n{details}"
+        )
+
+
+async def db_instrumentation_middleware(request: Request, call_next):
+    """Coleta as estatísticas do banco de cada requisição"""
+    with track_queries() as stats:
+        response = await call_next(request)
+
+    total_ms = stats.total_time * 1000
+    repeated = stats.repeated_shapes()
+
+    if settings.DEBUG:
+        response.headers["X-DB-Query-Count"] = str(stats.count)
+        response.headers["X-DB-Time-Ms"] = f"{total_ms:.1f}"
+        response.headers["X-DB-Slowest-Ms"] = f"{stats.slowest_time * 1000:.1f}"
+        if repeated:
+            response.headers["X-DB-N-Plus-One"] = str(len(repeated))
+
+    if total_ms >= settings.DB_SLOW_REQUEST_MS or stats.count >= settings.DB_MAX_QUERIES_PER_REQUEST:
+        logger.warning(
+            "Requisição pesada no banco: %s %s - %d consultas, %.1f ms (mais lenta %.1f ms: %s)",
+            request.method, request.url.path, stats.count, total_ms,
+            stats.slowest_time * 1000, (stats.slowest_statement or "")[:200],
+        )
+    for shape, n in repeated:
+        logger.warning("Possível N+1 em %s %s: %dx %s", request.method, request.url.path, n, shape[:300])
+
+    return response
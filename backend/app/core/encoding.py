@@ -0,0 +1,149 @@
+"""
+Negociação de conteúdo para respostas grandes da coleção.
+
+Além do JSON padrão (uma lista de objetos), o cliente pode pedir pelo
+cabeçalho Accept:
+
+- application/msgpack (ou application/x-msgpack): o mesmo documento em MessagePack
+- application/vnd.boardgame.columnar+json: layout colunar, um array por campo
+- application/vnd.boardgame.columnar+msgpack: layout colunar em MessagePack
+
+No layout colunar a lista de jogos vira
+
+    {"length": n, "columns": {"id": [...], "name": [...], ...},
+     "dictionaries": {"condition": ["Novo", "Usado - bom"], ...}}
+
+e as colunas com poucos valores distintos (condition, game_type) guardam o
+índice no dicionário em vez da string (None continua None).
+"""
+import json
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import msgpack
+from fastapi import Request
+from fastapi.responses import Response
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+COLUMNAR_JSON = "application/vnd.boardgame.columnar+json"
+COLUMNAR_MSGPACK = "application/vnd.boardgame.columnar+msgpack"
+
+# Aliases aceitos no Accept -> tipo canônico
+MEDIA_TYPES = {
+    JSON: JSON,
+    MSGPACK: MSGPACK,
+    "application/x-msgpack": MSGPACK,
+    COLUMNAR_JSON: COLUMNAR_JSON,
+    COLUMNAR_MSGPACK: COLUMNAR_MSGPACK,
+}
+
+# Colunas de strings repetidas que são codificadas por dicionário
+DICTIONARY_FIELDS = ("condition", "game_type")
+
+
+def parse_accept(header: Optional[str]) -> List[Tuple[str, float]]:
+    """Tipos do cabeçalho Accept com seus pesos q, na ordem de preferência"""
+    if not header:
+        return []
+    accepted = []
+    for position, part in enumerate(header.split(",")):
+        media_type, _, params = part.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if media_type:
+            accepted.append((media_type.strip().lower(), quality, position))
+    # Maior peso primeiro; em caso de empate vale a ordem do cabeçalho
+    accepted.sort(key=lambda item: (-item[1], item[2]))
+    return [(media_type, quality) for media_type, quality, _ in accepted]
+
+
+def negotiate(request: Request) -> str:
+    """Escolhe o formato da resposta pelo Accept; JSON quando nada suportado é pedido"""
+    for media_type, quality in parse_accept(request.headers.get("accept")):
+        if quality <= 0:
+            continue
+        if media_type in MEDIA_TYPES:
+            return MEDIA_TYPES[media_type]
+        if media_type in ("*/*", "application/*"):
+            return JSON
+    return JSON
+
+
+def to_columnar(
+    rows: Sequence[Dict[str, Any]],
+    fields: Iterable[str],
+    dictionary_fields: Iterable[str] = DICTIONARY_FIELDS,
+) -> Dict[str, Any]:
+    """Converte uma lista de objetos em um array por campo, com dicionário para strings repetidas"""
+    fields = list(fields)
+    columns: Dict[str, List[Any]] = {field: [row.get(field) for row in rows] for field in fields}
+    dictionaries: Dict[str, List[Any]] = {}
+
+    for field in dictionary_fields:
+        if field not in columns:
+            continue
+        values: List[Any] = []
+        index: Dict[Any, int] = {}
+        encoded = []
+        for value in columns[field]:
+            if value is None:
+                encoded.append(None)
+                continue
+            position = index.get(value)
+            if position is None:
+                position = index[value] = len(values)
+                values.append(value)
+            encoded.append(position)
+        columns[field] = encoded
+        dictionaries[field] = values
+
+    return {"length": len(rows), "columns": columns, "dictionaries": dictionaries}
+
+
+def from_columnar(table: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Inverso de to_columnar (usado pelos clientes Python e nos benchmarks)"""
+    columns = dict(table["columns"])
+    for field, values in table.get("dictionaries", {}).items():
+        columns[field] = [None if i is None else values[i] for i in columns[field]]
+    names = list(columns)
+    return [dict(zip(names, row)) for row in zip(*(columns[name] for name in names))]
+
+
+def encode(payload: Any, media_type: str) -> bytes:
+    """Serializa um documento já em tipos JSON (dict/list/str/números/None)"""
+    if media_type in (MSGPACK, COLUMNAR_MSGPACK):
+        return msgpack.packb(payload, use_bin_type=True)
+    # Mesmas opções do JSONResponse do Starlette
+    return json.dumps(payload, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def encoded_response(
+    media_type: str,
+    document: Dict[str, Any],
+    rows_key: str,
+    fields: Iterable[str],
+    status_code: int = 200,
+) -> Response:
+    """
+    Resposta no formato negociado
+
+    Args:
+        media_type: Tipo escolhido por negotiate()
+        document: Documento em tipos JSON (ex.: model_dump(mode="json"))
+        rows_key: Chave da lista de objetos que vira colunar
+        fields: Ordem das colunas no layout colunar
+    """
+    if media_type in (COLUMNAR_JSON, COLUMNAR_MSGPACK):
+        document = {**document, rows_key: to_columnar(document[rows_key], fields)}
+    return Response(
+        content=encode(document, media_type),
+        status_code=status_code,
+        media_type=media_type,
+        headers={"Vary": "Accept"},
+    )
@@ -0,0 +1,282 @@
+"""
+Idempotency-Key e single-flight para as rotas POST/DELETE caras.
+
+Para as rotas de IDEMPOTENT_ROUTES, autenticadas:
+
+- Com o cabeçalho Idempotency-Key, a resposta fica guardada por
+  IDEMPOTENCY_TTL_HOURS. Repetir a chave devolve a mesma resposta com
+  Idempotent-Replayed: true. Se a primeira ainda estiver em andamento, a
+  repetição espera por ela. A mesma chave com outro corpo recebe 422.
+  Nas rotas de STREAMED_ROUTES (uploads) o corpo não é lido aqui: a
+  impressão digital é só a chave, e a rota continua lendo o arquivo em
+  blocos com o próprio limite de tamanho.
+- As rotas de importação e sincronização têm um lock por usuário e por
+  grupo de operação (single-flight). Uma segunda requisição idêntica que
+  chega enquanto a primeira roda se junta a ela e recebe a mesma resposta
+  (X-Single-Flight: attached). Uma requisição diferente do mesmo grupo
+  recebe 409 até a primeira terminar.
+
+Respostas 5xx não são guardadas, para que o cliente possa tentar de novo.
+As reservas em andamento têm validade de IDEMPOTENCY_LOCK_SECONDS e são
+renovadas enquanto a rota roda; a resposta é guardada e os locks liberados
+assim que o corpo termina de ser enviado, antes das BackgroundTasks.
+"""
+import asyncio
+import hashlib
+import logging
+import secrets
+from typing import Any, Dict, List, Optional, Tuple
+
+from jose import JWTError, jwt
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+from app.services.idempotency import COMPLETED, IN_PROGRESS, idempotency
+
+logger = logging.getLogger(__name__)
+
+# (método, caminho) -> (operação, grupo de single-flight ou None)
+IDEMPOTENT_ROUTES: Dict[Tuple[str, str], Tuple[str, Optional[str]]] = {
+    ("POST", "/api/collection/games"): ("create_game", None),
+    ("DELETE", "/api/collection/"): ("clear_collection", None),
+    ("POST", "/api/collection/import/bgg"): ("import_bgg_games", "import:bgg"),
+    ("POST", "/api/collection/import-collection/bgg"): ("import_bgg_collection", "import:bgg"),
+    ("POST", "/api/collection/import/upload"): ("import_spreadsheet", "import:upload"),
+    ("POST", "/api/ludopedia/import-collection"): ("import_ludopedia_collection", "import:ludopedia"),
+    ("POST", "/api/ludopedia/sync-collection"): ("sync_ludopedia_collection", "import:ludopedia"),
+}
+
+# Rotas cujo corpo (arquivo) não é guardado em memória para a impressão digital
+STREAMED_ROUTES = {("POST", "/api/collection/import/upload")}
+
+MAX_KEY_LENGTH = 255
+# Respostas maiores que isso são entregues, mas não guardadas
+MAX_STORED_BYTES = 8 * 1024 * 1024
+# Quanto tempo a resposta de um single-flight fica disponível para quem se juntou a ele
+FLIGHT_RESULT_SECONDS = 60
+
+
+def _subject(authorization: Optional[str]) -> Optional[str]:
+    """Usuário do token Bearer (None se ausente ou inválido; a rota responde 401)"""
+    if not authorization or not authorization.lower().startswith("bearer "):
+        return None
+    try:
+        payload = jwt.decode(authorization[7:], settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        return None
+    return payload.get("sub")
+
+
+def _fingerprint(scope: Scope, body: bytes) -> str:
+    digest = hashlib.sha256()
+    for part in (scope["method"], scope["path"], scope.get("query_string", b"").decode("latin-1")):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    digest.update(body)
+    return digest.hexdigest()
+
+
+async def _read_body(receive: Receive) -> Tuple[bytes, Receive]:
+    """Lê o corpo inteiro e devolve um receive que o entrega de novo à rota"""
+    chunks: List[bytes] = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    body = b"".join(chunks)
+    replayed = False
+
+    async def replay() -> Message:
+        nonlocal replayed
+        if not replayed:
+            replayed = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return await receive()
+
+    return body, replay
+
+
+def _replay(record: Dict[str, Any], header: str, value: str) -> Response:
+    stored = record["response"]
+    response = Response(
+        content=stored["body"].encode("latin-1"),
+        status_code=stored["status"],
+        media_type=stored.get("content_type"),
+    )
+    response.headers[header] = value
+    return response
+
+
+class IdempotencyMiddleware:
+    def __init__(self, app: ASGIApp, routes: Optional[Dict[Tuple[str, str], Tuple[str, Optional[str]]]] = None):
+        self.app = app
+        self.routes = IDEMPOTENT_ROUTES if routes is None else routes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or (scope["method"], scope["path"]) not in self.routes:
+            await self.app(scope, receive, send)
+            return
+
+        operation, flight_group = self.routes[(scope["method"], scope["path"])]
+        headers = Headers(scope=scope)
+        user = _subject(headers.get("authorization"))
+        if user is None:
+            await self.app(scope, receive, send)
+            return
+
+        key = headers.get("idempotency-key")
+        if key is not None and not 0 < len(key) <= MAX_KEY_LENGTH:
+            await JSONResponse(
+                {"detail": f"Idempotency-Key deve ter entre 1 e {MAX_KEY_LENGTH} caracteres"}, status_code=400
+            )(scope, receive, send)
+            return
+
+        if (scope["method"], scope["path"]) in STREAMED_ROUTES:
+            # Sem chave, cada envio é único: outro upload simultâneo recebe 409 do single-flight
+            fingerprint = _fingerprint(scope, key.encode() if key else secrets.token_bytes(16))
+        else:
+            body, receive = await _read_body(receive)
+            fingerprint = _fingerprint(scope, body)
+        ttl = settings.IDEMPOTENCY_TTL_HOURS * 3600
+        lease = settings.IDEMPOTENCY_LOCK_SECONDS
+
+        # Reservas em andamento valem por um lease curto, renovado enquanto a rota roda:
+        # um worker que cai não deixa a chave presa, e uma importação longa não perde o lock
+        key_name = f"idempotency:{user}:{operation}:{key}" if key else None
+        if key_name:
+            existing = await idempotency.reserve(key_name, fingerprint, lease)
+            if existing is not None:
+                await self._repeat(key_name, existing, fingerprint, scope, receive, send)
+                return
+
+        flight_name = f"singleflight:{user}:{flight_group}" if flight_group else None
+        if flight_name:
+            existing = await idempotency.reserve(flight_name, fingerprint, lease)
+            if existing is not None:
+                response, stored = await self._attach(flight_name, existing, fingerprint)
+                if key_name:
+                    if stored is not None:
+                        await idempotency.complete(key_name, fingerprint, stored, ttl)
+                    else:
+                        await idempotency.release(key_name)
+                await response(scope, receive, send)
+                return
+
+        reserved = [name for name in (key_name, flight_name) if name]
+        keep_alive = asyncio.create_task(self._keep_alive(reserved, fingerprint, lease))
+        status_code = 500
+        content_type: Optional[str] = None
+        chunks: List[bytes] = []
+        size = 0
+        finished = False
+
+        async def finish(stored: Optional[Dict[str, Any]]) -> None:
+            """Guarda a resposta e libera as reservas (uma vez só)"""
+            nonlocal finished
+            if finished:
+                return
+            finished = True
+            keep_alive.cancel()
+            if flight_name:
+                if stored is not None:
+                    await idempotency.complete(f"{flight_name}:{fingerprint}", fingerprint, stored, FLIGHT_RESULT_SECONDS)
+                await idempotency.release(flight_name)
+            if key_name:
+                if stored is not None:
+                    await idempotency.complete(key_name, fingerprint, stored, ttl)
+                else:
+                    await idempotency.release(key_name)
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code, content_type, size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                content_type = Headers(raw=message["headers"]).get("content-type")
+            elif message["type"] == "http.response.body" and size <= MAX_STORED_BYTES:
+                chunk = message.get("body", b"")
+                size += len(chunk)
+                chunks.append(chunk)
+            await send(message)
+
+            # Resposta entregue: libera já, sem esperar as BackgroundTasks da rota
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                stored = None
+                if status_code < 500 and size <= MAX_STORED_BYTES:
+                    stored = {
+                        "status": status_code,
+                        "content_type": content_type,
+                        # latin-1 preserva os bytes em JSON
+                        "body": b"".join(chunks).decode("latin-1"),
+                    }
+                await finish(stored)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Falha antes de a resposta terminar: nada é guardado
+            await finish(None)
+
+    @staticmethod
+    async def _keep_alive(names: List[str], fingerprint: str, lease: float) -> None:
+        """Renova as reservas a cada terço do lease até a resposta ser entregue"""
+        while True:
+            await asyncio.sleep(lease / 3)
+            for name in names:
+                try:
+                    if not await idempotency.renew(name, fingerprint, lease):
+                        logger.warning("Reserva de idempotência perdida durante a execução", extra={"key": name})
+                except Exception as e:
+                    logger.warning("Falha ao renovar reserva de idempotência: %s", e, extra={"key": name})
+
+    async def _repeat(
+        self, key_name: str, existing: Dict[str, Any], fingerprint: str, scope: Scope, receive: Receive, send: Send
+    ) -> None:
+        """Requisição com uma Idempotency-Key já usada"""
+        if existing["fingerprint"] != fingerprint:
+            response: Response = JSONResponse(
+                {"detail": "Idempotency-Key já usada com outra requisição"}, status_code=422
+            )
+        else:
+            if existing["state"] == IN_PROGRESS:
+                existing = await idempotency.wait(key_name, settings.IDEMPOTENCY_WAIT_SECONDS)
+            if existing is not None and existing["state"] == COMPLETED:
+                response = _replay(existing, "Idempotent-Replayed", "true")
+            else:
+                response = JSONResponse(
+                    {"detail": "Requisição com esta Idempotency-Key ainda em andamento"},
+                    status_code=409,
+                    headers={"Retry-After": "5"},
+                )
+        await response(scope, receive, send)
+
+    async def _attach(
+        self, flight_name: str, existing: Dict[str, Any], fingerprint: str
+    ) -> Tuple[Response, Optional[Dict[str, Any]]]:
+        """
+        Junta a requisição à execução em andamento do mesmo usuário e grupo
+
+        Returns:
+            A resposta e, quando houver, a resposta guardada da execução original
+        """
+        if existing["fingerprint"] != fingerprint:
+            return JSONResponse(
+                {"detail": "Já existe uma importação em andamento. Aguarde ela terminar."},
+                status_code=409,
+                headers={"Retry-After": "5"},
+            ), None
+
+        logger.info("Requisição juntada à execução em andamento", extra={"flight": flight_name})
+        await idempotency.wait(flight_name, settings.IDEMPOTENCY_WAIT_SECONDS)
+        result = await idempotency.get(f"{flight_name}:{fingerprint}")
+        if result is None or result["state"] != COMPLETED:
+            return JSONResponse(
+                {"detail": "A importação em andamento falhou ou não terminou a tempo. Tente novamente."},
+                status_code=409,
+                headers={"Retry-After": "5"},
+            ), None
+        return _replay(result, "X-Single-Flight", "attached"), result["response"]
@@ -0,0 +1,159 @@
+"""
+Configuração de logs estruturados.
+
+Os registros passam por filtros de amostragem e de redação de segredos e
+são colocados em uma fila (QueueHandler); uma thread separada
+(QueueListener) formata e escreve, então o event loop nunca bloqueia em E/S
+de log. Os níveis podem ser ajustados por módulo (LOG_LEVELS).
+
+Campos estruturados vão em `extra`:
+    logger.info("Importação concluída", extra={"user_id": 1, "imported": 42})
+
+Linhas de debug por item usam `sample` para registrar só uma a cada
+LOG_DEBUG_SAMPLE_RATE ocorrências da mesma chave:
+    logger.debug("Jogo %s", nome, extra={"sample": "ludopedia.game"})
+"""
+import atexit
+import copy
+import itertools
+import json
+import logging
+import logging.handlers
+import queue
+import re
+import sys
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from app.config import settings
+
+
+REDACTED = "[REDACTED]"
+
+_SECRET_PATTERNS = (
+    re.compile(r"(?i)(bearer\s+)[\w.~+/=-]+"),
+    re.compile(
+        r"""(?i)((?:access_token|refresh_token|id_token|token|password|secret|client_secret|app_key|api_key)"""
+        r"""['"]?\s*[:=]\s*['"]?)[^\s'"&,}]+"""
+    ),
+    re.compile(r"eyJ[\w-]+\.[\w-]+\.[\w-]+"),  # JWT solto
+)
+_SECRET_KEYS = re.compile(r"(?i)token|password|secret|authorization|app_key|api_key")
+
+# Atributos padrão de LogRecord; o resto veio de `extra`
+_RESERVED_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+def redact(text: str) -> str:
+    """Mascara tokens, senhas e chaves em um texto"""
+    for pattern in _SECRET_PATTERNS:
+        text = pattern.sub(lambda m: (m.group(1) if m.groups() else "") + REDACTED, text)
+    return text
+
+
+def _extra_fields(record: logging.LogRecord) -> Dict[str, object]:
+    return {k: v for k, v in vars(record).items() if k not in _RESERVED_ATTRS and k != "sample"}
+
+
+class RedactingFilter(logging.Filter):
+    """Remove segredos da mensagem e dos campos estruturados antes de enfileirar"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        message = record.getMessage()
+        redacted = redact(message)
+        if redacted != message:
+            record.msg, record.args = redacted, None
+
+        for key, value in _extra_fields(record).items():
+            if _SECRET_KEYS.search(key):
+                setattr(record, key, REDACTED)
+            elif isinstance(value, str):
+                setattr(record, key, redact(value))
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Deixa passar 1 a cada `rate` registros de debug marcados com a mesma chave `sample`"""
+
+    def __init__(self, rate: int):
+        super().__init__()
+        self.rate = max(rate, 1)
+        self._counters: Dict[str, itertools.count] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = getattr(record, "sample", None)
+        if key is None or record.levelno > logging.DEBUG:
+            return True
+        counter = self._counters.setdefault(key, itertools.count())
+        # O contador é atômico no CPython; a primeira ocorrência sempre passa
+        return next(counter) % self.rate == 0
+
+
+class JsonFormatter(logging.Formatter):
+    """Uma linha JSON por registro, com os campos de `extra`"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(_extra_fields(record))
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """Formato legível para desenvolvimento, com os campos de `extra` no final"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = _extra_fields(record)
+        if fields:
+            line += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        return line
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve mensagem e traceback antes de enfileirar (objetos podem mudar
+        # depois); a formatação final fica para a thread do listener
+        record = copy.copy(record)
+        record.msg, record.args = record.getMessage(), None
+        if record.exc_info:
+            record.exc_text = redact(logging.Formatter().formatException(record.exc_info))
+        record.exc_info = None
+        return record
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def setup_logging() -> None:
+    """Configura o logger raiz com fila, filtros e níveis por módulo (idempotente)"""
+    global _listener
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter() if settings.LOG_FORMAT == "json" else TextFormatter())
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    handler = _QueueHandler(log_queue)
+    handler.addFilter(SamplingFilter(settings.LOG_DEBUG_SAMPLE_RATE))
+    handler.addFilter(RedactingFilter())
+
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(settings.LOG_LEVEL.upper())
+    for name, level in settings.LOG_LEVELS.items():
+        logging.getLogger(name).setLevel(str(level).upper())
+
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
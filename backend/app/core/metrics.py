@@ -0,0 +1,306 @@
+"""
+Métricas no formato de texto do Prometheus.
+
+A maior parte das atualizações acontece na thread do event loop
+(middleware ASGI e clientes HTTP assíncronos), mas rotas síncronas rodam no
+threadpool e também registram métricas (ex.: record_cache). Cada métrica
+tem um lock próprio, tomado só pelo tempo de atualizar um dicionário, para
+os incrementos concorrentes não se perderem. Os gauges do pool de conexões
+são lidos apenas no momento da coleta.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import httpx
+
+
+# Buckets de latência em segundos
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Contador monotônico com labels"""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in values:
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Gauge(Counter):
+    """Valor que sobe e desce"""
+
+    type_name = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) - amount
+
+    def set(self, value: float, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+
+class CallbackGauge:
+    """Gauge calculado no momento da coleta"""
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, callback: Callable[[], Iterable[Tuple[LabelValues, float]]],
+                 labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.callback = callback
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in self.callback():
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Histogram:
+    """Histograma com buckets fixos; guarda contagens por bucket (não cumulativas)"""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets) + (float("inf"),)
+        self._series: Dict[LabelValues, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # Contagem por bucket + soma no último elemento
+                series = self._series[labels] = [0] * len(self.buckets) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return sum(series[:-1]) if series else 0
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            snapshot = [(labels, list(series)) for labels, series in self._series.items()]
+        for labels, series in snapshot:
+            cumulative = 0
+            for bound, n in zip(self.buckets, series):
+                cumulative += n
+                le = 'le="' + _format_value(bound) + '"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {series[-1]!r}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}"
+
+
+class Registry:
+    """Conjunto de métricas expostas em /metrics"""
+
+    def __init__(self):
+        self._metrics: List = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Gera o texto no formato de exposição do Prometheus"""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests_total = registry.register(Counter(
+    "http_requests_total", "Requisições HTTP por rota, método e status", ("method", "route", "status"),
+))
+http_request_duration_seconds = registry.register(Histogram(
+    "http_request_duration_seconds", "Latência das requisições HTTP por rota", ("method", "route"),
+))
+http_requests_in_flight = registry.register(Gauge(
+    "http_requests_in_flight", "Requisições HTTP em andamento",
+))
+provider_request_duration_seconds = registry.register(Histogram(
+    "provider_request_duration_seconds", "Latência das chamadas aos provedores externos", ("provider", "endpoint"),
+))
+provider_requests_total = registry.register(Counter(
+    "provider_requests_total", "Chamadas aos provedores externos por resultado", ("provider", "endpoint", "status"),
+))
+provider_errors_total = registry.register(Counter(
+    "provider_errors_total", "Falhas de rede ou respostas de erro dos provedores", ("provider", "endpoint"),
+))
+cache_requests_total = registry.register(Counter(
+    "cache_requests_total", "Consultas a caches da aplicação por resultado", ("cache", "result"),
+))
+metadata_refresh_games_total = registry.register(Counter(
+    "metadata_refresh_games_total", "Títulos processados pela atualização de metadados por resultado", ("provider", "result"),
+))
+metadata_refresh_provider_calls_total = registry.register(Counter(
+    "metadata_refresh_provider_calls_total", "Chamadas aos provedores feitas pela atualização de metadados", ("provider",),
+))
+
+rate_limited_total = registry.register(Counter(
+    "rate_limited_total", "Requisições recusadas pelos limites de requisição", ("group", "scope"),
+))
+
+admission_rejected_total = registry.register(Counter(
+    "admission_rejected_total", "Requisições recusadas pelo controle de admissão (503)", ("class", "reason"),
+))
+admission_queue_wait_seconds = registry.register(Histogram(
+    "admission_queue_wait_seconds", "Espera na fila do controle de admissão", ("class",),
+))
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    """Registra um acerto ou falta de cache (a razão de acerto sai das duas séries)"""
+    cache_requests_total.inc(cache, "hit" if hit else "miss")
+
+
+def register_pool_metrics(engines: Callable[[], Iterable[Tuple[str, object]]]) -> None:
+    """Expõe os gauges do pool de conexões dos engines informados"""
+
+    def _pool_values(attribute: str):
+        def collect():
+            for name, engine in engines():
+                method = getattr(engine.pool, attribute, None)
+                if method is not None:
+                    # overflow() fica negativo enquanto o pool ainda não encheu
+                    yield (name,), max(method(), 0)
+        return collect
+
+    registry.register(CallbackGauge(
+        "db_pool_checked_out", "Conexões em uso no pool", _pool_values("checkedout"), ("engine",),
+    ))
+    registry.register(CallbackGauge(
+        "db_pool_overflow", "Conexões de overflow abertas além do pool_size", _pool_values("overflow"), ("engine",),
+    ))
+    registry.register(CallbackGauge(
+        "db_pool_size", "Tamanho configurado do pool", _pool_values("size"), ("engine",),
+    ))
+
+
+class MetricsMiddleware:
+    """Middleware ASGI que mede latência, status e requisições em andamento"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_holder = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_holder[0] = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - started
+            http_requests_in_flight.dec()
+
+            route = scope.get("route")
+            # Rotas não encontradas agrupadas para não explodir a cardinalidade
+            template = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            http_request_duration_seconds.observe(duration, method, template)
+            http_requests_total.inc(method, template, str(status_holder[0]))
+
+
+# Chamadas externas da requisição atual, quando alguém (o profiler) está coletando
+outbound_calls: ContextVar[Optional[List[Tuple[str, str, float]]]] = ContextVar("outbound_calls", default=None)
+
+
+class InstrumentedTransport(httpx.AsyncBaseTransport):
+    """Transporte httpx que mede latência e erros das chamadas a um provedor"""
+
+    def __init__(self, provider: str, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.provider = provider
+        self._transport = transport or httpx.AsyncHTTPTransport()
+
+    @staticmethod
+    def _endpoint(request: httpx.Request) -> str:
+        # Último segmento fixo do caminho (search, thing, jogos, colecao...)
+        segments = [s for s in request.url.path.split("/") if s and not s.isdigit()]
+        return segments[-1] if segments else "/"
+
+    def _observe(self, endpoint: str, duration: float) -> None:
+        provider_request_duration_seconds.observe(duration, self.provider, endpoint)
+        calls = outbound_calls.get()
+        if calls is not None:
+            calls.append((self.provider, endpoint, duration))
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        endpoint = self._endpoint(request)
+        started = time.perf_counter()
+        try:
+            response = await self._transport.handle_async_request(request)
+        except Exception:
+            self._observe(endpoint, time.perf_counter() - started)
+            provider_requests_total.inc(self.provider, endpoint, "error")
+            provider_errors_total.inc(self.provider, endpoint)
+            raise
+
+        self._observe(endpoint, time.perf_counter() - started)
+        provider_requests_total.inc(self.provider, endpoint, str(response.status_code))
+        if response.status_code >= 400:
+            provider_errors_total.inc(self.provider, endpoint)
+        return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
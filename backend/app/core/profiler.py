@@ -0,0 +1,398 @@
+"""
+Profiler por requisição, ativado sob demanda.
+
+Requisições com um token de profiling válido (cabeçalho X-Profile ou
+parâmetro __profile) rodam com um profiler por amostragem: uma thread lê a
+pilha das threads que executam a rota (event loop e threadpool) a cada
+PROFILER_INTERVAL_MS e soma o tempo de parede e de CPU de cada função. O
+relatório inclui o tempo em SQL e em chamadas externas e é salvo no formato
+do speedscope (https://www.speedscope.app) em PROFILER_DIR, que guarda no
+máximo PROFILER_MAX_REPORTS relatórios.
+
+Com PROFILER_ENABLED=False o middleware nem é instalado. Ativado, cada
+requisição custa uma consulta de cabeçalho; no máximo um profiling roda por
+vez, limitado a PROFILER_MAX_PER_MINUTE. As rotas que listam e baixam os
+relatórios (/api/profiles) usam o mesmo token, mas nunca são perfiladas.
+
+Gerar um token (válido por 15 minutos):
+    python -m app.core.profiler --minutes 15
+"""
+import argparse
+import asyncio
+import hashlib
+import hmac
+import inspect
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qs
+
+from app.config import settings
+from app.core.db_instrumentation import track_queries
+from app.core.metrics import outbound_calls
+
+
+HEADER_NAME = b"x-profile"
+QUERY_PARAM = "__profile"
+WAITING_FRAME = ("[aguardando I/O]", "", 0)
+# Rotas dos próprios relatórios: perfilá-las só gastaria a cota e geraria relatórios inúteis
+SKIPPED_PREFIXES = ("/api/profiles",)
+
+FrameKey = Tuple[str, str, int]
+
+
+def sign_token(expires_at: int) -> str:
+    """Gera um token de profiling assinado com a SECRET_KEY"""
+    digest = hmac.new(settings.SECRET_KEY.encode(), f"profile:{expires_at}".encode(), hashlib.sha256)
+    return f"{expires_at}.{digest.hexdigest()[:32]}"
+
+
+def verify_token(token: Optional[str]) -> bool:
+    """Verifica a assinatura e a validade de um token de profiling"""
+    if not token or "." not in token:
+        return False
+    expires_at, _ = token.split(".", 1)
+    try:
+        if int(expires_at) < time.time():
+            return False
+    except ValueError:
+        return False
+    return hmac.compare_digest(token, sign_token(int(expires_at)))
+
+
+def request_token(scope) -> Optional[str]:
+    """Extrai o token de profiling do cabeçalho ou da query string"""
+    for name, value in scope["headers"]:
+        if name == HEADER_NAME:
+            return value.decode("latin-1")
+    query = scope.get("query_string")
+    if query and QUERY_PARAM.encode() in query:
+        values = parse_qs(query.decode("latin-1")).get(QUERY_PARAM)
+        return values[0] if values else None
+    return None
+
+
+def _route_codes(route) -> Set[Any]:
+    """Code objects da rota e de todas as suas dependências"""
+    codes = set()
+    pending = [getattr(route, "dependant", None)]
+    while pending:
+        dependant = pending.pop()
+        if dependant is None:
+            continue
+        call = dependant.call
+        if call is not None:
+            call = inspect.unwrap(call)
+            code = getattr(call, "__code__", None) or getattr(getattr(call, "__call__", None), "__code__", None)
+            if code is not None:
+                codes.add(code)
+        pending.extend(dependant.dependencies)
+    return codes
+
+
+class Sampler:
+    """Amostra as pilhas das threads que executam uma requisição"""
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.interval = settings.PROFILER_INTERVAL_MS / 1000
+        self.deadline = time.perf_counter() + settings.PROFILER_MAX_SECONDS
+        self.frames: Dict[FrameKey, int] = {}
+        self.wall_samples: List[Tuple[List[int], float]] = []
+        self.cpu_samples: List[Tuple[List[int], float]] = []
+        self._codes: Optional[Set[Any]] = None
+        self._cpu_clocks: Dict[int, float] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _frame_index(self, key: FrameKey) -> int:
+        index = self.frames.get(key)
+        if index is None:
+            index = self.frames[key] = len(self.frames)
+        return index
+
+    def _request_stack(self, frame) -> Optional[List[int]]:
+        """Pilha (raiz -> folha) a partir da função mais externa da rota, se houver"""
+        codes = []
+        outermost = None
+        while frame is not None:
+            codes.append(frame.f_code)
+            if frame.f_code in self._codes:
+                outermost = len(codes)
+            frame = frame.f_back
+        if outermost is None:
+            return None
+        return [
+            self._frame_index((code.co_name, code.co_filename, code.co_firstlineno))
+            for code in reversed(codes[:outermost])
+        ]
+
+    def _cpu_delta(self, thread_id: int, elapsed: float) -> float:
+        """CPU gasta pela thread desde a amostra anterior (limitada ao intervalo)"""
+        try:
+            now = time.clock_gettime(time.pthread_getcpuclockid(thread_id))
+        except (AttributeError, OSError):
+            return 0.0
+        previous = self._cpu_clocks.get(thread_id)
+        self._cpu_clocks[thread_id] = now
+        # A thread pode ter atendido outras requisições entre duas amostras desta
+        return min(now - previous, elapsed) if previous is not None else 0.0
+
+    def _sample(self, elapsed: float) -> None:
+        if self._codes is None:
+            route = self.scope.get("route")
+            if route is None:
+                return  # Ainda roteando
+            self._codes = _route_codes(route)
+
+        matched = False
+        own_id = threading.get_ident()
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            stack = self._request_stack(frame)
+            if stack is None:
+                continue
+            matched = True
+            self.wall_samples.append((stack, elapsed))
+            cpu = self._cpu_delta(thread_id, elapsed)
+            if cpu > 0:
+                self.cpu_samples.append((stack, cpu))
+
+        if not matched:
+            # Corrotina suspensa (esperando banco, rede ou o threadpool)
+            self.wall_samples.append(([self._frame_index(WAITING_FRAME)], elapsed))
+
+    def _run(self) -> None:
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            if now > self.deadline:
+                break
+            self._sample(now - last)
+            last = now
+
+
+def speedscope_report(name: str, sampler: Sampler) -> Dict[str, Any]:
+    """Monta o relatório no formato de arquivo do speedscope"""
+    frames = [None] * len(sampler.frames)
+    for (function, filename, line), index in sampler.frames.items():
+        frames[index] = {"name": function, "file": filename, "line": line}
+
+    def profile(kind: str, samples: List[Tuple[List[int], float]]) -> Dict[str, Any]:
+        weights = [round(weight * 1000, 3) for _, weight in samples]
+        return {
+            "type": "sampled",
+            "name": f"{name} ({kind})",
+            "unit": "milliseconds",
+            "startValue": 0,
+            "endValue": round(sum(weights), 3),
+            "samples": [stack for stack, _ in samples],
+            "weights": weights,
+        }
+
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": name,
+        "exporter": settings.APP_NAME,
+        "activeProfileIndex": 0,
+        "shared": {"frames": frames},
+        "profiles": [profile("parede", sampler.wall_samples), profile("CPU", sampler.cpu_samples)],
+    }
+
+
+class ProfileStore:
+    """Diretório limitado de relatórios de profiling"""
+
+    def __init__(self, directory: str, max_reports: int):
+        self.directory = directory
+        self.max_reports = max_reports
+
+    def _path(self, profile_id: str, suffix: str) -> str:
+        return os.path.join(self.directory, f"{profile_id}.{suffix}.json")
+
+    def save(self, profile_id: str, report: Dict[str, Any], summary: Dict[str, Any]) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._path(profile_id, "speedscope"), "w") as f:
+            json.dump(report, f)
+        with open(self._path(profile_id, "summary"), "w") as f:
+            json.dump(summary, f)
+        self._evict()
+
+    def _evict(self) -> None:
+        summaries = sorted(
+            (entry for entry in os.scandir(self.directory) if entry.name.endswith(".summary.json")),
+            key=lambda entry: entry.stat().st_mtime,
+        )
+        for entry in summaries[:max(len(summaries) - self.max_reports, 0)]:
+            profile_id = entry.name[:-len(".summary.json")]
+            for suffix in ("summary", "speedscope"):
+                try:
+                    os.remove(self._path(profile_id, suffix))
+                except FileNotFoundError:
+                    pass
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Resumos dos relatórios, do mais recente para o mais antigo"""
+        if not os.path.isdir(self.directory):
+            return []
+        summaries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".summary.json"):
+                try:
+                    with open(entry.path) as f:
+                        summaries.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+        return sorted(summaries, key=lambda s: s["started_at"], reverse=True)
+
+    def path(self, profile_id: str) -> Optional[str]:
+        """Caminho do relatório do speedscope, se existir"""
+        try:
+            uuid.UUID(profile_id)
+        except ValueError:
+            return None
+        path = self._path(profile_id, "speedscope")
+        return path if os.path.exists(path) else None
+
+
+class ProfileRateLimiter:
+    """Um profiling por vez, no máximo N por minuto"""
+
+    def __init__(self, per_minute: int):
+        self.per_minute = per_minute
+        self.active = False
+        self._started: Deque[float] = deque()
+
+    def acquire(self) -> bool:
+        now = time.monotonic()
+        while self._started and now - self._started[0] > 60:
+            self._started.popleft()
+        if self.active or len(self._started) >= self.per_minute:
+            return False
+        self.active = True
+        self._started.append(now)
+        return True
+
+    def release(self) -> None:
+        self.active = False
+
+
+profile_store = ProfileStore(settings.PROFILER_DIR, settings.PROFILER_MAX_REPORTS)
+
+
+class ProfilerMiddleware:
+    """Middleware ASGI que perfila as requisições com token de profiling"""
+
+    def __init__(self, app):
+        self.app = app
+        self.limiter = ProfileRateLimiter(settings.PROFILER_MAX_PER_MINUTE)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(SKIPPED_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+
+        token = request_token(scope)
+        if token is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not verify_token(token):
+            await self._call_with_status(scope, receive, send, b"invalid-token")
+            return
+        if not self.limiter.acquire():
+            await self._call_with_status(scope, receive, send, b"rate-limited")
+            return
+
+        try:
+            await self._profile(scope, receive, send)
+        finally:
+            self.limiter.release()
+
+    async def _call_with_status(self, scope, receive, send, status: bytes):
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", []).append((b"x-profile-status", status))
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+    async def _profile(self, scope, receive, send):
+        profile_id = str(uuid.uuid4())
+        status_holder = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_holder[0] = message["status"]
+                message.setdefault("headers", []).append((b"x-profile-id", profile_id.encode()))
+            await send(message)
+
+        calls: List[Tuple[str, str, float]] = []
+        calls_token = outbound_calls.set(calls)
+        sampler = Sampler(scope)
+        started_at = time.time()
+        started = time.perf_counter()
+        cpu_started = time.process_time()
+        sampler.start()
+        try:
+            with track_queries() as queries:
+                await self.app(scope, receive, send_wrapper)
+        finally:
+            sampler.stop()
+            outbound_calls.reset(calls_token)
+
+        duration = time.perf_counter() - started
+        route = getattr(scope.get("route"), "path", None) or scope["path"]
+        name = f"{scope['method']} {route}"
+        summary = {
+            "id": profile_id,
+            "name": name,
+            "path": scope["path"],
+            "status": status_holder[0],
+            "started_at": started_at,
+            "wall_ms": round(duration * 1000, 3),
+            "process_cpu_ms": round((time.process_time() - cpu_started) * 1000, 3),
+            "samples": len(sampler.wall_samples),
+            "sql_queries": queries.count,
+            "sql_ms": round(queries.total_time * 1000, 3),
+            "http_calls": len(calls),
+            "http_ms": round(sum(duration for _, _, duration in calls) * 1000, 3),
+            "http_by_endpoint": _group_calls(calls),
+        }
+        report = speedscope_report(name, sampler)
+        await asyncio.to_thread(profile_store.save, profile_id, report, summary)
+
+
+def _group_calls(calls: List[Tuple[str, str, float]]) -> Dict[str, float]:
+    grouped: Dict[str, float] = {}
+    for provider, endpoint, duration in calls:
+        key = f"{provider}:{endpoint}"
+        grouped[key] = round(grouped.get(key, 0.0) + duration * 1000, 3)
+    return grouped
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera um token de profiling de requisições")
+    parser.add_argument("--minutes", type=int, default=15, help="Validade do token")
+    args = parser.parse_args()
+
+    token = sign_token(int(time.time()) + args.minutes * 60)
+    print(token)
+    print(f"Use no cabeçalho 'X-Profile: {token}' ou no parâmetro '?{QUERY_PARAM}={token}'")
+
+
+if __name__ == "__main__":
+    main()
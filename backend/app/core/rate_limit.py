@@ -0,0 +1,130 @@
+"""
+Limites de requisições por IP e por usuário (baldes de tokens).
+
+Cada requisição em /api cai no primeiro grupo de ROUTE_GROUPS que casar
+(ou em "default"), e os limites do grupo vêm de RATE_LIMITS: "ip" vale
+para todos, e o limite do plano (free, premium, pro) vale para quem envia
+um token de acesso válido. O usuário e o plano saem das claims do token,
+sem consultar o banco; um token inválido conta como anônimo (a rota
+responde 401).
+
+Respostas levam RateLimit-Limit, RateLimit-Remaining, RateLimit-Reset e
+RateLimit-Policy do balde mais restritivo; a recusa é 429 com Retry-After.
+"""
+import json
+import logging
+from typing import List, Optional, Tuple
+
+from jose import JWTError, jwt
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+from app.core.metrics import rate_limited_total
+from app.services.rate_limit import rate_limit
+
+logger = logging.getLogger(__name__)
+
+# (método, prefixo do caminho, grupo), na ordem de avaliação
+ROUTE_GROUPS: List[Tuple[str, str, str]] = [
+    # Força bruta de senha (bcrypt) e criação de contas
+    ("POST", "/api/auth/login", "auth"),
+    ("POST", "/api/auth/register", "auth"),
+    ("POST", "/api/auth/refresh", "auth"),
+    ("GET", "/api/auth/google/callback", "auth"),
+    # Proxies para os provedores (cada busca gasta o orçamento do BGG/Ludopedia)
+    ("GET", "/api/collection/search/", "search"),
+    ("GET", "/api/collection/game-details/", "search"),
+    # Importações e sincronizações
+    ("POST", "/api/collection/import", "import"),
+    ("POST", "/api/collection/link-expansions", "import"),
+    ("POST", "/api/ludopedia/import-collection", "import"),
+    ("POST", "/api/ludopedia/sync-collection", "import"),
+]
+
+DEFAULT_GROUP = "default"
+
+
+def route_group(method: str, path: str) -> Optional[str]:
+    """Grupo de limites da rota (None para rotas fora de /api e preflight do CORS)"""
+    if method == "OPTIONS" or not path.startswith("/api/"):
+        return None
+    for route_method, prefix, group in ROUTE_GROUPS:
+        if method == route_method and path.startswith(prefix):
+            return group
+    return DEFAULT_GROUP
+
+
+def _identity(authorization: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """Usuário e plano do token Bearer ((None, None) se ausente ou inválido)"""
+    if not authorization or not authorization.lower().startswith("bearer "):
+        return None, None
+    try:
+        payload = jwt.decode(authorization[7:], settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        return None, None
+    user = payload.get("uid") or payload.get("sub")
+    if user is None:
+        return None, None
+    # Tokens antigos, só com sub, contam como plano gratuito
+    return str(user), payload.get("role", "free")
+
+
+def _client_ip(scope: Scope) -> Optional[str]:
+    if settings.RATE_LIMIT_TRUST_FORWARDED_FOR:
+        for name, value in scope["headers"]:
+            if name == b"x-forwarded-for":
+                return value.decode("latin-1").split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else None
+
+
+class RateLimitMiddleware:
+    """Middleware ASGI que aplica os limites de RATE_LIMITS antes da rota"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not settings.RATE_LIMIT_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        group = route_group(scope["method"], scope["path"])
+        if group is None:
+            await self.app(scope, receive, send)
+            return
+
+        authorization = None
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                authorization = value.decode("latin-1")
+                break
+        user, role = _identity(authorization)
+        buckets = rate_limit.buckets(group, _client_ip(scope), user, role)
+        if not buckets:
+            await self.app(scope, receive, send)
+            return
+
+        decision = await rate_limit.check(buckets)
+        headers = rate_limit.headers(decision)
+        if not decision.allowed:
+            scope_name = "user" if ":user:" in decision.bucket.key else "ip"
+            rate_limited_total.inc(group, scope_name)
+            body = json.dumps({"detail": "Too many requests"}).encode()
+            await send({
+                "type": "http.response.start",
+                "status": 429,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    *headers,
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
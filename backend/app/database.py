@@ -1,8 +1,18 @@
-from sqlalchemy import create_engine
+import itertools
+import logging
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from fastapi import Request
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from app.config import settings
 
+logger = logging.getLogger(__name__)
+
 # Create engine
 engine = create_engine(
     settings.DATABASE_URL,
@@ -26,3 +36,145 @@ def get_db():
     finally:
         db.close()
 
+
+class Replica:
+    """Réplica de leitura com verificação de saúde periódica"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.engine = create_engine(url, pool_pre_ping=True, pool_size=10, max_overflow=20)
+        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self.healthy = True
+        self.checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def is_healthy(self) -> bool:
+        """Retorna o estado da réplica, refazendo a verificação quando vencida"""
+        if time.monotonic() - self.checked_at < settings.DATABASE_REPLICA_CHECK_SECONDS:
+            return self.healthy
+
+        # Apenas uma thread verifica; as demais usam o último estado conhecido
+        if not self._lock.acquire(blocking=False):
+            return self.healthy
+        try:
+            with self.engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+            self.healthy = True
+        except Exception as e:
+            logger.warning(
+                "Réplica de leitura indisponível: %s", e,
+                extra={"replica": self.engine.url.render_as_string(hide_password=True)},
+            )
+            self.healthy = False
+        finally:
+            self.checked_at = time.monotonic()
+            self._lock.release()
+        return self.healthy
+
+    def mark_down(self) -> None:
+        """Tira a réplica de rotação até a próxima verificação"""
+        self.healthy = False
+        self.checked_at = time.monotonic()
+
+
+class ReplicaRouter:
+    """Distribui sessões de leitura entre as réplicas saudáveis (round-robin)"""
+
+    def __init__(self, urls):
+        self.replicas = [Replica(url) for url in urls]
+        self._counter = itertools.count()
+
+    def pick(self) -> Optional[Replica]:
+        """Escolhe a próxima réplica saudável, ou None se nenhuma estiver disponível"""
+        total = len(self.replicas)
+        if not total:
+            return None
+
+        start = next(self._counter)
+        for offset in range(total):
+            replica = self.replicas[(start + offset) % total]
+            if replica.is_healthy():
+                return replica
+        return None
+
+
+class PrimaryPins:
+    """
+    Garante leitura das próprias escritas.
+
+    Após uma escrita, o usuário fica fixado no primário por alguns segundos,
+    tempo suficiente para as réplicas alcançarem. O pin é guardado em memória
+    (por token) e em um cookie, que vale também entre workers.
+    """
+
+    COOKIE_NAME = "db_primary_until"
+
+    def __init__(self):
+        self._pins: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(request: Request) -> Optional[str]:
+        authorization = request.headers.get("authorization")
+        if authorization and authorization.lower().startswith("bearer "):
+            return authorization[7:]
+        return request.query_params.get("token")
+
+    def pin(self, request: Request, response) -> None:
+        """Fixa o autor de uma escrita no primário"""
+        until = time.time() + settings.READ_YOUR_WRITES_SECONDS
+        key = self._key(request)
+        if key:
+            with self._lock:
+                self._pins[key] = until
+                if len(self._pins) > 10000:
+                    now = time.time()
+                    self._pins = {k: v for k, v in self._pins.items() if v > now}
+        response.set_cookie(
+            self.COOKIE_NAME,
+            f"{until:.3f}",
+            max_age=settings.READ_YOUR_WRITES_SECONDS,
+            httponly=True,
+            samesite="lax",
+        )
+
+    def is_pinned(self, request: Request) -> bool:
+        now = time.time()
+        try:
+            if float(request.cookies.get(self.COOKIE_NAME, 0)) > now:
+                return True
+        except ValueError:
+            pass
+
+        key = self._key(request)
+        return key is not None and self._pins.get(key, 0) > now
+
+
+replica_router = ReplicaRouter(settings.DATABASE_REPLICA_URLS)
+primary_pins = PrimaryPins()
+
+
+def _read_session(request: Request) -> Tuple[Session, Optional[Replica]]:
+    if not primary_pins.is_pinned(request):
+        replica = replica_router.pick()
+        if replica is not None:
+            return replica.SessionLocal(), replica
+    return SessionLocal(), None
+
+
+def open_read_session(request: Request) -> Session:
+    """Sessão de leitura fora de dependências (ex.: respostas em streaming); quem abre fecha"""
+    return _read_session(request)[0]
+
+
+# Dependency to get a read-only session (replica when available)
+def get_read_db(request: Request):
+    db, replica = _read_session(request)
+    try:
+        yield db
+    except OperationalError:
+        if replica is not None:
+            replica.mark_down()
+        raise
+    finally:
+        db.close()
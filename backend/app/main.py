@@ -1,10 +1,25 @@
-from fastapi import FastAPI
+import asyncio
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from app.config import settings
-from app.database import engine, Base
+from app.core.logging_config import setup_logging
+from app.database import engine, Base, primary_pins, replica_router
+from app.core import metrics
+from app.core.profiler import ProfilerMiddleware
+from app.core.compression import CompressionMiddleware
+from app.core.idempotency import IdempotencyMiddleware
+from app.core.rate_limit import RateLimitMiddleware
+from app.core.admission import AdmissionMiddleware, admission
+from app.core.db_instrumentation import install_query_instrumentation, db_instrumentation_middleware
+
+setup_logging()
 
 # Import models to register them with SQLAlchemy
-from app.models import User, Game
+from app.models import User, CatalogGame, CollectionItem, ImportJob
+from app.services.metadata_refresh import metadata_refresh
+from app.services.google_oauth import google_oauth
+from app.services.auth_tokens import auth_tokens
 
 # Create tables
 Base.metadata.create_all(bind=engine)
@@ -16,7 +31,41 @@ app = FastAPI(
     description="API para gerenciar coleções de jogos de tabuleiro e criar listas de vendas",
 )
 
-# CORS middleware
+
+@app.middleware("http")
+async def read_your_writes(request: Request, call_next):
+    """Fixa no banco primário quem acabou de escrever, para não ler dados defasados das réplicas"""
+    response = await call_next(request)
+    if request.method not in ("GET", "HEAD", "OPTIONS") and response.status_code < 400:
+        primary_pins.pin(request, response)
+    return response
+
+
+# Contagem de consultas, tempo no banco e detecção de N+1 por requisição
+install_query_instrumentation()
+app.middleware("http")(db_instrumentation_middleware)
+
+# Idempotency-Key e single-flight nas importações (guarda o corpo antes da compressão)
+app.add_middleware(IdempotencyMiddleware)
+
+# gzip/brotli para respostas grandes
+app.add_middleware(CompressionMiddleware)
+
+# Profiler sob demanda (só instalado quando habilitado)
+if settings.PROFILER_ENABLED:
+    app.add_middleware(ProfilerMiddleware)
+
+# Controle de admissão por classe de rota (protege o pool do banco nos picos)
+app.add_middleware(AdmissionMiddleware)
+
+# Limites de requisições por IP e por plano (recusa antes de qualquer outro trabalho)
+app.add_middleware(RateLimitMiddleware)
+
+# Métricas do Prometheus (mede a requisição inteira)
+app.add_middleware(metrics.MetricsMiddleware)
+
+# CORS (middleware mais externo: responde o preflight antes dos limites e põe
+# os cabeçalhos também nas recusas 429/503 e nas respostas de idempotência)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # Permitir todas as origens em desenvolvimento
@@ -25,6 +74,28 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+metrics.register_pool_metrics(
+    lambda: [("primary", engine)] + [(f"replica{i}", r.engine) for i, r in enumerate(replica_router.replicas)]
+)
+admission.register_metrics()
+
+
+@app.on_event("startup")
+async def start_background_jobs():
+    """Agendadores em segundo plano (só iniciam quando habilitados)"""
+    metadata_refresh.start()
+    auth_tokens.start()
+    if google_oauth.configured:
+        # Chaves do Google em cache antes do primeiro login
+        asyncio.create_task(google_oauth.certificates.warm())
+
+
+@app.on_event("shutdown")
+async def stop_background_jobs():
+    await metadata_refresh.stop()
+    await auth_tokens.stop()
+    await google_oauth.client.aclose()
+
 
 @app.get("/")
 async def root():
@@ -40,13 +111,21 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
+
 # Import routers
-from app.api import auth, collection, ludopedia_auth
+from app.api import auth, collection, ludopedia_auth, imports, profiles
 
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
 app.include_router(collection.router, prefix="/api/collection", tags=["collection"])
 app.include_router(ludopedia_auth.router, prefix="/api/ludopedia", tags=["ludopedia"])
+app.include_router(imports.router, prefix="/api/imports", tags=["imports"])
+if settings.PROFILER_ENABLED:
+    app.include_router(profiles.router, prefix="/api/profiles", tags=["profiles"])
 
 # To be created:
 # from app.api import users, sale_lists, orders
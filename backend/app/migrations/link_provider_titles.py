@@ -0,0 +1,35 @@
+"""
+Liga os títulos da Ludopedia e do BGG já existentes no catálogo.
+
+As importações ligam os títulos novos conforme chegam; esta execução em lote
+cobre o catálogo criado antes disso (e títulos que só passaram a ter par
+depois). Cada bloco é gravado em uma transação, então pode rodar com a
+aplicação no ar e ser repetida: títulos já ligados são ignorados.
+
+Uso:
+    python -m app.migrations.link_provider_titles [--batch-size 1000]
+"""
+import argparse
+
+from app.config import settings
+from app.database import Base, engine, SessionLocal
+from app.models import CatalogMatch
+from app.services.entity_resolution import entity_resolver
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Liga títulos da Ludopedia e do BGG que são o mesmo jogo")
+    parser.add_argument("--batch-size", type=int, default=settings.ENTITY_MATCH_BATCH_SIZE)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine, tables=[CatalogMatch.__table__])
+    db = SessionLocal()
+    try:
+        created = entity_resolver.match_all(db, args.batch_size)
+    finally:
+        db.close()
+    print(f"Ligações criadas: {created}")
+
+
+if __name__ == "__main__":
+    main()
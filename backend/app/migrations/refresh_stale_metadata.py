@@ -0,0 +1,41 @@
+"""
+Atualiza agora o rating, o peso e a posição no ranking dos títulos defasados.
+
+O agendador (METADATA_REFRESH_ENABLED) faz o mesmo na janela fora do pico;
+esta execução manual usa a mesma fila e o mesmo orçamento de chamadas, e
+retoma a rodada em andamento se houver uma. Interromper é seguro: o
+progresso é gravado a cada lote.
+
+Uso:
+    python -m app.migrations.refresh_stale_metadata [--respect-window] [--force]
+"""
+import argparse
+import asyncio
+
+from app.database import Base, engine
+from app.models import MetadataRefreshRun
+from app.services.metadata_refresh import metadata_refresh
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Atualiza os metadados defasados do catálogo")
+    parser.add_argument("--respect-window", action="store_true", help="Parar ao sair da janela fora do pico")
+    parser.add_argument("--force", action="store_true", help="Criar uma rodada nova mesmo que a última seja recente")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine, tables=[MetadataRefreshRun.__table__])
+    run = asyncio.run(metadata_refresh.run(ignore_window=not args.respect_window, force=args.force))
+    if run is None:
+        print("Nada a atualizar (ou outro worker está executando a rodada)")
+        return
+
+    cost = f"{run.provider_calls / run.refreshed_count:.3f}" if run.refreshed_count else "-"
+    print(
+        f"Rodada {run.id} ({run.status.value}): {run.position}/{len(run.queue)} títulos, "
+        f"{run.refreshed_count} atualizados, {run.missing_count} removidos do provedor, "
+        f"{run.failed_count} falhas, {run.provider_calls} chamadas ({cost} por título atualizado)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+"""
+Migração online da tabela legada `games` para `catalog_games` + `collection_items`.
+
+Copia os jogos em lotes pequenos (uma transação por lote, paginando por id),
+então pode rodar com a aplicação no ar. Itens mantêm o mesmo id do jogo
+legado; antes do primeiro lote a sequência de `collection_items` é
+avançada além da de `games` (com folga de --id-gap para os jogos criados
+enquanto a versão antiga segue no ar), de modo que itens novos nunca
+ocupam um id que um jogo legado ainda vai usar.
+
+É idempotente e retomável. Cada execução, além de copiar os jogos novos,
+recopia os jogos legados alterados depois da cópia (updated_at mais
+recente que o do item) e remove os itens cujo jogo legado foi apagado;
+rodar de novo após o deploy leva ao item tudo o que mudou no meio tempo.
+Alterações de metadados feitas na tabela legada vão para uma cópia
+privada do título, como as edições feitas pela API. A tabela `games` não
+é alterada nem removida.
+
+Em SQLite (desenvolvimento) não há sequência para reservar: rode com a
+aplicação parada.
+
+Uso:
+    python -m app.migrations.split_game_catalog [--batch-size 1000] [--id-gap 1000000]
+"""
+import argparse
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import MetaData, Table, bindparam, exists, func, inspect, select, text, update
+
+from app.database import Base, engine, SessionLocal
+from app.models import CatalogGame, CollectionItem
+from app.services.catalog_service import (
+    catalog_service,
+    insert_ignoring_conflicts,
+    CATALOG_FIELDS,
+    ITEM_FIELDS,
+)
+
+
+LEGACY_TABLE = "games"
+DEFAULT_BATCH_SIZE = 1000
+# Ids reservados para jogos legados criados enquanto a migração roda
+DEFAULT_ID_GAP = 1_000_000
+
+
+def _load_legacy_table() -> Table:
+    return Table(LEGACY_TABLE, MetaData(), autoload_with=engine)
+
+
+def _migrate_batch(db, rows: List[Dict[str, Any]]) -> int:
+    """Copia um lote de jogos legados; retorna quantos itens foram criados"""
+    migrated = dict(db.execute(
+        select(CollectionItem.id, CollectionItem.user_id).where(CollectionItem.id.in_([row["id"] for row in rows]))
+    ).all())
+    for row in rows:
+        if row["id"] in migrated and migrated[row["id"]] != row["user_id"]:
+            # Só acontece se um item novo ocupou o id antes da reserva da sequência
+            print(f"AVISO: id {row['id']} já usado por um item de outro usuário; jogo legado não copiado")
+    rows = [row for row in rows if row["id"] not in migrated]
+    if not rows:
+        return 0
+
+    catalog_ids: Dict[int, int] = {}
+
+    # Títulos compartilhados, deduplicados por ID de provedor
+    for id_field in ("ludopedia_id", "bgg_id"):
+        records = [
+            row for row in rows
+            if row["id"] not in catalog_ids and row.get(id_field) is not None
+        ]
+        catalogs = catalog_service.resolve_many(db, records, id_field)
+        for row in records:
+            catalog_ids[row["id"]] = catalogs[row[id_field]]["id"]
+
+    # Jogos cadastrados manualmente viram títulos privados do dono
+    for row in rows:
+        if row["id"] not in catalog_ids:
+            private = catalog_service.create_private_many(db, [row], row["user_id"])
+            catalog_ids[row["id"]] = private[0]["id"]
+
+    items = []
+    for row in rows:
+        item = {field: row.get(field) for field in ITEM_FIELDS}
+        item.update(
+            id=row["id"],
+            user_id=row["user_id"],
+            catalog_id=catalog_ids[row["id"]],
+            base_game_id=None,  # Ligado depois que todos os itens existirem
+            created_at=row["created_at"],
+            updated_at=row["updated_at"],
+        )
+        items.append(item)
+
+    inserted = insert_ignoring_conflicts(db, CollectionItem.__table__, items, index_elements=["id"])
+    db.commit()
+    return len(inserted)
+
+
+def _link_expansions(db, games: Table, batch_size: int) -> None:
+    """Copia os vínculos expansão -> jogo base, em lotes"""
+    last_id = 0
+    while True:
+        rows = db.execute(
+            select(games.c.id, games.c.base_game_id)
+            .where(
+                games.c.id > last_id,
+                games.c.base_game_id.isnot(None),
+                # Jogo base apagado na tabela legada: o item dele já foi removido
+                games.c.base_game_id.in_(select(CollectionItem.id)),
+            )
+            .order_by(games.c.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+
+        items = CollectionItem.__table__
+        db.execute(
+            update(items)
+            .where(items.c.id == bindparam("game_id"), items.c.base_game_id.is_(None))
+            .values(base_game_id=bindparam("legacy_base_game_id")),
+            [{"game_id": game_id, "legacy_base_game_id": base_id} for game_id, base_id in rows],
+        )
+        db.commit()
+        last_id = rows[-1][0]
+
+
+def _recopy_updated(db, games: Table, columns: List, batch_size: int) -> int:
+    """Recopia jogos legados alterados depois de copiados; retorna quantos itens mudaram"""
+    items = CollectionItem.__table__
+    last_id = 0
+    updated = 0
+    while True:
+        rows = [
+            dict(row) for row in db.execute(
+                select(*columns)
+                .join(items, items.c.id == games.c.id)
+                .where(
+                    games.c.id > last_id,
+                    games.c.updated_at.isnot(None),
+                    games.c.updated_at > func.coalesce(items.c.updated_at, items.c.created_at),
+                )
+                .order_by(games.c.id)
+                .limit(batch_size)
+            ).mappings()
+        ]
+        if not rows:
+            return updated
+
+        for row in rows:
+            item = db.get(CollectionItem, row["id"])
+            for field in ITEM_FIELDS:
+                setattr(item, field, row.get(field))
+            catalog_service.update_for_item(db, item, {field: row.get(field) for field in CATALOG_FIELDS})
+            # Mantém o updated_at legado para a próxima execução não recopiar
+            item.updated_at = row["updated_at"]
+        db.commit()
+        updated += len(rows)
+        last_id = rows[-1]["id"]
+
+
+def _remove_deleted(db, games: Table, ceiling: int, batch_size: int) -> int:
+    """Remove itens copiados cujo jogo legado foi apagado; retorna quantos"""
+    items = CollectionItem.__table__
+    last_id = 0
+    removed = 0
+    while True:
+        ids = db.execute(
+            select(items.c.id)
+            .where(
+                items.c.id > last_id,
+                items.c.id <= ceiling,
+                ~exists().where(games.c.id == items.c.id),
+            )
+            .order_by(items.c.id)
+            .limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            return removed
+
+        db.execute(update(items).where(items.c.base_game_id.in_(ids)).values(base_game_id=None))
+        for item in db.query(CollectionItem).filter(CollectionItem.id.in_(ids)):
+            catalog_service.release(db, item)
+            db.delete(item)
+        db.commit()
+        removed += len(ids)
+        last_id = ids[-1]
+
+
+def _sequence(db, table: str) -> Optional[str]:
+    """Sequência que gera os ids da tabela (PostgreSQL)"""
+    return db.execute(text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": table}).scalar()
+
+
+def _legacy_id_ceiling(db, games: Table) -> int:
+    """Maior id que um jogo legado já recebeu (ou pode ter recebido)"""
+    if db.get_bind().dialect.name == "postgresql":
+        sequence = _sequence(db, LEGACY_TABLE)
+        if sequence:
+            return db.execute(text(f"SELECT last_value FROM {sequence}")).scalar()
+    return db.execute(select(func.max(games.c.id))).scalar() or 0
+
+
+def _reserve_legacy_ids(db, games: Table, gap: int) -> None:
+    """Avança a sequência dos itens além dos ids legados (só avança, nunca recua)"""
+    if db.get_bind().dialect.name != "postgresql":
+        return
+    sequence = _sequence(db, CollectionItem.__tablename__)
+    db.execute(
+        text(
+            f"SELECT setval(:sequence, GREATEST(:reserved, "
+            f"(SELECT COALESCE(MAX(id), 1) FROM collection_items), (SELECT last_value FROM {sequence})))"
+        ),
+        {"sequence": sequence, "reserved": _legacy_id_ceiling(db, games) + gap},
+    )
+    db.commit()
+
+
+def migrate(batch_size: int = DEFAULT_BATCH_SIZE, id_gap: int = DEFAULT_ID_GAP) -> int:
+    """
+    Executa a migração completa
+
+    Args:
+        batch_size: Número de jogos legados por transação
+        id_gap: Ids reservados além da sequência legada para jogos criados durante a migração
+
+    Returns:
+        Número de itens criados nesta execução
+    """
+    Base.metadata.create_all(bind=engine, tables=[CatalogGame.__table__, CollectionItem.__table__])
+
+    if not inspect(engine).has_table(LEGACY_TABLE):
+        print(f"Tabela legada '{LEGACY_TABLE}' não encontrada; nada a migrar.")
+        return 0
+
+    games = _load_legacy_table()
+    columns = [c for c in games.columns if c.name in CATALOG_FIELDS + ITEM_FIELDS] + [
+        games.c.id, games.c.user_id, games.c.created_at, games.c.updated_at,
+    ]
+
+    db = SessionLocal()
+    try:
+        # Antes de tudo, para nenhum item novo ocupar um id legado
+        _reserve_legacy_ids(db, games, id_gap)
+        ceiling = _legacy_id_ceiling(db, games)
+
+        # Retoma a partir do último item já copiado (itens novos ficam acima do teto legado)
+        last_id = db.execute(
+            select(func.max(CollectionItem.id)).where(CollectionItem.id <= ceiling)
+        ).scalar() or 0
+        # Lotes anteriores podem ter ficado incompletos; revisita desde o início se houver lacunas
+        missing = db.execute(
+            select(func.count()).select_from(games).where(
+                games.c.id <= last_id,
+                games.c.id.notin_(select(CollectionItem.id))
+            )
+        ).scalar()
+        if missing:
+            last_id = 0
+
+        created = 0
+        while True:
+            rows = [
+                dict(row) for row in db.execute(
+                    select(*columns).where(games.c.id > last_id).order_by(games.c.id).limit(batch_size)
+                ).mappings()
+            ]
+            if not rows:
+                break
+
+            created += _migrate_batch(db, rows)
+            last_id = rows[-1]["id"]
+            print(f"Migrados jogos até id {last_id} ({created} itens criados)")
+
+        updated = _recopy_updated(db, games, columns, batch_size)
+        removed = _remove_deleted(db, games, ceiling, batch_size)
+        print(f"{updated} itens atualizados e {removed} removidos a partir da tabela legada")
+
+        _link_expansions(db, games, batch_size)
+        return created
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migra a tabela games para catalog_games + collection_items")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--id-gap", type=int, default=DEFAULT_ID_GAP)
+    args = parser.parse_args()
+
+    created = migrate(args.batch_size, args.id_gap)
+    print(f"Migração concluída: {created} itens criados.")
+
+
+if __name__ == "__main__":
+    main()
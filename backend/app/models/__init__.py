@@ -1,5 +1,10 @@
 from app.models.user import User, UserRole
-from app.models.game import Game, GameType
-
-__all__ = ["User", "UserRole", "Game", "GameType"]
+from app.models.game import CatalogGame, CollectionItem, GameType
+from app.models.import_job import ImportJob, ImportJobChunk, ImportStatus
+from app.models.catalog_match import CatalogMatch
+from app.models.tag import Tag, TagKind
+from app.models.bgg_thing import BggThingLinks, BggThingTag
+from app.models.metadata_refresh import MetadataRefreshRun, RefreshStatus
+from app.models.auth_token import TokenRevocation, RefreshToken
 
+__all__ = ["User", "UserRole", "CatalogGame", "CollectionItem", "GameType", "ImportJob", "ImportJobChunk", "ImportStatus", "CatalogMatch", "Tag", "TagKind", "BggThingLinks", "BggThingTag", "MetadataRefreshRun", "RefreshStatus", "TokenRevocation", "RefreshToken"]
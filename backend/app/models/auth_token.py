@@ -0,0 +1,45 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class TokenRevocation(Base):
+    """
+    Versão de token revogada de um usuário.
+
+    Os tokens de acesso levam a versão do usuário (claim `ver`); revogar
+    grava a versão atual aqui e os próximos tokens saem com a seguinte. A
+    versão atual é, portanto, a maior revogada + 1. Só as revogações mais
+    recentes que a validade de um token de acesso importam para a
+    autenticação; elas são carregadas no filtro em memória de cada worker.
+    """
+    __tablename__ = "token_revocations"
+    __table_args__ = (
+        UniqueConstraint("user_id", "token_version", name="uq_token_revocations_user_version"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    token_version = Column(Integer, nullable=False)
+    reason = Column(String, nullable=False)  # logout, deactivated, refresh_reuse...
+    revoked_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
+
+
+class RefreshToken(Base):
+    """
+    Token de renovação (opaco; só o hash SHA-256 é guardado).
+
+    Cada uso troca o token por um novo (rotação) e registra o substituto;
+    reapresentar um token já trocado indica vazamento e revoga todas as
+    sessões do usuário.
+    """
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    token_hash = Column(String, unique=True, nullable=False)
+    token_version = Column(Integer, nullable=False)  # Versão do usuário na emissão
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    revoked_at = Column(DateTime(timezone=True), nullable=True)
+    replaced_by_id = Column(Integer, nullable=True)  # Token emitido na rotação
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, DateTime, Boolean, ForeignKey, JSON
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class BggThingLinks(Base):
+    """
+    Tipo e jogos base de um item do BGG, guardados das chamadas /thing.
+
+    Serve de cache para a ligação de expansões: itens consultados há menos
+    de BGG_THING_CACHE_DAYS não voltam a ser buscados no BGG.
+    """
+    __tablename__ = "bgg_thing_links"
+
+    bgg_id = Column(Integer, primary_key=True)
+    is_expansion = Column(Boolean, nullable=False)
+    base_bgg_ids = Column(JSON, default=list, nullable=False)  # Jogos base (link inbound)
+
+    # Timestamps
+    fetched_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
+class BggThingTag(Base):
+    """Tags de um item do BGG, gravadas junto com BggThingLinks"""
+    __tablename__ = "bgg_thing_tags"
+
+    bgg_id = Column(Integer, primary_key=True)
+    tag_id = Column(Integer, ForeignKey("tags.id", ondelete="CASCADE"), primary_key=True, index=True)
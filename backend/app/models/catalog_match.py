@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
+from app.database import Base
+
+
+class CatalogMatch(Base):
+    """
+    Ligação entre o título da Ludopedia e o do BGG para o mesmo jogo.
+
+    Cada título compartilhado participa de no máximo uma ligação.
+    """
+    __tablename__ = "catalog_matches"
+
+    id = Column(Integer, primary_key=True, index=True)
+    ludopedia_catalog_id = Column(Integer, ForeignKey("catalog_games.id", ondelete="CASCADE"), nullable=False, unique=True)
+    bgg_catalog_id = Column(Integer, ForeignKey("catalog_games.id", ondelete="CASCADE"), nullable=False, unique=True)
+    confidence = Column(Float, nullable=False)  # 0 a 1
+    method = Column(String, nullable=False, default="auto")  # auto (batch ou importação)
+
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    # Relacionamentos
+    ludopedia_catalog = relationship("CatalogGame", foreign_keys=[ludopedia_catalog_id])
+    bgg_catalog = relationship("CatalogGame", foreign_keys=[bgg_catalog_id])
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Float, Boolean, Enum
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Float, Boolean, Enum, Index, UniqueConstraint, text
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import enum
@@ -11,25 +11,43 @@ class GameType(str, enum.Enum):
     EXPANSION = "EXPANSION"
 
 
-class Game(Base):
-    """Modelo de jogo de tabuleiro"""
-    __tablename__ = "games"
+# Condição das linhas compartilhadas do catálogo (sem dono)
+SHARED_CATALOG = text("owner_id IS NULL")
+
+
+class CatalogGame(Base):
+    """
+    Jogo do catálogo, com os metadados dos provedores.
+
+    Linhas compartilhadas (owner_id nulo) existem uma vez por título e são
+    únicas por ID de provedor. Linhas privadas pertencem a um usuário:
+    jogos cadastrados manualmente ou cópias editadas de um título compartilhado.
+    """
+    __tablename__ = "catalog_games"
+    __table_args__ = (
+        Index(
+            "uq_catalog_games_ludopedia_id", "ludopedia_id", unique=True,
+            postgresql_where=SHARED_CATALOG, sqlite_where=SHARED_CATALOG,
+        ),
+        Index(
+            "uq_catalog_games_bgg_id", "bgg_id", unique=True,
+            postgresql_where=SHARED_CATALOG, sqlite_where=SHARED_CATALOG,
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
-    
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)  # Nulo = compartilhado
+
+    # IDs nos provedores
+    ludopedia_id = Column(Integer, nullable=True)
+    bgg_id = Column(Integer, nullable=True)
+
     # Dados do jogo
     name = Column(String, nullable=False)
     description = Column(Text, nullable=True)
     year_published = Column(Integer, nullable=True)
     game_type = Column(Enum(GameType), default=GameType.BASE, nullable=False)
-    base_game_id = Column(Integer, ForeignKey("games.id"), nullable=True)  # ID do jogo base se for expansão
-    
-    # Dados de importação
-    ludopedia_id = Column(Integer, nullable=True, unique=True)
-    bgg_id = Column(Integer, nullable=True, unique=True)
-    order = Column(Integer, nullable=True)  # Ordem original da Ludopedia
-    
+
     # Metadados
     min_players = Column(Integer, nullable=True)
     max_players = Column(Integer, nullable=True)
@@ -39,7 +57,33 @@ class Game(Base):
     rating = Column(Float, nullable=True)
     weight = Column(Float, nullable=True)  # Complexidade (BGG)
     ranking_position = Column(Integer, nullable=True)  # Posição no ranking
-    
+
+    # Imagem
+    image_url = Column(String, nullable=True)
+
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now(), nullable=True)
+
+
+def _catalog_field(name: str) -> property:
+    """Expõe um campo do catálogo diretamente no item da coleção"""
+    return property(lambda item: getattr(item.catalog, name) if item.catalog is not None else None)
+
+
+class CollectionItem(Base):
+    """Jogo na coleção de um usuário (dados próprios do exemplar)"""
+    __tablename__ = "collection_items"
+    __table_args__ = (
+        UniqueConstraint("user_id", "catalog_id", name="uq_collection_items_user_catalog"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    catalog_id = Column(Integer, ForeignKey("catalog_games.id"), nullable=False, index=True)
+    base_game_id = Column(Integer, ForeignKey("collection_items.id"), nullable=True)  # ID do jogo base se for expansão
+    order = Column(Integer, nullable=True)  # Ordem original da Ludopedia
+
     # Estado do jogo na coleção
     is_for_trade = Column(Boolean, default=False, nullable=False)
     is_for_sale = Column(Boolean, default=False, nullable=False)
@@ -47,15 +91,33 @@ class Game(Base):
     price = Column(Float, nullable=True)  # Preço de venda
     purchase_price = Column(Float, nullable=True)  # Preço de compra (valor pago)
     notes = Column(Text, nullable=True)
-    
-    # Imagem
-    image_url = Column(String, nullable=True)
-    
+
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), onupdate=func.now(), nullable=True)
-    
+
     # Relacionamentos
-    owner = relationship("User", back_populates="games")
-    base_game = relationship("Game", remote_side=[id], backref="expansions")
+    owner = relationship("User", back_populates="collection_items")
+    catalog = relationship("CatalogGame", lazy="joined", innerjoin=True)
+    base_game = relationship("CollectionItem", remote_side=[id], backref="expansions")
+
+    # Compatibilidade com o antigo modelo Game (usado por GameResponse)
+    name = _catalog_field("name")
+    description = _catalog_field("description")
+    year_published = _catalog_field("year_published")
+    game_type = _catalog_field("game_type")
+    ludopedia_id = _catalog_field("ludopedia_id")
+    bgg_id = _catalog_field("bgg_id")
+    min_players = _catalog_field("min_players")
+    max_players = _catalog_field("max_players")
+    min_playtime = _catalog_field("min_playtime")
+    max_playtime = _catalog_field("max_playtime")
+    min_age = _catalog_field("min_age")
+    rating = _catalog_field("rating")
+    weight = _catalog_field("weight")
+    ranking_position = _catalog_field("ranking_position")
+    image_url = _catalog_field("image_url")
 
+    @property
+    def base_game_name(self):
+        return self.base_game.name if self.base_game is not None else None
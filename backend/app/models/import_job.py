@@ -0,0 +1,56 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Enum, JSON
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
+import enum
+from app.database import Base
+
+
+class ImportStatus(str, enum.Enum):
+    """Status de uma importação de coleção"""
+    RUNNING = "RUNNING"
+    FETCHED = "FETCHED"  # Dados obtidos do provedor, gravação pendente
+    FAILED = "FAILED"
+    COMPLETED = "COMPLETED"
+
+
+class ImportJob(Base):
+    """Importação de coleção com checkpoint para retomada"""
+    __tablename__ = "import_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    
+    # Origem da importação
+    provider = Column(String, nullable=False)  # bgg, ludopedia
+    source = Column(String, nullable=True)  # Usuário no provedor (quando aplicável)
+    status = Column(Enum(ImportStatus), default=ImportStatus.RUNNING, nullable=False)
+    
+    # Checkpoint
+    page = Column(Integer, default=1, nullable=False)  # Próxima página a buscar
+    processed_ids = Column(JSON, default=list, nullable=False)  # IDs externos já processados
+    results = Column(JSON, default=list, nullable=False)  # Registros já obtidos do provedor
+    imported_count = Column(Integer, default=0, nullable=False)
+    error = Column(Text, nullable=True)
+    
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now(), nullable=True)
+    
+    # Relacionamentos
+    owner = relationship("User", back_populates="import_jobs")
+
+
+class ImportJobChunk(Base):
+    """
+    Trecho do checkpoint de uma importação: os jogos processados desde o
+    último salvamento. Cada salvamento grava só o trecho novo, então o
+    volume gravado cresce com a coleção, não com o quadrado dela.
+    """
+    __tablename__ = "import_job_chunks"
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(Integer, ForeignKey("import_jobs.id", ondelete="CASCADE"), nullable=False, index=True)
+    processed_ids = Column(JSON, default=list, nullable=False)  # IDs externos processados no trecho
+    results = Column(JSON, default=list, nullable=False)  # Registros obtidos no trecho
+    processed_count = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
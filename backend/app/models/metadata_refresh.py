@@ -0,0 +1,54 @@
+from sqlalchemy import Column, Integer, String, DateTime, Enum, Index, JSON, text
+from sqlalchemy.sql import func
+import enum
+from app.database import Base
+
+
+class RefreshStatus(str, enum.Enum):
+    """Status de uma rodada de atualização de metadados"""
+    RUNNING = "RUNNING"
+    COMPLETED = "COMPLETED"
+
+
+# Só uma rodada em andamento por vez
+_RUNNING = text("status = 'RUNNING'")
+
+
+class MetadataRefreshRun(Base):
+    """
+    Rodada de atualização dos metadados defasados do catálogo.
+
+    A fila (IDs em ordem de prioridade) é gravada na criação e `position`
+    avança a cada lote gravado, então a rodada é retomada de onde parou
+    depois de um reinício ou do fim da janela de execução. O lease garante
+    um único worker executando, o que mantém o orçamento de chamadas global.
+    """
+    __tablename__ = "metadata_refresh_runs"
+    __table_args__ = (
+        Index(
+            "uq_metadata_refresh_runs_running", "status", unique=True,
+            postgresql_where=_RUNNING, sqlite_where=_RUNNING,
+        ),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    status = Column(Enum(RefreshStatus), default=RefreshStatus.RUNNING, nullable=False)
+
+    # Fila: [[catalog_id, bgg_id, ludopedia_id], ...] em ordem de prioridade
+    queue = Column(JSON, default=list, nullable=False)
+    position = Column(Integer, default=0, nullable=False)  # Próximo item da fila
+
+    # Resultado
+    refreshed_count = Column(Integer, default=0, nullable=False)  # Títulos atualizados
+    missing_count = Column(Integer, default=0, nullable=False)  # Removidos do provedor
+    failed_count = Column(Integer, default=0, nullable=False)  # Falhas (ficam para a próxima rodada)
+    provider_calls = Column(Integer, default=0, nullable=False)  # Requisições HTTP aos provedores
+
+    # Lease do worker que executa a rodada
+    lease_owner = Column(String, nullable=True)
+    lease_until = Column(DateTime(timezone=True), nullable=True)
+
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now(), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
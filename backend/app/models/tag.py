@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Integer, String, Enum, UniqueConstraint
+import enum
+from app.database import Base
+
+
+class TagKind(str, enum.Enum):
+    """Tipo de tag (links do BGG)"""
+    CATEGORY = "CATEGORY"
+    MECHANIC = "MECHANIC"
+    DESIGNER = "DESIGNER"
+    PUBLISHER = "PUBLISHER"
+
+
+class Tag(Base):
+    """Categoria, mecânica, designer ou editora, única por tipo e ID no BGG"""
+    __tablename__ = "tags"
+    __table_args__ = (
+        UniqueConstraint("kind", "bgg_id", name="uq_tags_kind_bgg_id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(Enum(TagKind), nullable=False)
+    bgg_id = Column(Integer, nullable=False)
+    name = Column(String, nullable=False)
+    slug = Column(String, nullable=False, index=True)  # Usado nas consultas (ex.: deck-bag-and-pool-building)
@@ -42,6 +42,7 @@ class User(Base):
     last_login = Column(DateTime(timezone=True), nullable=True)
     
     # Relacionamentos
-    games = relationship("Game", back_populates="owner", cascade="all, delete-orphan")
+    collection_items = relationship("CollectionItem", back_populates="owner", cascade="all, delete-orphan")
+    import_jobs = relationship("ImportJob", back_populates="owner", cascade="all, delete-orphan")
     # sale_lists = relationship("SaleList", back_populates="seller")
 
@@ -5,6 +5,7 @@ from app.schemas.auth import (
     UserResponse,
     Token,
     TokenData,
+    RefreshTokenRequest,
     LoginRequest,
 )
 from app.schemas.game import (
@@ -13,7 +14,18 @@ from app.schemas.game import (
     GameUpdate,
     GameResponse,
     UserCollectionResponse,
+    UploadRowError,
+    UploadImportResponse,
+    SimilarGameResponse,
 )
+from app.schemas.import_job import ImportJobResponse
+from app.schemas.analytics import (
+    HistogramBucket,
+    YearSpend,
+    CollectionValue,
+    CollectionAnalyticsResponse,
+)
+from app.schemas.tag import TagFacet, TagQueryResponse
 
 __all__ = [
     "UserBase",
@@ -22,11 +34,22 @@ __all__ = [
     "UserResponse",
     "Token",
     "TokenData",
+    "RefreshTokenRequest",
     "LoginRequest",
     "GameBase",
     "GameCreate",
     "GameUpdate",
     "GameResponse",
     "UserCollectionResponse",
+    "UploadRowError",
+    "UploadImportResponse",
+    "SimilarGameResponse",
+    "ImportJobResponse",
+    "HistogramBucket",
+    "YearSpend",
+    "CollectionValue",
+    "CollectionAnalyticsResponse",
+    "TagFacet",
+    "TagQueryResponse",
 ]
 
@@ -0,0 +1,35 @@
+from pydantic import BaseModel, Field
+
+
+class HistogramBucket(BaseModel):
+    """Faixa de um histograma"""
+    label: str
+    count: int
+
+
+class YearSpend(BaseModel):
+    """Valor pago pelos jogos adicionados à coleção em um ano"""
+    year: int = Field(..., description="Ano em que o jogo foi adicionado à coleção")
+    total: float
+    count: int
+
+
+class CollectionValue(BaseModel):
+    """Valor pago e valor pedido pelos jogos à venda"""
+    paid_total: float = Field(..., description="Soma dos preços de compra informados")
+    for_sale_count: int
+    for_sale_asking_total: float = Field(..., description="Soma dos preços pedidos nos jogos à venda")
+    for_sale_paid_total: float = Field(..., description="Quanto foi pago pelos jogos à venda")
+    for_sale_without_paid: int = Field(..., description="Jogos à venda sem preço de compra informado")
+    for_sale_margin: float = Field(..., description="Valor pedido menos valor pago, nos jogos à venda")
+
+
+class CollectionAnalyticsResponse(BaseModel):
+    """Schema de resposta das distribuições da coleção"""
+    total_games: int
+    players: list[HistogramBucket] = Field(..., description="Jogos que comportam cada número de jogadores")
+    playtime: list[HistogramBucket] = Field(..., description="Jogos por faixa de duração (minutos)")
+    weight: list[HistogramBucket] = Field(..., description="Jogos por faixa de peso (complexidade)")
+    decades: list[HistogramBucket] = Field(..., description="Jogos por década de publicação")
+    spend_by_year_added: list[YearSpend]
+    value: CollectionValue
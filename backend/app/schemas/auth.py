@@ -43,6 +43,13 @@ class Token(BaseModel):
     """Schema de token de acesso"""
     access_token: str
     token_type: str = "bearer"
+    expires_in: Optional[int] = None  # Validade do token de acesso (segundos)
+    refresh_token: Optional[str] = None
+
+
+class RefreshTokenRequest(BaseModel):
+    """Schema de renovação do token de acesso"""
+    refresh_token: str
 
 
 class TokenData(BaseModel):
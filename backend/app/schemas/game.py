@@ -90,3 +90,34 @@ class UserCollectionResponse(BaseModel):
     class Config:
         from_attributes = True
 
+
+class UploadRowError(BaseModel):
+    """Erro de uma linha da planilha importada"""
+    row: int = Field(..., description="Linha no arquivo (o cabeçalho é a linha 1)")
+    field: Optional[str] = Field(None, description="Campo com erro")
+    message: str
+
+
+class UploadImportResponse(BaseModel):
+    """Schema de resposta da importação de planilha"""
+    total_rows: int
+    imported_count: int
+    matched_count: int = Field(..., description="Linhas associadas a um jogo do BGG/Ludopedia pelo nome")
+    skipped_existing: int
+    skipped_duplicate: int
+    error_count: int
+    errors: list[UploadRowError]
+    errors_truncated: bool = Field(False, description="Indica que há mais erros do que os listados")
+
+
+class SimilarGameResponse(BaseModel):
+    """Jogo parecido com outro, do catálogo ou da própria coleção"""
+    catalog_id: int
+    item_id: Optional[int] = Field(None, description="ID do item na coleção (quando a busca é na coleção)")
+    name: str
+    year_published: Optional[int] = None
+    bgg_id: Optional[int] = None
+    ludopedia_id: Optional[int] = None
+    image_url: Optional[str] = None
+    price: Optional[float] = Field(None, description="Preço de venda (quando a busca é na coleção)")
+    similarity: float = Field(..., description="Similaridade de cosseno (0 a 1)")
@@ -0,0 +1,33 @@
+from pydantic import BaseModel
+from typing import Optional
+from datetime import datetime
+from app.models.import_job import ImportStatus
+
+
+class ImportJobResponse(BaseModel):
+    """Schema de resposta para o estado de uma importação"""
+    id: int
+    provider: str
+    source: Optional[str] = None
+    status: ImportStatus
+    page: int
+    processed_count: int
+    imported_count: int
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+    @classmethod
+    def from_job(cls, job, processed_count: Optional[int] = None) -> "ImportJobResponse":
+        return cls(
+            id=job.id,
+            provider=job.provider,
+            source=job.source,
+            status=job.status,
+            page=job.page,
+            processed_count=len(job.processed_ids or []) if processed_count is None else processed_count,
+            imported_count=job.imported_count,
+            error=job.error,
+            created_at=job.created_at,
+            updated_at=job.updated_at,
+        )
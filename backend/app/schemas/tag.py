@@ -0,0 +1,20 @@
+from pydantic import BaseModel, Field
+
+from app.models.tag import TagKind
+
+
+class TagFacet(BaseModel):
+    """Tag com a quantidade de jogos que a têm sob o filtro atual"""
+    id: int
+    kind: TagKind
+    name: str
+    slug: str = Field(..., description="Identificador usado nas consultas")
+    count: int
+
+
+class TagQueryResponse(BaseModel):
+    """Schema de resposta do filtro por tags"""
+    total_games: int = Field(..., description="Jogos na coleção")
+    matching: int = Field(..., description="Jogos que satisfazem a consulta")
+    item_ids: list[int] = Field(..., description="IDs dos itens da coleção que satisfazem a consulta")
+    facets: list[TagFacet] = Field(..., description="Contagem de cada tag entre os jogos filtrados")
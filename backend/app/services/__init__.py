@@ -1,5 +1,18 @@
 from .ludopedia_service import ludopedia_service
 from .bgg_service import bgg_service
+from .catalog_service import catalog_service
+from .entity_resolution import entity_resolver
+from .import_pipeline import import_pipeline
+from .import_checkpoint import import_checkpoints
+from .collection_export import collection_export
+from .spreadsheet_import import spreadsheet_import
+from .collection_analytics import collection_analytics
+from .game_tags import game_tags
+from .expansion_linking import expansion_linker
+from .metadata_refresh import metadata_refresh
+from .similar_games import similar_games
+from .google_oauth import google_oauth
+from .auth_tokens import auth_tokens
+from .rate_limit import rate_limit
 
-__all__ = ["ludopedia_service", "bgg_service"]
-
+__all__ = ["ludopedia_service", "bgg_service", "catalog_service", "entity_resolver", "import_pipeline", "import_checkpoints", "collection_export", "spreadsheet_import", "collection_analytics", "game_tags", "expansion_linker", "metadata_refresh", "similar_games", "google_oauth", "auth_tokens", "rate_limit"]
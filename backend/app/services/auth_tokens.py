@@ -0,0 +1,342 @@
+import asyncio
+import hashlib
+import logging
+import math
+import secrets
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.core.metrics import record_cache
+from app.database import SessionLocal
+from app.models import RefreshToken, TokenRevocation, User
+from app.services.catalog_service import insert_ignoring_conflicts
+
+logger = logging.getLogger(__name__)
+
+_REVOCATIONS_TABLE = TokenRevocation.__table__
+_REFRESH_TABLE = RefreshToken.__table__
+
+# Sobreposição da leitura incremental (revogações gravadas fora de ordem)
+_SYNC_OVERLAP = timedelta(seconds=5)
+
+
+class RefreshTokenError(Exception):
+    """Token de renovação inválido, vencido, revogado ou reutilizado"""
+
+
+class _BloomFilter:
+    """
+    Conjunto aproximado de (user_id, versão) revogados.
+
+    Sem falsos negativos; os falsos positivos (taxa configurada) são
+    confirmados no banco pelo chamador. Cada consulta custa um hash BLAKE2b.
+    """
+
+    def __init__(self, capacity: int, false_positive_rate: float):
+        self.capacity = max(capacity, 1)
+        self.size = max(int(-self.capacity * math.log(false_positive_rate) / math.log(2) ** 2), 8)
+        self.hashes = max(int(round(self.size / self.capacity * math.log(2))), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, user_id: int, version: int):
+        digest = hashlib.blake2b(f"{user_id}:{version}".encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, user_id: int, version: int) -> None:
+        for position in self._positions(user_id, version):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: Tuple[int, int]) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(*key))
+
+
+class AuthTokenService:
+    """
+    Tokens de acesso autocontidos, tokens de renovação e revogação.
+
+    O token de acesso leva o que a autenticação precisa (id, e-mail, plano,
+    ativo e versão do token), então as rotas autenticadas não consultam o
+    banco. Para cortar um acesso antes do vencimento (logout, desativação),
+    a versão atual do usuário é revogada em token_revocations; cada worker
+    mantém as revogações recentes num filtro de Bloom em memória,
+    sincronizado com o banco a cada REVOCATION_SYNC_SECONDS, de modo que a
+    revogação vale em todos os workers em segundos. Só um acerto no filtro
+    (revogação real ou falso positivo) consulta o banco.
+    """
+
+    def __init__(self):
+        self._filter: Optional[_BloomFilter] = None
+        self._watermark: Optional[datetime] = None
+        self._built_at = 0.0
+        self._synced_at = 0.0
+        self._lock = threading.Lock()
+        self._background_sync = threading.Lock()  # Preso enquanto uma sincronização avulsa roda
+        self._task: Optional[asyncio.Task] = None
+
+    # ----- Versões e revogação -----
+
+    @staticmethod
+    def current_version(db: Session, user_id: int) -> int:
+        """Versão dos tokens emitidos agora (maior versão revogada + 1)"""
+        revoked = db.execute(
+            select(func.max(TokenRevocation.token_version)).where(TokenRevocation.user_id == user_id)
+        ).scalar()
+        return 0 if revoked is None else revoked + 1
+
+    def revoke_user(self, db: Session, user_id: int, reason: str) -> int:
+        """
+        Revoga todos os tokens atuais do usuário (acesso e renovação)
+
+        Returns:
+            Versão revogada
+        """
+        version = self.current_version(db, user_id)
+        # Revogações simultâneas da mesma versão gravam uma linha só
+        insert_ignoring_conflicts(
+            db, _REVOCATIONS_TABLE,
+            [{"user_id": user_id, "token_version": version, "reason": reason}],
+            ["user_id", "token_version"],
+        )
+        db.execute(
+            update(_REFRESH_TABLE)
+            .where(_REFRESH_TABLE.c.user_id == user_id, _REFRESH_TABLE.c.revoked_at.is_(None))
+            .values(revoked_at=datetime.now(timezone.utc))
+        )
+        db.commit()
+
+        # Vale neste worker na hora; nos demais na próxima sincronização
+        with self._lock:
+            if self._filter is not None:
+                self._filter.add(user_id, version)
+        logger.info("Tokens revogados", extra={"user_id": user_id, "token_version": version, "reason": reason})
+        return version
+
+    def set_active(self, db: Session, user: User, active: bool) -> None:
+        """Ativa ou desativa o usuário; desativar revoga os tokens emitidos"""
+        user.is_active = active
+        db.commit()
+        if not active:
+            self.revoke_user(db, user.id, "deactivated")
+
+    # ----- Filtro de revogações -----
+
+    def _load(self, db: Session, since: datetime):
+        return db.execute(
+            select(TokenRevocation.user_id, TokenRevocation.token_version, TokenRevocation.revoked_at)
+            .where(TokenRevocation.revoked_at >= since)
+        ).all()
+
+    def sync(self) -> None:
+        """
+        Atualiza o filtro com as revogações gravadas desde a última leitura
+
+        O filtro é refeito do zero a cada REVOCATION_REBUILD_SECONDS (descarta
+        revogações mais antigas que a validade dos tokens de acesso) ou
+        quando passa da capacidade.
+        """
+        with self._lock:
+            db = SessionLocal()
+            try:
+                now = time.monotonic()
+                rebuild = (
+                    self._filter is None
+                    or self._filter.count > self._filter.capacity
+                    or now - self._built_at >= settings.REVOCATION_REBUILD_SECONDS
+                )
+                if rebuild:
+                    # Margem para tokens emitidos logo antes da revogação
+                    retention = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES + 5)
+                    rows = self._load(db, datetime.now(timezone.utc) - retention)
+                    capacity = settings.REVOCATION_BLOOM_CAPACITY
+                    while capacity < len(rows):
+                        capacity *= 2
+                    bloom = _BloomFilter(capacity, settings.REVOCATION_BLOOM_FALSE_POSITIVE_RATE)
+                    self._built_at = now
+                else:
+                    rows = self._load(db, self._watermark - _SYNC_OVERLAP)
+                    bloom = self._filter
+
+                for row in rows:
+                    bloom.add(row.user_id, row.token_version)
+                    revoked_at = row.revoked_at if row.revoked_at.tzinfo else row.revoked_at.replace(tzinfo=timezone.utc)
+                    if self._watermark is None or revoked_at > self._watermark:
+                        self._watermark = revoked_at
+                if self._watermark is None:
+                    self._watermark = datetime.now(timezone.utc)
+                self._filter = bloom
+                self._synced_at = now
+            finally:
+                db.close()
+
+    def _sync_in_background(self) -> None:
+        """Dispara sync() numa thread, se nenhuma sincronização avulsa estiver em andamento"""
+        if not self._background_sync.acquire(blocking=False):
+            return
+
+        def run() -> None:
+            try:
+                self.sync()
+            except Exception:
+                logger.exception("Falha ao sincronizar as revogações de token")
+            finally:
+                self._background_sync.release()
+
+        threading.Thread(target=run, name="token-revocations-sync", daemon=True).start()
+
+    def _fresh_filter(self) -> Optional[_BloomFilter]:
+        """
+        Filtro atual, sem nunca sincronizar na requisição
+
+        Se o laço de fundo não estiver rodando (filtro ausente ou defasado),
+        a sincronização é disparada numa thread e o filtro atual é usado
+        enquanto isso; None enquanto o primeiro ainda não foi montado.
+        """
+        stale = time.monotonic() - self._synced_at > settings.REVOCATION_SYNC_SECONDS * 3
+        if self._filter is None or stale:
+            self._sync_in_background()
+        return self._filter
+
+    def is_revoked(self, db: Session, user_id: int, version: int) -> bool:
+        """Verifica se a versão de token do usuário foi revogada"""
+        bloom = self._fresh_filter()
+        if bloom is not None and (user_id, version) not in bloom:
+            record_cache("token_revocations", True)
+            return False
+        # Acerto no filtro (revogação real ou falso positivo) ou filtro ainda sendo montado
+        record_cache("token_revocations", False)
+        return db.execute(
+            select(TokenRevocation.id).where(
+                TokenRevocation.user_id == user_id, TokenRevocation.token_version == version,
+            )
+        ).first() is not None
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self.sync)
+            except Exception:
+                logger.exception("Falha ao sincronizar as revogações de token")
+            await asyncio.sleep(settings.REVOCATION_SYNC_SECONDS)
+
+    def start(self) -> None:
+        """Inicia a sincronização periódica no event loop atual"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    # ----- Emissão -----
+
+    @staticmethod
+    def access_claims(user: User, version: int) -> Dict[str, Any]:
+        """Claims do token de acesso (o suficiente para autenticar sem o banco)"""
+        return {
+            "sub": user.username,
+            "uid": user.id,
+            "email": user.email,
+            "role": user.role.value,
+            "act": user.is_active,
+            "ver": version,
+        }
+
+    @staticmethod
+    def _hash(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def _new_refresh_token(self, db: Session, user_id: int, version: int) -> Tuple[str, int]:
+        token = secrets.token_urlsafe(32)
+        row = RefreshToken(
+            user_id=user_id,
+            token_hash=self._hash(token),
+            token_version=version,
+            expires_at=datetime.now(timezone.utc) + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+        )
+        db.add(row)
+        db.flush()
+        return token, row.id
+
+    def issue(self, db: Session, user: User, with_refresh: bool = True) -> Dict[str, Any]:
+        """
+        Emite o token de acesso (e, opcionalmente, o de renovação)
+
+        Returns:
+            Corpo da resposta de login (schemas.Token)
+        """
+        from app.utils.auth import create_access_token
+
+        version = self.current_version(db, user.id)
+        expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+        tokens = {
+            "access_token": create_access_token(self.access_claims(user, version), expires_delta=expires),
+            "token_type": "bearer",
+            "expires_in": int(expires.total_seconds()),
+        }
+        if with_refresh:
+            tokens["refresh_token"], _ = self._new_refresh_token(db, user.id, version)
+            db.commit()
+        return tokens
+
+    def refresh(self, db: Session, token: str) -> Dict[str, Any]:
+        """
+        Troca um token de renovação por um novo par (rotação)
+
+        Raises:
+            RefreshTokenError: token desconhecido, vencido, revogado, de versão
+                antiga ou de usuário inativo. Reapresentar um token já trocado
+                revoga todas as sessões do usuário.
+        """
+        row = db.execute(select(RefreshToken).where(RefreshToken.token_hash == self._hash(token))).scalar_one_or_none()
+        if row is None:
+            raise RefreshTokenError("Unknown refresh token")
+        if row.revoked_at is not None:
+            if row.replaced_by_id is not None:
+                logger.warning("Token de renovação reutilizado", extra={"user_id": row.user_id})
+                self.revoke_user(db, row.user_id, "refresh_reuse")
+            raise RefreshTokenError("Refresh token revoked")
+
+        expires_at = row.expires_at if row.expires_at.tzinfo else row.expires_at.replace(tzinfo=timezone.utc)
+        if expires_at <= datetime.now(timezone.utc):
+            raise RefreshTokenError("Refresh token expired")
+
+        user = db.get(User, row.user_id)
+        version = self.current_version(db, row.user_id)
+        if user is None or not user.is_active or row.token_version != version:
+            raise RefreshTokenError("Refresh token revoked")
+
+        new_token, new_id = self._new_refresh_token(db, user.id, version)
+        # Só uma requisição consegue trocar o mesmo token
+        rotated = db.execute(
+            update(_REFRESH_TABLE)
+            .where(_REFRESH_TABLE.c.id == row.id, _REFRESH_TABLE.c.revoked_at.is_(None))
+            .values(revoked_at=datetime.now(timezone.utc), replaced_by_id=new_id)
+        ).rowcount
+        if rotated != 1:
+            db.rollback()
+            raise RefreshTokenError("Refresh token revoked")
+        db.commit()
+
+        tokens = self.issue(db, user, with_refresh=False)
+        tokens["refresh_token"] = new_token
+        return tokens
+
+
+# Instância global do serviço
+auth_tokens = AuthTokenService()
@@ -1,15 +1,33 @@
+import asyncio
+import logging
+
 import httpx
 from typing import Optional, Dict, Any, List
 from app.config import settings
+from app.core.metrics import InstrumentedTransport
+
+logger = logging.getLogger(__name__)
+
+# Tipos de link do /thing guardados como tags (valores de TagKind)
+TAG_LINK_TYPES = {
+    "boardgamecategory": "CATEGORY",
+    "boardgamemechanic": "MECHANIC",
+    "boardgamedesigner": "DESIGNER",
+    "boardgamepublisher": "PUBLISHER",
+}
 
 
 class BGGService:
     """Serviço para interagir com a API do BoardGameGeek"""
     
-    BASE_URL = "https://www.boardgamegeek.com/xmlapi2"
+    BASE_URL = settings.BGG_BASE_URL
     
     def __init__(self):
-        self.client = httpx.AsyncClient(timeout=30.0, follow_redirects=True)
+        self.client = httpx.AsyncClient(
+            timeout=30.0,
+            follow_redirects=True,
+            transport=InstrumentedTransport("bgg"),
+        )
     
     async def search_games(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
         """
@@ -52,7 +70,7 @@ class BGGService:
             return games
             
         except Exception as e:
-            print(f"Erro ao buscar jogos no BGG: {e}")
+            logger.warning("Erro ao buscar jogos no BGG: %s", e)
             return []
     
     async def get_game_details(self, bgg_id: int) -> Optional[Dict[str, Any]]:
@@ -83,6 +101,8 @@ class BGGService:
             if item is None:
                 return None
             
+            game_type = "EXPANSION" if item.get("type") == "boardgameexpansion" else "BASE"
+            
             # Extrair informações básicas
             name = item.find("name[@type='primary']")
             name_value = name.get("value") if name is not None else "Unknown"
@@ -103,8 +123,8 @@ class BGGService:
             max_playtime = None
             min_age = None
             
-            for link in item.findall("link[@type='boardgamecategory']"):
-                pass  # Podemos usar isso para categorias
+            # Categorias, mecânicas, designers e editoras
+            tags = self._tags(item)
             
             for poll in item.findall("poll[@name='suggested_numplayers']"):
                 for results in poll.findall("results"):
@@ -139,17 +159,8 @@ class BGGService:
             if maxplaytime is not None:
                 max_playtime = int(maxplaytime.get("value", 0))
             
-            # Extrair rating
-            rating = None
-            statistics = item.find("statistics/ratings/average")
-            if statistics is not None:
-                rating = round(float(statistics.get("value", 0)), 2)
-            
-            # Extrair peso (complexidade)
-            weight = None
-            statistics = item.find("statistics/ratings/averageweight")
-            if statistics is not None:
-                weight = round(float(statistics.get("value", 0)), 2)
+            # Extrair rating, peso (complexidade) e posição no ranking
+            ratings = self._ratings(item)
             
             # Extrair imagem
             image_url = None
@@ -162,40 +173,107 @@ class BGGService:
                 "name": name_value,
                 "description": description_value,
                 "year_published": year_published,
+                "game_type": game_type,
                 "min_players": min_players,
                 "max_players": max_players,
                 "min_playtime": min_playtime,
                 "max_playtime": max_playtime,
                 "min_age": min_age,
-                "rating": rating,
-                "weight": weight,
-                "image_url": image_url
+                **ratings,
+                "image_url": image_url,
+                "categories": [tag["name"] for tag in tags if tag["kind"] == "CATEGORY"],
+                "mechanics": [tag["name"] for tag in tags if tag["kind"] == "MECHANIC"],
+                "designers": [tag["name"] for tag in tags if tag["kind"] == "DESIGNER"],
+                "publishers": [tag["name"] for tag in tags if tag["kind"] == "PUBLISHER"],
             }
             
         except Exception as e:
-            print(f"Erro ao buscar detalhes do jogo {bgg_id} no BGG: {e}")
+            logger.warning("Erro ao buscar detalhes do jogo no BGG: %s", e, extra={"bgg_id": bgg_id})
             return None
     
-    async def get_user_collection(self, bgg_username: str) -> List[Dict[str, Any]]:
+    async def get_expansion_links(self, bgg_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """
+        Busca o tipo, os jogos base e as tags de vários itens do BGG
+        
+        Usa /thing com até BGG_THING_BATCH_SIZE IDs por chamada. Expansões
+        trazem o jogo base em <link type="boardgameexpansion" inbound="true">.
+        Lotes que falham ficam de fora do resultado.
+        
+        Args:
+            bgg_ids: IDs no BoardGameGeek
+            
+        Returns:
+            {bgg_id: {"is_expansion": bool, "base_bgg_ids": [int, ...],
+            "tags": [{"kind", "bgg_id", "name"}, ...]}}
+        """
+        import xml.etree.ElementTree as ET
+        
+        links: Dict[int, Dict[str, Any]] = {}
+        batch_size = settings.BGG_THING_BATCH_SIZE
+        for start in range(0, len(bgg_ids), batch_size):
+            chunk = bgg_ids[start:start + batch_size]
+            try:
+                response = await self._fetch("thing", {"id": ",".join(str(bgg_id) for bgg_id in chunk)})
+                root = ET.fromstring(response.text)
+            except Exception as e:
+                logger.warning("Erro ao buscar vínculos de expansões no BGG: %s", e, extra={"bgg_ids": len(chunk)})
+                continue
+            
+            for item in root.findall("item"):
+                links[int(item.get("id"))] = {
+                    "is_expansion": item.get("type") == "boardgameexpansion",
+                    "base_bgg_ids": [
+                        int(link.get("id"))
+                        for link in item.findall("link[@type='boardgameexpansion'][@inbound='true']")
+                    ],
+                    "tags": self._tags(item),
+                }
+        return links
+    
+    async def get_game_stats(self, bgg_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """
+        Busca rating, peso e posição no ranking de vários itens do BGG
+        
+        Faz uma única chamada /thing?stats=1 com todos os IDs (no máximo
+        BGG_THING_BATCH_SIZE). Ao contrário das outras consultas, erros sobem
+        para quem chama, que precisa distinguir uma falha de um item removido.
+        
+        Args:
+            bgg_ids: IDs no BoardGameGeek
+            
+        Returns:
+            {bgg_id: {"rating", "weight", "ranking_position"}}; itens que o
+            BGG não devolveu ficam de fora
+        """
+        import xml.etree.ElementTree as ET
+        
+        response = await self._fetch("thing", {"id": ",".join(str(bgg_id) for bgg_id in bgg_ids), "stats": 1})
+        root = ET.fromstring(response.text)
+        return {int(item.get("id")): self._ratings(item) for item in root.findall("item")}
+    
+    async def get_user_collection(self, bgg_username: str, checkpoint=None) -> List[Dict[str, Any]]:
         """
         Importa a coleção de um usuário do BoardGameGeek
         
         Args:
             bgg_username: Nome de usuário no BoardGameGeek
+            checkpoint: ImportCheckpoint opcional; se a coleção já foi obtida
+                em uma tentativa anterior, ela é reutilizada sem nova chamada
             
         Returns:
             Lista de jogos da coleção do usuário
         """
+        if checkpoint is not None and checkpoint.fetched:
+            return checkpoint.results
+        
         try:
-            url = f"{self.BASE_URL}/collection"
             params = {
                 "username": bgg_username,
                 "own": 1,  # Apenas jogos que o usuário possui
                 "stats": 1
             }
             
-            response = await self.client.get(url, params=params)
-            response.raise_for_status()
+            response = await self._fetch("collection", params)
             
             # Parse XML response
             import xml.etree.ElementTree as ET
@@ -221,25 +299,11 @@ class BGGService:
                 year_published = None
                 
                 if stats is not None:
-                    minplayers = stats.find("minplayers")
-                    if minplayers is not None:
-                        min_players = int(minplayers.get("value", 0))
-                    
-                    maxplayers = stats.find("maxplayers")
-                    if maxplayers is not None:
-                        max_players = int(maxplayers.get("value", 0))
-                    
-                    minplaytime = stats.find("minplaytime")
-                    if minplaytime is not None:
-                        min_playtime = int(minplaytime.get("value", 0))
-                    
-                    maxplaytime = stats.find("maxplaytime")
-                    if maxplaytime is not None:
-                        max_playtime = int(maxplaytime.get("value", 0))
-                    
-                    minage = stats.find("minage")
-                    if minage is not None:
-                        min_age = int(minage.get("value", 0))
+                    min_players = self._stat(stats, "minplayers")
+                    max_players = self._stat(stats, "maxplayers")
+                    min_playtime = self._stat(stats, "minplaytime")
+                    max_playtime = self._stat(stats, "maxplaytime")
+                    min_age = self._stat(stats, "minage")
                     
                     rating_elem = stats.find("rating/average")
                     if rating_elem is not None:
@@ -249,10 +313,10 @@ class BGGService:
                     if weight_elem is not None:
                         weight = round(float(weight_elem.get("value", 0)), 2)
                 
-                # Extrair ano de publicação
+                # Extrair ano de publicação (texto do elemento na API de coleção)
                 yearpublished = item.find("yearpublished")
                 if yearpublished is not None:
-                    year_published = int(yearpublished.get("value", 0))
+                    year_published = int(yearpublished.get("value") or yearpublished.text or 0)
                 
                 games.append({
                     "bgg_id": int(game_id),
@@ -267,12 +331,85 @@ class BGGService:
                     "weight": weight
                 })
             
+            if checkpoint is not None:
+                await checkpoint.add_many(games, "bgg_id")
+                await checkpoint.mark_fetched()
+            
             return games
             
         except Exception as e:
-            print(f"Erro ao importar coleção do usuário {bgg_username} do BGG: {e}")
+            logger.exception("Erro ao importar coleção do BGG", extra={"bgg_username": bgg_username})
+            if checkpoint is not None:
+                await checkpoint.fail(str(e))
             return []
     
+    async def _fetch(self, path: str, params: Dict[str, Any]) -> httpx.Response:
+        """
+        Faz uma consulta à API XML, aguardando enquanto o BGG a prepara
+        
+        Na primeira consulta de uma coleção o BGG responde 202 e a processa em
+        segundo plano; 429 indica excesso de requisições. Nos dois casos a
+        consulta é repetida após Retry-After (ou um intervalo crescente).
+        """
+        url = f"{self.BASE_URL}/{path}"
+        for attempt in range(settings.BGG_COLLECTION_RETRIES + 1):
+            response = await self.client.get(url, params=params)
+            if response.status_code not in (202, 429):
+                response.raise_for_status()
+                return response
+            
+            if attempt < settings.BGG_COLLECTION_RETRIES:
+                try:
+                    delay = float(response.headers["Retry-After"])
+                except (KeyError, ValueError):
+                    delay = settings.BGG_COLLECTION_RETRY_SECONDS * (attempt + 1)
+                logger.info(
+                    "Resposta do BGG ainda não disponível em /%s (%d); nova tentativa em %.1fs",
+                    path, response.status_code, delay, extra={"bgg_username": params.get("username")},
+                )
+                await asyncio.sleep(delay)
+        
+        raise RuntimeError(f"BGG /{path} indisponível após {settings.BGG_COLLECTION_RETRIES} tentativas")
+    
+    @staticmethod
+    def _ratings(item) -> Dict[str, Any]:
+        """Lê rating, peso e posição no ranking geral de um <item> do /thing"""
+        rating = None
+        statistics = item.find("statistics/ratings/average")
+        if statistics is not None:
+            rating = round(float(statistics.get("value", 0)), 2)
+        
+        weight = None
+        statistics = item.find("statistics/ratings/averageweight")
+        if statistics is not None:
+            weight = round(float(statistics.get("value", 0)), 2)
+        
+        # "Not Ranked" para itens sem posição
+        ranking_position = None
+        rank = item.find("statistics/ratings/ranks/rank[@name='boardgame']")
+        if rank is not None and rank.get("value", "").isdigit():
+            ranking_position = int(rank.get("value"))
+        
+        return {"rating": rating, "weight": weight, "ranking_position": ranking_position}
+    
+    @staticmethod
+    def _tags(item) -> List[Dict[str, Any]]:
+        """Lê as categorias, mecânicas, designers e editoras de um <item> do /thing"""
+        return [
+            {"kind": TAG_LINK_TYPES[link.get("type")], "bgg_id": int(link.get("id")), "name": link.get("value")}
+            for link in item.findall("link")
+            if link.get("type") in TAG_LINK_TYPES
+        ]
+    
+    @staticmethod
+    def _stat(stats, name: str) -> Optional[int]:
+        """Lê uma estatística da coleção (atributo de <stats> ou elemento com value)"""
+        value = stats.get(name)
+        if value is None:
+            element = stats.find(name)
+            value = element.get("value") if element is not None else None
+        return int(value) if value else None
+    
     def close(self):
         """Fecha a conexão HTTP"""
         self.client.close()
@@ -0,0 +1,289 @@
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from app.models import CatalogGame, CollectionItem, GameType
+
+
+# Campos que pertencem ao título (catálogo) e ao exemplar (item da coleção)
+CATALOG_FIELDS = (
+    "ludopedia_id",
+    "bgg_id",
+    "name",
+    "description",
+    "year_published",
+    "game_type",
+    "min_players",
+    "max_players",
+    "min_playtime",
+    "max_playtime",
+    "min_age",
+    "rating",
+    "weight",
+    "ranking_position",
+    "image_url",
+)
+ITEM_FIELDS = (
+    "base_game_id",
+    "order",
+    "is_for_trade",
+    "is_for_sale",
+    "condition",
+    "price",
+    "purchase_price",
+    "notes",
+)
+PROVIDER_ID_FIELDS = ("ludopedia_id", "bgg_id")
+METADATA_FIELDS = tuple(f for f in CATALOG_FIELDS if f not in PROVIDER_ID_FIELDS)
+
+_CATALOG_TABLE = CatalogGame.__table__
+_ITEM_TABLE = CollectionItem.__table__
+
+
+def insert_ignoring_conflicts(
+    db: Session,
+    table,
+    rows: List[Dict[str, Any]],
+    index_elements: Optional[Sequence[str]],
+    index_where=None,
+) -> List[Dict[str, Any]]:
+    """
+    Insere linhas ignorando as que violam a restrição única informada
+
+    Com index_elements=None, ignora conflitos em qualquer restrição única.
+
+    Returns:
+        Linhas efetivamente inseridas
+    """
+    if not rows:
+        return []
+
+    stmt = _dialect_insert(db)(table).on_conflict_do_nothing(
+        index_elements=list(index_elements) if index_elements is not None else None,
+        index_where=index_where,
+    ).returning(*table.columns)
+    return [dict(row) for row in db.execute(stmt, rows).mappings()]
+
+
+def upsert(db: Session, table, rows: List[Dict[str, Any]], index_elements: Sequence[str]) -> None:
+    """
+    Insere linhas ou, em conflito na restrição única informada, atualiza as
+    demais colunas com os valores novos (sem janela entre apagar e inserir)
+    """
+    if not rows:
+        return
+
+    stmt = _dialect_insert(db)(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(index_elements),
+        set_={column: stmt.excluded[column] for column in rows[0] if column not in index_elements},
+    )
+    db.execute(stmt, rows)
+
+
+def _dialect_insert(db: Session):
+    """insert() do dialeto da sessão, com suporte a ON CONFLICT"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        raise NotImplementedError(f"Dialeto não suportado: {dialect}")
+    return dialect_insert
+
+
+class CatalogService:
+    """Serviço para o catálogo compartilhado de jogos"""
+
+    def split(self, data: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Separa os dados de um jogo em campos de catálogo e de item da coleção"""
+        catalog_data = {k: v for k, v in data.items() if k in CATALOG_FIELDS}
+        item_data = {k: v for k, v in data.items() if k in ITEM_FIELDS}
+        return catalog_data, item_data
+
+    def catalog_row(self, record: Dict[str, Any], owner_id: Optional[int] = None) -> Dict[str, Any]:
+        """Monta uma linha do catálogo a partir de um registro de provedor"""
+        row = {field: record.get(field) for field in CATALOG_FIELDS}
+        row["game_type"] = record.get("game_type") or GameType.BASE.value
+        row["owner_id"] = owner_id
+        return row
+
+    def find_shared(
+        self,
+        db: Session,
+        ludopedia_id: Optional[int] = None,
+        bgg_id: Optional[int] = None,
+    ) -> Optional[CatalogGame]:
+        """Busca o título compartilhado pelo ID da Ludopedia ou do BGG"""
+        for field, value in (("ludopedia_id", ludopedia_id), ("bgg_id", bgg_id)):
+            if value is None:
+                continue
+            catalog = db.query(CatalogGame).filter(
+                CatalogGame.owner_id.is_(None),
+                getattr(CatalogGame, field) == value
+            ).first()
+            if catalog is not None:
+                return catalog
+        return None
+
+    def get_or_create(self, db: Session, data: Dict[str, Any], user_id: int) -> CatalogGame:
+        """
+        Retorna o título do catálogo para os dados de um jogo
+
+        Jogos com ID de provedor reutilizam o título compartilhado, se ele
+        existir. Os dados vêm do usuário, então nunca criam um título
+        compartilhado: sem título compartilhado, o usuário ganha um privado.
+        """
+        catalog = None
+        if data.get("ludopedia_id") is not None or data.get("bgg_id") is not None:
+            catalog = self.find_shared(db, data.get("ludopedia_id"), data.get("bgg_id"))
+        if catalog is None:
+            catalog = CatalogGame(**self.catalog_row(data, owner_id=user_id))
+
+        if catalog.id is None:
+            db.add(catalog)
+            db.flush()
+        return catalog
+
+    def resolve_many(
+        self,
+        db: Session,
+        records: Iterable[Dict[str, Any]],
+        id_field: str,
+        owner_id: Optional[int] = None,
+    ) -> Dict[int, Dict[str, Any]]:
+        """
+        Resolve em lote os títulos compartilhados de vários registros
+
+        Busca os títulos existentes em uma consulta e insere os que faltam,
+        tolerando inserções concorrentes do mesmo título. Registros com os
+        dois IDs reutilizam o título encontrado por qualquer um deles.
+
+        Args:
+            db: Sessão do banco de dados
+            records: Registros com o ID do provedor preenchido
+            id_field: Campo do ID do provedor ("ludopedia_id" ou "bgg_id")
+            owner_id: Para registros digitados pelo usuário (não vindos do
+                provedor): os títulos que faltam viram títulos privados dele
+
+        Returns:
+            Linhas do catálogo indexadas pelo ID do provedor
+        """
+        by_id = {record[id_field]: record for record in records}
+        if not by_id:
+            return {}
+
+        found = self._select_shared(db, id_field, list(by_id))
+        self._select_by_other_id(db, by_id, id_field, found)
+        if owner_id is not None:
+            missing_records = [record for external_id, record in by_id.items() if external_id not in found]
+            for row in self.create_private_many(db, missing_records, owner_id):
+                found[row[id_field]] = row
+            return found
+
+        missing = [self.catalog_row(record) for external_id, record in by_id.items() if external_id not in found]
+        if missing:
+            # Sem alvo: registros com os dois IDs podem conflitar em qualquer um dos índices únicos
+            inserted = insert_ignoring_conflicts(db, _CATALOG_TABLE, missing, index_elements=None)
+            for row in inserted:
+                found[row[id_field]] = row
+
+            # Títulos inseridos por outra importação ao mesmo tempo
+            raced = [external_id for external_id in by_id if external_id not in found]
+            if raced:
+                found.update(self._select_shared(db, id_field, raced))
+                self._select_by_other_id(db, by_id, id_field, found)
+
+        return found
+
+    def create_private_many(self, db: Session, records: List[Dict[str, Any]], user_id: int) -> List[Dict[str, Any]]:
+        """Cria títulos privados (sem ID de provedor) e retorna as linhas na mesma ordem"""
+        if not records:
+            return []
+        rows = [self.catalog_row(record, owner_id=user_id) for record in records]
+        stmt = insert(_CATALOG_TABLE).returning(*_CATALOG_TABLE.columns, sort_by_parameter_order=True)
+        return [dict(row) for row in db.execute(stmt, rows).mappings()]
+
+    def update_for_item(self, db: Session, item: CollectionItem, changes: Dict[str, Any]) -> None:
+        """
+        Aplica alterações de metadados feitas por um usuário no seu item
+
+        Títulos compartilhados nunca são alterados por um usuário: na primeira
+        edição o item passa a apontar para uma cópia privada do título.
+        """
+        catalog = item.catalog
+        changes = {k: v for k, v in changes.items() if getattr(catalog, k) != v}
+        if not changes:
+            return
+
+        if catalog.owner_id is None:
+            catalog = CatalogGame(
+                owner_id=item.user_id,
+                **{field: getattr(item.catalog, field) for field in CATALOG_FIELDS}
+            )
+            db.add(catalog)
+            item.catalog = catalog
+
+        for field, value in changes.items():
+            setattr(catalog, field, value)
+
+    def apply_provider_data(self, catalog: CatalogGame, data: Dict[str, Any]) -> None:
+        """
+        Atualiza os metadados de um título compartilhado com dados do provedor
+
+        Só os campos que o provedor informou são gravados: a coleção da
+        Ludopedia não traz peso, rating nem descrição, e o título é de todos
+        os donos (os valores do BGG ficam).
+        """
+        if catalog.owner_id is not None:
+            return
+
+        for field in METADATA_FIELDS:
+            value = data.get(field)
+            if value is None or (field == "name" and not value):
+                continue
+            setattr(catalog, field, value)
+
+    def release(self, db: Session, item: CollectionItem) -> None:
+        """Remove o título privado de um item que está sendo removido"""
+        if item.catalog is not None and item.catalog.owner_id is not None:
+            db.delete(item.catalog)
+
+    def to_game_dict(
+        self,
+        catalog: Dict[str, Any],
+        item: Dict[str, Any],
+        base_game_name: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Combina linhas de catálogo e item no formato de GameResponse"""
+        game = {field: catalog.get(field) for field in CATALOG_FIELDS}
+        game.update(item)
+        game["base_game_name"] = base_game_name
+        return game
+
+    def _select_by_other_id(
+        self, db: Session, by_id: Dict[int, Dict[str, Any]], id_field: str, found: Dict[int, Dict[str, Any]],
+    ) -> None:
+        """Completa `found` com os títulos que já existem pelo ID do outro provedor"""
+        other_field = "bgg_id" if id_field == "ludopedia_id" else "ludopedia_id"
+        pending = {
+            record[other_field]: external_id
+            for external_id, record in by_id.items()
+            if external_id not in found and record.get(other_field) is not None
+        }
+        if pending:
+            for other_id, row in self._select_shared(db, other_field, list(pending)).items():
+                found[pending[other_id]] = row
+
+    def _select_shared(self, db: Session, id_field: str, external_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        column = _CATALOG_TABLE.c[id_field]
+        rows = db.execute(
+            select(_CATALOG_TABLE).where(_CATALOG_TABLE.c.owner_id.is_(None), column.in_(external_ids))
+        ).mappings()
+        return {row[id_field]: dict(row) for row in rows}
+
+
+# Instância global do serviço
+catalog_service = CatalogService()
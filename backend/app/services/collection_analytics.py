@@ -0,0 +1,195 @@
+import logging
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import extract, func, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.core.metrics import record_cache
+from app.models import CatalogGame, CollectionItem
+
+logger = logging.getLogger(__name__)
+
+
+# Contagens de jogadores: 1..9 e "10+"
+PLAYER_COUNTS = np.arange(1, 11)
+# Faixas de duração (minutos), fechadas à direita: ≤15, 16-30, ...
+PLAYTIME_EDGES = np.array([15, 30, 45, 60, 90, 120, 180, 240])
+PLAYTIME_LABELS = ["≤15", "16-30", "31-45", "46-60", "61-90", "91-120", "121-180", "181-240", ">240"]
+WEIGHT_EDGES = np.arange(1.0, 5.01, 0.5)
+
+# Colunas lidas do banco, na ordem das matrizes
+_COLUMNS = (
+    CatalogGame.min_players,
+    CatalogGame.max_players,
+    CatalogGame.min_playtime,
+    CatalogGame.max_playtime,
+    CatalogGame.weight,
+    CatalogGame.year_published,
+    CollectionItem.purchase_price,
+    CollectionItem.price,
+    CollectionItem.is_for_sale,
+    extract("year", CollectionItem.created_at),
+)
+
+
+class _Totals:
+    """Acumula histogramas e somas de vários blocos de linhas"""
+
+    def __init__(self):
+        self.total_games = 0
+        self.players = np.zeros(len(PLAYER_COUNTS), dtype=np.int64)
+        self.playtime = np.zeros(len(PLAYTIME_LABELS), dtype=np.int64)
+        self.weight = np.zeros(len(WEIGHT_EDGES) - 1, dtype=np.int64)
+        self.decades: Counter = Counter()
+        self.spend: Dict[int, list] = {}
+        self.paid_total = 0.0
+        self.for_sale_count = 0
+        self.for_sale_asking_total = 0.0
+        self.for_sale_paid_total = 0.0
+        self.for_sale_without_paid = 0
+
+    def add(self, data: np.ndarray) -> None:
+        """
+        Soma um bloco (uma linha por item, colunas na ordem de _COLUMNS)
+
+        Valores nulos chegam como NaN; cada medida ignora os seus.
+        """
+        (min_players, max_players, min_playtime, max_playtime, weight,
+         year, purchase_price, price, for_sale, year_added) = data.T
+        self.total_games += len(data)
+
+        # Jogos que comportam n jogadores (min ≤ n ≤ max); sem máximo vale o mínimo
+        low = np.nan_to_num(min_players, nan=np.inf)
+        high = np.where(np.isnan(max_players), min_players, max_players)
+        high = np.nan_to_num(high, nan=-np.inf)
+        supports = (low[:, None] <= PLAYER_COUNTS) & (high[:, None] >= PLAYER_COUNTS)
+        supports[:, -1] = high >= PLAYER_COUNTS[-1]
+        self.players += supports.sum(axis=0)
+
+        playtime = np.where(np.isnan(max_playtime), min_playtime, max_playtime)
+        playtime = playtime[~np.isnan(playtime)]
+        self.playtime += np.bincount(
+            np.searchsorted(PLAYTIME_EDGES, playtime, side="left"), minlength=len(PLAYTIME_LABELS)
+        )
+
+        self.weight += np.histogram(weight[~np.isnan(weight)], bins=WEIGHT_EDGES)[0]
+
+        year = year[~np.isnan(year) & (year > 0)]
+        decades, counts = np.unique((year // 10 * 10).astype(np.int64), return_counts=True)
+        self.decades.update(dict(zip(decades.tolist(), counts.tolist())))
+
+        paid = ~np.isnan(purchase_price)
+        years, inverse = np.unique(np.nan_to_num(year_added[paid]).astype(np.int64), return_inverse=True)
+        sums = np.bincount(inverse, weights=purchase_price[paid], minlength=len(years))
+        counts = np.bincount(inverse, minlength=len(years))
+        for y, total, count in zip(years.tolist(), sums.tolist(), counts.tolist()):
+            entry = self.spend.setdefault(y, [0.0, 0])
+            entry[0] += total
+            entry[1] += count
+        self.paid_total += float(purchase_price[paid].sum())
+
+        selling = (for_sale == 1) & ~np.isnan(price)
+        self.for_sale_count += int(selling.sum())
+        self.for_sale_asking_total += float(price[selling].sum())
+        self.for_sale_paid_total += float(np.nansum(purchase_price[selling]))
+        self.for_sale_without_paid += int((selling & ~paid).sum())
+
+    def result(self) -> Dict[str, Any]:
+        labels = [str(n) for n in PLAYER_COUNTS[:-1]] + [f"{PLAYER_COUNTS[-1]}+"]
+        weight_labels = [f"{a:.1f}-{b:.1f}" for a, b in zip(WEIGHT_EDGES[:-1], WEIGHT_EDGES[1:])]
+        return {
+            "total_games": self.total_games,
+            "players": [{"label": label, "count": int(c)} for label, c in zip(labels, self.players)],
+            "playtime": [{"label": label, "count": int(c)} for label, c in zip(PLAYTIME_LABELS, self.playtime)],
+            "weight": [{"label": label, "count": int(c)} for label, c in zip(weight_labels, self.weight)],
+            "decades": [{"label": f"{d}s", "count": c} for d, c in sorted(self.decades.items())],
+            "spend_by_year_added": [
+                {"year": year, "total": round(total, 2), "count": count}
+                for year, (total, count) in sorted(self.spend.items())
+            ],
+            "value": {
+                "paid_total": round(self.paid_total, 2),
+                "for_sale_count": self.for_sale_count,
+                "for_sale_asking_total": round(self.for_sale_asking_total, 2),
+                "for_sale_paid_total": round(self.for_sale_paid_total, 2),
+                "for_sale_without_paid": self.for_sale_without_paid,
+                "for_sale_margin": round(self.for_sale_asking_total - self.for_sale_paid_total, 2),
+            },
+        }
+
+
+class CollectionAnalyticsService:
+    """
+    Distribuições e totais da coleção calculados com NumPy.
+
+    Lê só as colunas numéricas necessárias, em blocos de um cursor, e
+    calcula cada histograma em operações vetorizadas por bloco. O resultado
+    fica em cache pela versão da coleção (contagem, maior id e última
+    alteração dos itens e dos títulos), então qualquer escrita o invalida.
+    """
+
+    def __init__(self):
+        self._cache: "OrderedDict[Tuple[Optional[int], Tuple], Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def version(db: Session, user_id: Optional[int] = None) -> Tuple:
+        """Versão da coleção do usuário (ou de todas, se user_id for None)"""
+        stmt = select(
+            func.count(CollectionItem.id),
+            func.max(CollectionItem.id),
+            func.max(CollectionItem.updated_at),
+            func.max(CatalogGame.updated_at),
+        ).join(CatalogGame, CollectionItem.catalog_id == CatalogGame.id)
+        if user_id is not None:
+            stmt = stmt.where(CollectionItem.user_id == user_id)
+        return tuple(str(value) for value in db.execute(stmt).one())
+
+    def compute(self, db: Session, user_id: Optional[int] = None, chunk_size: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Calcula as distribuições lendo a coleção em blocos de `chunk_size` linhas
+
+        As linhas vêm de um cursor do lado do servidor e a memória fica
+        limitada a um bloco, então a variante de todos os usuários
+        (user_id=None) funciona para qualquer tamanho de tabela.
+        """
+        chunk_size = chunk_size or settings.ANALYTICS_CHUNK_SIZE
+        totals = _Totals()
+        stmt = select(*_COLUMNS).join(CatalogGame, CollectionItem.catalog_id == CatalogGame.id)
+        if user_id is not None:
+            stmt = stmt.where(CollectionItem.user_id == user_id)
+        result = db.execute(stmt, execution_options={"stream_results": True, "yield_per": chunk_size})
+        try:
+            for partition in result.partitions():
+                # None vira NaN em arrays float
+                totals.add(np.array(partition, dtype=np.float64))
+        finally:
+            result.close()
+        return totals.result()
+
+    def get(self, db: Session, user_id: Optional[int] = None) -> Dict[str, Any]:
+        """Distribuições da coleção, do cache quando a versão não mudou"""
+        key = (user_id, self.version(db, user_id))
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+        record_cache("collection_analytics", cached is not None)
+        if cached is not None:
+            return cached
+
+        result = self.compute(db, user_id)
+        with self._lock:
+            self._cache[key] = result
+            while len(self._cache) > settings.ANALYTICS_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        logger.debug("Análise da coleção calculada", extra={"user_id": user_id, "games": result["total_games"]})
+        return result
+
+
+# Instância global do serviço
+collection_analytics = CollectionAnalyticsService()
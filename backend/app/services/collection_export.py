@@ -0,0 +1,283 @@
+import csv
+import io
+import re
+import zipfile
+from datetime import datetime
+from typing import Any, Iterator, List, Optional, Sequence, Tuple
+from xml.sax.saxutils import escape
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import nullslast, select
+from sqlalchemy.orm import Session, aliased
+
+from app.config import settings
+from app.models import CatalogGame, CollectionItem
+
+# Colunas exportadas: (nome, coluna SQL, tipo Parquet)
+_BASE_ITEM = aliased(CollectionItem)
+_BASE_CATALOG = aliased(CatalogGame)
+
+COLUMNS: List[Tuple[str, Any, pa.DataType]] = [
+    ("id", CollectionItem.id, pa.int64()),
+    ("name", CatalogGame.name, pa.string()),
+    ("year_published", CatalogGame.year_published, pa.int16()),
+    ("game_type", CatalogGame.game_type, pa.dictionary(pa.int8(), pa.string())),
+    ("base_game_id", CollectionItem.base_game_id, pa.int64()),
+    ("base_game_name", _BASE_CATALOG.name, pa.string()),
+    ("bgg_id", CatalogGame.bgg_id, pa.int32()),
+    ("ludopedia_id", CatalogGame.ludopedia_id, pa.int32()),
+    ("order", CollectionItem.order, pa.int32()),
+    ("min_players", CatalogGame.min_players, pa.int16()),
+    ("max_players", CatalogGame.max_players, pa.int16()),
+    ("min_playtime", CatalogGame.min_playtime, pa.int32()),
+    ("max_playtime", CatalogGame.max_playtime, pa.int32()),
+    ("min_age", CatalogGame.min_age, pa.int16()),
+    ("rating", CatalogGame.rating, pa.float64()),
+    ("weight", CatalogGame.weight, pa.float64()),
+    ("ranking_position", CatalogGame.ranking_position, pa.int32()),
+    ("is_for_trade", CollectionItem.is_for_trade, pa.bool_()),
+    ("is_for_sale", CollectionItem.is_for_sale, pa.bool_()),
+    ("condition", CollectionItem.condition, pa.dictionary(pa.int8(), pa.string())),
+    ("price", CollectionItem.price, pa.float64()),
+    ("purchase_price", CollectionItem.purchase_price, pa.float64()),
+    ("notes", CollectionItem.notes, pa.string()),
+    ("image_url", CatalogGame.image_url, pa.string()),
+    ("created_at", CollectionItem.created_at, pa.timestamp("us", tz="UTC")),
+]
+
+FIELD_NAMES = [name for name, _, _ in COLUMNS]
+
+# Caracteres de controle proibidos em XML 1.0
+_XML_INVALID = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "xlsx"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+
+class _ChunkSink:
+    """
+    Arquivo só de escrita que acumula bytes até serem drenados.
+
+    Sem seek: o zipfile passa a usar data descriptors e o Parquet escreve
+    o rodapé no fim, então os dois funcionam em streaming.
+    """
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _value(value: Any) -> Any:
+    # Enums (game_type) saem pelo valor
+    return getattr(value, "value", value)
+
+
+class CollectionExportService:
+    """Exporta a coleção de um usuário em CSV, XLSX ou Parquet, em streaming"""
+
+    @staticmethod
+    def iter_batches(db: Session, user_id: int, batch_size: Optional[int] = None) -> Iterator[Sequence[Tuple]]:
+        """
+        Lê a coleção em lotes por um cursor do lado do servidor
+
+        Yields:
+            Listas de tuplas na ordem de COLUMNS
+        """
+        batch_size = batch_size or settings.EXPORT_BATCH_SIZE
+        stmt = (
+            select(*(column for _, column, _ in COLUMNS))
+            .join(CatalogGame, CollectionItem.catalog_id == CatalogGame.id)
+            .outerjoin(_BASE_ITEM, CollectionItem.base_game_id == _BASE_ITEM.id)
+            .outerjoin(_BASE_CATALOG, _BASE_ITEM.catalog_id == _BASE_CATALOG.id)
+            .where(CollectionItem.user_id == user_id)
+            .order_by(nullslast(CollectionItem.order.asc()), CollectionItem.id)
+        )
+        result = db.execute(stmt, execution_options={"stream_results": True, "yield_per": batch_size})
+        try:
+            for partition in result.partitions():
+                yield [tuple(_value(value) for value in row) for row in partition]
+        finally:
+            result.close()
+
+    @staticmethod
+    def csv(batches: Iterator[Sequence[Tuple]]) -> Iterator[bytes]:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        # BOM para o Excel reconhecer UTF-8
+        buffer.write("\ufeff")
+        writer.writerow(FIELD_NAMES)
+        for batch in batches:
+            writer.writerows(
+                [value.isoformat() if isinstance(value, datetime) else value for value in row]
+                for row in batch
+            )
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode("utf-8")
+
+    @staticmethod
+    def xlsx(batches: Iterator[Sequence[Tuple]]) -> Iterator[bytes]:
+        """Planilha mínima (uma aba, strings inline) escrita direto no zip"""
+        sink = _ChunkSink()
+        letters = [_column_letter(index) for index in range(len(FIELD_NAMES))]
+        with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            for name, content in _XLSX_PARTS.items():
+                archive.writestr(name, content)
+            with archive.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as sheet:
+                sheet.write(
+                    b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                    b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+                )
+                sheet.write(_xlsx_row(1, letters, FIELD_NAMES))
+                row_number = 1
+                for batch in batches:
+                    parts = []
+                    for row in batch:
+                        row_number += 1
+                        parts.append(_xlsx_row(row_number, letters, row))
+                    sheet.write(b"".join(parts))
+                    yield sink.drain()
+                sheet.write(b"</sheetData></worksheet>")
+        yield sink.drain()
+
+    @staticmethod
+    def parquet(batches: Iterator[Sequence[Tuple]]) -> Iterator[bytes]:
+        """
+        Parquet tipado, com row groups de EXPORT_PARQUET_ROW_GROUP_ROWS linhas
+
+        Cada lote vira colunas Arrow na hora, então a memória fica limitada
+        a um row group em formato colunar (e não em tuplas Python).
+        """
+        schema = pa.schema([pa.field(name, arrow_type) for name, _, arrow_type in COLUMNS])
+        row_group_rows = settings.EXPORT_PARQUET_ROW_GROUP_ROWS
+        sink = _ChunkSink()
+        writer = pq.ParquetWriter(sink, schema, compression="zstd", write_statistics=True)
+        pending: List[pa.RecordBatch] = []
+        pending_rows = 0
+
+        def flush_row_group() -> None:
+            nonlocal pending_rows
+            writer.write_table(pa.Table.from_batches(pending, schema=schema), row_group_size=pending_rows)
+            pending.clear()
+            pending_rows = 0
+
+        try:
+            # Cabeçalho "PAR1": o download começa antes do primeiro row group
+            yield sink.drain()
+            for batch in batches:
+                columns = list(zip(*batch))
+                pending.append(pa.RecordBatch.from_arrays([
+                    pa.array(values, type=arrow_type.value_type).dictionary_encode()
+                    if pa.types.is_dictionary(arrow_type)
+                    else pa.array(values, type=arrow_type)
+                    for values, (_, _, arrow_type) in zip(columns, COLUMNS)
+                ], schema=schema))
+                pending_rows += len(batch)
+                if pending_rows >= row_group_rows:
+                    flush_row_group()
+                    yield sink.drain()
+            if pending:
+                flush_row_group()
+        finally:
+            writer.close()
+        yield sink.drain()
+
+    def stream(self, db: Session, user_id: int, format: str) -> Iterator[bytes]:
+        """Bytes do arquivo no formato pedido (csv, xlsx ou parquet)"""
+        yield from getattr(self, format)(self.iter_batches(db, user_id))
+
+
+def _column_letter(index: int) -> str:
+    letters = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _xlsx_row(number: int, letters: List[str], values: Sequence[Any]) -> bytes:
+    cells = []
+    for letter, value in zip(letters, values):
+        ref = f"{letter}{number}"
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            cells.append(f'<c r="{ref}" t="b"><v>{int(value)}</v></c>')
+        elif isinstance(value, (int, float)):
+            cells.append(f'<c r="{ref}"><v>{value}</v></c>')
+        else:
+            if isinstance(value, datetime):
+                value = value.isoformat()
+            text = escape(_XML_INVALID.sub("", str(value)))
+            cells.append(f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>')
+    return f'<row r="{number}">{"".join(cells)}</row>'.encode("utf-8")
+
+
+_XLSX_PARTS = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    "xl/workbook.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Coleção" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+
+# Instância global do serviço
+collection_export = CollectionExportService()
@@ -0,0 +1,438 @@
+"""
+Ligação entre títulos da Ludopedia e do BGG que são o mesmo jogo.
+
+Um título importado da Ludopedia só tem ludopedia_id e um do BGG só tem
+bgg_id, então o mesmo jogo aparece duas vezes no catálogo. Este módulo
+encontra os pares pela similaridade de trigramas do nome normalizado,
+pelo ano e pelo número de jogadores, e grava cada ligação em
+catalog_matches com a confiança calculada.
+
+Os candidatos vêm de um índice invertido de trigramas em memória com
+filtragem por prefixo: só os trigramas mais raros do nome buscado são
+consultados, então a busca não percorre o catálogo inteiro.
+
+Execução em lote sobre o catálogo existente:
+    python -m app.migrations.link_provider_titles [--batch-size 1000]
+"""
+import logging
+import math
+import re
+import threading
+import unicodedata
+from array import array
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.orm import Session, aliased
+
+from app.config import settings
+from app.models import CatalogGame, CatalogMatch, CollectionItem
+from app.services.catalog_service import insert_ignoring_conflicts
+
+logger = logging.getLogger(__name__)
+
+_CATALOG_TABLE = CatalogGame.__table__
+_MATCH_TABLE = CatalogMatch.__table__
+
+# Provedor -> (coluna do ID no catálogo, coluna da ligação em catalog_matches)
+PROVIDERS = {
+    "ludopedia": ("ludopedia_id", "ludopedia_catalog_id"),
+    "bgg": ("bgg_id", "bgg_catalog_id"),
+}
+OTHER_PROVIDER = {"ludopedia": "bgg", "bgg": "ludopedia"}
+
+# Campos que a Ludopedia pode não ter e o título ligado do BGG preenche
+ENRICH_FIELDS = ("weight", "year_published", "min_players", "max_players", "min_playtime", "max_playtime", "min_age")
+
+# Pesos da confiança: nome, ano e número de jogadores
+NAME_WEIGHT = 0.6
+YEAR_WEIGHT = 0.25
+PLAYERS_WEIGHT = 0.15
+# Diferença mínima para o segundo melhor candidato (senão o nome é ambíguo)
+AMBIGUITY_MARGIN = 0.05
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+_NUMBER = re.compile(r"\d+")
+
+_MATCH_COLUMNS = (
+    _CATALOG_TABLE.c.id,
+    _CATALOG_TABLE.c.name,
+    _CATALOG_TABLE.c.year_published,
+    _CATALOG_TABLE.c.min_players,
+    _CATALOG_TABLE.c.max_players,
+)
+
+
+def normalize_name(name: Optional[str]) -> str:
+    """Minúsculas, sem acentos nem pontuação e com espaços simples"""
+    if not name:
+        return ""
+    name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii").lower()
+    name = name.replace("&", " and ")
+    return _NON_ALNUM.sub(" ", name).strip()
+
+
+def trigrams(normalized: str) -> FrozenSet[str]:
+    padded = f"  {normalized} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def similarity(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    """Jaccard entre dois conjuntos de trigramas"""
+    if not a or not b:
+        return 0.0
+    overlap = len(a & b)
+    return overlap / (len(a) + len(b) - overlap)
+
+
+@dataclass(slots=True)
+class Candidate:
+    """Título candidato a ligação, com os campos usados na comparação"""
+    catalog_id: int
+    name: str  # normalizado
+    year: Optional[int] = None
+    min_players: Optional[int] = None
+    max_players: Optional[int] = None
+    grams: FrozenSet[str] = field(default=frozenset(), repr=False)
+
+    @classmethod
+    def from_row(cls, row: Any) -> "Candidate":
+        name = normalize_name(row["name"])
+        return cls(row["id"], name, row["year_published"], row["min_players"], row["max_players"], trigrams(name))
+
+
+def confidence(a: Candidate, b: Candidate, name_similarity: float) -> float:
+    """
+    Confiança (0 a 1) de que dois títulos são o mesmo jogo
+
+    Números no nome ("Pandemic Legacy: Season 1" e "Season 2") precisam
+    coincidir. Ano e jogadores ausentes contam pela metade.
+    """
+    if _NUMBER.findall(a.name) != _NUMBER.findall(b.name):
+        return 0.0
+
+    if a.year and b.year:
+        year = {0: 1.0, 1: 0.7}.get(abs(a.year - b.year), 0.0)
+    else:
+        year = 0.5
+
+    if a.min_players and b.min_players:
+        if (a.min_players, a.max_players) == (b.min_players, b.max_players):
+            players = 1.0
+        elif a.min_players <= (b.max_players or b.min_players) and b.min_players <= (a.max_players or a.min_players):
+            players = 0.5
+        else:
+            players = 0.0
+    else:
+        players = 0.5
+
+    return NAME_WEIGHT * name_similarity + YEAR_WEIGHT * year + PLAYERS_WEIGHT * players
+
+
+class TrigramIndex:
+    """
+    Índice invertido trigrama -> ordinais dos títulos.
+
+    Cada trigrama ganha um id inteiro; as listas de ocorrências e os
+    trigramas de cada título ficam em arrays compactos, e a verificação de
+    um candidato é uma interseção de conjuntos feita em C.
+    """
+
+    def __init__(self):
+        self._gram_ids: Dict[str, int] = {}
+        self._postings: List[array] = []
+        self._entries: List[Optional[Candidate]] = []
+        self._grams: List[array] = []
+        self._ordinals: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._ordinals)
+
+    def __contains__(self, catalog_id: int) -> bool:
+        return catalog_id in self._ordinals
+
+    def _gram_id(self, gram: str) -> int:
+        gram_id = self._gram_ids.get(gram)
+        if gram_id is None:
+            gram_id = self._gram_ids[gram] = len(self._postings)
+            self._postings.append(array("i"))
+        return gram_id
+
+    def add(self, candidate: Candidate) -> None:
+        if candidate.catalog_id in self._ordinals or not candidate.name:
+            return
+        ordinal = len(self._entries)
+        gram_ids = array("i", (self._gram_id(gram) for gram in candidate.grams or trigrams(candidate.name)))
+        self._entries.append(Candidate(
+            candidate.catalog_id, candidate.name, candidate.year, candidate.min_players, candidate.max_players
+        ))
+        self._grams.append(gram_ids)
+        self._ordinals[candidate.catalog_id] = ordinal
+        for gram_id in gram_ids:
+            self._postings[gram_id].append(ordinal)
+
+    def remove(self, catalog_id: int) -> None:
+        # Remoção preguiçosa: as ocorrências ficam, a entrada vira None
+        ordinal = self._ordinals.pop(catalog_id, None)
+        if ordinal is not None:
+            self._entries[ordinal] = None
+
+    def search(self, grams: FrozenSet[str], threshold: float) -> List[Tuple[Candidate, float]]:
+        """
+        Títulos com similaridade de Jaccard >= threshold
+
+        Jaccard >= t exige ao menos ceil(t * |q|) trigramas em comum, então
+        todo resultado tem algum dos |q| - ceil(t * |q|) + 1 trigramas mais
+        raros da consulta; só as listas desses trigramas são lidas. Também
+        exige t * |q| <= |e| <= |q| / t, o que descarta candidatos antes de
+        contar os trigramas em comum.
+        """
+        if not grams:
+            return []
+        size = len(grams)
+        min_size, max_size = threshold * size, size / threshold
+        known = {self._gram_ids[gram] for gram in grams if gram in self._gram_ids}
+        # Trigramas que nenhum título tem são os mais raros de todos
+        prefix_length = size - math.ceil(threshold * size) + 1 - (size - len(known))
+        if prefix_length <= 0:
+            return []
+        rarest = sorted(known, key=lambda gram_id: len(self._postings[gram_id]))[:prefix_length]
+
+        ordinals: Set[int] = set()
+        for gram_id in rarest:
+            ordinals.update(self._postings[gram_id])
+
+        results = []
+        for ordinal in ordinals:
+            entry = self._entries[ordinal]
+            entry_grams = self._grams[ordinal]
+            if entry is None or not min_size <= len(entry_grams) <= max_size:
+                continue
+            overlap = len(known.intersection(entry_grams))
+            score = overlap / (size + len(entry_grams) - overlap)
+            if score >= threshold:
+                results.append((entry, score))
+        return results
+
+
+class EntityResolver:
+    """
+    Liga títulos compartilhados da Ludopedia e do BGG.
+
+    Mantém um índice por provedor com os títulos que só têm o ID daquele
+    provedor e ainda não foram ligados. O lote (match_all) percorre o
+    catálogo; durante as importações, match_new liga os títulos recém-
+    criados e os acrescenta ao índice do seu provedor.
+    """
+
+    def __init__(self):
+        self._indexes: Optional[Dict[str, TrigramIndex]] = None
+        self._matched: Dict[str, Set[int]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _unmatched(provider: str):
+        """Títulos compartilhados só do provedor e ainda sem ligação"""
+        id_field, match_field = PROVIDERS[provider]
+        other_field, _ = PROVIDERS[OTHER_PROVIDER[provider]]
+        return select(*_MATCH_COLUMNS).where(
+            _CATALOG_TABLE.c.owner_id.is_(None),
+            _CATALOG_TABLE.c[id_field].isnot(None),
+            _CATALOG_TABLE.c[other_field].is_(None),
+            ~_CATALOG_TABLE.c.id.in_(select(_MATCH_TABLE.c[match_field])),
+        )
+
+    def _iter_unmatched(self, db: Session, provider: str, batch_size: int) -> Iterable[List[Candidate]]:
+        result = db.execute(
+            self._unmatched(provider),
+            execution_options={"stream_results": True, "yield_per": batch_size},
+        ).mappings()
+        try:
+            for partition in result.partitions():
+                yield [Candidate.from_row(row) for row in partition]
+        finally:
+            result.close()
+
+    def build_index(self, db: Session, provider: str, batch_size: Optional[int] = None) -> TrigramIndex:
+        index = TrigramIndex()
+        for candidates in self._iter_unmatched(db, provider, batch_size or settings.ENTITY_MATCH_BATCH_SIZE):
+            for candidate in candidates:
+                index.add(candidate)
+        return index
+
+    def _load(self, db: Session) -> Dict[str, TrigramIndex]:
+        if self._indexes is None:
+            self._indexes = {provider: self.build_index(db, provider) for provider in PROVIDERS}
+            self._matched = {
+                provider: {row[0] for row in db.execute(select(_MATCH_TABLE.c[match_field]))}
+                for provider, (_, match_field) in PROVIDERS.items()
+            }
+            logger.info(
+                "Índices de ligação entre provedores carregados",
+                extra={provider: len(index) for provider, index in self._indexes.items()},
+            )
+        return self._indexes
+
+    @staticmethod
+    def search_threshold() -> float:
+        """
+        Similaridade mínima de nome que ainda alcança a confiança mínima
+
+        Mesmo com ano e jogadores perfeitos, um nome abaixo disso não chega
+        a ENTITY_MATCH_MIN_CONFIDENCE, então o índice nem o retorna.
+        """
+        reachable = (settings.ENTITY_MATCH_MIN_CONFIDENCE - YEAR_WEIGHT - PLAYERS_WEIGHT) / NAME_WEIGHT
+        return max(settings.ENTITY_MATCH_MIN_SIMILARITY, reachable)
+
+    def best_match(self, candidate: Candidate, index: TrigramIndex) -> Optional[Tuple[Candidate, float]]:
+        """Melhor título do índice para o candidato, se confiável e sem ambiguidade"""
+        scored = sorted(
+            ((entry, confidence(candidate, entry, score))
+             for entry, score in index.search(candidate.grams, self.search_threshold())),
+            key=lambda pair: pair[1],
+            reverse=True,
+        )
+        if not scored or scored[0][1] < settings.ENTITY_MATCH_MIN_CONFIDENCE:
+            return None
+        if len(scored) > 1 and scored[0][1] - scored[1][1] < AMBIGUITY_MARGIN:
+            logger.debug("Ligação ambígua ignorada: %s", candidate.name)
+            return None
+        return scored[0]
+
+    def match_new(self, db: Session, provider: str, rows: Iterable[Dict[str, Any]]) -> int:
+        """
+        Liga títulos recém-importados de um provedor aos do outro
+
+        Args:
+            db: Sessão do banco de dados
+            provider: Provedor dos títulos ("ludopedia" ou "bgg")
+            rows: Linhas do catálogo (títulos compartilhados)
+
+        Returns:
+            Número de ligações gravadas
+        """
+        other_field, _ = PROVIDERS[OTHER_PROVIDER[provider]]
+        with self._lock:
+            # Um índice carregado agora já contém as linhas do lote
+            fresh = self._indexes is None
+            indexes = self._load(db)
+            own, other = indexes[provider], indexes[OTHER_PROVIDER[provider]]
+            pairs = []
+            for row in rows:
+                if row.get("owner_id") is not None or row.get(other_field) is not None:
+                    continue
+                if (row["id"] in own and not fresh) or row["id"] in self._matched[provider]:
+                    continue
+                candidate = Candidate.from_row(row)
+                match = self.best_match(candidate, other)
+                if match is None:
+                    own.add(candidate)
+                    continue
+                entry, score = match
+                own.remove(candidate.catalog_id)
+                other.remove(entry.catalog_id)
+                self._matched[provider].add(candidate.catalog_id)
+                self._matched[OTHER_PROVIDER[provider]].add(entry.catalog_id)
+                pairs.append((candidate.catalog_id, entry.catalog_id, score))
+        if not pairs:
+            return 0
+        if provider == "bgg":
+            pairs = [(other_id, own_id, score) for own_id, other_id, score in pairs]
+        return self._persist(db, pairs)
+
+    def match_all(self, db: Session, batch_size: Optional[int] = None) -> int:
+        """
+        Liga todos os títulos da Ludopedia ainda sem ligação
+
+        Indexa os títulos do BGG sem ligação e percorre os da Ludopedia em
+        blocos, gravando as ligações de cada bloco.
+
+        Returns:
+            Número de ligações gravadas
+        """
+        batch_size = batch_size or settings.ENTITY_MATCH_BATCH_SIZE
+        bgg_index = self.build_index(db, "bgg", batch_size)
+        # O cursor do lote não pode ficar aberto enquanto cada bloco é gravado
+        ludopedia_ids = [row[0] for row in db.execute(self._unmatched("ludopedia").with_only_columns(_CATALOG_TABLE.c.id))]
+
+        created = 0
+        for start in range(0, len(ludopedia_ids), batch_size):
+            chunk = ludopedia_ids[start:start + batch_size]
+            rows = db.execute(select(*_MATCH_COLUMNS).where(_CATALOG_TABLE.c.id.in_(chunk))).mappings()
+            pairs = []
+            for row in rows:
+                candidate = Candidate.from_row(row)
+                match = self.best_match(candidate, bgg_index)
+                if match is not None:
+                    entry, score = match
+                    bgg_index.remove(entry.catalog_id)
+                    pairs.append((candidate.catalog_id, entry.catalog_id, score))
+            created += self._persist(db, pairs)
+            logger.info("Ligações entre provedores: %d de %d títulos processados", start + len(chunk), len(ludopedia_ids))
+
+        # Os índices em memória do processo são recarregados na próxima importação
+        with self._lock:
+            self._indexes = None
+        return created
+
+    def _persist(self, db: Session, pairs: List[Tuple[int, int, float]]) -> int:
+        """Grava ligações (ludopedia_catalog_id, bgg_catalog_id, confiança) e completa a Ludopedia"""
+        if not pairs:
+            return 0
+        inserted = insert_ignoring_conflicts(db, _MATCH_TABLE, [
+            {"ludopedia_catalog_id": ludopedia_id, "bgg_catalog_id": bgg_id, "confidence": round(score, 4), "method": "auto"}
+            for ludopedia_id, bgg_id, score in pairs
+        ], index_elements=None)
+        if inserted:
+            self._enrich(db, [(row["ludopedia_catalog_id"], row["bgg_catalog_id"]) for row in inserted])
+        db.commit()
+        return len(inserted)
+
+    @staticmethod
+    def _enrich(db: Session, links: List[Tuple[int, int]]) -> None:
+        """Preenche campos vazios dos títulos da Ludopedia com os do BGG"""
+        columns = [_CATALOG_TABLE.c[name] for name in ENRICH_FIELDS]
+        bgg_rows = {
+            row["id"]: row
+            for row in db.execute(
+                select(_CATALOG_TABLE.c.id, *columns).where(_CATALOG_TABLE.c.id.in_([bgg for _, bgg in links]))
+            ).mappings()
+        }
+        params = [
+            {"_id": ludopedia_id, **{f"_{name}": bgg_rows[bgg_id][name] for name in ENRICH_FIELDS}}
+            for ludopedia_id, bgg_id in links
+            if bgg_id in bgg_rows
+        ]
+        if not params:
+            return
+        stmt = (
+            update(_CATALOG_TABLE)
+            .where(_CATALOG_TABLE.c.id == bindparam("_id"))
+            .values({name: func.coalesce(_CATALOG_TABLE.c[name], bindparam(f"_{name}")) for name in ENRICH_FIELDS})
+        )
+        db.execute(stmt, params)
+
+    @staticmethod
+    def counterpart_ids(db: Session, user_id: int, provider: str) -> Set[int]:
+        """
+        IDs do provedor que o usuário já tem por meio de um título ligado do outro
+
+        Ex.: para "bgg", os bgg_id ligados aos títulos da Ludopedia da coleção.
+        """
+        id_field, match_field = PROVIDERS[provider]
+        _, other_match_field = PROVIDERS[OTHER_PROVIDER[provider]]
+        linked = aliased(CatalogGame)
+        rows = db.execute(
+            select(getattr(linked, id_field))
+            .select_from(CollectionItem)
+            .join(CatalogMatch, getattr(CatalogMatch, other_match_field) == CollectionItem.catalog_id)
+            .join(linked, linked.id == getattr(CatalogMatch, match_field))
+            .where(CollectionItem.user_id == user_id)
+        )
+        return {row[0] for row in rows}
+
+
+# Instância global do serviço
+entity_resolver = EntityResolver()
+
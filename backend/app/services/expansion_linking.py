@@ -0,0 +1,177 @@
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Set
+
+from fastapi import BackgroundTasks
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.orm import Session, aliased
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models import BggThingLinks, CatalogGame, CatalogMatch, CollectionItem, GameType
+from app.services.bgg_service import bgg_service
+from app.services.catalog_service import upsert
+from app.services.game_tags import game_tags
+
+logger = logging.getLogger(__name__)
+
+_ITEM_TABLE = CollectionItem.__table__
+_CATALOG_TABLE = CatalogGame.__table__
+_LINKS_TABLE = BggThingLinks.__table__
+
+# Máximo de IDs por cláusula IN
+_IN_CHUNK = 1000
+
+
+@dataclass
+class ExpansionLinkResult:
+    """Resultado de uma passada de ligação de expansões"""
+    checked: int = 0  # Itens sem jogo base avaliados
+    fetched: int = 0  # Itens buscados no BGG (fora do cache)
+    classified: int = 0  # Títulos marcados como expansão
+    linked: int = 0  # Expansões ligadas ao jogo base
+
+
+class ExpansionLinker:
+    """
+    Classifica expansões e liga cada uma ao jogo base da coleção.
+
+    O BGG informa, em /thing, o tipo de cada item e, nas expansões, o jogo
+    base (<link type="boardgameexpansion" inbound="true">). Itens da
+    Ludopedia usam o bgg_id do título ligado (catalog_matches).
+
+    A passada é incremental: só itens ainda sem base_game_id são avaliados,
+    e só os IDs fora do cache (bgg_thing_links) são buscados no BGG, em
+    chamadas com vários IDs. Ligações existentes, inclusive manuais, nunca
+    são alteradas. A mesma chamada traz as tags do item (categorias,
+    mecânicas, designers e editoras), gravadas por game_tags.
+    """
+
+    @staticmethod
+    def _collection(db: Session, user_id: int) -> List[Any]:
+        """Itens do usuário com o bgg_id efetivo (próprio ou do título ligado)"""
+        linked = aliased(CatalogGame)
+        return db.execute(
+            select(
+                CollectionItem.id,
+                CollectionItem.base_game_id,
+                CatalogGame.id.label("catalog_id"),
+                CatalogGame.owner_id,
+                CatalogGame.game_type,
+                func.coalesce(CatalogGame.bgg_id, linked.bgg_id).label("bgg_id"),
+            )
+            .join(CatalogGame, CollectionItem.catalog_id == CatalogGame.id)
+            .outerjoin(CatalogMatch, CatalogMatch.ludopedia_catalog_id == CatalogGame.id)
+            .outerjoin(linked, linked.id == CatalogMatch.bgg_catalog_id)
+            .where(CollectionItem.user_id == user_id)
+        ).all()
+
+    @staticmethod
+    def _cached(db: Session, bgg_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """Vínculos guardados ainda válidos"""
+        fresh_after = datetime.now(timezone.utc) - timedelta(days=settings.BGG_THING_CACHE_DAYS)
+        cached = {}
+        for start in range(0, len(bgg_ids), _IN_CHUNK):
+            rows = db.execute(
+                select(_LINKS_TABLE).where(
+                    _LINKS_TABLE.c.bgg_id.in_(bgg_ids[start:start + _IN_CHUNK]),
+                    _LINKS_TABLE.c.fetched_at >= fresh_after,
+                )
+            ).mappings()
+            cached.update((row["bgg_id"], dict(row)) for row in rows)
+        return cached
+
+    @staticmethod
+    def _store(db: Session, links: Dict[int, Dict[str, Any]]) -> None:
+        """Grava (ou substitui) os vínculos e as tags buscados no BGG"""
+        if not links:
+            return
+        # Upsert: duas passadas simultâneas sobre o mesmo item não conflitam
+        now = datetime.now(timezone.utc)
+        upsert(db, _LINKS_TABLE, [
+            {"bgg_id": bgg_id, "is_expansion": link["is_expansion"], "base_bgg_ids": link["base_bgg_ids"], "fetched_at": now}
+            for bgg_id, link in links.items()
+        ], index_elements=["bgg_id"])
+        game_tags.store(db, {bgg_id: link["tags"] for bgg_id, link in links.items()})
+        db.commit()
+
+    async def link_user(self, db: Session, user_id: int) -> ExpansionLinkResult:
+        """
+        Liga as expansões da coleção do usuário aos jogos base que ele possui
+
+        Returns:
+            Contagens da passada
+        """
+        rows = self._collection(db, user_id)
+        item_by_bgg = {row.bgg_id: row.id for row in rows if row.bgg_id is not None}
+        pending = [row for row in rows if row.bgg_id is not None and row.base_game_id is None]
+        result = ExpansionLinkResult(checked=len(pending))
+        if not item_by_bgg:
+            return result
+
+        # Toda a coleção é buscada (fora do cache) para as tags ficarem completas
+        links = self._cached(db, sorted(item_by_bgg))
+        missing = [bgg_id for bgg_id in sorted(item_by_bgg) if bgg_id not in links]
+        if missing:
+            fetched = await bgg_service.get_expansion_links(missing)
+            self._store(db, fetched)
+            links.update(fetched)
+            result.fetched = len(fetched)
+
+        to_classify: Set[int] = set()
+        to_link: List[Dict[str, int]] = []
+        for row in pending:
+            link = links.get(row.bgg_id)
+            if link is None or not link["is_expansion"]:
+                continue
+            # Títulos privados guardam as edições do usuário
+            if row.game_type != GameType.EXPANSION and row.owner_id is None:
+                to_classify.add(row.catalog_id)
+            base_id = next(
+                (item_by_bgg[base] for base in link["base_bgg_ids"] if base in item_by_bgg and base != row.bgg_id),
+                None,
+            )
+            if base_id is not None:
+                to_link.append({"_id": row.id, "_base": base_id})
+
+        if to_classify:
+            ids = list(to_classify)
+            for start in range(0, len(ids), _IN_CHUNK):
+                db.execute(
+                    update(_CATALOG_TABLE)
+                    .where(_CATALOG_TABLE.c.id.in_(ids[start:start + _IN_CHUNK]))
+                    .values(game_type=GameType.EXPANSION)
+                )
+        if to_link:
+            db.execute(
+                update(_ITEM_TABLE)
+                .where(_ITEM_TABLE.c.id == bindparam("_id"), _ITEM_TABLE.c.base_game_id.is_(None))
+                .values(base_game_id=bindparam("_base")),
+                to_link,
+            )
+        db.commit()
+
+        result.classified = len(to_classify)
+        result.linked = len(to_link)
+        logger.info("Expansões ligadas aos jogos base", extra={"user_id": user_id, **vars(result)})
+        return result
+
+    def schedule(self, background_tasks: BackgroundTasks, user_id: int) -> None:
+        """Agenda uma passada para depois da resposta de uma importação"""
+        if settings.EXPANSION_LINK_AFTER_IMPORT:
+            background_tasks.add_task(self.link_user_in_background, user_id)
+
+    async def link_user_in_background(self, user_id: int) -> None:
+        """Passada em segundo plano após uma importação, com sessão própria"""
+        db = SessionLocal()
+        try:
+            await self.link_user(db, user_id)
+        except Exception:
+            logger.exception("Falha ao ligar expansões", extra={"user_id": user_id})
+        finally:
+            db.close()
+
+
+# Instância global do serviço
+expansion_linker = ExpansionLinker()
@@ -0,0 +1,386 @@
+import logging
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session, aliased
+
+from app.config import settings
+from app.core.metrics import record_cache
+from app.models import BggThingLinks, BggThingTag, CatalogGame, CatalogMatch, CollectionItem, Tag, TagKind
+from app.services.catalog_service import insert_ignoring_conflicts
+
+logger = logging.getLogger(__name__)
+
+_TAG_TABLE = Tag.__table__
+_THING_TAG_TABLE = BggThingTag.__table__
+
+# Máximo de IDs por cláusula IN
+_IN_CHUNK = 1000
+
+# Prefixos aceitos nos termos (mechanic:dice-rolling)
+KIND_PREFIXES = {kind.value.lower(): kind for kind in TagKind}
+
+_TOKEN = re.compile(r"\(|\)|[^\s()]+")
+_OPERATORS = {"AND", "OR", "NOT"}
+
+# Limites da consulta (a análise é recursiva: "((((..." estouraria a pilha)
+_MAX_QUERY_LENGTH = 500
+_MAX_DEPTH = 32
+
+
+class TagQueryError(ValueError):
+    """Consulta de tags inválida (sintaxe ou tag inexistente)"""
+
+
+def slugify(name: str) -> str:
+    """Nome em minúsculas, sem acentos, com hífens (Deck, Bag, and Pool Building -> deck-bag-and-pool-building)"""
+    ascii_name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode()
+    return re.sub(r"[^a-z0-9]+", "-", ascii_name.lower()).strip("-")
+
+
+@dataclass
+class _TagIndex:
+    """Bitsets das tags sobre os itens de uma coleção (bit i = i-ésimo item)"""
+    item_ids: List[int]
+    bitsets: Dict[int, int]  # tag_id -> bitset
+    tags: Dict[int, Dict[str, Any]]  # tag_id -> {"id", "kind", "name", "slug"}
+    by_slug: Dict[str, List[int]]
+
+    @property
+    def everything(self) -> int:
+        return (1 << len(self.item_ids)) - 1
+
+    def items(self, bits: int) -> List[int]:
+        """IDs dos itens com o bit ligado"""
+        if not bits:
+            return []
+        raw = np.frombuffer(bits.to_bytes((len(self.item_ids) + 7) // 8, "little"), dtype=np.uint8)
+        ordinals = np.flatnonzero(np.unpackbits(raw, bitorder="little")[:len(self.item_ids)])
+        return [self.item_ids[i] for i in ordinals.tolist()]
+
+
+class _Parser:
+    """
+    Analisador descendente da consulta
+
+    expr   := term (OR term)*
+    term   := factor ((AND)? factor)*
+    factor := NOT factor | "(" expr ")" | tag
+
+    Termos adjacentes sem operador valem como AND. Cada tag é um slug,
+    opcionalmente com o tipo (mechanic:dice-rolling). Consultas com mais de
+    _MAX_QUERY_LENGTH caracteres ou mais de _MAX_DEPTH níveis de parênteses
+    e NOT são recusadas.
+    """
+
+    def __init__(self, query: str, resolve):
+        if len(query) > _MAX_QUERY_LENGTH:
+            raise TagQueryError(f"Consulta longa demais (máximo de {_MAX_QUERY_LENGTH} caracteres)")
+        self.tokens = _TOKEN.findall(query)
+        self.pos = 0
+        self.depth = 0
+        self.resolve = resolve
+
+    def parse(self) -> int:
+        if not self.tokens:
+            raise TagQueryError("Consulta vazia")
+        bits = self._expr()
+        if self.pos < len(self.tokens):
+            raise TagQueryError(f"Termo inesperado: {self.tokens[self.pos]}")
+        return bits
+
+    def _peek(self) -> Optional[str]:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def _keyword(self, word: str) -> bool:
+        token = self._peek()
+        if token is not None and token.upper() == word:
+            self.pos += 1
+            return True
+        return False
+
+    def _expr(self) -> int:
+        bits = self._term()
+        while self._keyword("OR"):
+            bits |= self._term()
+        return bits
+
+    def _term(self) -> int:
+        bits = self._factor()
+        while True:
+            if self._keyword("AND"):
+                bits &= self._factor()
+                continue
+            token = self._peek()
+            if token is None or token == ")" or token.upper() == "OR":
+                return bits
+            bits &= self._factor()
+
+    def _nested(self, parse) -> int:
+        """Analisa um nível aninhado (parênteses ou NOT), respeitando _MAX_DEPTH"""
+        self.depth += 1
+        if self.depth > _MAX_DEPTH:
+            raise TagQueryError(f"Consulta aninhada demais (máximo de {_MAX_DEPTH} níveis)")
+        bits = parse()
+        self.depth -= 1
+        return bits
+
+    def _factor(self) -> int:
+        token = self._peek()
+        if token is None:
+            raise TagQueryError("Consulta incompleta")
+        if self._keyword("NOT"):
+            return self.resolve(None) & ~self._nested(self._factor)
+        self.pos += 1
+        if token == "(":
+            bits = self._nested(self._expr)
+            if self._peek() != ")":
+                raise TagQueryError("Parêntese não fechado")
+            self.pos += 1
+            return bits
+        if token == ")" or token.upper() in _OPERATORS:
+            raise TagQueryError(f"Termo inesperado: {token}")
+        return self.resolve(token)
+
+
+class GameTagService:
+    """
+    Categorias, mecânicas, designers e editoras dos jogos, com filtro por bitmap.
+
+    As tags vêm dos links do /thing do BGG e são gravadas por bgg_id
+    (tabelas tags e bgg_thing_tags) na mesma passada que liga as expansões.
+    Itens da Ludopedia usam as tags do título do BGG ligado.
+
+    Para consultar, cada coleção vira um índice em memória: os itens ganham
+    uma posição (ordinal) e cada tag um bitset (int do Python) com os bits
+    dos itens que a têm. "cooperative-game AND NOT dice-rolling" vira
+    operações bit a bit, e a contagem de cada tag sob o filtro é um
+    popcount de (tag & filtro). O índice fica em cache pela versão da
+    coleção e das tags gravadas.
+    """
+
+    def __init__(self):
+        self._cache: "OrderedDict[Tuple[int, Tuple], _TagIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def store(db: Session, tags_by_bgg: Dict[int, List[Dict[str, Any]]]) -> None:
+        """
+        Grava (ou substitui) as tags de itens do BGG, sem commit
+
+        Args:
+            tags_by_bgg: {bgg_id: [{"kind", "bgg_id", "name"}, ...]}
+        """
+        if not tags_by_bgg:
+            return
+        unique = {
+            (tag["kind"], tag["bgg_id"]): tag["name"]
+            for tags in tags_by_bgg.values() for tag in tags
+        }
+        insert_ignoring_conflicts(
+            db, _TAG_TABLE,
+            [{"kind": TagKind(kind), "bgg_id": tag_bgg_id, "name": name, "slug": slugify(name)}
+             for (kind, tag_bgg_id), name in unique.items()],
+            index_elements=["kind", "bgg_id"],
+        )
+
+        tag_ids: Dict[Tuple[str, int], int] = {}
+        tag_bgg_ids = list({tag_bgg_id for _, tag_bgg_id in unique})
+        for start in range(0, len(tag_bgg_ids), _IN_CHUNK):
+            rows = db.execute(
+                select(Tag.id, Tag.kind, Tag.bgg_id).where(Tag.bgg_id.in_(tag_bgg_ids[start:start + _IN_CHUNK]))
+            )
+            tag_ids.update(((row.kind.value, row.bgg_id), row.id) for row in rows)
+
+        pairs = {
+            (bgg_id, tag_ids[(tag["kind"], tag["bgg_id"])])
+            for bgg_id, tags in tags_by_bgg.items() for tag in tags
+        }
+
+        # Só as tags que saíram do item são apagadas; as novas entram ignorando
+        # conflitos, então gravações simultâneas do mesmo item não colidem
+        stale: Dict[int, List[int]] = {}
+        bgg_ids = list(tags_by_bgg)
+        for start in range(0, len(bgg_ids), _IN_CHUNK):
+            rows = db.execute(
+                select(_THING_TAG_TABLE.c.bgg_id, _THING_TAG_TABLE.c.tag_id)
+                .where(_THING_TAG_TABLE.c.bgg_id.in_(bgg_ids[start:start + _IN_CHUNK]))
+            )
+            for bgg_id, tag_id in rows:
+                if (bgg_id, tag_id) not in pairs:
+                    stale.setdefault(bgg_id, []).append(tag_id)
+        for bgg_id, stale_tag_ids in stale.items():
+            db.execute(delete(_THING_TAG_TABLE).where(
+                _THING_TAG_TABLE.c.bgg_id == bgg_id, _THING_TAG_TABLE.c.tag_id.in_(stale_tag_ids)
+            ))
+        insert_ignoring_conflicts(
+            db, _THING_TAG_TABLE,
+            [{"bgg_id": bgg_id, "tag_id": tag_id} for bgg_id, tag_id in pairs],
+            index_elements=["bgg_id", "tag_id"],
+        )
+
+    @staticmethod
+    def version(db: Session, user_id: int) -> Tuple:
+        """
+        Versão da coleção do usuário e das tags gravadas
+
+        As contagens de ligações e de tags por item mudam quando uma linha que
+        não é a mais recente é apagada (ligação desfeita, tag removida), o que
+        os máximos não percebem.
+        """
+        items = db.execute(
+            select(func.count(CollectionItem.id), func.max(CollectionItem.id), func.max(CollectionItem.updated_at))
+            .where(CollectionItem.user_id == user_id)
+        ).one()
+        things = db.execute(select(
+            select(func.max(BggThingLinks.fetched_at)).scalar_subquery(),
+            select(func.max(CatalogMatch.id)).scalar_subquery(),
+            select(func.count(CatalogMatch.id)).scalar_subquery(),
+            select(func.count()).select_from(BggThingTag).scalar_subquery(),
+        )).one()
+        return tuple(str(value) for value in (*items, *things))
+
+    @staticmethod
+    def build(db: Session, user_id: int) -> _TagIndex:
+        """Monta o índice de bitsets da coleção do usuário"""
+        linked = aliased(CatalogGame)
+        bgg_id = func.coalesce(CatalogGame.bgg_id, linked.bgg_id)
+        rows = db.execute(
+            select(CollectionItem.id, BggThingTag.tag_id)
+            .join(CatalogGame, CollectionItem.catalog_id == CatalogGame.id)
+            .outerjoin(CatalogMatch, CatalogMatch.ludopedia_catalog_id == CatalogGame.id)
+            .outerjoin(linked, linked.id == CatalogMatch.bgg_catalog_id)
+            .outerjoin(BggThingTag, BggThingTag.bgg_id == bgg_id)
+            .where(CollectionItem.user_id == user_id)
+            .order_by(CollectionItem.id)
+        ).all()
+
+        item_ids: List[int] = []
+        ordinals: Dict[int, List[int]] = {}
+        for item_id, tag_id in rows:
+            if not item_ids or item_ids[-1] != item_id:
+                item_ids.append(item_id)
+            if tag_id is not None:
+                ordinals.setdefault(tag_id, []).append(len(item_ids) - 1)
+
+        # Bitset de cada tag montado de uma vez a partir de um vetor de bits
+        bitsets: Dict[int, int] = {}
+        for tag_id, positions in ordinals.items():
+            bits = np.zeros(len(item_ids), dtype=bool)
+            bits[positions] = True
+            bitsets[tag_id] = int.from_bytes(np.packbits(bits, bitorder="little").tobytes(), "little")
+
+        tags: Dict[int, Dict[str, Any]] = {}
+        tag_ids = list(bitsets)
+        for start in range(0, len(tag_ids), _IN_CHUNK):
+            for tag in db.execute(select(Tag).where(Tag.id.in_(tag_ids[start:start + _IN_CHUNK]))).scalars():
+                tags[tag.id] = {"id": tag.id, "kind": tag.kind, "name": tag.name, "slug": tag.slug}
+        by_slug: Dict[str, List[int]] = {}
+        for tag in tags.values():
+            by_slug.setdefault(tag["slug"], []).append(tag["id"])
+        return _TagIndex(item_ids=item_ids, bitsets=bitsets, tags=tags, by_slug=by_slug)
+
+    def get_index(self, db: Session, user_id: int) -> _TagIndex:
+        """Índice da coleção, do cache quando a versão não mudou"""
+        key = (user_id, self.version(db, user_id))
+        with self._lock:
+            index = self._cache.get(key)
+            if index is not None:
+                self._cache.move_to_end(key)
+        record_cache("tag_index", index is not None)
+        if index is not None:
+            return index
+
+        index = self.build(db, user_id)
+        with self._lock:
+            self._cache[key] = index
+            while len(self._cache) > settings.TAG_INDEX_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        logger.debug(
+            "Índice de tags montado",
+            extra={"user_id": user_id, "games": len(index.item_ids), "tags": len(index.bitsets)},
+        )
+        return index
+
+    @staticmethod
+    def _resolver(db: Session, index: _TagIndex):
+        """Converte um termo da consulta no bitset dos itens que o têm"""
+        def resolve(term: Optional[str]) -> int:
+            if term is None:
+                return index.everything
+            kind = None
+            prefix, sep, slug = term.lower().partition(":")
+            if sep and prefix in KIND_PREFIXES:
+                kind = KIND_PREFIXES[prefix]
+            else:
+                slug = term.lower()
+
+            tag_ids = [
+                tag_id for tag_id in index.by_slug.get(slug, [])
+                if kind is None or index.tags[tag_id]["kind"] == kind
+            ]
+            if not tag_ids:
+                # Tag existente que ninguém da coleção tem: conjunto vazio; inexistente: erro
+                stmt = select(Tag.id).where(Tag.slug == slug)
+                if kind is not None:
+                    stmt = stmt.where(Tag.kind == kind)
+                if db.execute(stmt.limit(1)).first() is None:
+                    raise TagQueryError(f"Tag desconhecida: {term}")
+                return 0
+            bits = 0
+            for tag_id in tag_ids:
+                bits |= index.bitsets[tag_id]
+            return bits
+        return resolve
+
+    def query(
+        self, db: Session, user_id: int, query: Optional[str] = None, kind: Optional[TagKind] = None,
+    ) -> Dict[str, Any]:
+        """
+        Filtra a coleção por uma expressão de tags e conta cada tag sob o filtro
+
+        Args:
+            query: Ex.: "cooperative-game AND deck-bag-and-pool-building AND NOT dice-rolling";
+                sem consulta, considera a coleção inteira
+            kind: Restringe as contagens a um tipo de tag
+
+        Returns:
+            {"total_games", "matching", "item_ids", "facets": [{"id", "kind", "name", "slug", "count"}]}
+
+        Raises:
+            TagQueryError: consulta inválida ou tag inexistente
+        """
+        index = self.get_index(db, user_id)
+        bits = _Parser(query, self._resolver(db, index)).parse() if query else index.everything
+
+        facets = []
+        for tag_id, tag_bits in index.bitsets.items():
+            tag = index.tags[tag_id]
+            if kind is not None and tag["kind"] != kind:
+                continue
+            count = (tag_bits & bits).bit_count()
+            if count:
+                facets.append({**tag, "count": count})
+        facets.sort(key=lambda facet: (-facet["count"], facet["name"]))
+
+        return {
+            "total_games": len(index.item_ids),
+            "matching": bits.bit_count(),
+            "item_ids": index.items(bits),
+            "facets": facets,
+        }
+
+    def filter_items(self, db: Session, user_id: int, query: str) -> set:
+        """IDs dos itens da coleção que satisfazem a consulta"""
+        index = self.get_index(db, user_id)
+        return set(index.items(_Parser(query, self._resolver(db, index)).parse()))
+
+
+# Instância global do serviço
+game_tags = GameTagService()
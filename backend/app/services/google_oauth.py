@@ -0,0 +1,197 @@
+import asyncio
+import logging
+import re
+import secrets
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import urlencode
+
+import httpx
+from jose import jwt
+
+from app.config import settings
+from app.core.metrics import InstrumentedTransport, record_cache
+
+logger = logging.getLogger(__name__)
+
+_MAX_AGE = re.compile(r"max-age=(\d+)")
+
+
+class GoogleAuthError(Exception):
+    """Falha na troca do código ou na validação do id_token do Google"""
+
+
+class _CertificateCache:
+    """
+    Chaves públicas do Google (JWKS) em memória, pela validade do Cache-Control
+
+    Perto do vencimento (GOOGLE_CERTS_REFRESH_MARGIN da validade) as chaves
+    são renovadas em segundo plano e as atuais continuam servindo; só a
+    primeira busca, uma chave vencida ou um kid desconhecido (rotação) fazem
+    o login esperar. Buscas simultâneas são agrupadas em uma.
+    """
+
+    def __init__(self, client: httpx.AsyncClient):
+        self.client = client
+        self._keys: Dict[str, Dict[str, Any]] = {}
+        self._expires_at = 0.0
+        self._refresh_at = 0.0
+        self._fetched_at = 0.0
+        self._lock = asyncio.Lock()
+        self._background: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _max_age(response: httpx.Response) -> float:
+        match = _MAX_AGE.search(response.headers.get("Cache-Control", ""))
+        if match is None:
+            return float(settings.GOOGLE_CERTS_DEFAULT_MAX_AGE)
+        try:
+            age = float(response.headers.get("Age", 0))
+        except ValueError:
+            age = 0.0
+        return max(float(match.group(1)) - age, 0.0)
+
+    async def _fetch(self, seen: float) -> None:
+        """Busca as chaves, a menos que outra corrotina já tenha buscado depois de `seen`"""
+        async with self._lock:
+            if self._fetched_at != seen:
+                return
+            response = await self.client.get(GoogleOAuthService.CERTS_URI)
+            response.raise_for_status()
+            keys = {key["kid"]: key for key in response.json().get("keys", [])}
+            max_age = self._max_age(response)
+            now = time.monotonic()
+            self._keys = keys
+            self._fetched_at = now
+            self._expires_at = now + max_age
+            self._refresh_at = now + max_age * (1 - settings.GOOGLE_CERTS_REFRESH_MARGIN)
+            logger.debug("Chaves do Google atualizadas", extra={"keys": len(keys), "max_age": max_age})
+
+    async def _fetch_in_background(self) -> None:
+        try:
+            await self._fetch(self._fetched_at)
+        except Exception as e:
+            # As chaves atuais seguem válidas até expires_at
+            logger.warning("Erro ao renovar as chaves do Google: %s", e)
+
+    def _schedule_refresh(self) -> None:
+        if self._background is None or self._background.done():
+            self._background = asyncio.create_task(self._fetch_in_background())
+
+    async def warm(self) -> None:
+        """Busca as chaves antes do primeiro login"""
+        await self._fetch_in_background()
+
+    async def get(self, kid: str) -> Dict[str, Any]:
+        """Chave pública (JWK) de um kid"""
+        now = time.monotonic()
+        if now >= self._expires_at:
+            record_cache("google_certs", False)
+            await self._fetch(self._fetched_at)
+        elif kid not in self._keys:
+            record_cache("google_certs", False)
+            # Rotação: no máximo uma busca extra por GOOGLE_CERTS_MIN_REFETCH_SECONDS
+            if now - self._fetched_at >= settings.GOOGLE_CERTS_MIN_REFETCH_SECONDS:
+                await self._fetch(self._fetched_at)
+        else:
+            record_cache("google_certs", True)
+            if now >= self._refresh_at:
+                self._schedule_refresh()
+
+        key = self._keys.get(kid)
+        if key is None:
+            raise GoogleAuthError(f"Chave desconhecida no id_token: {kid}")
+        return key
+
+
+class GoogleOAuthService:
+    """
+    Login com Google (OAuth 2.0 / OpenID Connect) sem bloquear o event loop.
+
+    A configuração do cliente é montada uma vez; a troca do código e a
+    busca das chaves usam um cliente httpx assíncrono compartilhado, e o
+    id_token é validado localmente (assinatura RS256, audiência, emissor e
+    at_hash) com as chaves em cache.
+    """
+
+    AUTH_URI = "https://accounts.google.com/o/oauth2/auth"
+    TOKEN_URI = "https://oauth2.googleapis.com/token"
+    CERTS_URI = "https://www.googleapis.com/oauth2/v3/certs"
+    ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+    SCOPES = (
+        "openid",
+        "https://www.googleapis.com/auth/userinfo.email",
+        "https://www.googleapis.com/auth/userinfo.profile",
+    )
+
+    def __init__(self):
+        self.client = httpx.AsyncClient(timeout=10.0, transport=InstrumentedTransport("google"))
+        self.certificates = _CertificateCache(self.client)
+        self._authorization_params = {
+            "response_type": "code",
+            "client_id": settings.GOOGLE_CLIENT_ID,
+            "redirect_uri": settings.GOOGLE_REDIRECT_URI,
+            "scope": " ".join(self.SCOPES),
+            "access_type": "offline",
+            "include_granted_scopes": "true",
+        }
+
+    @property
+    def configured(self) -> bool:
+        return bool(settings.GOOGLE_CLIENT_ID and settings.GOOGLE_CLIENT_SECRET)
+
+    def authorization_url(self) -> str:
+        """URL de consentimento do Google (com state aleatório)"""
+        params = {**self._authorization_params, "state": secrets.token_urlsafe(24)}
+        return f"{self.AUTH_URI}?{urlencode(params)}"
+
+    async def exchange_code(self, code: str) -> Dict[str, Any]:
+        """
+        Troca o código de autorização pelos tokens
+
+        Returns:
+            Resposta do endpoint de token (id_token, access_token, ...)
+        """
+        response = await self.client.post(self.TOKEN_URI, data={
+            "grant_type": "authorization_code",
+            "code": code,
+            "client_id": settings.GOOGLE_CLIENT_ID,
+            "client_secret": settings.GOOGLE_CLIENT_SECRET,
+            "redirect_uri": settings.GOOGLE_REDIRECT_URI,
+        })
+        if response.status_code != 200:
+            raise GoogleAuthError(f"Troca do código recusada pelo Google ({response.status_code})")
+        tokens = response.json()
+        if "id_token" not in tokens:
+            raise GoogleAuthError("Resposta do Google sem id_token")
+        return tokens
+
+    async def verify_id_token(self, token: str, access_token: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Valida o id_token e retorna as claims (sub, email, name, picture...)
+
+        Raises:
+            GoogleAuthError: assinatura, audiência, emissor ou validade inválidos
+        """
+        try:
+            header = jwt.get_unverified_header(token)
+            key = await self.certificates.get(header.get("kid"))
+            claims = jwt.decode(
+                token, key, algorithms=["RS256"], audience=settings.GOOGLE_CLIENT_ID, access_token=access_token,
+            )
+        except GoogleAuthError:
+            raise
+        except Exception as e:
+            raise GoogleAuthError(f"id_token inválido: {e}") from e
+        if claims.get("iss") not in self.ISSUERS:
+            raise GoogleAuthError("Emissor do id_token inválido")
+        return claims
+
+    async def authenticate(self, code: str) -> Dict[str, Any]:
+        """Troca o código e valida o id_token; retorna as claims do usuário"""
+        tokens = await self.exchange_code(code)
+        return await self.verify_id_token(tokens["id_token"], tokens.get("access_token"))
+
+
+# Instância global do serviço
+google_oauth = GoogleOAuthService()
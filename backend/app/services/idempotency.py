@@ -0,0 +1,211 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+# Estados de um registro
+IN_PROGRESS = "in_progress"
+COMPLETED = "completed"
+
+
+class MemoryIdempotencyStore:
+    """
+    Registros de idempotência dentro do processo.
+
+    Quem espera por um registro em andamento é acordado por um asyncio.Event
+    assim que ele é concluído ou liberado. Serve apenas um worker.
+    """
+
+    # Número máximo de registros em memória (os mais antigos saem primeiro)
+    MAX_RECORDS = 10000
+
+    def __init__(self):
+        self._records: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self._events: Dict[str, asyncio.Event] = {}
+
+    def _get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._records.get(key)
+        if entry is None:
+            return None
+        expires_at, record = entry
+        if expires_at < time.monotonic():
+            del self._records[key]
+            return None
+        return record
+
+    def _wake(self, key: str) -> None:
+        event = self._events.pop(key, None)
+        if event is not None:
+            event.set()
+
+    async def reserve(self, key: str, record: Dict[str, Any], ttl: float) -> Optional[Dict[str, Any]]:
+        existing = self._get(key)
+        if existing is not None:
+            return existing
+        if len(self._records) >= self.MAX_RECORDS:
+            del self._records[next(iter(self._records))]
+        self._records[key] = (time.monotonic() + ttl, record)
+        return None
+
+    async def put(self, key: str, record: Dict[str, Any], ttl: float) -> None:
+        self._records.pop(key, None)
+        self._records[key] = (time.monotonic() + ttl, record)
+        self._wake(key)
+
+    async def renew(self, key: str, record: Dict[str, Any], ttl: float) -> bool:
+        if self._get(key) != record:
+            return False
+        self._records[key] = (time.monotonic() + ttl, record)
+        return True
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self._get(key)
+
+    async def delete(self, key: str) -> None:
+        self._records.pop(key, None)
+        self._wake(key)
+
+    async def wait(self, key: str, timeout: float) -> Optional[Dict[str, Any]]:
+        record = self._get(key)
+        if record is None or record["state"] != IN_PROGRESS:
+            return record
+        event = self._events.setdefault(key, asyncio.Event())
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self._get(key)
+
+
+class RedisIdempotencyStore:
+    """
+    Registros de idempotência no Redis, compartilhados entre workers.
+
+    A reserva usa SET NX, e quem espera consulta o registro periodicamente
+    até ele sair do estado em andamento.
+    """
+
+    POLL_SECONDS = 0.25
+
+    # Estende a validade só se a chave ainda guarda a mesma reserva
+    _RENEW_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+    def __init__(self, redis_url: str):
+        import redis.asyncio as aioredis
+
+        self._redis = aioredis.Redis.from_url(redis_url)
+        self._renew = self._redis.register_script(self._RENEW_LUA)
+
+    async def reserve(self, key: str, record: Dict[str, Any], ttl: float) -> Optional[Dict[str, Any]]:
+        if await self._redis.set(key, json.dumps(record), nx=True, px=int(ttl * 1000)):
+            return None
+        existing = await self.get(key)
+        if existing is None:
+            # Expirou entre o SET e o GET: tenta de novo uma única vez
+            if await self._redis.set(key, json.dumps(record), nx=True, px=int(ttl * 1000)):
+                return None
+            return await self.get(key)
+        return existing
+
+    async def put(self, key: str, record: Dict[str, Any], ttl: float) -> None:
+        await self._redis.set(key, json.dumps(record), px=int(ttl * 1000))
+
+    async def renew(self, key: str, record: Dict[str, Any], ttl: float) -> bool:
+        return bool(await self._renew(keys=[key], args=[json.dumps(record), int(ttl * 1000)]))
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        raw = await self._redis.get(key)
+        return json.loads(raw) if raw is not None else None
+
+    async def delete(self, key: str) -> None:
+        await self._redis.delete(key)
+
+    async def wait(self, key: str, timeout: float) -> Optional[Dict[str, Any]]:
+        deadline = time.monotonic() + timeout
+        while True:
+            record = await self.get(key)
+            if record is None or record["state"] != IN_PROGRESS or time.monotonic() >= deadline:
+                return record
+            await asyncio.sleep(self.POLL_SECONDS)
+
+
+class IdempotencyService:
+    """
+    Guarda respostas de requisições repetidas e coordena requisições concorrentes.
+
+    Com IDEMPOTENCY_BACKEND=redis os registros valem para todos os workers;
+    se o Redis ficar indisponível, as operações caem para a memória do
+    processo (a proteção continua valendo dentro do mesmo worker).
+    """
+
+    def __init__(self):
+        self._store = None
+        self._memory = MemoryIdempotencyStore()
+
+    @property
+    def store(self):
+        if self._store is None:
+            if settings.IDEMPOTENCY_BACKEND == "redis":
+                self._store = RedisIdempotencyStore(settings.REDIS_URL)
+            else:
+                self._store = self._memory
+        return self._store
+
+    async def _call(self, method: str, *args: Any) -> Any:
+        store = self.store
+        if store is self._memory:
+            return await getattr(store, method)(*args)
+        try:
+            return await getattr(store, method)(*args)
+        except Exception as e:
+            logger.warning("Redis indisponível para idempotência, usando memória: %s", e)
+            return await getattr(self._memory, method)(*args)
+
+    async def reserve(self, key: str, fingerprint: str, ttl: float) -> Optional[Dict[str, Any]]:
+        """
+        Marca a chave como em andamento se ela ainda não existir
+
+        Returns:
+            None se a reserva foi feita; senão o registro existente
+        """
+        return await self._call("reserve", key, {"state": IN_PROGRESS, "fingerprint": fingerprint}, ttl)
+
+    async def renew(self, key: str, fingerprint: str, ttl: float) -> bool:
+        """
+        Estende a reserva em andamento (lease) enquanto a requisição roda
+
+        Returns:
+            False se a chave já não guarda esta reserva
+        """
+        return await self._call("renew", key, {"state": IN_PROGRESS, "fingerprint": fingerprint}, ttl)
+
+    async def complete(self, key: str, fingerprint: str, response: Dict[str, Any], ttl: float) -> None:
+        """Guarda a resposta final (status, headers e corpo) da chave"""
+        record = {"state": COMPLETED, "fingerprint": fingerprint, "response": response}
+        await self._call("put", key, record, ttl)
+
+    async def release(self, key: str) -> None:
+        """Libera a chave sem resposta (falhas podem ser repetidas)"""
+        await self._call("delete", key)
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return await self._call("get", key)
+
+    async def wait(self, key: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """Espera a chave sair do estado em andamento e retorna o registro (ou None)"""
+        return await self._call("wait", key, timeout)
+
+
+# Instância global do serviço
+idempotency = IdempotencyService()
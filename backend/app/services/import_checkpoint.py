@@ -0,0 +1,286 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models import ImportJob, ImportJobChunk, ImportStatus
+from app.services.import_events import import_events
+
+_JOBS_TABLE = ImportJob.__table__
+_CHUNKS_TABLE = ImportJobChunk.__table__
+
+
+class ImportCheckpoint:
+    """
+    Checkpoint de uma importação em andamento.
+
+    Guarda a página atual, os IDs externos já processados e os registros
+    obtidos até agora, para que uma nova tentativa continue de onde parou.
+    Cada salvamento grava só os jogos novos desde o anterior (um trecho em
+    import_job_chunks) e a página atual, fora do event loop e numa sessão
+    própria. Cada avanço também é publicado como evento de progresso.
+    """
+
+    # Salva o progresso a cada N jogos processados dentro de uma página
+    SAVE_EVERY = 25
+
+    def __init__(self, job: ImportJob, chunks: List[ImportJobChunk]):
+        self.job_id = job.id
+        self._page = job.page
+        self._status = job.status
+        # Importações salvas antes dos trechos guardavam tudo na própria linha
+        self._results: List[Dict[str, Any]] = list(job.results or [])
+        self._processed_ids = set(job.processed_ids or [])
+        for chunk in chunks:
+            self._results.extend(chunk.results or [])
+            self._processed_ids.update(chunk.processed_ids or [])
+        self._pending_ids: List[Any] = []
+        self._pending_results: List[Dict[str, Any]] = []
+        self._total: Optional[int] = None
+        self._started_at = time.monotonic()
+        self._processed_this_run = 0
+
+    @property
+    def id(self) -> int:
+        return self.job_id
+
+    @property
+    def page(self) -> int:
+        return self._page
+
+    @property
+    def results(self) -> List[Dict[str, Any]]:
+        return list(self._results)
+
+    @property
+    def resumed(self) -> bool:
+        """Indica se o checkpoint já tinha progresso salvo"""
+        return self._page > 1 or bool(self._results)
+
+    @property
+    def failed(self) -> bool:
+        return self._status == ImportStatus.FAILED
+
+    @property
+    def finished(self) -> bool:
+        """Indica se a importação já terminou (concluída ou interrompida)"""
+        return self._status in (ImportStatus.COMPLETED, ImportStatus.FAILED)
+
+    @property
+    def fetched(self) -> bool:
+        """Indica se todos os dados já foram obtidos do provedor"""
+        return self._status == ImportStatus.FETCHED
+
+    @property
+    def processed(self) -> int:
+        return len(self._processed_ids)
+
+    def set_total(self, total: Optional[int]) -> None:
+        """Informa o total de jogos esperado, usado no cálculo do ETA"""
+        if total:
+            self._total = int(total)
+
+    def eta_seconds(self) -> Optional[float]:
+        """Estimativa de tempo restante com base no ritmo desta execução"""
+        if not self._total or not self._processed_this_run:
+            return None
+        elapsed = time.monotonic() - self._started_at
+        remaining = max(self._total - self.processed, 0)
+        return round(elapsed / self._processed_this_run * remaining, 1)
+
+    def publish(self, event: str, **data: Any) -> None:
+        """Publica um evento de progresso desta importação"""
+        import_events.publish(self.job_id, event, **data)
+
+    def is_processed(self, external_id: Any) -> bool:
+        """Verifica se o jogo já foi processado em uma tentativa anterior"""
+        return external_id in self._processed_ids
+
+    def _record(self, external_id: Any, record: Optional[Dict[str, Any]]) -> None:
+        if external_id not in self._processed_ids:
+            self._processed_ids.add(external_id)
+            self._pending_ids.append(external_id)
+        if record is not None:
+            self._results.append(record)
+            self._pending_results.append(record)
+
+    async def add(self, external_id: Any, record: Optional[Dict[str, Any]] = None) -> None:
+        """Registra um jogo processado, salvando a cada SAVE_EVERY jogos"""
+        self._record(external_id, record)
+        self._processed_this_run += 1
+
+        self.publish(
+            "game",
+            external_id=external_id,
+            name=record.get("name") if record else None,
+            processed=self.processed,
+            total=self._total,
+            eta_seconds=self.eta_seconds(),
+        )
+
+        if len(self._pending_ids) + len(self._pending_results) >= self.SAVE_EVERY:
+            await self.save()
+
+    async def add_many(self, records: List[Dict[str, Any]], id_key: str) -> None:
+        """Registra vários jogos processados de uma só vez"""
+        for record in records:
+            self._record(record.get(id_key), record)
+        self._processed_this_run += len(records)
+        await self.save()
+        self.publish("page", page=self._page, games=len(records), processed=self.processed, total=self._total)
+
+    async def advance_page(self, page: int, games: int = 0) -> None:
+        """Marca a página como concluída e salva o checkpoint"""
+        self._page = page + 1
+        await self.save()
+        self.publish(
+            "page",
+            page=page,
+            games=games,
+            processed=self.processed,
+            total=self._total,
+            eta_seconds=self.eta_seconds(),
+        )
+
+    def batch_committed(self, imported: int, batch_size: int) -> None:
+        """Publica o progresso da gravação de um lote no banco"""
+        self.publish("batch", imported=imported, batch_size=batch_size)
+
+    def _write(self, values: Dict[str, Any], chunk: Optional[Dict[str, Any]], clear_results: bool) -> None:
+        db = SessionLocal()
+        try:
+            if chunk is not None:
+                db.execute(insert(_CHUNKS_TABLE), [chunk])
+            if clear_results:
+                db.execute(update(_CHUNKS_TABLE).where(_CHUNKS_TABLE.c.job_id == self.job_id).values(results=[]))
+            db.execute(update(_JOBS_TABLE).where(_JOBS_TABLE.c.id == self.job_id).values(**values))
+            db.commit()
+        finally:
+            db.close()
+
+    async def _persist(self, clear_results: bool = False, **values: Any) -> None:
+        """Grava o trecho pendente e os campos da importação numa thread, com sessão própria"""
+        chunk = None
+        if self._pending_ids or self._pending_results:
+            chunk = {
+                "job_id": self.job_id,
+                "processed_ids": self._pending_ids,
+                "results": self._pending_results,
+                "processed_count": len(self._pending_ids),
+            }
+            self._pending_ids, self._pending_results = [], []
+        await asyncio.to_thread(self._write, {"page": self._page, **values}, chunk, clear_results)
+
+    async def save(self) -> None:
+        """Persiste o progresso atual (só os jogos novos desde o último salvamento)"""
+        self._status = ImportStatus.RUNNING
+        await self._persist(status=ImportStatus.RUNNING)
+
+    async def mark_fetched(self) -> None:
+        """Marca o fim da busca no provedor; novas tentativas só refazem a gravação"""
+        self._status = ImportStatus.FETCHED
+        await self._persist(status=ImportStatus.FETCHED)
+        self.publish("fetched", processed=self.processed)
+
+    async def fail(self, error: str) -> None:
+        """Marca a importação como interrompida, mantendo o progresso para retomada"""
+        self._status = ImportStatus.FAILED
+        await self._persist(status=ImportStatus.FAILED, error=error)
+        self.publish("failed", error=error, page=self._page, processed=self.processed)
+
+    async def complete(self, imported_count: int = 0) -> None:
+        """Finaliza a importação e descarta os registros intermediários"""
+        self._status = ImportStatus.COMPLETED
+        await self._persist(
+            clear_results=True,
+            status=ImportStatus.COMPLETED, imported_count=imported_count, results=[], error=None,
+        )
+        self.publish("completed", imported_count=imported_count, processed=self.processed)
+
+
+class ImportCheckpointStore:
+    """Cria ou retoma checkpoints de importação no banco de dados"""
+
+    def open(
+        self,
+        db: Session,
+        user_id: int,
+        provider: str,
+        source: Optional[str] = None,
+    ) -> ImportCheckpoint:
+        """
+        Retoma a última importação não concluída ou inicia uma nova
+
+        Args:
+            db: Sessão do banco de dados
+            user_id: ID do usuário
+            provider: Provedor de origem ("bgg" ou "ludopedia")
+            source: Usuário no provedor (quando aplicável)
+
+        Returns:
+            Checkpoint da importação
+        """
+        cutoff = datetime.now(timezone.utc) - timedelta(hours=settings.IMPORT_CHECKPOINT_TTL_HOURS)
+
+        job = db.query(ImportJob).filter(
+            ImportJob.user_id == user_id,
+            ImportJob.provider == provider,
+            ImportJob.source == source,
+            ImportJob.status != ImportStatus.COMPLETED,
+        ).order_by(ImportJob.id.desc()).first()
+
+        if job is not None and self._last_activity(job) < cutoff:
+            job.status = ImportStatus.FAILED
+            job.error = "Checkpoint expirado"
+            job.results = []
+            db.execute(update(_CHUNKS_TABLE).where(_CHUNKS_TABLE.c.job_id == job.id).values(results=[]))
+            job = None
+
+        chunks: List[ImportJobChunk] = []
+        if job is None:
+            job = ImportJob(
+                user_id=user_id,
+                provider=provider,
+                source=source,
+                status=ImportStatus.RUNNING,
+                page=1,
+                processed_ids=[],
+                results=[],
+            )
+            db.add(job)
+        else:
+            chunks = db.query(ImportJobChunk).filter(ImportJobChunk.job_id == job.id).order_by(ImportJobChunk.id).all()
+
+        db.commit()
+        return ImportCheckpoint(job, chunks)
+
+    @staticmethod
+    def processed_counts(db: Session, jobs: Iterable[ImportJob]) -> Dict[int, int]:
+        """Jogos processados por importação (trechos + IDs guardados na própria linha)"""
+        jobs = list(jobs)
+        counts = {job.id: len(job.processed_ids or []) for job in jobs}
+        if counts:
+            rows = db.execute(
+                select(ImportJobChunk.job_id, func.sum(ImportJobChunk.processed_count))
+                .where(ImportJobChunk.job_id.in_(list(counts)))
+                .group_by(ImportJobChunk.job_id)
+            )
+            for job_id, processed in rows:
+                counts[job_id] += int(processed or 0)
+        return counts
+
+    @staticmethod
+    def _last_activity(job: ImportJob) -> datetime:
+        last = job.updated_at or job.created_at
+        if last.tzinfo is None:
+            last = last.replace(tzinfo=timezone.utc)
+        return last
+
+
+# Instância global do serviço
+import_checkpoints = ImportCheckpointStore()
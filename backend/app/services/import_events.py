@@ -0,0 +1,266 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from queue import Full, Queue
+from typing import Any, AsyncIterator, Deque, Dict, Optional, Set, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+# Eventos que encerram o stream de uma importação
+TERMINAL_EVENTS = ("completed", "failed")
+
+
+class ImportEvent:
+    """Evento de progresso de uma importação"""
+
+    __slots__ = ("id", "event", "data")
+
+    def __init__(self, id: int, event: str, data: Dict[str, Any]):
+        self.id = id
+        self.event = event
+        self.data = data
+
+    def to_json(self) -> str:
+        return json.dumps({"id": self.id, "event": self.event, "data": self.data})
+
+    @classmethod
+    def from_json(cls, raw: str) -> "ImportEvent":
+        payload = json.loads(raw)
+        return cls(payload["id"], payload["event"], payload["data"])
+
+    def to_sse(self) -> str:
+        """Formata o evento no formato Server-Sent Events"""
+        return f"id: {self.id}\nevent: {self.event}\ndata: {json.dumps(self.data)}\n\n"
+
+
+class MemoryImportEventBroker:
+    """
+    Distribui eventos de importação dentro do processo.
+
+    Mantém um histórico limitado por importação para permitir reconexão
+    com Last-Event-ID. Serve apenas streams atendidos pelo mesmo worker.
+    """
+
+    # Número máximo de importações com histórico em memória
+    MAX_IMPORTS = 1000
+
+    def __init__(self, history_size: int):
+        self.history_size = history_size
+        self._history: "OrderedDict[int, Deque[ImportEvent]]" = OrderedDict()
+        self._subscribers: Dict[int, Set[asyncio.Queue]] = {}
+
+    def publish(self, import_id: int, event: str, data: Dict[str, Any]) -> ImportEvent:
+        history = self._history.get(import_id)
+        if history is None:
+            history = self._history[import_id] = deque(maxlen=self.history_size)
+            while len(self._history) > self.MAX_IMPORTS:
+                self._history.popitem(last=False)
+        else:
+            self._history.move_to_end(import_id)
+
+        item = ImportEvent(history[-1].id + 1 if history else 1, event, data)
+        history.append(item)
+        for queue in self._subscribers.get(import_id, ()):
+            queue.put_nowait(item)
+        return item
+
+    async def subscribe(self, import_id: int, last_event_id: int = 0) -> AsyncIterator[Optional[ImportEvent]]:
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(import_id, set()).add(queue)
+        try:
+            sent = last_event_id
+            for item in list(self._history.get(import_id, ())):
+                if item.id > sent:
+                    sent = item.id
+                    yield item
+
+            while True:
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout=settings.IMPORT_EVENTS_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                if item.id > sent:
+                    sent = item.id
+                    yield item
+        finally:
+            subscribers = self._subscribers.get(import_id)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._subscribers[import_id]
+
+
+class RedisImportEventBroker:
+    """
+    Distribui eventos de importação via Redis pub/sub.
+
+    O histórico fica em uma lista no Redis, então qualquer worker pode
+    servir o stream e retomar a partir do Last-Event-ID.
+
+    A publicação não espera o Redis: os eventos entram numa fila limitada
+    e uma thread os grava (um script por evento, com timeout). Com o Redis
+    fora do ar, ou a fila cheia, os eventos são descartados por
+    IMPORT_EVENTS_REDIS_RETRY_SECONDS; o progresso continua salvo no
+    checkpoint e aparece no snapshot da reconexão.
+    """
+
+    KEY_TTL_SECONDS = 24 * 60 * 60
+    # Eventos aguardando gravação antes de começar a descartar
+    MAX_PENDING = 10000
+
+    # Numera, guarda no histórico e publica o evento numa só ida ao Redis.
+    # KEYS: sequência, histórico, canal; ARGV: JSON do evento sem o id,
+    # tamanho do histórico e TTL das chaves.
+    _PUBLISH_LUA = """
+local seq = redis.call('INCR', KEYS[1])
+local raw = '{"id": ' .. seq .. ', ' .. ARGV[1]
+redis.call('RPUSH', KEYS[2], raw)
+redis.call('LTRIM', KEYS[2], -tonumber(ARGV[2]), -1)
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+redis.call('PUBLISH', KEYS[3], raw)
+return seq
+"""
+
+    def __init__(self, redis_url: str, history_size: int):
+        import redis
+        import redis.asyncio as aioredis
+
+        timeout = settings.IMPORT_EVENTS_REDIS_TIMEOUT_SECONDS
+        self.history_size = history_size
+        self._redis = redis.Redis.from_url(redis_url, socket_timeout=timeout, socket_connect_timeout=timeout)
+        self._aioredis = aioredis.Redis.from_url(redis_url, socket_connect_timeout=timeout)
+        self._script = self._redis.register_script(self._PUBLISH_LUA)
+        self._pending: "Queue[Tuple[int, str]]" = Queue(self.MAX_PENDING)
+        self._writer: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
+        self._down_until = 0.0
+
+    @staticmethod
+    def _channel(import_id: int) -> str:
+        return f"import:{import_id}:events"
+
+    def publish(self, import_id: int, event: str, data: Dict[str, Any]) -> None:
+        if time.monotonic() < self._down_until:
+            return
+        if self._writer is None:
+            self._start_writer()
+        # O id é atribuído pelo Redis; o restante do JSON já vai pronto
+        tail = json.dumps({"event": event, "data": data})[1:]
+        try:
+            self._pending.put_nowait((import_id, tail))
+        except Full:
+            self._pause("fila de eventos cheia")
+
+    def _start_writer(self) -> None:
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="import-events", daemon=True)
+                self._writer.start()
+
+    def _write_loop(self) -> None:
+        while True:
+            import_id, tail = self._pending.get()
+            if time.monotonic() < self._down_until:
+                continue
+            channel = self._channel(import_id)
+            try:
+                self._script(
+                    keys=[f"{channel}:seq", f"{channel}:history", channel],
+                    args=[tail, self.history_size, self.KEY_TTL_SECONDS],
+                )
+            except Exception as e:
+                self._pause(str(e))
+
+    def _pause(self, reason: str) -> None:
+        """Descarta eventos por um intervalo, para não pagar um timeout a cada um"""
+        logger.warning("Redis indisponível para eventos de importação, descartando eventos: %s", reason)
+        self._down_until = time.monotonic() + settings.IMPORT_EVENTS_REDIS_RETRY_SECONDS
+
+    async def subscribe(self, import_id: int, last_event_id: int = 0) -> AsyncIterator[Optional[ImportEvent]]:
+        channel = self._channel(import_id)
+        pubsub = self._aioredis.pubsub()
+        # Inscreve antes de ler o histórico para não perder eventos no intervalo
+        await pubsub.subscribe(channel)
+        try:
+            sent = last_event_id
+            for raw in await self._aioredis.lrange(f"{channel}:history", 0, -1):
+                item = ImportEvent.from_json(raw)
+                if item.id > sent:
+                    sent = item.id
+                    yield item
+
+            while True:
+                message = await pubsub.get_message(
+                    ignore_subscribe_messages=True,
+                    timeout=settings.IMPORT_EVENTS_HEARTBEAT_SECONDS,
+                )
+                if message is None:
+                    yield None
+                    continue
+                item = ImportEvent.from_json(message["data"])
+                if item.id > sent:
+                    sent = item.id
+                    yield item
+        finally:
+            await pubsub.unsubscribe(channel)
+            await pubsub.close()
+
+
+class ImportEventService:
+    """Publica e assina eventos de progresso das importações"""
+
+    HISTORY_SIZE = 500
+
+    def __init__(self):
+        self._broker = None
+
+    @property
+    def broker(self):
+        if self._broker is None:
+            if settings.IMPORT_EVENTS_BACKEND == "redis":
+                self._broker = RedisImportEventBroker(settings.REDIS_URL, self.HISTORY_SIZE)
+            else:
+                self._broker = MemoryImportEventBroker(self.HISTORY_SIZE)
+        return self._broker
+
+    def publish(self, import_id: int, event: str, **data: Any) -> None:
+        """
+        Publica um evento de progresso
+
+        Args:
+            import_id: ID da importação (ImportJob)
+            event: Tipo do evento (page, game, fetched, batch, completed, failed)
+            **data: Dados do evento
+        """
+        try:
+            self.broker.publish(import_id, event, data)
+        except Exception as e:
+            # O progresso é informativo; nunca deve interromper a importação
+            logger.warning("Erro ao publicar evento da importação: %s", e, extra={"import_id": import_id})
+
+    async def stream(self, import_id: int, last_event_id: int = 0) -> AsyncIterator[Optional[ImportEvent]]:
+        """
+        Assina os eventos de uma importação
+
+        Args:
+            import_id: ID da importação (ImportJob)
+            last_event_id: Último evento recebido pelo cliente (reconexão)
+
+        Yields:
+            Eventos novos, ou None quando nenhum evento chega dentro do
+            intervalo de heartbeat
+        """
+        async for item in self.broker.subscribe(import_id, last_event_id):
+            yield item
+
+
+# Instância global do serviço
+import_events = ImportEventService()
@@ -0,0 +1,208 @@
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import CatalogGame, CollectionItem
+from app.services.catalog_service import catalog_service, insert_ignoring_conflicts, ITEM_FIELDS
+from app.services.entity_resolution import entity_resolver
+
+logger = logging.getLogger(__name__)
+
+_ITEM_TABLE = CollectionItem.__table__
+
+# Coluna de ID externo usada para deduplicação em cada provedor
+PROVIDER_ID_COLUMNS = {
+    "bgg": "bgg_id",
+    "ludopedia": "ludopedia_id",
+}
+
+
+@dataclass
+class ImportResult:
+    """Resultado de uma importação em lote"""
+    total_received: int = 0
+    imported_count: int = 0
+    skipped_invalid: int = 0
+    skipped_existing: int = 0
+    skipped_duplicate: int = 0
+    games: List[Dict[str, Any]] = field(default_factory=list)
+
+
+class ImportPipeline:
+    """
+    Pipeline único de importação em lote usado por todas as rotas de importação.
+
+    Carrega os IDs externos já existentes do usuário em uma única consulta,
+    deduplica em memória, resolve os títulos do catálogo compartilhado e
+    insere os itens novos em lotes com RETURNING, sem refresh por linha.
+    Cada lote é idempotente: itens que o usuário já possui são ignorados.
+    """
+
+    CHUNK_SIZE = 500
+
+    def __init__(self, chunk_size: Optional[int] = None):
+        self.chunk_size = chunk_size or self.CHUNK_SIZE
+
+    def load_existing_ids(self, db: Session, user_id: int, provider: str) -> Set[int]:
+        """
+        Busca os IDs externos que o usuário já possui na coleção
+
+        Inclui os IDs dos títulos ligados (catalog_matches) aos que o usuário
+        tem pelo outro provedor, para o mesmo jogo não entrar duas vezes.
+
+        Args:
+            db: Sessão do banco de dados
+            user_id: ID do usuário
+            provider: Provedor de origem ("bgg" ou "ludopedia")
+
+        Returns:
+            Conjunto de IDs externos já importados
+        """
+        id_column = getattr(CatalogGame, PROVIDER_ID_COLUMNS[provider])
+        rows = db.execute(
+            select(id_column)
+            .join(CollectionItem, CollectionItem.catalog_id == CatalogGame.id)
+            .where(CollectionItem.user_id == user_id, id_column.isnot(None))
+        )
+        return {row[0] for row in rows} | entity_resolver.counterpart_ids(db, user_id, provider)
+
+    def normalize(self, record: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Valida um registro do provedor
+
+        Returns:
+            Registro pronto para importação ou None se for inválido
+        """
+        name = record.get("name")
+        if not name or name.strip() == "":
+            return None
+        return record
+
+    def run(
+        self,
+        db: Session,
+        user_id: int,
+        records: Iterable[Dict[str, Any]],
+        provider: str,
+        existing_ids: Optional[Set[int]] = None,
+        on_batch: Optional[Callable[[int, int], None]] = None,
+        from_provider: bool = True,
+    ) -> ImportResult:
+        """
+        Importa um fluxo de registros normalizados para a coleção do usuário
+
+        Args:
+            db: Sessão do banco de dados
+            user_id: ID do usuário dono da coleção
+            records: Registros de jogos no formato dos serviços de provedor
+            provider: Provedor de origem ("bgg" ou "ludopedia")
+            existing_ids: IDs externos já conhecidos (evita a consulta inicial)
+            on_batch: Chamado após cada lote gravado com (total importado, tamanho do lote)
+            from_provider: False para dados digitados pelo usuário (planilhas),
+                que só reutilizam títulos compartilhados e nunca os criam
+
+        Returns:
+            Contagens da importação e as linhas inseridas
+        """
+        id_key = PROVIDER_ID_COLUMNS[provider]
+        if existing_ids is None:
+            existing_ids = self.load_existing_ids(db, user_id, provider)
+        seen: Set[int] = set()
+        result = ImportResult()
+        pending: List[Dict[str, Any]] = []
+
+        for record in records:
+            result.total_received += 1
+
+            row = self.normalize(record)
+            if row is None:
+                result.skipped_invalid += 1
+                continue
+
+            external_id = row.get(id_key)
+            if external_id is not None:
+                if external_id in existing_ids:
+                    result.skipped_existing += 1
+                    continue
+                if external_id in seen:
+                    result.skipped_duplicate += 1
+                    continue
+                seen.add(external_id)
+
+            pending.append(row)
+            if len(pending) >= self.chunk_size:
+                self._insert_chunk(db, user_id, provider, pending, result, on_batch, from_provider)
+                pending = []
+
+        if pending:
+            self._insert_chunk(db, user_id, provider, pending, result, on_batch, from_provider)
+
+        return result
+
+    def _insert_chunk(
+        self,
+        db: Session,
+        user_id: int,
+        provider: str,
+        records: List[Dict[str, Any]],
+        result: ImportResult,
+        on_batch: Optional[Callable[[int, int], None]] = None,
+        from_provider: bool = True,
+    ) -> None:
+        """Resolve os títulos de um lote, insere os itens e guarda as linhas retornadas"""
+        id_key = PROVIDER_ID_COLUMNS[provider]
+        shared = [record for record in records if record.get(id_key) is not None]
+        private = [record for record in records if record.get(id_key) is None]
+
+        catalogs = catalog_service.resolve_many(db, shared, id_key, owner_id=None if from_provider else user_id)
+        catalog_rows = [catalogs[record[id_key]] for record in shared]
+        catalog_rows += catalog_service.create_private_many(db, private, user_id)
+        catalog_by_id = {row["id"]: row for row in catalog_rows}
+
+        item_rows = [
+            self._item_row(record, user_id, catalog["id"])
+            for record, catalog in zip(shared + private, catalog_rows)
+        ]
+        inserted = insert_ignoring_conflicts(
+            db, _ITEM_TABLE, item_rows, index_elements=["user_id", "catalog_id"]
+        )
+        db.commit()
+
+        result.imported_count += len(inserted)
+        result.games.extend(
+            catalog_service.to_game_dict(catalog_by_id[item["catalog_id"]], item)
+            for item in inserted
+        )
+
+        shared_catalogs = [catalog for catalog in catalogs.values() if catalog["owner_id"] is None]
+        if settings.ENTITY_MATCH_INLINE and shared_catalogs:
+            self._match_providers(db, provider, shared_catalogs)
+
+        if on_batch is not None:
+            on_batch(result.imported_count, len(inserted))
+
+    @staticmethod
+    def _match_providers(db: Session, provider: str, catalogs: List[Dict[str, Any]]) -> None:
+        """Liga os títulos do lote aos do outro provedor; uma falha aqui não interrompe a importação"""
+        try:
+            entity_resolver.match_new(db, provider, catalogs)
+        except Exception as e:
+            db.rollback()
+            logger.warning("Falha ao ligar títulos entre provedores: %s", e)
+
+    @staticmethod
+    def _item_row(record: Dict[str, Any], user_id: int, catalog_id: int) -> Dict[str, Any]:
+        row = {field: record.get(field) for field in ITEM_FIELDS}
+        row["user_id"] = user_id
+        row["catalog_id"] = catalog_id
+        row["is_for_trade"] = bool(record.get("is_for_trade") or False)
+        row["is_for_sale"] = bool(record.get("is_for_sale") or False)
+        return row
+
+
+# Instância global do pipeline
+import_pipeline = ImportPipeline()
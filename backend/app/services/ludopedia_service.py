@@ -1,12 +1,18 @@
+import asyncio
+import logging
+
 import httpx
 from typing import Optional, Dict, Any, List
 from app.config import settings
+from app.core.metrics import InstrumentedTransport
+
+logger = logging.getLogger(__name__)
 
 
 class LudopediaService:
     """Serviço para interagir com a API da Ludopedia"""
     
-    BASE_URL = "https://ludopedia.com.br/api/v1"
+    BASE_URL = settings.LUDOPEDIA_BASE_URL
     OAUTH_URL = "https://ludopedia.com.br/oauth"
     TOKEN_URL = "https://ludopedia.com.br/tokenrequest"
     
@@ -14,7 +20,11 @@ class LudopediaService:
         self.app_id = getattr(settings, 'LUDOPEDIA_APP_ID', None)
         self.app_key = getattr(settings, 'LUDOPEDIA_APP_KEY', None)
         self.redirect_uri = getattr(settings, 'LUDOPEDIA_REDIRECT_URI', 'http://localhost:3000/auth/ludopedia/callback')
-        self.client = httpx.AsyncClient(timeout=30.0, follow_redirects=True)
+        self.client = httpx.AsyncClient(
+            timeout=30.0,
+            follow_redirects=True,
+            transport=InstrumentedTransport("ludopedia"),
+        )
     
     async def search_games(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
         """
@@ -56,7 +66,7 @@ class LudopediaService:
             return games
             
         except Exception as e:
-            print(f"Erro ao buscar jogos na Ludopedia: {e}")
+            logger.warning("Erro ao buscar jogos na Ludopedia: %s", e)
             return []
     
     async def get_game_by_id(self, ludopedia_id: int, access_token: str) -> Optional[Dict[str, Any]]:
@@ -82,8 +92,10 @@ class LudopediaService:
             jogo = response.json()
             
             # Debug: imprimir todos os campos disponíveis
-            print(f"DEBUG GAME DETAILS - Jogo {ludopedia_id}: {jogo.get('nm_jogo')}")
-            print(f"DEBUG GAME DETAILS - tp_jogo: {jogo.get('tp_jogo')}")
+            logger.debug(
+                "Detalhes do jogo %s: tp_jogo=%s", jogo.get("nm_jogo"), jogo.get("tp_jogo"),
+                extra={"ludopedia_id": ludopedia_id, "sample": "ludopedia.game_details"},
+            )
             
             return {
                 "ludopedia_id": jogo.get("id_jogo"),
@@ -103,19 +115,24 @@ class LudopediaService:
             }
             
         except Exception as e:
-            print(f"Erro ao buscar jogo {ludopedia_id} na Ludopedia: {e}")
+            logger.warning("Erro ao buscar jogo na Ludopedia: %s", e, extra={"ludopedia_id": ludopedia_id})
             return None
     
-    async def get_user_collection(self, access_token: str) -> List[Dict[str, Any]]:
+    async def get_user_collection(self, access_token: str, checkpoint=None) -> List[Dict[str, Any]]:
         """
         Importa a coleção do usuário autenticado na Ludopedia
         
         Args:
             access_token: Token de acesso OAuth
+            checkpoint: ImportCheckpoint opcional para salvar o progresso e
+                retomar uma importação interrompida
             
         Returns:
             Lista de jogos da coleção do usuário
         """
+        if checkpoint is not None and checkpoint.fetched:
+            return checkpoint.results
+        
         try:
             url = f"{self.BASE_URL}/colecao"
             headers = {
@@ -126,8 +143,8 @@ class LudopediaService:
                 "rows": 100  # Máximo por página
             }
             
-            all_games = []
-            page = 1
+            all_games = checkpoint.results if checkpoint is not None else []
+            page = checkpoint.page if checkpoint is not None else 1
             
             while True:
                 params["page"] = page
@@ -135,11 +152,16 @@ class LudopediaService:
                 response.raise_for_status()
                 
                 data = response.json()
-                print(f"DEBUG Ludopedia - Resposta da API (página {page}): {data}")
+                logger.debug(
+                    "Página %d da coleção da Ludopedia: %d jogos", page, len(data.get("colecao", [])),
+                    extra={"total": data.get("total")},
+                )
                 games = data.get("colecao", [])
+                if checkpoint is not None:
+                    checkpoint.set_total(data.get("total"))
                 
                 if not games:
-                    print(f"DEBUG Ludopedia - Nenhum jogo encontrado na página {page}")
+                    logger.debug("Nenhum jogo na página %d da coleção da Ludopedia", page)
                     break
                 
                 for jogo in games:
@@ -148,6 +170,10 @@ class LudopediaService:
                     if not nome or nome.strip() == "":
                         continue
                     
+                    # Pula jogos já processados em uma tentativa anterior
+                    if checkpoint is not None and checkpoint.is_processed(jogo.get("id_jogo")):
+                        continue
+                    
                     # Buscar detalhes do jogo para obter informações completas
                     game_details = await self.get_game_by_id(jogo.get("id_jogo"), access_token)
                     
@@ -168,7 +194,7 @@ class LudopediaService:
                             "description": game_details.get("description") or jogo.get("ds_jogo"),
                             "year_published": game_details.get("year_published") or jogo.get("ano_lancamento") or jogo.get("ano_publicacao"),
                             "game_type": game_type,
-                            "base_game_id": None,  # Não disponível na API da Ludopedia
+                            "base_game_id": None,  # Não disponível na API da Ludopedia (ligado depois pelo BGG)
                             "base_game_name": None,  # Não disponível na API da Ludopedia
                             "purchase_price": jogo.get("vl_custo"),
                             "image_url": game_details.get("image_url") or jogo.get("thumb"),
@@ -183,9 +209,11 @@ class LudopediaService:
                             "order": len(all_games),  # Ordem original da Ludopedia
                         })
                         
-                        # Debug: imprimir alguns jogos para verificar campos
-                        if len(all_games) <= 3:
-                            print(f"DEBUG Ludopedia - Jogo exemplo: {nome}, tp_jogo: {tp_jogo}, game_type: {game_type}, rating: {game_details.get('rating')}, weight: {game_details.get('weight')}")
+                        logger.debug(
+                            "Jogo da coleção: %s (tp_jogo=%s, game_type=%s, rating=%s, weight=%s)",
+                            nome, tp_jogo, game_type, game_details.get("rating"), game_details.get("weight"),
+                            extra={"sample": "ludopedia.collection_game"},
+                        )
                     else:
                         # Fallback: usar apenas dados da lista se detalhes não estiverem disponíveis
                         all_games.append({
@@ -209,9 +237,15 @@ class LudopediaService:
                             "order": len(all_games),
                         })
                     
+                    if checkpoint is not None:
+                        await checkpoint.add(jogo.get("id_jogo"), all_games[-1])
+                    
                     # Pequeno delay para evitar rate limiting
-                    import asyncio
-                    await asyncio.sleep(0.5)  # 500ms entre requisições
+                    if settings.LUDOPEDIA_REQUEST_DELAY_SECONDS:
+                        await asyncio.sleep(settings.LUDOPEDIA_REQUEST_DELAY_SECONDS)
+                
+                if checkpoint is not None:
+                    await checkpoint.advance_page(page, len(games))
                 
                 # Se retornou menos que o máximo, chegamos ao fim
                 if len(games) < 100:
@@ -219,13 +253,16 @@ class LudopediaService:
                 
                 page += 1
             
-            print(f"DEBUG Ludopedia - Total de jogos encontrados: {len(all_games)}")
+            if checkpoint is not None:
+                await checkpoint.mark_fetched()
+            
+            logger.info("Coleção da Ludopedia obtida", extra={"games": len(all_games)})
             return all_games
             
         except Exception as e:
-            print(f"Erro ao importar coleção da Ludopedia: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Erro ao importar coleção da Ludopedia")
+            if checkpoint is not None:
+                await checkpoint.fail(str(e))
             return []
     
     def close(self):
@@ -0,0 +1,349 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import bindparam, case, func, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.core import metrics
+from app.database import SessionLocal
+from app.models import CatalogGame, CollectionItem, MetadataRefreshRun, RefreshStatus
+from app.services.bgg_service import bgg_service
+from app.services.ludopedia_service import ludopedia_service
+
+logger = logging.getLogger(__name__)
+
+_CATALOG_TABLE = CatalogGame.__table__
+_RUNS_TABLE = MetadataRefreshRun.__table__
+
+# Campos que mudam nos provedores depois da importação
+REFRESH_FIELDS = ("rating", "weight", "ranking_position")
+
+
+class _RateBudget:
+    """Espaça as chamadas aos provedores para caber em N por minuto"""
+
+    def __init__(self, per_minute: int):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self._next = 0.0
+
+    async def acquire(self) -> None:
+        now = time.monotonic()
+        if self._next > now:
+            await asyncio.sleep(self._next - now)
+        self._next = max(now, self._next) + self.interval
+
+
+class MetadataRefreshScheduler:
+    """
+    Atualiza rating, peso e posição no ranking dos títulos defasados.
+
+    Esses campos mudam no BGG e na Ludopedia, mas só eram gravados na
+    importação. Cada rodada monta uma fila de prioridade com os títulos
+    compartilhados sem atualização há METADATA_REFRESH_MAX_AGE_DAYS (ou
+    METADATA_REFRESH_SALE_MAX_AGE_DAYS, se estiverem à venda em alguma lista):
+    primeiro os que estão à venda, depois os com mais donos, depois os mais
+    antigos. Títulos sem nenhum dono ficam de fora.
+
+    Títulos do BGG são buscados em chamadas /thing com até
+    BGG_THING_BATCH_SIZE IDs; a Ludopedia não tem consulta de vários jogos,
+    então cada título é uma chamada, feita com a credencial da própria
+    aplicação (METADATA_REFRESH_LUDOPEDIA_TOKEN); sem ela, os títulos só da
+    Ludopedia ficam fora da fila. O token OAuth de usuários nunca é usado.
+    Todas as chamadas dividem o orçamento METADATA_REFRESH_REQUESTS_PER_MINUTE
+    e só acontecem dentro da janela fora do pico.
+
+    A fila e a posição ficam em metadata_refresh_runs, gravadas a cada lote:
+    a rodada continua de onde parou após um reinício ou na janela seguinte.
+    As chamadas de cada lote são contadas no transporte HTTP (inclusive
+    repetições após 202/429), o que dá o custo por título atualizado.
+    """
+
+    def __init__(self):
+        self.worker = f"{socket.gethostname()}:{os.getpid()}"
+        self._budget = _RateBudget(settings.METADATA_REFRESH_REQUESTS_PER_MINUTE)
+        self._task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def in_window(now: Optional[datetime] = None) -> bool:
+        """Se a hora (UTC) está na janela fora do pico; início igual ao fim = o dia todo"""
+        hour = (now or datetime.now(timezone.utc)).hour
+        start, end = settings.METADATA_REFRESH_WINDOW_START_HOUR, settings.METADATA_REFRESH_WINDOW_END_HOUR
+        if start == end:
+            return True
+        if start < end:
+            return start <= hour < end
+        # Janela que passa da meia-noite (ex.: 22-4)
+        return hour >= start or hour < end
+
+    @staticmethod
+    def build_queue(db: Session, include_ludopedia: bool = True, limit: Optional[int] = None) -> List[List[Any]]:
+        """
+        Títulos defasados em ordem de prioridade
+
+        Returns:
+            [[catalog_id, bgg_id, ludopedia_id], ...]
+        """
+        now = datetime.now(timezone.utc)
+        last_update = func.coalesce(CatalogGame.updated_at, CatalogGame.created_at)
+        on_sale = func.max(case((CollectionItem.is_for_sale.is_(True), 1), else_=0))
+        owners = func.count(CollectionItem.id)
+
+        has_provider = CatalogGame.bgg_id.isnot(None)
+        if include_ludopedia:
+            has_provider = or_(has_provider, CatalogGame.ludopedia_id.isnot(None))
+
+        rows = db.execute(
+            select(CatalogGame.id, CatalogGame.bgg_id, CatalogGame.ludopedia_id)
+            .join(CollectionItem, CollectionItem.catalog_id == CatalogGame.id)
+            .where(
+                CatalogGame.owner_id.is_(None),
+                has_provider,
+                last_update < now - timedelta(days=settings.METADATA_REFRESH_SALE_MAX_AGE_DAYS),
+            )
+            .group_by(CatalogGame.id)
+            .having(or_(on_sale == 1, last_update < now - timedelta(days=settings.METADATA_REFRESH_MAX_AGE_DAYS)))
+            .order_by(on_sale.desc(), owners.desc(), last_update.asc(), CatalogGame.id)
+            .limit(limit or settings.METADATA_REFRESH_MAX_PER_RUN)
+        ).all()
+        # Títulos com os dois IDs vão pelo BGG, que aceita vários por chamada
+        return [[row.id, row.bgg_id, None if row.bgg_id is not None else row.ludopedia_id] for row in rows]
+
+    def _claim(self, db: Session, force: bool = False) -> Optional[MetadataRefreshRun]:
+        """Retoma a rodada em andamento ou cria uma nova, e pega o lease dela"""
+        run = db.query(MetadataRefreshRun).filter(MetadataRefreshRun.status == RefreshStatus.RUNNING).first()
+        if run is None:
+            if not force and self._started_recently(db):
+                return None
+            queue = self.build_queue(db, include_ludopedia=settings.METADATA_REFRESH_LUDOPEDIA_TOKEN is not None)
+            if not queue:
+                return None
+            run = MetadataRefreshRun(queue=queue)
+            db.add(run)
+            try:
+                db.commit()
+            except IntegrityError:
+                # Outro worker criou a rodada ao mesmo tempo
+                db.rollback()
+                run = db.query(MetadataRefreshRun).filter(MetadataRefreshRun.status == RefreshStatus.RUNNING).first()
+                if run is None:
+                    return None
+
+        now = datetime.now(timezone.utc)
+        claimed = db.execute(
+            update(_RUNS_TABLE)
+            .where(
+                _RUNS_TABLE.c.id == run.id,
+                or_(
+                    _RUNS_TABLE.c.lease_owner == self.worker,
+                    _RUNS_TABLE.c.lease_until.is_(None),
+                    _RUNS_TABLE.c.lease_until < now,
+                ),
+            )
+            .values(lease_owner=self.worker, lease_until=now + timedelta(seconds=settings.METADATA_REFRESH_LEASE_SECONDS))
+        ).rowcount
+        db.commit()
+        if not claimed:
+            return None
+        db.refresh(run)
+        return run
+
+    @staticmethod
+    def _started_recently(db: Session) -> bool:
+        """Se a última rodada começou há menos de METADATA_REFRESH_INTERVAL_HOURS"""
+        last_start = db.execute(select(func.max(MetadataRefreshRun.created_at))).scalar()
+        if last_start is None:
+            return False
+        if last_start.tzinfo is None:
+            last_start = last_start.replace(tzinfo=timezone.utc)
+        return datetime.now(timezone.utc) - last_start < timedelta(hours=settings.METADATA_REFRESH_INTERVAL_HOURS)
+
+    @staticmethod
+    def _page(queue: List[List[Any]], position: int) -> Tuple[List[Tuple[int, int]], List[Tuple[int, int]], int]:
+        """
+        Próximo lote da fila, a partir de `position`
+
+        Avança até completar uma chamada /thing do BGG (ou o mesmo número de
+        títulos da Ludopedia), mantendo a ordem de prioridade entre lotes.
+
+        Returns:
+            ([(catalog_id, bgg_id)], [(catalog_id, ludopedia_id)], próxima posição)
+        """
+        batch_size = settings.BGG_THING_BATCH_SIZE
+        bgg: List[Tuple[int, int]] = []
+        ludopedia: List[Tuple[int, int]] = []
+        end = position
+        while end < len(queue) and len(bgg) < batch_size and len(ludopedia) < batch_size:
+            catalog_id, bgg_id, ludopedia_id = queue[end]
+            if bgg_id is not None:
+                bgg.append((catalog_id, bgg_id))
+            else:
+                ludopedia.append((catalog_id, ludopedia_id))
+            end += 1
+        return bgg, ludopedia, end
+
+    @staticmethod
+    def _record(run: MetadataRefreshRun, provider: str, result: str, count: int = 1) -> None:
+        if not count:
+            return
+        metrics.metadata_refresh_games_total.inc(provider, result, amount=count)
+        if result == "refreshed":
+            run.refreshed_count += count
+        elif result == "missing":
+            run.missing_count += count
+        else:
+            run.failed_count += count
+
+    async def _refresh_page(
+        self,
+        db: Session,
+        run: MetadataRefreshRun,
+        bgg: List[Tuple[int, int]],
+        ludopedia: List[Tuple[int, int]],
+        token: Optional[str],
+    ) -> None:
+        """Busca um lote nos provedores e grava os campos atualizados"""
+        values: List[Dict[str, Any]] = []
+        missing: List[int] = []
+
+        if bgg:
+            await self._budget.acquire()
+            try:
+                stats = await bgg_service.get_game_stats([bgg_id for _, bgg_id in bgg])
+            except Exception as e:
+                logger.warning("Erro ao atualizar metadados no BGG: %s", e, extra={"bgg_ids": len(bgg)})
+                self._record(run, "bgg", "failed", len(bgg))
+            else:
+                for catalog_id, bgg_id in bgg:
+                    if bgg_id in stats:
+                        values.append({"_id": catalog_id, **{f"_{f}": stats[bgg_id][f] for f in REFRESH_FIELDS}})
+                    else:
+                        missing.append(catalog_id)
+                self._record(run, "bgg", "refreshed", len(bgg) - len(missing))
+                self._record(run, "bgg", "missing", len(missing))
+
+        for catalog_id, ludopedia_id in ludopedia:
+            if token is None:
+                self._record(run, "ludopedia", "failed")
+                continue
+            await self._budget.acquire()
+            details = await ludopedia_service.get_game_by_id(ludopedia_id, token)
+            if details is None:
+                self._record(run, "ludopedia", "failed")
+                continue
+            values.append({"_id": catalog_id, **{f"_{f}": details.get(f) for f in REFRESH_FIELDS}})
+            self._record(run, "ludopedia", "refreshed")
+
+        # Campos que o provedor não devolveu mantêm o valor atual; updated_at é renovado
+        if values:
+            db.execute(
+                update(_CATALOG_TABLE)
+                .where(_CATALOG_TABLE.c.id == bindparam("_id"))
+                .values({f: func.coalesce(bindparam(f"_{f}"), _CATALOG_TABLE.c[f]) for f in REFRESH_FIELDS}),
+                values,
+            )
+        # Removidos do provedor: só renova updated_at, para não voltarem à fila a cada rodada
+        if missing:
+            db.execute(update(_CATALOG_TABLE).where(_CATALOG_TABLE.c.id.in_(missing)).values(updated_at=func.now()))
+
+    async def run(self, ignore_window: bool = False, force: bool = False) -> Optional[MetadataRefreshRun]:
+        """
+        Executa (ou retoma) uma rodada até o fim da fila ou da janela
+
+        Args:
+            ignore_window: Executar mesmo fora da janela fora do pico
+            force: Criar uma rodada nova mesmo que a última seja recente
+
+        Returns:
+            A rodada (desligada da sessão) ou None se não havia o que fazer
+            ou outro worker está com o lease
+        """
+        db = SessionLocal()
+        calls: List[Tuple[str, str, float]] = []
+        calls_token = metrics.outbound_calls.set(calls)
+        try:
+            # A montagem da fila agrega o catálogo inteiro: fora do event loop
+            run = await asyncio.to_thread(self._claim, db, force)
+            if run is None:
+                return None
+            token = settings.METADATA_REFRESH_LUDOPEDIA_TOKEN
+            queue = run.queue
+            logger.info(
+                "Atualização de metadados iniciada",
+                extra={"run_id": run.id, "position": run.position, "queued": len(queue)},
+            )
+
+            while run.position < len(queue):
+                if not ignore_window and not self.in_window():
+                    break
+                bgg, ludopedia, end = self._page(queue, run.position)
+                made = len(calls)
+                await self._refresh_page(db, run, bgg, ludopedia, token)
+                for provider, _, _ in calls[made:]:
+                    metrics.metadata_refresh_provider_calls_total.inc(provider)
+                run.provider_calls += len(calls) - made
+                run.position = end
+                run.lease_until = datetime.now(timezone.utc) + timedelta(seconds=settings.METADATA_REFRESH_LEASE_SECONDS)
+                db.commit()
+
+            if run.position >= len(queue):
+                run.status = RefreshStatus.COMPLETED
+                run.finished_at = datetime.now(timezone.utc)
+            run.lease_owner = None
+            run.lease_until = None
+            db.commit()
+            db.refresh(run)
+            db.expunge(run)
+
+            logger.info(
+                "Atualização de metadados %s",
+                "concluída" if run.status == RefreshStatus.COMPLETED else "pausada",
+                extra={
+                    "run_id": run.id,
+                    "position": run.position,
+                    "refreshed": run.refreshed_count,
+                    "missing": run.missing_count,
+                    "failed": run.failed_count,
+                    "provider_calls": run.provider_calls,
+                    "calls_per_game": round(run.provider_calls / run.refreshed_count, 3) if run.refreshed_count else None,
+                },
+            )
+            return run
+        finally:
+            metrics.outbound_calls.reset(calls_token)
+            db.close()
+
+    async def _loop(self) -> None:
+        while True:
+            if self.in_window():
+                try:
+                    await self.run()
+                except Exception:
+                    logger.exception("Falha na atualização de metadados")
+            await asyncio.sleep(settings.METADATA_REFRESH_CHECK_SECONDS)
+
+    def start(self) -> None:
+        """Inicia o agendador no event loop atual (quando habilitado)"""
+        if settings.METADATA_REFRESH_ENABLED and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        """Interrompe o agendador; a rodada em andamento é retomada depois"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+# Instância global do serviço
+metadata_refresh = MetadataRefreshScheduler()
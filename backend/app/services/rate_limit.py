@@ -0,0 +1,257 @@
+import logging
+import math
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+_RULE = re.compile(r"^\s*(\d+)\s*/\s*(second|minute|hour|day)\s*$")
+
+# Consome um token de todos os baldes ou de nenhum (atômico no Redis).
+# KEYS: baldes; ARGV: agora, custo e, por balde, capacidade e taxa (tokens/s).
+# Retorna: permitido, índice do balde informado nos cabeçalhos, tokens
+# restantes, espera até haver token (s) e tempo até encher de novo (s).
+_TOKEN_BUCKET_LUA = """
+local now = tonumber(ARGV[1])
+local cost = tonumber(ARGV[2])
+local tokens = {}
+local allowed = 1
+local retry = 0
+local chosen = 1
+for i = 1, #KEYS do
+    local capacity = tonumber(ARGV[2 * i + 1])
+    local rate = tonumber(ARGV[2 * i + 2])
+    local state = redis.call('HMGET', KEYS[i], 't', 'ts')
+    local t = tonumber(state[1])
+    local ts = tonumber(state[2])
+    if t == nil or ts == nil then
+        t = capacity
+    else
+        t = math.min(capacity, t + math.max(0, now - ts) * rate)
+    end
+    tokens[i] = t
+    if t < cost then
+        allowed = 0
+        local wait = (cost - t) / rate
+        if wait > retry then
+            retry = wait
+            chosen = i
+        end
+    end
+end
+local remaining = nil
+for i = 1, #KEYS do
+    local capacity = tonumber(ARGV[2 * i + 1])
+    local rate = tonumber(ARGV[2 * i + 2])
+    local t = tokens[i]
+    if allowed == 1 then
+        t = t - cost
+        if remaining == nil or t < remaining then
+            remaining = t
+            chosen = i
+        end
+    end
+    redis.call('HSET', KEYS[i], 't', tostring(t), 'ts', tostring(now))
+    redis.call('PEXPIRE', KEYS[i], math.ceil((capacity - t) / rate * 1000) + 1000)
+end
+local capacity = tonumber(ARGV[2 * chosen + 1])
+local rate = tonumber(ARGV[2 * chosen + 2])
+local t = tokens[chosen]
+if allowed == 1 then
+    t = t - cost
+end
+return {allowed, chosen, tostring(t), tostring(retry), tostring((capacity - t) / rate)}
+"""
+
+
+def parse_rule(rule: str) -> Tuple[int, int]:
+    """Converte '60/minute' em (limite, período em segundos)"""
+    match = _RULE.match(rule)
+    if match is None:
+        raise ValueError(f"Limite inválido: {rule!r} (use N/second, N/minute, N/hour ou N/day)")
+    return int(match.group(1)), _PERIODS[match.group(2)]
+
+
+@dataclass(frozen=True)
+class Bucket:
+    """Balde de tokens: `limit` requisições por `period` segundos, com rajada de `limit`"""
+    key: str
+    limit: int
+    period: int
+
+    @property
+    def rate(self) -> float:
+        return self.limit / self.period
+
+
+@dataclass
+class RateLimitDecision:
+    """Resultado de uma verificação (o balde mais restritivo vai nos cabeçalhos)"""
+    allowed: bool
+    bucket: Bucket
+    remaining: float
+    retry_after: float  # Segundos até haver token (0 se permitido)
+    reset: float  # Segundos até o balde encher de novo
+
+
+class MemoryTokenBuckets:
+    """
+    Baldes na memória do processo (um worker), em LRU limitado.
+
+    Roda no event loop sem pontos de espera, então cada verificação é atômica.
+    """
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+
+    def consume(self, buckets: List[Bucket], now: float, cost: float = 1.0) -> Tuple[bool, int, float, float, float]:
+        states = []
+        allowed, retry, chosen = True, 0.0, 0
+        for i, bucket in enumerate(buckets):
+            state = self._buckets.get(bucket.key)
+            if state is None:
+                tokens = float(bucket.limit)
+            else:
+                self._buckets.move_to_end(bucket.key)
+                tokens = min(bucket.limit, state[0] + max(0.0, now - state[1]) * bucket.rate)
+            states.append(tokens)
+            if tokens < cost:
+                allowed = False
+                wait = (cost - tokens) / bucket.rate
+                if wait > retry:
+                    retry, chosen = wait, i
+
+        remaining = None
+        for i, bucket in enumerate(buckets):
+            tokens = states[i]
+            if allowed:
+                tokens -= cost
+                if remaining is None or tokens < remaining:
+                    remaining, chosen = tokens, i
+            states[i] = tokens
+            self._buckets[bucket.key] = [tokens, now]
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+
+        bucket = buckets[chosen]
+        return allowed, chosen, states[chosen], retry, (bucket.limit - states[chosen]) / bucket.rate
+
+
+class RedisTokenBuckets:
+    """Baldes no Redis, compartilhados entre workers (um EVALSHA por verificação)"""
+
+    def __init__(self, redis_url: str):
+        import redis.asyncio as aioredis
+
+        timeout = settings.RATE_LIMIT_REDIS_TIMEOUT_SECONDS
+        self._redis = aioredis.Redis.from_url(redis_url, socket_timeout=timeout, socket_connect_timeout=timeout)
+        self._script = self._redis.register_script(_TOKEN_BUCKET_LUA)
+
+    async def consume(self, buckets: List[Bucket], now: float, cost: float = 1.0) -> Tuple[bool, int, float, float, float]:
+        args: List[float] = [now, cost]
+        for bucket in buckets:
+            args.extend((bucket.limit, bucket.rate))
+        allowed, chosen, remaining, retry, reset = await self._script(keys=[b.key for b in buckets], args=args)
+        return bool(allowed), int(chosen) - 1, float(remaining), float(retry), float(reset)
+
+
+class RateLimitService:
+    """
+    Limites de requisições com baldes de tokens por IP e por usuário.
+
+    RATE_LIMITS define, por grupo de rotas, o limite por IP ("ip") e por
+    plano do usuário autenticado ("free", "premium", "pro"). Todos os baldes
+    aplicáveis a uma requisição são consumidos juntos, ou nenhum.
+
+    Com RATE_LIMIT_BACKEND=redis os baldes valem para todos os workers (um
+    script Lua por verificação); se o Redis falhar, a verificação cai para
+    a memória do processo por RATE_LIMIT_REDIS_RETRY_SECONDS, para não
+    pagar um timeout a cada requisição.
+    """
+
+    def __init__(self):
+        self._store = None
+        self._memory: Optional[MemoryTokenBuckets] = None
+        self._rules: Optional[Dict[str, Dict[str, Tuple[int, int]]]] = None
+        self._redis_down_until = 0.0
+
+    @property
+    def rules(self) -> Dict[str, Dict[str, Tuple[int, int]]]:
+        """Limites por grupo e escopo, já convertidos"""
+        if self._rules is None:
+            self._rules = {
+                group: {scope: parse_rule(rule) for scope, rule in scopes.items()}
+                for group, scopes in settings.RATE_LIMITS.items()
+            }
+        return self._rules
+
+    @property
+    def memory(self) -> MemoryTokenBuckets:
+        if self._memory is None:
+            self._memory = MemoryTokenBuckets(settings.RATE_LIMIT_MEMORY_MAX_KEYS)
+        return self._memory
+
+    @property
+    def store(self):
+        if self._store is None:
+            if settings.RATE_LIMIT_BACKEND == "redis":
+                self._store = RedisTokenBuckets(settings.REDIS_URL)
+            else:
+                self._store = self.memory
+        return self._store
+
+    def buckets(self, group: str, ip: Optional[str], user: Optional[str], role: Optional[str]) -> List[Bucket]:
+        """Baldes que se aplicam à requisição"""
+        scopes = self.rules.get(group)
+        if not scopes:
+            return []
+        buckets = []
+        if ip is not None and "ip" in scopes:
+            limit, period = scopes["ip"]
+            buckets.append(Bucket(f"ratelimit:{group}:ip:{ip}", limit, period))
+        if user is not None and role in scopes:
+            limit, period = scopes[role]
+            buckets.append(Bucket(f"ratelimit:{group}:user:{user}", limit, period))
+        return buckets
+
+    async def check(self, buckets: List[Bucket]) -> RateLimitDecision:
+        """Consome um token de cada balde (se todos tiverem) e retorna a decisão"""
+        now = time.time()
+        store = self.store
+        if store is not self.memory and now >= self._redis_down_until:
+            try:
+                result = await store.consume(buckets, now)
+            except Exception as e:
+                logger.warning("Redis indisponível para limites de requisição, usando memória: %s", e)
+                self._redis_down_until = now + settings.RATE_LIMIT_REDIS_RETRY_SECONDS
+                result = self.memory.consume(buckets, now)
+        else:
+            result = self.memory.consume(buckets, now)
+
+        allowed, chosen, remaining, retry, reset = result
+        return RateLimitDecision(allowed, buckets[chosen], remaining, retry, reset)
+
+    @staticmethod
+    def headers(decision: RateLimitDecision) -> List[Tuple[bytes, bytes]]:
+        """Cabeçalhos RateLimit-* (e Retry-After na recusa)"""
+        bucket = decision.bucket
+        headers = [
+            (b"ratelimit-limit", str(bucket.limit).encode()),
+            (b"ratelimit-remaining", str(max(int(decision.remaining), 0)).encode()),
+            (b"ratelimit-reset", str(math.ceil(decision.reset)).encode()),
+            (b"ratelimit-policy", f"{bucket.limit};w={bucket.period}".encode()),
+        ]
+        if not decision.allowed:
+            headers.append((b"retry-after", str(max(math.ceil(decision.retry_after), 1)).encode()))
+        return headers
+
+
+# Instância global do serviço
+rate_limit = RateLimitService()
@@ -0,0 +1,417 @@
+import logging
+import threading
+import time
+import warnings
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import func, or_, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import BggThingLinks, BggThingTag, CatalogGame, CatalogMatch, Tag, TagKind
+
+logger = logging.getLogger(__name__)
+
+# Máximo de IDs por cláusula IN
+_IN_CHUNK = 1000
+
+# Tags que descrevem o jogo (designers e editoras ficam de fora)
+TAG_KINDS = (TagKind.CATEGORY, TagKind.MECHANIC)
+
+# Colunas numéricas lidas do catálogo
+_NUMERIC_COLUMNS = (
+    CatalogGame.weight,
+    CatalogGame.min_players,
+    CatalogGame.max_players,
+    CatalogGame.min_playtime,
+    CatalogGame.max_playtime,
+    CatalogGame.min_age,
+)
+# Peso, jogadores (mín/máx), duração (log) e idade
+_NUMERIC_FEATURES = 5
+
+# Folga ao comparar com a marca d'água (transações que gravam fora de ordem)
+_WATERMARK_OVERLAP = timedelta(seconds=5)
+
+
+def _numeric(raw: np.ndarray) -> np.ndarray:
+    """Colunas de _NUMERIC_COLUMNS (NaN = nulo) nas features numéricas, ainda sem escala"""
+    weight, min_players, max_players, min_playtime, max_playtime, min_age = raw.T
+    max_players = np.where(np.isnan(max_players), min_players, max_players)
+    playtime = np.where(np.isnan(max_playtime), min_playtime, max_playtime)
+    playtime = np.where(np.isnan(min_playtime), playtime, (min_playtime + playtime) / 2)
+    return np.column_stack([weight, min_players, max_players, np.log1p(playtime), min_age])
+
+
+@dataclass
+class _Shard:
+    """Bloco de vetores normalizados; ids = -1 marca linhas livres ou removidas"""
+    ids: np.ndarray  # int64 (SIMILARITY_SHARD_SIZE,)
+    matrix: np.ndarray  # float32 (SIMILARITY_SHARD_SIZE, dimensões), por coluna (order="F")
+    size: int = 0
+
+
+class SimilarGamesEngine:
+    """
+    Jogos parecidos por similaridade de cosseno.
+
+    Cada título vira um vetor: as categorias e mecânicas mais comuns
+    (one-hot, dividido pela raiz da quantidade de tags do jogo) e peso,
+    jogadores, duração e idade padronizados pela média e desvio do catálogo.
+    Os dois blocos têm peso SIMILARITY_TAG_WEIGHT e 1 - SIMILARITY_TAG_WEIGHT
+    e o vetor final tem norma 1, então o cosseno é um produto escalar.
+
+    Os vetores dos títulos compartilhados ficam em matrizes float32 de
+    SIMILARITY_SHARD_SIZE linhas (shards), guardadas por coluna: o vetor de
+    consulta tem só ~10 dimensões não nulas (as tags do jogo e as numéricas),
+    então o produto matriz-vetor lê só essas colunas, em vez da matriz
+    inteira, e é seguido de argpartition por shard. Títulos da Ludopedia
+    ligados a um título do BGG são representados por ele, para o mesmo jogo
+    não aparecer duas vezes.
+
+    O índice é montado na primeira consulta e depois atualizado por linha:
+    a cada SIMILARITY_REFRESH_SECONDS, títulos criados ou alterados desde a
+    última verificação (importações, atualização de metadados, tags novas,
+    ligações entre provedores) são recodificados no lugar, com a média e o
+    desvio da última montagem. Tags novas fora do vocabulário disparam uma
+    remontagem completa.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._shards: List[_Shard] = []
+        self._positions: Dict[int, Tuple[int, int]] = {}  # catalog_id -> (shard, linha)
+        self._vocab: Dict[int, int] = {}  # tag_id -> coluna
+        self._mean: Optional[np.ndarray] = None
+        self._std: Optional[np.ndarray] = None
+        self._watermark: Optional[Tuple] = None
+        self._checked_at = 0.0
+
+    @property
+    def dimensions(self) -> int:
+        return len(self._vocab) + _NUMERIC_FEATURES
+
+    @staticmethod
+    def _eligible():
+        """Títulos compartilhados, exceto os da Ludopedia ligados a um do BGG"""
+        matched = select(CatalogMatch.ludopedia_catalog_id)
+        return select(CatalogGame.id, CatalogGame.bgg_id, *_NUMERIC_COLUMNS).where(
+            CatalogGame.owner_id.is_(None), CatalogGame.id.not_in(matched),
+        )
+
+    @staticmethod
+    def _read_watermark(db: Session) -> Tuple:
+        """
+        Últimas alterações no catálogo, nas tags e nas ligações entre provedores
+
+        A contagem de títulos detecta os criados no mesmo instante da última
+        alteração (relógios de resolução baixa, como o CURRENT_TIMESTAMP do SQLite).
+        """
+        return tuple(db.execute(select(
+            select(func.max(func.coalesce(CatalogGame.updated_at, CatalogGame.created_at))).scalar_subquery(),
+            select(func.max(BggThingLinks.fetched_at)).scalar_subquery(),
+            select(func.max(CatalogMatch.id)).scalar_subquery(),
+            select(func.count(Tag.id)).where(Tag.kind.in_(TAG_KINDS)).scalar_subquery(),
+            select(func.count(CatalogGame.id)).scalar_subquery(),
+        )).one())
+
+    def _tag_columns(self, db: Session, bgg_ids: Sequence[int]) -> Dict[int, List[int]]:
+        """Colunas do vocabulário de cada bgg_id"""
+        columns: Dict[int, List[int]] = {}
+        ids = [bgg_id for bgg_id in set(bgg_ids) if bgg_id is not None]
+        for start in range(0, len(ids), _IN_CHUNK):
+            rows = db.execute(
+                select(BggThingTag.bgg_id, BggThingTag.tag_id).where(BggThingTag.bgg_id.in_(ids[start:start + _IN_CHUNK]))
+            )
+            for bgg_id, tag_id in rows:
+                column = self._vocab.get(tag_id)
+                if column is not None:
+                    columns.setdefault(bgg_id, []).append(column)
+        return columns
+
+    def _encode(self, rows: Sequence, tag_columns: Dict[int, List[int]]) -> np.ndarray:
+        """Vetores normalizados (float32) de linhas (id, bgg_id, *_NUMERIC_COLUMNS)"""
+        n = len(rows)
+        vectors = np.zeros((n, self.dimensions), dtype=np.float32)
+        if not n:
+            return vectors
+
+        # Tags: 1/√k nas k colunas do jogo (bloco com norma 1)
+        row_index, col_index = [], []
+        for i, row in enumerate(rows):
+            columns = tag_columns.get(row[1], ())
+            row_index.extend([i] * len(columns))
+            col_index.extend(columns)
+        if row_index:
+            row_index = np.asarray(row_index)
+            counts = np.bincount(row_index, minlength=n)
+            vectors[row_index, np.asarray(col_index)] = 1.0 / np.sqrt(counts[row_index])
+        vectors[:, :len(self._vocab)] *= np.sqrt(settings.SIMILARITY_TAG_WEIGHT)
+
+        # Numéricas: z-score; nulos ficam na média (0)
+        raw = np.array([row[2:] for row in rows], dtype=np.float64)
+        z = np.nan_to_num((_numeric(raw) - self._mean) / self._std)
+        vectors[:, len(self._vocab):] = z * np.sqrt((1 - settings.SIMILARITY_TAG_WEIGHT) / _NUMERIC_FEATURES)
+
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        np.divide(vectors, norms, out=vectors, where=norms > 0)
+        return vectors
+
+    def _new_shard(self) -> _Shard:
+        size = settings.SIMILARITY_SHARD_SIZE
+        return _Shard(
+            ids=np.full(size, -1, dtype=np.int64),
+            matrix=np.zeros((size, self.dimensions), dtype=np.float32, order="F"),
+        )
+
+    def _place(self, catalog_id: int, vector: np.ndarray) -> None:
+        """Grava o vetor na linha do título, ou no fim do último shard"""
+        position = self._positions.get(catalog_id)
+        if position is None:
+            if not self._shards or self._shards[-1].size == settings.SIMILARITY_SHARD_SIZE:
+                self._shards.append(self._new_shard())
+            shard_index = len(self._shards) - 1
+            shard = self._shards[shard_index]
+            position = (shard_index, shard.size)
+            shard.size += 1
+            self._positions[catalog_id] = position
+        shard = self._shards[position[0]]
+        shard.ids[position[1]] = catalog_id
+        shard.matrix[position[1]] = vector
+
+    def _remove(self, catalog_id: int) -> None:
+        position = self._positions.pop(catalog_id, None)
+        if position is not None:
+            shard = self._shards[position[0]]
+            shard.ids[position[1]] = -1
+            shard.matrix[position[1]] = 0
+
+    def build(self, db: Session) -> None:
+        """Monta vocabulário, estatísticas e matrizes a partir do catálogo inteiro"""
+        started = time.perf_counter()
+        with self._lock:
+            watermark = self._read_watermark(db)
+            frequency = func.count(BggThingTag.bgg_id)
+            vocab_ids = db.execute(
+                select(Tag.id)
+                .join(BggThingTag, BggThingTag.tag_id == Tag.id)
+                .where(Tag.kind.in_(TAG_KINDS))
+                .group_by(Tag.id)
+                .order_by(frequency.desc(), Tag.id)
+                .limit(settings.SIMILARITY_MAX_TAGS)
+            ).scalars().all()
+            self._vocab = {tag_id: column for column, tag_id in enumerate(vocab_ids)}
+
+            rows = db.execute(self._eligible().order_by(CatalogGame.id)).all()
+            features = _numeric(np.array([row[2:] for row in rows], dtype=np.float64).reshape(-1, len(_NUMERIC_COLUMNS)))
+            with warnings.catch_warnings():
+                # Colunas sem nenhum valor dão NaN (tratado abaixo)
+                warnings.simplefilter("ignore", RuntimeWarning)
+                mean = np.nanmean(features, axis=0)
+                std = np.nanstd(features, axis=0)
+            self._mean = np.nan_to_num(mean)
+            self._std = np.where(np.nan_to_num(std) > 0, np.nan_to_num(std), 1.0)
+
+            vectors = self._encode(rows, self._tag_columns(db, [row[1] for row in rows]))
+            self._shards, self._positions = [], {}
+            for start in range(0, len(rows), settings.SIMILARITY_SHARD_SIZE):
+                block = rows[start:start + settings.SIMILARITY_SHARD_SIZE]
+                shard = self._new_shard()
+                shard.size = len(block)
+                shard.ids[:shard.size] = [row[0] for row in block]
+                shard.matrix[:shard.size] = vectors[start:start + shard.size]
+                self._positions.update((row[0], (len(self._shards), i)) for i, row in enumerate(block))
+                self._shards.append(shard)
+            self._watermark = watermark
+            self._checked_at = time.monotonic()
+
+        logger.info(
+            "Índice de jogos parecidos montado",
+            extra={
+                "games": len(rows), "dimensions": self.dimensions, "shards": len(self._shards),
+                "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+            },
+        )
+
+    def update(self, db: Session, catalog_ids: Iterable[int]) -> None:
+        """Recodifica títulos alterados; os que deixaram de ser elegíveis saem do índice"""
+        ids = list(set(catalog_ids))
+        with self._lock:
+            rows = []
+            for start in range(0, len(ids), _IN_CHUNK):
+                rows.extend(db.execute(self._eligible().where(CatalogGame.id.in_(ids[start:start + _IN_CHUNK]))).all())
+            vectors = self._encode(rows, self._tag_columns(db, [row[1] for row in rows]))
+            for i, row in enumerate(rows):
+                self._place(row[0], vectors[i])
+            for catalog_id in set(ids) - {row[0] for row in rows}:
+                self._remove(catalog_id)
+
+    def _refresh(self, db: Session) -> None:
+        """Monta o índice ou aplica as alterações desde a última verificação"""
+        if self._watermark is None:
+            self.build(db)
+            return
+        if time.monotonic() - self._checked_at < settings.SIMILARITY_REFRESH_SECONDS:
+            return
+        self._checked_at = time.monotonic()
+        watermark = self._read_watermark(db)
+        if watermark == self._watermark:
+            return
+
+        last_catalog, last_fetch, last_match, tag_count, _ = self._watermark
+        if watermark[3] != tag_count and len(self._vocab) < settings.SIMILARITY_MAX_TAGS:
+            # Tags novas que caberiam no vocabulário
+            self.build(db)
+            return
+
+        conditions = []
+        if last_catalog is not None:
+            conditions.append(
+                func.coalesce(CatalogGame.updated_at, CatalogGame.created_at) >= last_catalog - _WATERMARK_OVERLAP
+            )
+        if last_fetch is not None:
+            conditions.append(CatalogGame.bgg_id.in_(
+                select(BggThingLinks.bgg_id).where(BggThingLinks.fetched_at >= last_fetch - _WATERMARK_OVERLAP)
+            ))
+        if not conditions:
+            self.build(db)
+            return
+        changed = set(db.execute(select(CatalogGame.id).where(or_(*conditions))).scalars())
+        matches = db.execute(
+            select(CatalogMatch.ludopedia_catalog_id, CatalogMatch.bgg_catalog_id)
+            .where(CatalogMatch.id > (last_match or 0))
+        ).all()
+        for ludopedia_catalog_id, bgg_catalog_id in matches:
+            changed.update((ludopedia_catalog_id, bgg_catalog_id))
+        self.update(db, changed)
+        self._watermark = watermark
+        logger.debug("Índice de jogos parecidos atualizado", extra={"games": len(changed)})
+
+    def _vectors(self, db: Session, catalog_ids: Sequence[int]) -> Dict[int, np.ndarray]:
+        """
+        Vetores de títulos quaisquer: do índice, do título do BGG ligado ou
+        codificados na hora (títulos privados)
+        """
+        vectors: Dict[int, np.ndarray] = {}
+        pending = []
+        for catalog_id in set(catalog_ids):
+            position = self._positions.get(catalog_id)
+            if position is not None:
+                vectors[catalog_id] = self._shards[position[0]].matrix[position[1]]
+            else:
+                pending.append(catalog_id)
+
+        for start in range(0, len(pending), _IN_CHUNK):
+            chunk = pending[start:start + _IN_CHUNK]
+            for ludopedia_catalog_id, bgg_catalog_id in db.execute(
+                select(CatalogMatch.ludopedia_catalog_id, CatalogMatch.bgg_catalog_id)
+                .where(CatalogMatch.ludopedia_catalog_id.in_(chunk))
+            ):
+                position = self._positions.get(bgg_catalog_id)
+                if position is not None:
+                    vectors[ludopedia_catalog_id] = self._shards[position[0]].matrix[position[1]]
+
+        pending = [catalog_id for catalog_id in pending if catalog_id not in vectors]
+        rows = []
+        for start in range(0, len(pending), _IN_CHUNK):
+            rows.extend(db.execute(
+                select(CatalogGame.id, CatalogGame.bgg_id, *_NUMERIC_COLUMNS)
+                .where(CatalogGame.id.in_(pending[start:start + _IN_CHUNK]))
+            ).all())
+        encoded = self._encode(rows, self._tag_columns(db, [row[1] for row in rows]))
+        for i, row in enumerate(rows):
+            vectors[row[0]] = encoded[i]
+        return vectors
+
+    @staticmethod
+    def _same_game(db: Session, catalog_id: int) -> set:
+        """IDs do catálogo que representam o mesmo jogo (título compartilhado e título ligado)"""
+        game = db.get(CatalogGame, catalog_id)
+        same = {catalog_id}
+        if game is None:
+            return same
+        conditions = []
+        if game.bgg_id is not None:
+            conditions.append(CatalogGame.bgg_id == game.bgg_id)
+        if game.ludopedia_id is not None:
+            conditions.append(CatalogGame.ludopedia_id == game.ludopedia_id)
+        if conditions:
+            # Só linhas compartilhadas estão no índice (e usam os índices únicos parciais)
+            same.update(db.execute(
+                select(CatalogGame.id).where(CatalogGame.owner_id.is_(None), or_(*conditions))
+            ).scalars())
+        same.update(db.execute(
+            select(CatalogMatch.bgg_catalog_id).where(CatalogMatch.ludopedia_catalog_id.in_(same))
+        ).scalars())
+        same.update(db.execute(
+            select(CatalogMatch.ludopedia_catalog_id).where(CatalogMatch.bgg_catalog_id.in_(same))
+        ).scalars())
+        return same
+
+    def similar(self, db: Session, catalog_id: int, limit: int = 10) -> List[Tuple[int, float]]:
+        """
+        Títulos do catálogo mais parecidos com um título
+
+        Returns:
+            [(catalog_id, similaridade), ...] em ordem decrescente
+        """
+        with self._lock:
+            self._refresh(db)
+            query = self._vectors(db, [catalog_id]).get(catalog_id)
+            if query is None or not query.any():
+                return []
+            exclude = self._same_game(db, catalog_id)
+
+            ids_parts, score_parts = [], []
+            take = limit + len(exclude)
+            columns = np.flatnonzero(query)
+            weights = query[columns]
+            for shard in self._shards:
+                scores = shard.matrix[:shard.size, columns] @ weights
+                if shard.size > take:
+                    top = np.argpartition(scores, shard.size - take)[shard.size - take:]
+                else:
+                    top = np.arange(shard.size)
+                ids_parts.append(shard.ids[top])
+                score_parts.append(scores[top])
+        if not ids_parts:
+            return []
+
+        ids = np.concatenate(ids_parts)
+        scores = np.concatenate(score_parts)
+        results = []
+        for i in np.argsort(-scores, kind="stable"):
+            candidate = int(ids[i])
+            if candidate == -1 or candidate in exclude:
+                continue
+            results.append((candidate, round(float(scores[i]), 4)))
+            if len(results) == limit:
+                break
+        return results
+
+    def rank(self, db: Session, catalog_id: int, candidates: Sequence[int], limit: int = 10) -> List[Tuple[int, float]]:
+        """
+        Ordena títulos candidatos (ex.: os jogos à venda de um usuário) pela
+        similaridade com um título
+
+        Returns:
+            [(catalog_id, similaridade), ...] em ordem decrescente, sem o próprio título
+        """
+        with self._lock:
+            self._refresh(db)
+            vectors = self._vectors(db, [catalog_id, *candidates])
+            query = vectors.get(catalog_id)
+            exclude = self._same_game(db, catalog_id)
+            ordered = [candidate for candidate in dict.fromkeys(candidates) if candidate not in exclude and candidate in vectors]
+            if query is None or not query.any() or not ordered:
+                return []
+            scores = np.stack([vectors[candidate] for candidate in ordered]) @ query
+        top = np.argsort(-scores, kind="stable")[:limit]
+        return [(ordered[i], round(float(scores[i]), 4)) for i in top]
+
+
+# Instância global do serviço
+similar_games = SimilarGamesEngine()
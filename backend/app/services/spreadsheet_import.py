@@ -0,0 +1,475 @@
+import codecs
+import csv
+import io
+import logging
+import posixpath
+import re
+import unicodedata
+import zipfile
+from dataclasses import dataclass, field
+from typing import IO, Any, Dict, Iterator, List, Optional, Set, Tuple
+from xml.etree import ElementTree
+
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.models import CatalogGame, CollectionItem
+from app.schemas import GameCreate
+from app.services.import_pipeline import ImportResult, import_pipeline
+
+logger = logging.getLogger(__name__)
+
+
+# Cabeçalhos aceitos (normalizados: minúsculas, sem acento, "_" no lugar de espaços)
+HEADER_ALIASES = {
+    "nome": "name",
+    "jogo": "name",
+    "titulo": "name",
+    "descricao": "description",
+    "ano": "year_published",
+    "ano_publicacao": "year_published",
+    "tipo": "game_type",
+    "bgg": "bgg_id",
+    "id_bgg": "bgg_id",
+    "ludopedia": "ludopedia_id",
+    "id_ludopedia": "ludopedia_id",
+    "ordem": "order",
+    "min_jogadores": "min_players",
+    "max_jogadores": "max_players",
+    "tempo_min": "min_playtime",
+    "tempo_max": "max_playtime",
+    "idade_minima": "min_age",
+    "idade": "min_age",
+    "nota": "rating",
+    "avaliacao": "rating",
+    "peso": "weight",
+    "complexidade": "weight",
+    "ranking": "ranking_position",
+    "troca": "is_for_trade",
+    "para_troca": "is_for_trade",
+    "venda": "is_for_sale",
+    "a_venda": "is_for_sale",
+    "condicao": "condition",
+    "estado": "condition",
+    "preco": "price",
+    "preco_venda": "price",
+    "preco_compra": "purchase_price",
+    "valor_pago": "purchase_price",
+    "notas": "notes",
+    "observacoes": "notes",
+    "imagem": "image_url",
+}
+
+# base_game_id referencia IDs internos de outra coleção e não é importado
+IMPORTABLE_FIELDS = set(GameCreate.model_fields) - {"base_game_id"}
+
+INT_FIELDS = {
+    "year_published", "bgg_id", "ludopedia_id", "order", "min_players", "max_players",
+    "min_playtime", "max_playtime", "min_age", "ranking_position",
+}
+FLOAT_FIELDS = {"rating", "weight", "price", "purchase_price"}
+BOOL_FIELDS = {"is_for_trade", "is_for_sale"}
+
+TRUE_VALUES = {"1", "true", "sim", "s", "yes", "y", "x", "verdadeiro"}
+FALSE_VALUES = {"0", "false", "nao", "n", "no", "falso", ""}
+GAME_TYPES = {"base": "BASE", "expansion": "EXPANSION", "expansao": "EXPANSION"}
+
+# Número máximo de erros devolvidos no relatório (o total é sempre contado)
+MAX_REPORTED_ERRORS = 1000
+
+_XLSX_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_RELS_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+_DOC_RELS_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_CELL_REF = re.compile(r"([A-Z]+)")
+
+_games_adapter = TypeAdapter(List[GameCreate])
+
+
+class SpreadsheetError(ValueError):
+    """Arquivo que não pode ser lido como planilha"""
+
+
+@dataclass
+class RowError:
+    row: int
+    field: Optional[str]
+    message: str
+
+
+@dataclass
+class SpreadsheetImportResult:
+    """Resultado da importação de uma planilha"""
+    total_rows: int = 0
+    imported_count: int = 0
+    matched_count: int = 0
+    skipped_existing: int = 0
+    skipped_duplicate: int = 0
+    error_count: int = 0
+    errors: List[RowError] = field(default_factory=list)
+
+    def add_error(self, row: int, field: Optional[str], message: str) -> None:
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(RowError(row, field, message))
+
+    def add_pipeline_result(self, result: ImportResult) -> None:
+        self.imported_count += result.imported_count
+        self.skipped_existing += result.skipped_existing
+        self.skipped_duplicate += result.skipped_duplicate
+
+
+def _normalize(text: str) -> str:
+    text = unicodedata.normalize("NFKD", str(text)).encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"[^a-z0-9]+", "_", text.strip().lower()).strip("_")
+
+
+def map_headers(headers: List[Any]) -> List[Optional[str]]:
+    """Campo de GameCreate de cada coluna (None para colunas ignoradas)"""
+    mapped = []
+    for header in headers:
+        key = _normalize(header) if header is not None else ""
+        name = HEADER_ALIASES.get(key, key)
+        mapped.append(name if name in IMPORTABLE_FIELDS else None)
+    return mapped
+
+
+def _number(value: Any) -> Any:
+    """Aceita 1234.5, 1.234,50 e 1234,5; devolve o texto original se não for número"""
+    if not isinstance(value, str):
+        return value
+    text = value.strip().replace("R$", "").replace(" ", "")
+    if "," in text:
+        text = text.replace(".", "").replace(",", ".")
+    try:
+        return float(text)
+    except ValueError:
+        return value
+
+
+def coerce(field_name: str, value: Any) -> Any:
+    """Converte o valor da célula para o tipo esperado; valores inválidos seguem para a validação"""
+    if isinstance(value, str):
+        value = value.strip()
+        if value == "":
+            return None
+    if value is None:
+        return None
+    if field_name in INT_FIELDS:
+        number = _number(value)
+        if isinstance(number, float) and number.is_integer():
+            return int(number)
+        return number
+    if field_name in FLOAT_FIELDS:
+        return _number(value)
+    if field_name in BOOL_FIELDS:
+        if isinstance(value, bool):
+            return value
+        key = _normalize(value)
+        if key in TRUE_VALUES:
+            return True
+        if key in FALSE_VALUES:
+            return False
+        return value
+    if field_name == "game_type":
+        return GAME_TYPES.get(_normalize(value), value)
+    return value if isinstance(value, str) else str(value)
+
+
+def _open_text(file: IO[bytes]) -> IO[str]:
+    """Abre o CSV como texto: UTF-8 (com ou sem BOM) ou, se não decodificar, Windows-1252"""
+    sample = file.read(64 * 1024)
+    file.seek(0)
+    try:
+        # Um caractere multibyte pode ter sido cortado no fim da amostra
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+        encoding = "utf-8-sig"
+    except UnicodeDecodeError:
+        encoding = "cp1252"
+    return io.TextIOWrapper(file, encoding=encoding, newline="")
+
+
+def iter_csv(file: IO[bytes]) -> Iterator[Tuple[int, List[Any]]]:
+    """Linhas do CSV com o número da linha no arquivo (o cabeçalho é a linha 1)"""
+    text = _open_text(file)
+    sample = text.read(64 * 1024)
+    text.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+    reader = csv.reader(text, dialect)
+    for row in reader:
+        if any(cell.strip() for cell in row):
+            yield reader.line_num, row
+    text.detach()
+
+
+def _xlsx_first_sheet(archive: zipfile.ZipFile) -> str:
+    workbook = ElementTree.fromstring(archive.read("xl/workbook.xml"))
+    sheet = workbook.find(f"{_XLSX_NS}sheets/{_XLSX_NS}sheet")
+    if sheet is None:
+        raise SpreadsheetError("Planilha sem abas")
+    rel_id = sheet.get(f"{_DOC_RELS_NS}id")
+    rels = ElementTree.fromstring(archive.read("xl/_rels/workbook.xml.rels"))
+    for rel in rels.iter(f"{_RELS_NS}Relationship"):
+        if rel.get("Id") == rel_id:
+            target = rel.get("Target")
+            return target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join("xl", target))
+    raise SpreadsheetError("Aba não encontrada no arquivo")
+
+
+def _xlsx_shared_strings(archive: zipfile.ZipFile) -> List[str]:
+    if "xl/sharedStrings.xml" not in archive.namelist():
+        return []
+    strings = []
+    with archive.open("xl/sharedStrings.xml") as f:
+        for _, element in ElementTree.iterparse(f):
+            if element.tag == f"{_XLSX_NS}si":
+                strings.append("".join(t.text or "" for t in element.iter(f"{_XLSX_NS}t")))
+                element.clear()
+    return strings
+
+
+def _column_index(ref: str) -> int:
+    index = 0
+    for letter in _CELL_REF.match(ref).group(1):
+        index = index * 26 + ord(letter) - 64
+    return index - 1
+
+
+def iter_xlsx(file: IO[bytes]) -> Iterator[Tuple[int, List[Any]]]:
+    """Linhas da primeira aba do XLSX, lidas em streaming com iterparse"""
+    try:
+        archive = zipfile.ZipFile(file)
+        sheet_path = _xlsx_first_sheet(archive)
+        shared = _xlsx_shared_strings(archive)
+    except (zipfile.BadZipFile, KeyError, ElementTree.ParseError) as e:
+        raise SpreadsheetError(f"Arquivo XLSX inválido: {e}") from e
+
+    with archive, archive.open(sheet_path) as sheet:
+        sheet_data = None
+        for event, element in ElementTree.iterparse(sheet, events=("start", "end")):
+            if event == "start":
+                if element.tag == f"{_XLSX_NS}sheetData":
+                    sheet_data = element
+                continue
+            if element.tag != f"{_XLSX_NS}row":
+                continue
+            values: List[Any] = []
+            for position, cell in enumerate(element.iter(f"{_XLSX_NS}c")):
+                ref = cell.get("r")
+                index = _column_index(ref) if ref else position
+                cell_type = cell.get("t")
+                if cell_type == "inlineStr":
+                    value: Any = "".join(t.text or "" for t in cell.iter(f"{_XLSX_NS}t"))
+                else:
+                    raw = cell.findtext(f"{_XLSX_NS}v")
+                    if raw is None:
+                        value = None
+                    elif cell_type == "s":
+                        value = shared[int(raw)]
+                    elif cell_type == "b":
+                        value = raw == "1"
+                    elif cell_type in ("str", "e"):
+                        value = raw
+                    else:
+                        value = float(raw)
+                        if value.is_integer():
+                            value = int(value)
+                if index >= len(values):
+                    values.extend([None] * (index + 1 - len(values)))
+                values[index] = value
+            number = int(element.get("r") or 0)
+            # Libera as linhas já lidas para a memória não crescer com o arquivo
+            if sheet_data is not None:
+                sheet_data.clear()
+            if any(value not in (None, "") for value in values):
+                yield number, values
+
+
+class SpreadsheetImportService:
+    """
+    Importa uma coleção a partir de uma planilha CSV ou XLSX.
+
+    As linhas são lidas em streaming, validadas em lotes com as regras de
+    GameCreate, associadas ao catálogo compartilhado pelo nome quando não
+    trazem IDs de provedor e gravadas pelo pipeline de importação, um lote
+    por transação.
+    """
+
+    BATCH_SIZE = 500
+
+    def rows(self, file: IO[bytes], file_format: str) -> Iterator[Tuple[int, List[Any]]]:
+        if file_format == "xlsx":
+            return iter_xlsx(file)
+        return iter_csv(file)
+
+    def validate_batch(
+        self, batch: List[Tuple[int, Dict[str, Any]]], result: SpreadsheetImportResult
+    ) -> List[Dict[str, Any]]:
+        """Valida o lote de uma vez; só revalida linha a linha quando algo falha"""
+        try:
+            games = _games_adapter.validate_python([data for _, data in batch])
+            return [game.model_dump(exclude={"base_game_id"}) for game in games]
+        except ValidationError:
+            pass
+
+        valid = []
+        for row_number, data in batch:
+            try:
+                valid.append(GameCreate.model_validate(data).model_dump(exclude={"base_game_id"}))
+            except ValidationError as e:
+                for error in e.errors():
+                    location = ".".join(str(part) for part in error["loc"]) or None
+                    result.add_error(row_number, location, error["msg"])
+        return valid
+
+    def match_providers(self, db: Session, records: List[Dict[str, Any]]) -> int:
+        """
+        Preenche bgg_id/ludopedia_id de linhas sem IDs pelo nome (e ano, se houver)
+
+        Só associa quando há exatamente um título compartilhado compatível.
+
+        Returns:
+            Quantidade de linhas associadas
+        """
+        unmatched = [r for r in records if r.get("bgg_id") is None and r.get("ludopedia_id") is None]
+        if not unmatched:
+            return 0
+
+        names = {record["name"].strip().lower() for record in unmatched}
+        candidates: Dict[str, List[Any]] = {}
+        rows = db.execute(
+            select(CatalogGame.name, CatalogGame.year_published, CatalogGame.bgg_id, CatalogGame.ludopedia_id)
+            .where(
+                CatalogGame.owner_id.is_(None),
+                func.lower(CatalogGame.name).in_(names),
+            )
+        )
+        for row in rows:
+            candidates.setdefault(row.name.strip().lower(), []).append(row)
+
+        matched = 0
+        for record in unmatched:
+            options = candidates.get(record["name"].strip().lower(), [])
+            if record.get("year_published"):
+                options = [o for o in options if o.year_published == record["year_published"]]
+            if len(options) == 1:
+                record["bgg_id"] = options[0].bgg_id
+                record["ludopedia_id"] = options[0].ludopedia_id
+                matched += 1
+        return matched
+
+    @staticmethod
+    def load_private_names(db: Session, user_id: int) -> Set[str]:
+        """Nomes (em minúsculas) dos jogos do usuário sem ID de provedor"""
+        rows = db.execute(
+            select(func.lower(CatalogGame.name))
+            .join(CollectionItem, CollectionItem.catalog_id == CatalogGame.id)
+            .where(
+                CollectionItem.user_id == user_id,
+                CatalogGame.bgg_id.is_(None),
+                CatalogGame.ludopedia_id.is_(None),
+            )
+        )
+        return {row[0].strip() for row in rows}
+
+    def _store(
+        self,
+        db: Session,
+        user_id: int,
+        records: List[Dict[str, Any]],
+        existing: Dict[str, Set],
+        result: SpreadsheetImportResult,
+    ) -> None:
+        result.matched_count += self.match_providers(db, records)
+
+        # Sem ID de provedor, o nome é a chave para não duplicar jogos em reenvios
+        if "private" not in existing:
+            existing["private"] = self.load_private_names(db, user_id)
+            existing["private_seen"] = set()
+        unique = []
+        for record in records:
+            if record.get("bgg_id") is None and record.get("ludopedia_id") is None:
+                name = record["name"].strip().lower()
+                if name in existing["private"]:
+                    result.skipped_existing += 1
+                    continue
+                if name in existing["private_seen"]:
+                    result.skipped_duplicate += 1
+                    continue
+                existing["private_seen"].add(name)
+            unique.append(record)
+        records = unique
+
+        # Linhas só com ID da Ludopedia deduplicam por ele; o resto pelo BGG (ou ficam privadas)
+        groups = {
+            "ludopedia": [r for r in records if r.get("bgg_id") is None and r.get("ludopedia_id") is not None],
+            "bgg": [r for r in records if r.get("bgg_id") is not None or r.get("ludopedia_id") is None],
+        }
+        for provider, group in groups.items():
+            if not group:
+                continue
+            if provider not in existing:
+                existing[provider] = import_pipeline.load_existing_ids(db, user_id, provider)
+            id_key = "bgg_id" if provider == "bgg" else "ludopedia_id"
+            pipeline_result = import_pipeline.run(
+                db, user_id, group, provider=provider, existing_ids=existing[provider], from_provider=False
+            )
+            result.add_pipeline_result(pipeline_result)
+            existing[provider].update(r[id_key] for r in group if r.get(id_key) is not None)
+
+    def run(self, db: Session, user_id: int, file: IO[bytes], file_format: str) -> SpreadsheetImportResult:
+        """
+        Importa a planilha para a coleção do usuário
+
+        Args:
+            db: Sessão do banco de dados
+            user_id: ID do usuário dono da coleção
+            file: Arquivo binário com acesso aleatório (seek)
+            file_format: "csv" ou "xlsx"
+
+        Returns:
+            Contagens e relatório de erros por linha
+        """
+        result = SpreadsheetImportResult()
+        rows = self.rows(file, file_format)
+
+        header = next(rows, None)
+        if header is None:
+            raise SpreadsheetError("Arquivo vazio")
+        fields = map_headers(header[1])
+        if "name" not in fields:
+            raise SpreadsheetError("A planilha precisa de uma coluna 'name' (ou 'nome')")
+
+        existing: Dict[str, Set] = {}
+        batch: List[Tuple[int, Dict[str, Any]]] = []
+        for row_number, values in rows:
+            result.total_rows += 1
+            data = {
+                field_name: coerce(field_name, value)
+                for field_name, value in zip(fields, values)
+                if field_name is not None
+            }
+            batch.append((row_number, {k: v for k, v in data.items() if v is not None}))
+            if len(batch) >= self.BATCH_SIZE:
+                self._store(db, user_id, self.validate_batch(batch, result), existing, result)
+                batch = []
+        if batch:
+            self._store(db, user_id, self.validate_batch(batch, result), existing, result)
+
+        logger.info(
+            "Importação de planilha concluída",
+            extra={
+                "user_id": user_id,
+                "rows": result.total_rows,
+                "imported": result.imported_count,
+                "errors": result.error_count,
+            },
+        )
+        return result
+
+
+# Instância global do serviço
+spreadsheet_import = SpreadsheetImportService()
@@ -6,8 +6,11 @@ from app.utils.auth import (
     get_user_by_email,
     get_user_by_id,
     authenticate_user,
+    get_user_from_token,
     get_current_user,
     get_current_active_user,
+    get_current_db_user,
+    CurrentUser,
 )
 
 __all__ = [
@@ -18,7 +21,10 @@ __all__ = [
     "get_user_by_email",
     "get_user_by_id",
     "authenticate_user",
+    "get_user_from_token",
     "get_current_user",
     "get_current_active_user",
+    "get_current_db_user",
+    "CurrentUser",
 ]
 
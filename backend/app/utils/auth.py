@@ -1,3 +1,4 @@
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
@@ -7,8 +8,9 @@ from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from app.config import settings
 from app.database import get_db
-from app.models.user import User
+from app.models.user import User, UserRole
 from app.schemas.auth import TokenData
+from app.services.auth_tokens import auth_tokens
 
 # Import datetime for use in other modules
 from datetime import datetime as dt
@@ -20,6 +22,21 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
 
+@dataclass(frozen=True)
+class CurrentUser:
+    """Usuário autenticado, montado a partir das claims do token de acesso"""
+    id: int
+    username: str
+    email: str
+    role: UserRole
+    is_active: bool
+    token_version: int
+
+    @classmethod
+    def from_user(cls, user: User) -> "CurrentUser":
+        return cls(user.id, user.username, user.email, user.role, user.is_active, 0)
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verifica se a senha está correta"""
     return pwd_context.verify(plain_password, hashed_password)
@@ -70,27 +87,55 @@ def authenticate_user(db: Session, username: str, password: str) -> Optional[Use
     return user
 
 
+def get_user_from_token(db: Session, token: str) -> Optional[CurrentUser]:
+    """
+    Valida o token JWT e retorna o usuário correspondente
+
+    Tokens com as claims do usuário (uid, ver...) não consultam o banco, a
+    não ser quando a versão aparece no filtro de revogações. Tokens antigos,
+    só com `sub`, ainda buscam o usuário até vencerem.
+    """
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        username: str = payload.get("sub")
+        if username is None:
+            return None
+        token_data = TokenData(username=username, user_id=payload.get("uid"))
+    except JWTError:
+        return None
+
+    if token_data.user_id is None:
+        user = get_user_by_username(db, username=token_data.username)
+        return CurrentUser.from_user(user) if user else None
+
+    try:
+        current_user = CurrentUser(
+            id=token_data.user_id,
+            username=token_data.username,
+            email=payload["email"],
+            role=UserRole(payload["role"]),
+            is_active=bool(payload["act"]),
+            token_version=int(payload["ver"]),
+        )
+    except (KeyError, ValueError):
+        return None
+    if auth_tokens.is_revoked(db, current_user.id, current_user.token_version):
+        return None
+    return current_user
+
+
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: Session = Depends(get_db)
-) -> User:
-    """Obtém o usuário atual a partir do token"""
+) -> CurrentUser:
+    """Obtém o usuário atual a partir do token (sem consultar o banco)"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-        token_data = TokenData(username=username)
-    except JWTError:
-        raise credentials_exception
-    
-    user = get_user_by_username(db, username=token_data.username)
+    user = get_user_from_token(db, token)
     if user is None:
         raise credentials_exception
     
@@ -98,10 +143,34 @@ async def get_current_user(
 
 
 async def get_current_active_user(
-    current_user: User = Depends(get_current_user)
-) -> User:
+    current_user: CurrentUser = Depends(get_current_user)
+) -> CurrentUser:
     """Obtém o usuário ativo atual"""
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
+
+
+async def get_current_admin_user(
+    current_user: CurrentUser = Depends(get_current_active_user)
+) -> CurrentUser:
+    """Obtém o usuário atual, exigindo que seja administrador (ADMIN_EMAILS)"""
+    if current_user.email not in settings.ADMIN_EMAILS:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    return current_user
+
+
+async def get_current_db_user(
+    current_user: CurrentUser = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+) -> User:
+    """Obtém o registro completo do usuário ativo (para rotas que leem ou alteram o perfil)"""
+    user = get_user_by_id(db, current_user.id)
+    if user is None or not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user
@@ -0,0 +1,308 @@
+"""
+Benchmark da API com coleções sintéticas grandes.
+
+Semeia usuários com 100, 1k, 10k e 50k jogos (com expansões ligadas por
+base_game_id) e executa, por um cliente ASGI em processo e com requisições
+concorrentes:
+
+- GET /api/collection/ para cada campo de ordenação, asc e desc
+- CRUD de jogos (POST, GET, PUT e DELETE em /api/collection/games)
+- login (POST /api/auth/login)
+- lotes: import_pipeline.run com registros de provedor e DELETE /api/collection/
+
+Para cada cenário registra vazão, latências p50/p95/p99, consultas por
+requisição e o pico de RSS do processo, e grava tudo em JSON para comparar
+commits com benchmarks.compare.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_api [--sizes 100 1000] [--concurrency 8] [--requests 50]
+        [--database-url postgresql://...] [--output resultado.json]
+
+Sem --database-url (ou DATABASE_URL) usa um SQLite temporário; para números
+comparáveis com produção, aponte para um PostgreSQL descartável.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+DEFAULT_SIZES = (100, 1000, 10000, 50000)
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+RequestFactory = Callable[[Any, int], Awaitable[Any]]
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Percentil pelo método nearest-rank"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(int(round(q / 100 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def peak_rss_mb() -> float:
+    """Pico de memória residente do processo até agora (MB)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss é em KB no Linux e em bytes no macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+async def run_scenario(
+    name: str,
+    size: Optional[int],
+    make_request: RequestFactory,
+    client,
+    requests: int,
+    concurrency: int,
+) -> Dict[str, Any]:
+    """Executa `requests` chamadas com até `concurrency` em paralelo e mede cada uma"""
+    from app.core.db_instrumentation import track_queries
+
+    latencies: List[float] = []
+    queries: List[int] = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(index: int) -> None:
+        nonlocal errors
+        async with semaphore:
+            with track_queries() as stats:
+                started = time.perf_counter()
+                response = await make_request(client, index)
+                latencies.append(time.perf_counter() - started)
+            queries.append(stats.count)
+            if getattr(response, "status_code", 200) >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - started
+
+    result = {
+        "scenario": name,
+        "size": size,
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "throughput_rps": round(requests / elapsed, 2) if requests else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 2),
+            "p95": round(percentile(latencies, 95) * 1000, 2),
+            "p99": round(percentile(latencies, 99) * 1000, 2),
+            "mean": round(sum(latencies) / max(len(latencies), 1) * 1000, 2),
+            "max": round(max(latencies, default=0) * 1000, 2),
+        },
+        "queries_per_request": round(sum(queries) / max(len(queries), 1), 2),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    print(
+        f"{name:<40} {str(size or '-'):>6}  {result['throughput_rps']:>9.1f} req/s  "
+        f"p50 {result['latency_ms']['p50']:>9.2f}  p95 {result['latency_ms']['p95']:>9.2f}  "
+        f"p99 {result['latency_ms']['p99']:>9.2f} ms  {result['queries_per_request']:>6.1f} q/req  "
+        f"{result['peak_rss_mb']:>7.1f} MB" + (f"  {errors} erros" if errors else "")
+    )
+    return result
+
+
+def _auth(token: str) -> Dict[str, str]:
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def collection_scenarios(client, size: int, token: str, args) -> List[Dict[str, Any]]:
+    from app.api.collection import SORT_COLUMNS
+
+    # Coleções grandes custam segundos por requisição; limita o total por cenário
+    requests = max(3, min(args.requests, 100_000 // size))
+    results = []
+    for sort_by in SORT_COLUMNS:
+        for sort_order in ("asc", "desc"):
+            async def request(c, i, sort_by=sort_by, sort_order=sort_order):
+                return await c.get(
+                    "/api/collection/",
+                    params={"sortBy": sort_by, "sortOrder": sort_order},
+                    headers=_auth(token),
+                )
+            results.append(await run_scenario(
+                f"get_collection sort={sort_by} {sort_order}", size, request, client,
+                requests, args.concurrency,
+            ))
+    return results
+
+
+async def crud_scenarios(client, size: int, token: str, args) -> List[Dict[str, Any]]:
+    created: List[int] = []
+
+    async def create(c, i):
+        response = await c.post("/api/collection/games", headers=_auth(token), json={
+            "name": f"Jogo CRUD {size}-{i}",
+            "year_published": 2020,
+            "min_players": 2,
+            "max_players": 4,
+            "purchase_price": 199.9,
+        })
+        if response.status_code == 201:
+            created.append(response.json()["id"])
+        return response
+
+    async def read(c, i):
+        return await c.get(f"/api/collection/games/{created[i]}", headers=_auth(token))
+
+    async def update(c, i):
+        return await c.put(
+            f"/api/collection/games/{created[i]}", headers=_auth(token),
+            json={"is_for_sale": True, "price": 150.0, "condition": "Usado - ótimo"},
+        )
+
+    async def delete(c, i):
+        return await c.delete(f"/api/collection/games/{created[i]}", headers=_auth(token))
+
+    results = [await run_scenario("crud create", size, create, client, args.requests, args.concurrency)]
+    for name, request in (("crud read", read), ("crud update", update), ("crud delete", delete)):
+        results.append(await run_scenario(name, size, request, client, len(created), args.concurrency))
+    return results
+
+
+async def login_scenario(client, size: int, args) -> Dict[str, Any]:
+    from benchmarks.seed import PASSWORD, username_for
+
+    async def login(c, i):
+        return await c.post("/api/auth/login", data={"username": username_for(size), "password": PASSWORD})
+
+    # bcrypt é lento de propósito; poucas requisições bastam
+    return await run_scenario("login", size, login, client, min(args.requests, 20), args.concurrency)
+
+
+async def batch_scenarios(client, args) -> List[Dict[str, Any]]:
+    import random
+
+    from app.database import SessionLocal
+    from app.models import User
+    from app.services import import_pipeline
+    from benchmarks.seed import access_token, catalog_record
+
+    db = SessionLocal()
+    user = db.query(User).filter(User.username == "bench_batch").first()
+    if user is None:
+        user = User(email="bench_batch@bench.local", username="bench_batch", hashed_password="-")
+        db.add(user)
+        db.commit()
+    user_id = user.id
+    token = access_token(db, user)
+    db.close()
+
+    rng = random.Random(7)
+    records = [catalog_record(index, rng) for index in range(args.batch_size)]
+    runs = max(3, min(args.requests // 10, 10))
+
+    async def import_batch(c, i):
+        # Rota síncrona: roda no threadpool como o FastAPI faria
+        def run():
+            session = SessionLocal()
+            try:
+                return import_pipeline.run(session, user_id, records, provider="bgg")
+            finally:
+                session.close()
+        await asyncio.to_thread(run)
+        return await c.delete("/api/collection/", headers=_auth(token))
+
+    async def clear(c, i):
+        return await c.delete("/api/collection/", headers=_auth(token))
+
+    return [
+        # Importações do mesmo usuário em série (como o checkpoint garante em produção)
+        await run_scenario(
+            f"batch import_pipeline+clear ({args.batch_size})", None, import_batch, client, runs, 1,
+        ),
+        await run_scenario("batch clear (vazia)", None, clear, client, runs, args.concurrency),
+    ]
+
+
+async def run(args) -> Dict[str, Any]:
+    import httpx
+
+    from app.database import SessionLocal, engine
+    from app.main import app
+    from benchmarks.seed import access_token, seed_user
+
+    results: List[Dict[str, Any]] = []
+    async with httpx.AsyncClient(app=app, base_url="http://bench", timeout=None) as client:
+        for size in args.sizes:
+            started = time.perf_counter()
+            db = SessionLocal()
+            token = access_token(db, seed_user(db, size))
+            db.close()
+            print(f"-- {size} jogos (semeado em {time.perf_counter() - started:.1f}s)")
+
+            results += await collection_scenarios(client, size, token, args)
+            results += await crud_scenarios(client, size, token, args)
+            results.append(await login_scenario(client, size, args))
+
+        print("-- lotes")
+        results += await batch_scenarios(client, args)
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": engine.dialect.name,
+            "sizes": list(args.sizes),
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+        },
+        "results": results,
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da API com coleções sintéticas")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=50, help="Requisições por cenário")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Registros por importação em lote")
+    parser.add_argument("--database-url", help="Banco descartável (padrão: SQLite temporário)")
+    parser.add_argument("--output", help="Arquivo JSON de saída (padrão: benchmarks/results/)")
+    args = parser.parse_args()
+
+    # O banco precisa estar definido antes de importar o app
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    elif "DATABASE_URL" not in os.environ:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    # A carga de teste não deve esbarrar nos limites de requisição
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "False")
+
+    report = asyncio.run(run(args))
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"{stamp}-{report['meta']['git_commit'] or 'local'}.json")
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Resultados em {output}")
+
+
+if __name__ == "__main__":
+    main()
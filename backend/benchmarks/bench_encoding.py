@@ -0,0 +1,131 @@
+"""
+Bytes na rede e tempo de codificação por formato da coleção.
+
+Monta coleções sintéticas (mesmos títulos de benchmarks.seed) em memória e,
+para cada formato negociável em GET /api/collection/ (JSON, MessagePack,
+colunar JSON e colunar MessagePack), mede o tempo de codificação a partir do
+UserCollectionResponse, o tamanho bruto e o tamanho/tempo com gzip e brotli
+nos níveis configurados. Não usa banco nem HTTP: isola o custo do formato.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_encoding [--sizes 1000 10000] [--repeat 5] [--output resultado.json]
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import time
+import zlib
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Tuple
+
+DEFAULT_SIZES = (1000, 10000)
+
+
+def build_collection(size: int, seed: int = 42):
+    """UserCollectionResponse sintético com `size` jogos"""
+    from app.schemas import GameResponse, UserCollectionResponse
+    from benchmarks.seed import CONDITIONS, catalog_record
+
+    rng = random.Random(seed + size)
+    now = datetime.now(timezone.utc)
+    games = []
+    for index in range(size):
+        record = catalog_record(index, rng)
+        is_for_sale = rng.random() < 0.15
+        games.append(GameResponse(
+            **record,
+            id=index + 1,
+            user_id=1,
+            order=index,
+            base_game_id=index if record["game_type"] == "EXPANSION" else None,
+            base_game_name=f"Jogo Sintético {index - 1:06d}" if record["game_type"] == "EXPANSION" else None,
+            is_for_trade=rng.random() < 0.1,
+            is_for_sale=is_for_sale,
+            condition=rng.choice(CONDITIONS),
+            price=round(rng.uniform(50, 900), 2) if is_for_sale else None,
+            purchase_price=round(rng.uniform(50, 900), 2) if rng.random() < 0.7 else None,
+            created_at=now,
+        ))
+    return UserCollectionResponse(user_id=1, total_games=size, games=games)
+
+
+def timed(func: Callable[[], Any], repeat: int) -> Tuple[Any, float]:
+    """Resultado e mediana do tempo (ms) de `repeat` execuções"""
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - started)
+    return result, round(statistics.median(times) * 1000, 2)
+
+
+def bench_size(size: int, repeat: int) -> List[Dict[str, Any]]:
+    import brotli
+
+    from app.config import settings
+    from app.core import encoding
+    from app.schemas import GameResponse
+
+    collection = build_collection(size)
+    fields = list(GameResponse.model_fields)
+
+    def encoder(media_type: str) -> Callable[[], bytes]:
+        def run() -> bytes:
+            document = collection.model_dump(mode="json")
+            if media_type in (encoding.COLUMNAR_JSON, encoding.COLUMNAR_MSGPACK):
+                document["games"] = encoding.to_columnar(document["games"], fields)
+            return encoding.encode(document, media_type)
+        return run
+
+    def gzip_bytes(data: bytes) -> bytes:
+        compressor = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+        return compressor.compress(data) + compressor.flush()
+
+    def brotli_bytes(data: bytes) -> bytes:
+        return brotli.compress(data, quality=settings.COMPRESSION_BROTLI_QUALITY)
+
+    results = []
+    for media_type in (encoding.JSON, encoding.MSGPACK, encoding.COLUMNAR_JSON, encoding.COLUMNAR_MSGPACK):
+        raw, encode_ms = timed(encoder(media_type), repeat)
+        gzipped, gzip_ms = timed(lambda: gzip_bytes(raw), repeat)
+        brotlied, brotli_ms = timed(lambda: brotli_bytes(raw), repeat)
+        result = {
+            "size": size,
+            "format": media_type,
+            "encode_ms": encode_ms,
+            "bytes": len(raw),
+            "gzip_bytes": len(gzipped),
+            "gzip_ms": gzip_ms,
+            "br_bytes": len(brotlied),
+            "br_ms": brotli_ms,
+        }
+        print(
+            f"{size:>6}  {media_type:<44} {encode_ms:>8.1f} ms  {len(raw):>10,} B  "
+            f"gzip {len(gzipped):>9,} B ({gzip_ms:>6.1f} ms)  br {len(brotlied):>9,} B ({brotli_ms:>6.1f} ms)"
+        )
+        results.append(result)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tamanho e tempo de codificação por formato da coleção")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--repeat", type=int, default=5, help="Execuções por medida (vale a mediana)")
+    parser.add_argument("--output", help="Arquivo JSON de saída")
+    args = parser.parse_args()
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    results = []
+    for size in args.sizes:
+        results += bench_size(size, args.repeat)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"timestamp": datetime.now(timezone.utc).isoformat(), "results": results}, f, indent=2)
+        print(f"Resultados em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+Tempo de ponta a ponta de cada rota de importação contra os provedores falsos.
+
+Sobe benchmarks.fake_providers em uma porta local, aponta o app para ele
+(BGG_BASE_URL / LUDOPEDIA_BASE_URL) e executa cada rota com um usuário novo,
+medindo o tempo total, as chamadas aos provedores (por status), as
+consultas ao banco e os jogos importados:
+
+- POST /api/collection/import/bgg (lista de IDs, um /thing por jogo)
+- POST /api/collection/import-collection/bgg (inclui a fila 202 do BGG)
+- POST /api/ludopedia/import-collection (paginação + /jogos/{id} por jogo)
+- POST /api/ludopedia/sync-collection (sobre a coleção já importada)
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_imports [--collection-size 200] [--latency-ms 50]
+        [--error-rate 0] [--rate-limit 0] [--repeat 3] [--output resultado.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_fake_providers(config, port: int):
+    """Sobe os provedores falsos em uma thread e espera ficarem prontos"""
+    import uvicorn
+
+    from benchmarks.fake_providers import create_app
+
+    fake_app = create_app(config)
+    server = uvicorn.Server(uvicorn.Config(fake_app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, fake_app
+
+
+def _provider_calls() -> Dict[str, float]:
+    from app.core.metrics import provider_requests_total
+
+    return {"/".join(labels): value for labels, value in provider_requests_total._values.items()}
+
+
+def _delta(before: Dict[str, float], after: Dict[str, float]) -> Dict[str, int]:
+    return {key: int(value - before.get(key, 0)) for key, value in after.items() if value - before.get(key, 0)}
+
+
+async def measure(name: str, call) -> Dict[str, Any]:
+    from app.core.db_instrumentation import track_queries
+
+    before = _provider_calls()
+    with track_queries() as queries:
+        started = time.perf_counter()
+        response = await call()
+        elapsed = time.perf_counter() - started
+
+    body = response.json() if response.headers.get("content-type", "").startswith("application/json") else None
+    if isinstance(body, list):
+        imported = len(body)
+    else:
+        imported = (body or {}).get("imported_count", (body or {}).get("added"))
+    calls = _delta(before, _provider_calls())
+    result = {
+        "route": name,
+        "status": response.status_code,
+        "seconds": round(elapsed, 3),
+        "imported": imported,
+        "provider_calls": calls,
+        "provider_calls_total": sum(calls.values()),
+        "db_queries": queries.count,
+        "db_seconds": round(queries.total_time, 3),
+    }
+    print(
+        f"{name:<45} {response.status_code}  {elapsed:>8.2f}s  importados {str(imported):>5}  "
+        f"chamadas {result['provider_calls_total']:>5}  consultas {queries.count:>5}"
+    )
+    return result
+
+
+async def run(args, config) -> List[Dict[str, Any]]:
+    import httpx
+
+    from app.database import SessionLocal
+    from app.main import app
+    from app.models import User
+    from benchmarks.seed import access_token
+
+    def new_user(label: str) -> str:
+        username = f"import_{label}_{int(time.time() * 1000)}"
+        db = SessionLocal()
+        user = User(email=f"{username}@bench.local", username=username, hashed_password="-")
+        db.add(user)
+        db.commit()
+        token = access_token(db, user)
+        db.close()
+        return token
+
+    results = []
+    async with httpx.AsyncClient(app=app, base_url="http://bench", timeout=None) as client:
+        for run_index in range(args.repeat):
+            headers = {"Authorization": f"Bearer {new_user('bgg_ids')}"}
+            game_ids = list(range(1, args.ids + 1))
+            results.append(await measure("POST /api/collection/import/bgg", lambda: client.post(
+                "/api/collection/import/bgg", json={"game_ids": game_ids}, headers=headers,
+            )))
+
+            headers = {"Authorization": f"Bearer {new_user('bgg_collection')}"}
+            results.append(await measure("POST /api/collection/import-collection/bgg", lambda: client.post(
+                "/api/collection/import-collection/bgg", params={"username": f"fake_{run_index}"}, headers=headers,
+            )))
+
+            headers = {"Authorization": f"Bearer {new_user('ludopedia')}"}
+            token = f"fake-token-{run_index}"
+            results.append(await measure("POST /api/ludopedia/import-collection", lambda: client.post(
+                "/api/ludopedia/import-collection", params={"access_token": token}, headers=headers,
+            )))
+            results.append(await measure("POST /api/ludopedia/sync-collection", lambda: client.post(
+                "/api/ludopedia/sync-collection", params={"access_token": token}, headers=headers,
+            )))
+    return results
+
+
+def summarize(results: List[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    summary: Dict[str, Dict[str, float]] = {}
+    for route in dict.fromkeys(r["route"] for r in results):
+        times = sorted(r["seconds"] for r in results if r["route"] == route)
+        summary[route] = {
+            "runs": len(times),
+            "min_seconds": times[0],
+            "median_seconds": times[len(times) // 2],
+            "max_seconds": times[-1],
+        }
+    return summary
+
+
+def main():
+    from benchmarks.fake_providers import FakeProviderConfig
+
+    parser = argparse.ArgumentParser(description="Benchmark das rotas de importação contra provedores falsos")
+    parser.add_argument("--collection-size", type=int, default=200)
+    parser.add_argument("--ids", type=int, default=50, help="IDs enviados para /import/bgg")
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=0.0)
+    parser.add_argument("--queue-seconds", type=float, default=1.0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--database-url", help="Banco descartável (padrão: SQLite temporário)")
+    parser.add_argument("--output", help="Arquivo JSON de saída")
+    args = parser.parse_args()
+
+    config = FakeProviderConfig(
+        latency_ms=args.latency_ms,
+        latency_sigma=args.latency_sigma,
+        error_rate=args.error_rate,
+        rate_limit=args.rate_limit,
+        collection_size=args.collection_size,
+        queue_seconds=args.queue_seconds,
+    )
+    port = _free_port()
+    server, fake_app = start_fake_providers(config, port)
+
+    # Configuração do app antes de importá-lo
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    elif "DATABASE_URL" not in os.environ:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench_imports.db"
+    os.environ["BGG_BASE_URL"] = f"http://127.0.0.1:{port}/xmlapi2"
+    os.environ["LUDOPEDIA_BASE_URL"] = f"http://127.0.0.1:{port}/api/v1"
+    os.environ["LUDOPEDIA_REQUEST_DELAY_SECONDS"] = "0"
+    os.environ["BGG_COLLECTION_RETRY_SECONDS"] = str(max(args.queue_seconds / 2, 0.1))
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    # A carga de teste não deve esbarrar nos limites de requisição
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "False")
+
+    try:
+        results = asyncio.run(run(args, config))
+    finally:
+        server.should_exit = True
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "fake_providers": vars(config),
+            "provider_behavior": {
+                name: {
+                    "requests": behavior.requests,
+                    "throttled": behavior.throttled,
+                    "failed": behavior.failed,
+                }
+                for name, behavior in (
+                    ("bgg", fake_app.state.bgg.state.behavior),
+                    ("ludopedia", fake_app.state.ludopedia.state.behavior),
+                )
+            },
+        },
+        "summary": summarize(results),
+        "runs": results,
+    }
+    print(json.dumps(report["summary"], indent=2, ensure_ascii=False))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"Resultados em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Mede o custo do middleware de métricas do Prometheus.
+
+1. Custo fixo do MetricsMiddleware: um app ASGI vazio, com e sem o middleware.
+2. Tempo de uma requisição real do app (GET /api/collection/ com 100 jogos,
+   SQLite temporário), para comparar o custo fixo com o tempo da requisição.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_metrics [--requests 5000]
+
+Resultado medido (Python 3.11, 1 vCPU, métricas com lock):
+    custo do middleware:        ~4 µs/req
+    GET /api/collection/ (100): ~12 ms/req
+    custo relativo:             ~0.04% (< 1%)
+    Histogram.observe ~0.65 µs, Counter.inc ~0.5 µs
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import timeit
+
+
+def _scope(path: str, headers=()):
+    return {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": b"", "root_path": "", "headers": list(headers),
+        "client": ("127.0.0.1", 1), "server": ("test", 80),
+    }
+
+
+async def _call(app, path: str, headers=()) -> None:
+    messages = [{"type": "http.request", "body": b"", "more_body": False}]
+
+    async def receive():
+        # Depois do corpo o cliente "desconecta", como o servidor faria ao fim da resposta
+        return messages.pop() if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        pass
+
+    await app(_scope(path, headers), receive, send)
+
+
+async def _time(app, path: str, requests: int, headers=()) -> float:
+    for _ in range(min(200, requests)):  # aquecimento
+        await _call(app, path, headers)
+    started = time.perf_counter()
+    for _ in range(requests):
+        await _call(app, path, headers)
+    return (time.perf_counter() - started) / requests
+
+
+async def _empty_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+def bench_middleware(requests: int) -> float:
+    from app.core.metrics import MetricsMiddleware
+
+    baseline = asyncio.run(_time(_empty_app, "/", requests))
+    instrumented = asyncio.run(_time(MetricsMiddleware(_empty_app), "/", requests))
+    return instrumented - baseline
+
+
+def bench_collection(requests: int) -> float:
+    from app.database import SessionLocal
+    from app.main import app
+    from app.models import CatalogGame, CollectionItem, User
+    from benchmarks.seed import access_token
+
+    db = SessionLocal()
+    user = User(email="bench@example.com", username="bench", hashed_password="x")
+    db.add(user)
+    db.flush()
+    for i in range(100):
+        catalog = CatalogGame(bgg_id=i + 1, name=f"Jogo {i}", min_players=1, max_players=4)
+        db.add(CollectionItem(user_id=user.id, catalog=catalog))
+    db.commit()
+    token = access_token(db, user)
+    db.close()
+
+    headers = [(b"authorization", f"Bearer {token}".encode())]
+    return asyncio.run(_time(app, "/api/collection/", requests, headers))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Custo do middleware de métricas")
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    overhead = bench_middleware(args.requests * 10)
+    request_time = bench_collection(args.requests // 10 or 1)
+
+    print(f"custo do middleware:        {overhead * 1e6:8.2f} µs/req")
+    print(f"GET /api/collection/ (100): {request_time * 1e3:8.2f} ms/req")
+    print(f"custo relativo:             {overhead / request_time * 100:8.3f} %")
+
+    from app.core.metrics import Counter, Histogram
+
+    histogram = Histogram("bench_seconds", "bench", ("method", "route"))
+    counter = Counter("bench_total", "bench", ("method", "route", "status"))
+    n = 200000
+    observe = timeit.timeit(lambda: histogram.observe(0.012, "GET", "/api/collection/"), number=n) / n
+    inc = timeit.timeit(lambda: counter.inc("GET", "/api/collection/", "200"), number=n) / n
+    print(f"Histogram.observe: {observe * 1e6:.2f} µs   Counter.inc: {inc * 1e6:.2f} µs")
+
+
+if __name__ == "__main__":
+    # Banco descartável, criado antes de importar o app
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+    # A carga de teste não deve esbarrar nos limites de requisição
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "False")
+    main()
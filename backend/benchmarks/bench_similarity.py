@@ -0,0 +1,118 @@
+"""
+Mede o índice de jogos parecidos (app/services/similar_games.py) em um
+catálogo sintético.
+
+Cria um SQLite temporário com N títulos (categorias e mecânicas sorteadas
+de um vocabulário de 200 tags, ~6 por jogo), monta o índice e mede a
+consulta "parecidos com" no catálogo inteiro, a ordenação de 50 candidatos
+e a atualização incremental de 1000 títulos alterados.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_similarity [--games 100000] [--queries 200]
+
+Resultado medido (Python 3.11, 1 vCPU, 100k títulos, 133 dimensões):
+    montagem:               ~3.9 s, ~61 MB de matrizes (7 shards)
+    similar (catálogo):     p50 ~2.0 ms, p95 ~2.8 ms
+                            (~7.7 ms com as matrizes por linha, lendo todas as colunas)
+    rank (50 candidatos):   p50 ~1.3 ms
+    atualização de 1000:    ~30 ms
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+
+def _seed(db, games: int) -> None:
+    from sqlalchemy import insert
+
+    from app.models import BggThingTag, CatalogGame, Tag, TagKind
+
+    rng = random.Random(42)
+    db.execute(insert(Tag.__table__), [
+        {"id": i + 1, "kind": TagKind.CATEGORY if i < 80 else TagKind.MECHANIC, "bgg_id": 1000 + i,
+         "name": f"Tag {i}", "slug": f"tag-{i}"}
+        for i in range(200)
+    ])
+    # Popularidade desigual das tags, como no BGG
+    weights = [1 / (i + 1) ** 0.7 for i in range(200)]
+    rows, tags = [], []
+    for game_id in range(1, games + 1):
+        min_players = rng.randint(1, 4)
+        min_playtime = rng.choice((15, 30, 45, 60, 90, 120))
+        rows.append({
+            "id": game_id, "bgg_id": game_id, "name": f"Game {game_id}", "game_type": "BASE",
+            "weight": round(rng.uniform(1, 5), 2), "min_players": min_players,
+            "max_players": min_players + rng.randint(0, 4), "min_playtime": min_playtime,
+            "max_playtime": min_playtime + rng.choice((0, 15, 30, 60)), "min_age": rng.choice((8, 10, 12, 14)),
+        })
+        for tag_id in set(rng.choices(range(1, 201), weights=weights, k=6)):
+            tags.append({"bgg_id": game_id, "tag_id": tag_id})
+    db.execute(insert(CatalogGame.__table__), rows)
+    db.execute(insert(BggThingTag.__table__), tags)
+    db.commit()
+
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    return statistics.median(samples) * 1000, samples[int(len(samples) * 0.95)] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do índice de jogos parecidos")
+    parser.add_argument("--games", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench_similarity.db"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ["SIMILARITY_REFRESH_SECONDS"] = "3600"
+
+    from sqlalchemy import text
+
+    from app.database import Base, SessionLocal, engine
+    import app.models  # noqa: F401 (registra as tabelas)
+    from app.services.similar_games import similar_games
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    _seed(db, args.games)
+
+    started = time.perf_counter()
+    similar_games.build(db)
+    build = time.perf_counter() - started
+    memory = sum(shard.matrix.nbytes for shard in similar_games._shards) / 1e6
+    print(f"montagem:               {build:.2f} s, {memory:.0f} MB de matrizes, {similar_games.dimensions} dimensões")
+
+    rng = random.Random(7)
+    samples = []
+    for _ in range(args.queries):
+        catalog_id = rng.randint(1, args.games)
+        started = time.perf_counter()
+        similar_games.similar(db, catalog_id, 10)
+        samples.append(time.perf_counter() - started)
+    p50, p95 = _percentiles(samples)
+    print(f"similar (catálogo):     p50 {p50:.2f} ms, p95 {p95:.2f} ms")
+
+    samples = []
+    for _ in range(args.queries):
+        candidates = rng.sample(range(1, args.games + 1), 50)
+        started = time.perf_counter()
+        similar_games.rank(db, candidates[0], candidates[1:], 10)
+        samples.append(time.perf_counter() - started)
+    p50, p95 = _percentiles(samples)
+    print(f"rank (50 candidatos):   p50 {p50:.2f} ms, p95 {p95:.2f} ms")
+
+    changed = rng.sample(range(1, args.games + 1), 1000)
+    db.execute(text(f"UPDATE catalog_games SET weight = 2.5 WHERE id IN ({','.join(map(str, changed))})"))
+    db.commit()
+    started = time.perf_counter()
+    similar_games.update(db, changed)
+    print(f"atualização de 1000:    {(time.perf_counter() - started) * 1000:.0f} ms")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
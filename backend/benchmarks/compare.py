@@ -0,0 +1,75 @@
+"""
+Compara dois resultados do benchmarks.bench_api.
+
+Aponta os cenários em que o p95, a vazão ou as consultas por requisição
+pioraram além do limite, e termina com código 1 se houver regressão (para
+uso em CI).
+
+Uso (a partir de backend/):
+    python -m benchmarks.compare base.json novo.json [--threshold 10]
+"""
+import argparse
+import json
+import sys
+from typing import Any, Dict, List, Tuple
+
+Key = Tuple[str, Any]
+
+
+def _load(path: str) -> Dict[Key, Dict[str, Any]]:
+    with open(path) as f:
+        report = json.load(f)
+    return {(r["scenario"], r["size"]): r for r in report["results"]}
+
+
+def _change(old: float, new: float) -> float:
+    if not old:
+        return 0.0
+    return (new - old) / old * 100
+
+
+def compare(base: Dict[Key, Dict], new: Dict[Key, Dict], threshold: float) -> List[str]:
+    """Retorna as regressões encontradas (uma linha por métrica)"""
+    regressions = []
+    for key in sorted(base.keys() & new.keys(), key=lambda k: (k[0], k[1] or 0)):
+        old, cur = base[key], new[key]
+        label = f"{key[0]} [{key[1] or '-'}]"
+
+        p95 = _change(old["latency_ms"]["p95"], cur["latency_ms"]["p95"])
+        throughput = _change(old["throughput_rps"], cur["throughput_rps"])
+        queries = cur["queries_per_request"] - old["queries_per_request"]
+
+        print(
+            f"{label:<50} p95 {old['latency_ms']['p95']:>9.2f} -> {cur['latency_ms']['p95']:>9.2f} ms ({p95:+6.1f}%)  "
+            f"vazão {throughput:+6.1f}%  consultas {old['queries_per_request']:.1f} -> {cur['queries_per_request']:.1f}"
+        )
+        if p95 > threshold:
+            regressions.append(f"{label}: p95 {p95:+.1f}%")
+        if throughput < -threshold:
+            regressions.append(f"{label}: vazão {throughput:+.1f}%")
+        if queries > 0.5:
+            regressions.append(f"{label}: +{queries:.1f} consultas por requisição")
+
+    for key in sorted(base.keys() - new.keys(), key=str):
+        print(f"Cenário ausente no novo resultado: {key}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara dois resultados de benchmark")
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Piora tolerada em %% (p95 e vazão)")
+    args = parser.parse_args()
+
+    regressions = compare(_load(args.base), _load(args.new), args.threshold)
+    if regressions:
+        print("\nRegressões:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print("\nSem regressões.")
+
+
+if __name__ == "__main__":
+    main()
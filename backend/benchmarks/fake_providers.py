@@ -0,0 +1,382 @@
+"""
+Provedores falsos do BGG e da Ludopedia para benchmarks locais.
+
+Servem respostas no formato das APIs reais, geradas de forma determinística
+a partir do ID do jogo:
+
+- BGG (XML, em /xmlapi2): /search, /thing (com vários IDs separados por
+  vírgula) e /collection, que responde 202 na primeira consulta de cada
+  usuário e 200 depois de `queue_seconds`, como o BGG faz.
+- Ludopedia (JSON, em /api/v1): /jogos, /jogos/{id} e /colecao paginada.
+
+Latência (log-normal), limite de requisições (429), erros injetados e o
+tamanho das coleções são configuráveis.
+
+Uso (a partir de backend/):
+    python -m benchmarks.fake_providers --port 8900 --latency-ms 80 --collection-size 500
+
+e aponte o app para eles:
+    BGG_BASE_URL=http://127.0.0.1:8900/xmlapi2
+    LUDOPEDIA_BASE_URL=http://127.0.0.1:8900/api/v1
+    LUDOPEDIA_REQUEST_DELAY_SECONDS=0
+"""
+import argparse
+import asyncio
+import math
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+from xml.sax.saxutils import escape, quoteattr
+
+from fastapi import FastAPI, Query, Request
+from fastapi.responses import JSONResponse, Response
+
+
+ADJECTIVES = (
+    "Ancient", "Lost", "Great", "Little", "Hidden", "Crimson", "Golden", "Iron", "Silent", "Wild",
+    "Northern", "Forgotten", "Eternal", "Broken", "Royal", "Secret", "Shining", "Twisted",
+)
+NOUNS = (
+    "Kingdoms", "Harbor", "Dungeon", "Railways", "Empire", "Garden", "Galaxy", "Castle", "Expedition",
+    "Market", "Colony", "Islands", "Frontier", "Dynasty", "Voyage", "Citadel", "Orchard", "Legacy",
+)
+CATEGORIES = ("Economic", "Fantasy", "Adventure", "Card Game", "Exploration", "Science Fiction", "Medieval")
+MECHANICS = ("Worker Placement", "Deck Building", "Tile Placement", "Set Collection", "Hand Management")
+DESIGNERS = ("Uwe Rosenberg", "Reiner Knizia", "Vital Lacerda", "Stefan Feld", "Elizabeth Hargrave")
+PUBLISHERS = ("Devir", "Galápagos Jogos", "Meeple BR", "Conclave", "Grok Games")
+EXPANSION_EVERY = 5
+
+
+@dataclass
+class FakeProviderConfig:
+    """Comportamento dos provedores falsos"""
+
+    latency_ms: float = 50.0  # Mediana da latência
+    latency_sigma: float = 0.5  # Dispersão da log-normal (0 = latência fixa)
+    error_rate: float = 0.0  # Fração de respostas 500/503
+    rate_limit: float = 0.0  # Requisições por segundo antes de 429 (0 = sem limite)
+    rate_burst: int = 10
+    collection_size: int = 200
+    catalog_size: int = 20000
+    queue_seconds: float = 1.0  # Tempo em que o BGG responde 202 para uma coleção nova
+    page_size: int = 100  # Máximo por página na Ludopedia
+    seed: int = 42
+
+
+def fake_game(game_id: int) -> Dict[str, Any]:
+    """Jogo sintético; o mesmo ID gera sempre os mesmos dados"""
+    rng = random.Random(game_id)
+    is_expansion = game_id % EXPANSION_EVERY == EXPANSION_EVERY - 1
+    base_name = f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {game_id}"
+    min_players = rng.randint(1, 4)
+    min_playtime = rng.choice((15, 30, 45, 60, 90, 120))
+    return {
+        "id": game_id,
+        "name": f"{base_name}: Expansion" if is_expansion else base_name,
+        "is_expansion": is_expansion,
+        "base_id": game_id - 1 if is_expansion else None,
+        "year": rng.randint(1960, 2025),
+        "min_players": min_players,
+        "max_players": min_players + rng.randint(0, 6),
+        "min_playtime": min_playtime,
+        "max_playtime": min_playtime + rng.choice((0, 15, 30, 60)),
+        "min_age": rng.choice((8, 10, 12, 14)),
+        "rating": round(rng.uniform(4, 9), 5),
+        "weight": round(rng.uniform(1, 5), 4),
+        "rank": rng.randint(1, 30000) if not is_expansion and rng.random() < 0.8 else None,
+        "users_rated": rng.randint(10, 100000),
+        "categories": rng.sample(CATEGORIES, 2),
+        "mechanics": rng.sample(MECHANICS, 2),
+        "designer": rng.choice(DESIGNERS),
+        "publisher": rng.choice(PUBLISHERS),
+        "description": f"{base_name} é um jogo sintético gerado para benchmarks. " * 6,
+        "price": round(rng.uniform(50, 900), 2),
+    }
+
+
+class ProviderBehavior:
+    """Latência, limite de requisições e erros aplicados a cada requisição"""
+
+    def __init__(self, config: FakeProviderConfig):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.tokens = float(config.rate_burst)
+        self.refilled_at = time.monotonic()
+        self.requests = 0
+        self.throttled = 0
+        self.failed = 0
+
+    def _take_token(self) -> bool:
+        if not self.config.rate_limit:
+            return True
+        now = time.monotonic()
+        self.tokens = min(self.config.rate_burst, self.tokens + (now - self.refilled_at) * self.config.rate_limit)
+        self.refilled_at = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+    async def __call__(self, request: Request, call_next):
+        self.requests += 1
+        if not self._take_token():
+            self.throttled += 1
+            retry_after = math.ceil(1 / self.config.rate_limit)
+            return Response("Rate limit exceeded", status_code=429, headers={"Retry-After": str(retry_after)})
+
+        if self.config.latency_ms:
+            median = self.config.latency_ms / 1000
+            delay = self.rng.lognormvariate(math.log(median), self.config.latency_sigma) if self.config.latency_sigma else median
+            await asyncio.sleep(delay)
+
+        if self.config.error_rate and self.rng.random() < self.config.error_rate:
+            self.failed += 1
+            return Response("Injected failure", status_code=self.rng.choice((500, 503)))
+
+        return await call_next(request)
+
+
+def _collection_ids(config: FakeProviderConfig, owner: str) -> List[int]:
+    rng = random.Random(f"{config.seed}:{owner}")
+    size = min(config.collection_size, config.catalog_size)
+    return sorted(rng.sample(range(1, config.catalog_size + 1), size))
+
+
+def _xml(body: str, status_code: int = 200) -> Response:
+    return Response(
+        '<?xml version="1.0" encoding="utf-8"?>' + body,
+        status_code=status_code,
+        media_type="text/xml; charset=utf-8",
+    )
+
+
+def _thing_xml(game: Dict[str, Any]) -> str:
+    thing_type = "boardgameexpansion" if game["is_expansion"] else "boardgame"
+    links = [
+        *(f'<link type="boardgamecategory" id="{1000 + CATEGORIES.index(c)}" value={quoteattr(c)}/>' for c in game["categories"]),
+        *(f'<link type="boardgamemechanic" id="{2000 + MECHANICS.index(m)}" value={quoteattr(m)}/>' for m in game["mechanics"]),
+        f'<link type="boardgamedesigner" id="{3000 + DESIGNERS.index(game["designer"])}" value={quoteattr(game["designer"])}/>',
+        f'<link type="boardgamepublisher" id="{4000 + PUBLISHERS.index(game["publisher"])}" value={quoteattr(game["publisher"])}/>',
+    ]
+    if game["is_expansion"]:
+        base = fake_game(game["base_id"])
+        links.append(
+            f'<link type="boardgameexpansion" id="{base["id"]}" value={quoteattr(base["name"])} inbound="true"/>'
+        )
+    elif (game["id"] + 1) % EXPANSION_EVERY == EXPANSION_EVERY - 1:
+        expansion = fake_game(game["id"] + 1)
+        links.append(f'<link type="boardgameexpansion" id="{expansion["id"]}" value={quoteattr(expansion["name"])}/>')
+
+    rank = game["rank"] if game["rank"] is not None else "Not Ranked"
+    return (
+        f'<item type="{thing_type}" id="{game["id"]}">'
+        f'<thumbnail>https://cf.geekdo-images.com/fake/thumb/{game["id"]}.jpg</thumbnail>'
+        f'<image>https://cf.geekdo-images.com/fake/{game["id"]}.jpg</image>'
+        f'<name type="primary" sortindex="1" value={quoteattr(game["name"])}/>'
+        f'<description>{escape(game["description"])}</description>'
+        f'<yearpublished value="{game["year"]}"/>'
+        f'<minplayers value="{game["min_players"]}"/><maxplayers value="{game["max_players"]}"/>'
+        f'<poll name="suggested_numplayers" title="User Suggested Number of Players" totalvotes="0">'
+        f'<results numplayers="{game["min_players"]}-{game["max_players"]}"/></poll>'
+        f'<playingtime value="{game["max_playtime"]}"/>'
+        f'<minplaytime value="{game["min_playtime"]}"/><maxplaytime value="{game["max_playtime"]}"/>'
+        f'<minage value="{game["min_age"]}"/>'
+        + "".join(links) +
+        f'<statistics page="1"><ratings><usersrated value="{game["users_rated"]}"/>'
+        f'<average value="{game["rating"]}"/><bayesaverage value="{game["rating"] * 0.9:.5f}"/>'
+        f'<ranks><rank type="subtype" id="1" name="boardgame" friendlyname="Board Game Rank" value="{rank}"/></ranks>'
+        f'<averageweight value="{game["weight"]}"/></ratings></statistics>'
+        f'</item>'
+    )
+
+
+def create_bgg_app(config: FakeProviderConfig) -> FastAPI:
+    """API XML falsa do BoardGameGeek"""
+    app = FastAPI(title="Fake BGG XML API2")
+    behavior = ProviderBehavior(config)
+    app.middleware("http")(behavior)
+    app.state.behavior = behavior
+    names = {game_id: fake_game(game_id)["name"] for game_id in range(1, config.catalog_size + 1)}
+    queued: Dict[str, float] = {}
+
+    @app.get("/search")
+    def search(query: str, type: str = "boardgame", exact: int = 0):
+        term = query.lower()
+        matches = [
+            game_id for game_id, name in names.items()
+            if (name.lower() == term if exact else term in name.lower())
+        ]
+        items = "".join(
+            f'<item type="boardgame" id="{game_id}"><name type="primary" value={quoteattr(names[game_id])}/>'
+            f'<yearpublished value="{fake_game(game_id)["year"]}"/></item>'
+            for game_id in matches
+        )
+        return _xml(f'<items total="{len(matches)}" termsofuse="https://boardgamegeek.com/xmlapi/termsofuse">{items}</items>')
+
+    @app.get("/thing")
+    def thing(id: str, stats: int = 0):
+        ids = [int(value) for value in id.split(",") if value.strip().isdigit()][:20]
+        items = "".join(_thing_xml(fake_game(game_id)) for game_id in ids if 0 < game_id <= config.catalog_size)
+        return _xml(f'<items termsofuse="https://boardgamegeek.com/xmlapi/termsofuse">{items}</items>')
+
+    @app.get("/collection")
+    def collection(username: str, own: int = 0, stats: int = 0):
+        # Primeira consulta enfileira a coleção, como o BGG real
+        ready_at = queued.setdefault(username, time.monotonic() + config.queue_seconds)
+        if time.monotonic() < ready_at:
+            return _xml(
+                "<message>Your request for this collection has been accepted and will be processed. "
+                "Please try again later for access.</message>",
+                status_code=202,
+            )
+
+        items = []
+        for collid, game_id in enumerate(_collection_ids(config, username), start=1):
+            game = fake_game(game_id)
+            rank = game["rank"] if game["rank"] is not None else "Not Ranked"
+            items.append(
+                f'<item objecttype="thing" objectid="{game_id}" subtype="boardgame" collid="{collid}">'
+                f'<name sortindex="1">{escape(game["name"])}</name>'
+                f'<yearpublished>{game["year"]}</yearpublished>'
+                f'<image>https://cf.geekdo-images.com/fake/{game_id}.jpg</image>'
+                f'<thumbnail>https://cf.geekdo-images.com/fake/thumb/{game_id}.jpg</thumbnail>'
+                f'<stats minplayers="{game["min_players"]}" maxplayers="{game["max_players"]}" '
+                f'minplaytime="{game["min_playtime"]}" maxplaytime="{game["max_playtime"]}" '
+                f'playingtime="{game["max_playtime"]}" numowned="{game["users_rated"] * 2}">'
+                f'<rating value="N/A"><usersrated value="{game["users_rated"]}"/>'
+                f'<average value="{game["rating"]}"/><bayesaverage value="{game["rating"] * 0.9:.5f}"/>'
+                f'<ranks><rank type="subtype" id="1" name="boardgame" friendlyname="Board Game Rank" value="{rank}"/></ranks>'
+                f'</rating></stats>'
+                f'<status own="1" prevowned="0" fortrade="0" want="0" wanttoplay="0" wanttobuy="0" '
+                f'wishlist="0" preordered="0" lastmodified="2024-01-01 12:00:00"/>'
+                f'<numplays>0</numplays></item>'
+            )
+        return _xml(
+            f'<items totalitems="{len(items)}" termsofuse="https://boardgamegeek.com/xmlapi/termsofuse" '
+            f'pubdate="Mon, 01 Jan 2024 12:00:00 +0000">{"".join(items)}</items>'
+        )
+
+    return app
+
+
+def _ludopedia_summary(game: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id_jogo": game["id"],
+        "nm_jogo": game["name"],
+        "nm_original": game["name"],
+        "thumb": f"https://storage.googleapis.com/ludopedia-capas/fake_{game['id']}_t.jpg",
+        "link": f"https://ludopedia.com.br/jogo/fake-{game['id']}",
+    }
+
+
+def create_ludopedia_app(config: FakeProviderConfig) -> FastAPI:
+    """API JSON falsa da Ludopedia"""
+    app = FastAPI(title="Fake Ludopedia API v1")
+    behavior = ProviderBehavior(config)
+    app.middleware("http")(behavior)
+    app.state.behavior = behavior
+    names = {game_id: fake_game(game_id)["name"] for game_id in range(1, config.catalog_size + 1)}
+
+    @app.get("/jogos")
+    def search(search: str = "", rows: int = Query(20, le=100), page: int = 1):
+        term = search.lower()
+        matches = [game_id for game_id, name in names.items() if term in name.lower()]
+        chunk = matches[(page - 1) * rows:page * rows]
+        return {"jogos": [_ludopedia_summary(fake_game(game_id)) for game_id in chunk], "total": len(matches)}
+
+    @app.get("/jogos/{id_jogo}")
+    def game_details(id_jogo: int):
+        if not 0 < id_jogo <= config.catalog_size:
+            return JSONResponse({"error": "Jogo não encontrado"}, status_code=404)
+        game = fake_game(id_jogo)
+        return {
+            **_ludopedia_summary(game),
+            "tp_jogo": "E" if game["is_expansion"] else "B",
+            "ano_publicacao": game["year"],
+            "ano_nacional": game["year"],
+            "qt_jogadores_min": game["min_players"],
+            "qt_jogadores_max": game["max_players"],
+            "vl_tempo_jogo": game["max_playtime"],
+            "idade_minima": game["min_age"],
+            "vl_nota": round(game["rating"], 2),
+            "vl_peso": round(game["weight"], 2),
+            "posicao_ranking": game["rank"],
+            "ds_jogo": game["description"],
+            "mecanicas": [{"id_mecanica": 2000 + i, "nm_mecanica": m} for i, m in enumerate(game["mechanics"])],
+            "categorias": [{"id_categoria": 1000 + i, "nm_categoria": c} for i, c in enumerate(game["categories"])],
+            "artistas": [],
+            "designers": [{"id_profissional": 3000 + DESIGNERS.index(game["designer"]), "nm_profissional": game["designer"]}],
+        }
+
+    @app.get("/colecao")
+    def collection(request: Request, lista: str = "colecao", rows: int = 100, page: int = 1):
+        if not request.headers.get("authorization", "").startswith("Bearer "):
+            return JSONResponse({"error": "Token inválido"}, status_code=401)
+        rows = min(rows, config.page_size)
+        ids = _collection_ids(config, request.headers["authorization"])
+        chunk = ids[(page - 1) * rows:page * rows]
+        items = []
+        for game_id in chunk:
+            game = fake_game(game_id)
+            items.append({
+                **_ludopedia_summary(game),
+                "vl_custo": game["price"],
+                "fl_tem": 1,
+                "fl_teve": 0,
+                "fl_favorito": 0,
+                "fl_quer": 0,
+                "fl_jogou": 0,
+                "comentario": "",
+            })
+        return {"colecao": items, "total": len(ids)}
+
+    return app
+
+
+def create_app(config: Optional[FakeProviderConfig] = None) -> FastAPI:
+    """App com os dois provedores: BGG em /xmlapi2 e Ludopedia em /api/v1"""
+    config = config or FakeProviderConfig()
+    app = FastAPI(title="Fake providers")
+    app.state.bgg = create_bgg_app(config)
+    app.state.ludopedia = create_ludopedia_app(config)
+    app.mount("/xmlapi2", app.state.bgg)
+    app.mount("/api/v1", app.state.ludopedia)
+    return app
+
+
+def config_from_args(argv=None):
+    parser = argparse.ArgumentParser(description="Provedores falsos do BGG e da Ludopedia")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=FakeProviderConfig.latency_ms)
+    parser.add_argument("--latency-sigma", type=float, default=FakeProviderConfig.latency_sigma)
+    parser.add_argument("--error-rate", type=float, default=FakeProviderConfig.error_rate)
+    parser.add_argument("--rate-limit", type=float, default=FakeProviderConfig.rate_limit)
+    parser.add_argument("--rate-burst", type=int, default=FakeProviderConfig.rate_burst)
+    parser.add_argument("--collection-size", type=int, default=FakeProviderConfig.collection_size)
+    parser.add_argument("--catalog-size", type=int, default=FakeProviderConfig.catalog_size)
+    parser.add_argument("--queue-seconds", type=float, default=FakeProviderConfig.queue_seconds)
+    args = parser.parse_args(argv)
+    config = FakeProviderConfig(
+        latency_ms=args.latency_ms,
+        latency_sigma=args.latency_sigma,
+        error_rate=args.error_rate,
+        rate_limit=args.rate_limit,
+        rate_burst=args.rate_burst,
+        collection_size=args.collection_size,
+        catalog_size=args.catalog_size,
+        queue_seconds=args.queue_seconds,
+    )
+    return args, config
+
+
+def main():
+    import uvicorn
+
+    args, config = config_from_args()
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Usuários sintéticos com coleções grandes para os benchmarks.
+
+Cada usuário `bench_<n>` recebe n jogos do catálogo compartilhado (os mesmos
+títulos entre usuários, como em produção) com metadados variados; um a cada
+cinco jogos é uma expansão ligada ao jogo anterior por base_game_id.
+"""
+import random
+from typing import Any, Dict, List
+
+from sqlalchemy import bindparam, insert, update
+from sqlalchemy.orm import Session
+
+from app.models import CollectionItem, User
+from app.services.auth_tokens import auth_tokens
+from app.services.catalog_service import catalog_service
+from app.utils.auth import get_password_hash
+
+
+PASSWORD = "bench-password"
+CHUNK_SIZE = 1000
+EXPANSION_EVERY = 5
+CONDITIONS = ("Novo", "Lacrado", "Usado - ótimo", "Usado - bom", None)
+
+_ITEMS = CollectionItem.__table__
+
+
+def username_for(size: int) -> str:
+    return f"bench_{size}"
+
+
+def access_token(db: Session, user: User) -> str:
+    """Token de acesso emitido como no /login (com as claims que a autenticação lê)"""
+    return auth_tokens.issue(db, user, with_refresh=False)["access_token"]
+
+
+def catalog_record(index: int, rng: random.Random) -> Dict[str, Any]:
+    """Título sintético; o mesmo índice gera sempre o mesmo bgg_id"""
+    is_expansion = index % EXPANSION_EVERY == EXPANSION_EVERY - 1
+    min_players = rng.randint(1, 4)
+    min_playtime = rng.choice((15, 30, 45, 60, 90, 120))
+    return {
+        "bgg_id": 1_000_000 + index,
+        "name": f"Jogo Sintético {index:06d}" + (" - Expansão" if is_expansion else ""),
+        "description": "Descrição gerada para benchmark. " * 8,
+        "year_published": rng.randint(1960, 2025),
+        "game_type": "EXPANSION" if is_expansion else "BASE",
+        "min_players": min_players,
+        "max_players": min_players + rng.randint(0, 6),
+        "min_playtime": min_playtime,
+        "max_playtime": min_playtime + rng.choice((0, 15, 30, 60)),
+        "min_age": rng.choice((8, 10, 12, 14)),
+        "rating": round(rng.uniform(4, 9), 2),
+        "weight": round(rng.uniform(1, 5), 2),
+        "ranking_position": rng.randint(1, 30000) if rng.random() < 0.8 else None,
+        "image_url": f"https://cf.geekdo-images.com/synthetic/{index}.jpg",
+    }
+
+
+def seed_user(db: Session, size: int, seed: int = 42) -> User:
+    """
+    Cria (ou reaproveita) o usuário `bench_<size>` com `size` jogos
+
+    Returns:
+        O usuário semeado
+    """
+    username = username_for(size)
+    user = db.query(User).filter(User.username == username).first()
+    if user is not None:
+        return user
+
+    user = User(
+        email=f"{username}@bench.local",
+        username=username,
+        hashed_password=get_password_hash(PASSWORD),
+    )
+    db.add(user)
+    db.commit()
+
+    rng = random.Random(seed + size)
+    for start in range(0, size, CHUNK_SIZE):
+        indexes = range(start, min(start + CHUNK_SIZE, size))
+        records = [catalog_record(index, rng) for index in indexes]
+        catalogs = catalog_service.resolve_many(db, records, "bgg_id")
+
+        items = [
+            {
+                "user_id": user.id,
+                "catalog_id": catalogs[record["bgg_id"]]["id"],
+                "order": index,
+                "is_for_trade": rng.random() < 0.1,
+                "is_for_sale": rng.random() < 0.15,
+                "condition": rng.choice(CONDITIONS),
+                "price": round(rng.uniform(50, 900), 2) if rng.random() < 0.15 else None,
+                "purchase_price": round(rng.uniform(50, 900), 2) if rng.random() < 0.7 else None,
+                "notes": None,
+            }
+            for index, record in zip(indexes, records)
+        ]
+        ids: List[int] = list(db.execute(
+            insert(_ITEMS).returning(_ITEMS.c.id, sort_by_parameter_order=True), items
+        ).scalars())
+
+        # Expansões apontam para o jogo base imediatamente anterior
+        links = [
+            {"item_id": ids[i], "base_id": ids[i - 1]}
+            for i, index in enumerate(indexes)
+            if i > 0 and index % EXPANSION_EVERY == EXPANSION_EVERY - 1
+        ]
+        if links:
+            db.execute(
+                update(_ITEMS).where(_ITEMS.c.id == bindparam("item_id")).values(base_game_id=bindparam("base_id")),
+                links,
+            )
+        db.commit()
+
+    return user
@@ -0,0 +1,88 @@
+"""
+Fixtures compartilhadas dos testes.
+
+O banco é um SQLite temporário criado por sessão de testes (as tabelas saem
+do create_all em app.main). Cada teste recebe um usuário próprio, então não
+é preciso limpar as tabelas entre testes nem invalidar caches por usuário.
+
+Rode a partir de backend/:
+    python -m pytest
+"""
+import itertools
+import os
+import tempfile
+
+# Antes de qualquer import de app.*: as configurações são lidas na importação
+_DB_DIR = tempfile.mkdtemp(prefix="boardgame-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR, 'test.db')}"
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+# Os testes fazem muitas requisições do mesmo IP; os limites têm testes próprios
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+# A ligação de expansões após as importações chamaria o BGG real
+os.environ["EXPANSION_LINK_AFTER_IMPORT"] = "false"
+
+import httpx  # noqa: E402
+import pytest  # noqa: E402
+
+from app.database import SessionLocal  # noqa: E402
+from app.main import app as fastapi_app  # noqa: E402
+from app.models import User  # noqa: E402
+from app.services.auth_tokens import auth_tokens  # noqa: E402
+from app.utils.auth import get_password_hash  # noqa: E402
+
+PASSWORD = "test-password"
+_usernames = itertools.count(1)
+
+
+@pytest.fixture(scope="session")
+def app():
+    return fastapi_app
+
+
+@pytest.fixture
+def db():
+    """Sessão do banco de testes"""
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+async def client(app):
+    """Cliente ASGI em processo (a rota roda na mesma tarefa, herdando o contexto)"""
+    async with httpx.AsyncClient(app=app, base_url="http://test") as c:
+        yield c
+
+
+@pytest.fixture
+def make_user(db):
+    """Cria usuários com nomes únicos"""
+
+    def make(**fields) -> User:
+        username = fields.pop("username", None) or f"user{next(_usernames)}"
+        user = User(
+            email=f"{username}@example.com",
+            username=username,
+            hashed_password=get_password_hash(PASSWORD),
+            **fields,
+        )
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+        return user
+
+    return make
+
+
+@pytest.fixture
+def user(make_user) -> User:
+    return make_user()
+
+
+@pytest.fixture
+def auth_headers(db, user):
+    """Cabeçalho com um token de acesso emitido como no /login"""
+    token = auth_tokens.issue(db, user, with_refresh=False)["access_token"]
+    return {"Authorization": f"Bearer {token}"}
@@ -0,0 +1,142 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.config import settings
+from app.core import metrics
+from app.core.admission import AdmissionMiddleware, _ClassLimiter, admission, admission_class
+
+
+def test_admission_class():
+    assert admission_class("GET", "/api/collection/") == "read"
+    assert admission_class("POST", "/api/collection/games") == "write"
+    assert admission_class("POST", "/api/collection/import/upload") == "import"
+    assert admission_class("GET", "/api/collection/search/bgg") == "external"
+    assert admission_class("GET", "/health") is None
+    # Preflight do CORS não ocupa vaga nem fila
+    assert admission_class("OPTIONS", "/api/collection/import/upload") is None
+
+
+class _Handler:
+    """Rota falsa: cada requisição espera `release` (ou dorme `delay`) antes de responder"""
+
+    def __init__(self, delay=0.0, blocking=False):
+        self.delay = delay
+        self.release = asyncio.Event()
+        if not blocking:
+            self.release.set()
+        self.started = 0
+
+    async def __call__(self, scope, receive, send):
+        self.started += 1
+        await self.release.wait()
+        await asyncio.sleep(self.delay)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+
+@pytest.fixture
+def read_limiter(monkeypatch):
+    """Classe "read" com 1 vaga e fila de 1"""
+
+    def make(max_wait=5.0, limit=1, latency_target=None):
+        limiter = _ClassLimiter("read", limit, 1, max_wait, latency_target)
+        monkeypatch.setattr(admission, "_limiters", {"read": limiter})
+        return limiter
+
+    monkeypatch.setattr(settings, "ADMISSION_ENABLED", True)
+    return make
+
+
+@pytest.fixture
+async def admitted():
+    clients = []
+
+    def make(handler):
+        client = httpx.AsyncClient(app=AdmissionMiddleware(handler), base_url="http://test")
+        clients.append(client)
+        return client
+
+    yield make
+    for client in clients:
+        await client.aclose()
+
+
+async def _until(condition):
+    for _ in range(200):
+        if condition():
+            return
+        await asyncio.sleep(0.005)
+    raise AssertionError("condição não atingida")
+
+
+async def test_waits_in_queue_and_sheds_when_the_queue_is_full(read_limiter, admitted):
+    limiter = read_limiter()
+    handler = _Handler(blocking=True)
+    client = admitted(handler)
+
+    first = asyncio.create_task(client.get("/api/collection/"))
+    await _until(lambda: handler.started == 1)
+    second = asyncio.create_task(client.get("/api/collection/"))
+    await _until(lambda: limiter.queued == 1)
+    before = metrics.admission_rejected_total.value("read", "queue_full")
+
+    shed = await client.get("/api/collection/")
+
+    assert shed.status_code == 503
+    assert int(shed.headers["retry-after"]) >= 1
+    assert metrics.admission_rejected_total.value("read", "queue_full") == before + 1
+    assert handler.started == 1  # A fila não passa da vaga
+    handler.release.set()
+    assert [(await first).status_code, (await second).status_code] == [200, 200]
+    assert (limiter.in_flight, limiter.queued) == (0, 0)
+
+
+async def test_queued_request_times_out(read_limiter, admitted):
+    limiter = read_limiter(max_wait=0.05)
+    handler = _Handler(blocking=True)
+    client = admitted(handler)
+    first = asyncio.create_task(client.get("/api/collection/"))
+    await _until(lambda: handler.started == 1)
+    before = metrics.admission_rejected_total.value("read", "timeout")
+
+    response = await client.get("/api/collection/")
+
+    assert response.status_code == 503 and "retry-after" in response.headers
+    assert metrics.admission_rejected_total.value("read", "timeout") == before + 1
+    assert limiter.queued == 0
+    handler.release.set()
+    assert (await first).status_code == 200
+    assert limiter.in_flight == 0
+
+
+async def test_slow_responses_shrink_the_adaptive_limit(monkeypatch, read_limiter, admitted):
+    monkeypatch.setattr(settings, "ADMISSION_ADAPTIVE", True)
+    limiter = read_limiter(limit=4, latency_target=0.01)
+    client = admitted(_Handler(delay=0.03))
+
+    await client.get("/api/collection/")
+    assert limiter.limit == pytest.approx(4 * settings.ADMISSION_AIMD_DECREASE)
+    # Uma redução por intervalo, mesmo com várias respostas lentas seguidas
+    await client.get("/api/collection/")
+    assert limiter.limit == pytest.approx(4 * settings.ADMISSION_AIMD_DECREASE)
+
+
+async def test_limit_grows_back_under_demand_up_to_the_configured_limit(monkeypatch, read_limiter):
+    monkeypatch.setattr(settings, "ADMISSION_ADAPTIVE", True)
+    limiter = read_limiter(limit=3, latency_target=1.0)
+    limiter.limit = 2.0
+
+    # Uma vaga a mais a cada `limit` respostas com todas as vagas ocupadas
+    for _ in range(4):
+        await limiter.acquire()
+        await limiter.acquire()
+        limiter.release(0.001)
+        limiter.release(0.001)
+    assert limiter.limit == 3.0
+    # Sem demanda (vagas sobrando), o limite não cresce
+    limiter.limit = 2.0
+    await limiter.acquire()
+    limiter.release(0.001)
+    assert limiter.limit == 2.0
@@ -0,0 +1,78 @@
+import threading
+
+import pytest
+
+from app.services.auth_tokens import auth_tokens
+
+
+@pytest.fixture
+def no_inline_sync(monkeypatch):
+    """Falha se a sincronização rodar na thread da requisição; registra as threads usadas"""
+    request_thread = threading.current_thread()
+    synced = threading.Event()
+    real_sync = auth_tokens.sync
+
+    def sync():
+        assert threading.current_thread() is not request_thread
+        real_sync()
+        synced.set()
+
+    monkeypatch.setattr(auth_tokens, "sync", sync)
+    yield synced
+    # A thread libera o lock logo depois de sincronizar
+    assert auth_tokens._background_sync.acquire(timeout=5)
+    auth_tokens._background_sync.release()
+
+
+async def test_revoked_token_is_rejected_before_the_filter_is_built(monkeypatch, client, auth_headers, no_inline_sync):
+    monkeypatch.setattr(auth_tokens, "_filter", None)
+
+    assert (await client.post("/api/auth/logout", headers=auth_headers)).status_code == 204
+    # Sem filtro, a verificação vai ao banco
+    assert (await client.get("/api/auth/me", headers=auth_headers)).status_code == 401
+    assert no_inline_sync.wait(5)
+
+
+async def test_stale_filter_is_served_while_it_refreshes(monkeypatch, client, auth_headers, no_inline_sync):
+    type(auth_tokens).sync(auth_tokens)
+    monkeypatch.setattr(auth_tokens, "_synced_at", 0.0)
+
+    assert (await client.get("/api/auth/me", headers=auth_headers)).status_code == 200
+    assert no_inline_sync.wait(5)
+
+
+def _login(db, user):
+    """Par de tokens como o devolvido pelo /login"""
+    return auth_tokens.issue(db, user)
+
+
+async def test_refresh_rotates_the_token(client, db, user, no_inline_sync):
+    tokens = _login(db, user)
+
+    rotated = (await client.post("/api/auth/refresh", json={"refresh_token": tokens["refresh_token"]})).json()
+
+    assert rotated["refresh_token"] != tokens["refresh_token"]
+    response = await client.post("/api/auth/refresh", json={"refresh_token": rotated["refresh_token"]})
+    assert response.status_code == 200
+
+
+async def test_reused_refresh_token_revokes_every_session(client, db, user, no_inline_sync):
+    tokens = _login(db, user)
+    rotated = (await client.post("/api/auth/refresh", json={"refresh_token": tokens["refresh_token"]})).json()
+
+    # O token já trocado aparece de novo: provável roubo
+    response = await client.post("/api/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+
+    assert response.status_code == 401
+    assert (await client.post("/api/auth/refresh", json={"refresh_token": rotated["refresh_token"]})).status_code == 401
+    headers = {"Authorization": f"Bearer {rotated['access_token']}"}
+    assert (await client.get("/api/auth/me", headers=headers)).status_code == 401
+    # Um login novo volta a funcionar
+    assert (await client.get("/api/auth/me", headers={
+        "Authorization": f"Bearer {_login(db, user)['access_token']}",
+    })).status_code == 200
+
+
+async def test_unknown_refresh_token_is_rejected(client):
+    response = await client.post("/api/auth/refresh", json={"refresh_token": "nao-existe"})
+    assert response.status_code == 401
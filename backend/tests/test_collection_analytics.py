@@ -0,0 +1,67 @@
+from datetime import datetime
+
+import pytest
+
+from app.core import metrics
+from app.services.collection_analytics import collection_analytics
+from app.services.import_pipeline import import_pipeline
+
+
+def _counts(entries):
+    return {entry["label"]: entry["count"] for entry in entries if entry["count"]}
+
+
+@pytest.fixture
+def games(db, user):
+    import_pipeline.run(db, user.id, [
+        {"bgg_id": 7_100_001, "name": "Médio", "min_players": 2, "max_players": 4, "min_playtime": 30,
+         "max_playtime": 45, "weight": 2.3, "year_published": 1995, "purchase_price": 100.0,
+         "is_for_sale": True, "price": 150.0},
+        # Sem máximo de jogadores/duração: vale o mínimo
+        {"bgg_id": 7_100_002, "name": "Solo", "min_players": 1, "min_playtime": 120,
+         "year_published": 2021, "is_for_sale": True, "price": 80.0},
+        {"bgg_id": 7_100_003, "name": "Festa", "min_players": 3, "max_players": 12,
+         "year_published": 2020, "purchase_price": 50.0},
+    ], provider="bgg")
+    db.commit()
+
+
+def test_distributions_and_values(db, user, games):
+    result = collection_analytics.compute(db, user.id)
+
+    assert result["total_games"] == 3
+    assert _counts(result["players"]) == {
+        "1": 1, "2": 1, "3": 2, "4": 2, "5": 1, "6": 1, "7": 1, "8": 1, "9": 1, "10+": 1,
+    }
+    assert _counts(result["playtime"]) == {"31-45": 1, "91-120": 1}
+    assert _counts(result["weight"]) == {"2.0-2.5": 1}
+    assert result["decades"] == [{"label": "1990s", "count": 1}, {"label": "2020s", "count": 2}]
+    assert result["spend_by_year_added"] == [{"year": datetime.now().year, "total": 150.0, "count": 2}]
+    assert result["value"] == {
+        "paid_total": 150.0,
+        "for_sale_count": 2,
+        "for_sale_asking_total": 230.0,
+        "for_sale_paid_total": 100.0,
+        "for_sale_without_paid": 1,
+        "for_sale_margin": 130.0,
+    }
+
+
+def test_chunked_reads_give_the_same_result(db, user, games):
+    assert collection_analytics.compute(db, user.id, chunk_size=1) == collection_analytics.compute(db, user.id)
+
+
+async def test_cached_until_the_collection_changes(client, db, user, auth_headers, games):
+    first = (await client.get("/api/collection/analytics", headers=auth_headers)).json()
+    hits = metrics.cache_requests_total.value("collection_analytics", "hit")
+    assert (await client.get("/api/collection/analytics", headers=auth_headers)).json() == first
+    assert metrics.cache_requests_total.value("collection_analytics", "hit") == hits + 1
+
+    import_pipeline.run(db, user.id, [{"bgg_id": 7_100_004, "name": "Novo"}], provider="bgg")
+    db.commit()
+
+    assert (await client.get("/api/collection/analytics", headers=auth_headers)).json()["total_games"] == 4
+
+
+async def test_all_collections_require_admin(client, auth_headers):
+    assert (await client.get("/api/collection/analytics/all", headers=auth_headers)).status_code == 403
@@ -0,0 +1,65 @@
+import csv
+import io
+import zipfile
+
+import pyarrow.parquet as pq
+import pytest
+
+from app.models import CollectionItem
+from app.services.collection_export import FIELD_NAMES, collection_export
+from app.services.import_pipeline import import_pipeline
+
+
+@pytest.fixture
+def exported(db, user):
+    """Três jogos do usuário; o terceiro é expansão do primeiro"""
+    records = [
+        {"bgg_id": 7_000_001 + i, "name": name, "rating": 7.5, "game_type": "BASE"}
+        for i, name in enumerate(["Azul", "Catan", "Azul: Pavilhão\x01"])
+    ]
+    games = import_pipeline.run(db, user.id, records, provider="bgg").games
+    items = {item.name: item for item in db.query(CollectionItem).filter(CollectionItem.user_id == user.id)}
+    items["Azul: Pavilhão\x01"].base_game_id = items["Azul"].id
+    for order, item in enumerate(sorted(items.values(), key=lambda i: i.id)):
+        item.order = order
+    db.commit()
+    return games
+
+
+async def test_csv_export(client, auth_headers, exported):
+    response = await client.get("/api/collection/export", headers=auth_headers)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert 'filename="colecao-' in response.headers["content-disposition"]
+    rows = list(csv.DictReader(io.StringIO(response.content.decode("utf-8-sig"))))
+    assert [row["name"] for row in rows] == ["Azul", "Catan", "Azul: Pavilhão\x01"]
+    assert rows[2]["base_game_name"] == "Azul"
+    assert list(rows[0]) == FIELD_NAMES
+
+
+async def test_parquet_export_is_typed(client, auth_headers, exported):
+    response = await client.get("/api/collection/export", params={"format": "parquet"}, headers=auth_headers)
+
+    table = pq.read_table(io.BytesIO(response.content))
+    assert table.num_rows == 3
+    assert table.column_names == FIELD_NAMES
+    assert str(table.schema.field("rating").type) == "double"
+    assert table.column("game_type").to_pylist() == ["BASE"] * 3
+
+
+async def test_xlsx_export_strips_invalid_xml_characters(client, auth_headers, exported):
+    response = await client.get("/api/collection/export", params={"format": "xlsx"}, headers=auth_headers)
+
+    with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+        assert "[Content_Types].xml" in archive.namelist()
+        sheet = archive.read("xl/worksheets/sheet1.xml").decode()
+    assert sheet.count("<row ") == 4  # Cabeçalho + 3 jogos
+    assert "Azul: Pavilhão" in sheet and "\x01" not in sheet
+
+
+def test_csv_yields_one_chunk_per_batch(db, user, exported):
+    chunks = list(collection_export.csv(collection_export.iter_batches(db, user.id, batch_size=1)))
+    # Cabeçalho sai com o primeiro lote; cada lote é um pedaço do download
+    assert len(chunks) == 3
+    assert b"Catan" in chunks[1]
@@ -0,0 +1,56 @@
+import zlib
+
+import brotli
+import pytest
+
+from app.core.compression import CompressionMiddleware, choose_encoding
+
+CHUNKS = [f"linha {i};".encode() * 200 for i in range(3)]
+
+
+def _streaming(content_type="text/csv", chunks=CHUNKS):
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", content_type.encode())]})
+        for i, chunk in enumerate(chunks):
+            await send({"type": "http.response.body", "body": chunk, "more_body": i < len(chunks) - 1})
+    return app
+
+
+async def _call(app, encoding):
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": [(b"accept-encoding", encoding.encode())]}
+    await CompressionMiddleware(app, minimum_size=100)(scope, None, send)
+    return sent[0], [message["body"] for message in sent[1:]]
+
+
+def _decompressor(encoding):
+    if encoding == "br":
+        return brotli.Decompressor().process
+    return zlib.decompressobj(31).decompress
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "br"])
+async def test_each_streamed_chunk_decompresses_on_arrival(encoding):
+    start, bodies = await _call(_streaming(), encoding)
+
+    assert dict(start["headers"])[b"content-encoding"] == encoding.encode()
+    decompress = _decompressor(encoding)
+    # Cada pedaço já traz o conteúdo enviado até ali, sem esperar o fim
+    assert [decompress(body) for body in bodies] == CHUNKS
+
+
+def test_choose_encoding_prefers_brotli():
+    assert choose_encoding("gzip, br") == "br"
+    assert choose_encoding("gzip;q=1, br;q=0.5") == "gzip"
+    assert choose_encoding("identity") is None
+
+
+async def test_event_streams_are_not_compressed():
+    start, bodies = await _call(_streaming("text/event-stream"), "gzip")
+
+    assert b"content-encoding" not in dict(start["headers"])
+    assert bodies == CHUNKS
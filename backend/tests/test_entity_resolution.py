@@ -0,0 +1,69 @@
+import random
+
+from app.models import CatalogGame, CatalogMatch
+from app.services.entity_resolution import (
+    Candidate, TrigramIndex, confidence, entity_resolver, normalize_name, similarity, trigrams,
+)
+from app.services.import_pipeline import import_pipeline
+
+
+def _candidate(catalog_id, name, year=None, min_players=None, max_players=None):
+    normalized = normalize_name(name)
+    return Candidate(catalog_id, normalized, year, min_players, max_players, trigrams(normalized))
+
+
+def test_normalize_name_drops_accents_and_punctuation():
+    assert normalize_name("  Ticket to Ride: Europa & Ásia!") == "ticket to ride europa and asia"
+
+
+def test_index_search_matches_a_full_scan():
+    words = ["terra", "mystica", "gaia", "project", "azul", "catan", "cidades", "de", "ouro", "ticket", "ride"]
+    rng = random.Random(42)
+    entries = [_candidate(i, " ".join(rng.sample(words, rng.randint(1, 3)))) for i in range(300)]
+    index = TrigramIndex()
+    for entry in entries:
+        index.add(entry)
+
+    for query in entries[:50]:
+        found = {entry.catalog_id for entry, _ in index.search(query.grams, 0.5)}
+        expected = {entry.catalog_id for entry in entries if similarity(query.grams, entry.grams) >= 0.5}
+        assert found == expected
+
+
+def test_numbers_in_the_name_must_match():
+    season_1 = _candidate(1, "Pandemic Legacy: Season 1", 2015, 2, 4)
+    season_2 = _candidate(2, "Pandemic Legacy: Season 2", 2015, 2, 4)
+    assert confidence(season_1, season_2, similarity(season_1.grams, season_2.grams)) == 0.0
+    assert confidence(season_1, season_1, 1.0) == 1.0
+
+
+def test_imports_link_the_same_game_across_providers(db, make_user):
+    ludopedia_user, bgg_user = make_user(), make_user()
+    ludopedia_game = {"ludopedia_id": 7_200_001, "name": "Faroleiros Quixotescos", "year_published": 2019,
+                      "min_players": 2, "max_players": 4}
+    bgg_game = {**ludopedia_game, "ludopedia_id": None, "bgg_id": 7_200_001, "name": "Faroleiros Quixotescos!",
+                "weight": 2.7, "min_age": 10}
+    import_pipeline.run(db, ludopedia_user.id, [ludopedia_game], provider="ludopedia")
+    import_pipeline.run(db, bgg_user.id, [bgg_game], provider="bgg")
+
+    ludopedia_title = db.query(CatalogGame).filter(CatalogGame.ludopedia_id == 7_200_001).one()
+    bgg_title = db.query(CatalogGame).filter(CatalogGame.bgg_id == 7_200_001).one()
+    match = db.query(CatalogMatch).filter(CatalogMatch.ludopedia_catalog_id == ludopedia_title.id).one()
+    assert match.bgg_catalog_id == bgg_title.id and match.confidence >= 0.8
+    # O título da Ludopedia herda os campos que não tinha
+    db.refresh(ludopedia_title)
+    assert (ludopedia_title.weight, ludopedia_title.min_age) == (2.7, 10)
+
+    # Quem tem o jogo pela Ludopedia não o importa de novo pelo BGG
+    assert entity_resolver.counterpart_ids(db, ludopedia_user.id, "bgg") == {7_200_001}
+    result = import_pipeline.run(db, ludopedia_user.id, [bgg_game], provider="bgg")
+    assert (result.imported_count, result.skipped_existing) == (0, 1)
+
+
+def test_different_editions_are_not_linked(db, make_user):
+    import_pipeline.run(db, make_user().id, [{"ludopedia_id": 7_200_002, "name": "Lanternas Submersas 2"}],
+                        provider="ludopedia")
+    import_pipeline.run(db, make_user().id, [{"bgg_id": 7_200_002, "name": "Lanternas Submersas 3"}], provider="bgg")
+
+    ludopedia_title = db.query(CatalogGame).filter(CatalogGame.ludopedia_id == 7_200_002).one()
+    assert db.query(CatalogMatch).filter(CatalogMatch.ludopedia_catalog_id == ludopedia_title.id).count() == 0
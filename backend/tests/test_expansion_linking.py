@@ -0,0 +1,79 @@
+import pytest
+
+from app.models import BggThingLinks, CollectionItem, GameType
+from app.services import bgg_service
+from app.services.expansion_linking import ExpansionLinker
+from app.services.import_pipeline import import_pipeline
+
+BASE, EXPANSION, OTHER = 7_300_001, 7_300_002, 7_300_003
+
+
+def _link(is_expansion, *base_ids, tags=()):
+    return {"is_expansion": is_expansion, "base_bgg_ids": list(base_ids), "tags": list(tags)}
+
+
+@pytest.fixture
+def bgg_links(monkeypatch):
+    """Respostas do /thing do BGG; guarda os IDs de cada chamada"""
+    calls = []
+    links = {
+        BASE: _link(False, tags=[{"kind": "MECHANIC", "bgg_id": 7_300_100, "name": "Worker Placement"}]),
+        EXPANSION: _link(True, 7_300_999, BASE),
+        OTHER: _link(False),
+    }
+
+    async def get_expansion_links(bgg_ids):
+        calls.append(list(bgg_ids))
+        return {bgg_id: links[bgg_id] for bgg_id in bgg_ids}
+
+    monkeypatch.setattr(bgg_service, "get_expansion_links", get_expansion_links)
+    return calls
+
+
+def _items(db, user):
+    return {item.catalog.bgg_id: item for item in db.query(CollectionItem).filter(CollectionItem.user_id == user.id)}
+
+
+async def test_expansion_is_classified_and_linked_to_its_base(client, db, user, auth_headers, bgg_links):
+    import_pipeline.run(db, user.id, [
+        {"bgg_id": bgg_id, "name": f"Jogo {bgg_id}"} for bgg_id in (BASE, EXPANSION, OTHER)
+    ], provider="bgg")
+    db.commit()
+
+    response = await client.post("/api/collection/link-expansions", headers=auth_headers)
+
+    assert response.json() | {"message": None} == {
+        "message": None, "checked": 3, "fetched": 3, "classified": 1, "linked": 1,
+    }
+    items = _items(db, user)
+    assert items[EXPANSION].base_game_id == items[BASE].id
+    assert items[EXPANSION].catalog.game_type == GameType.EXPANSION
+    assert items[OTHER].base_game_id is None
+    assert bgg_links == [[BASE, EXPANSION, OTHER]]
+
+
+async def test_second_pass_uses_the_cache_and_keeps_manual_links(db, make_user, bgg_links):
+    user = make_user()
+    ExpansionLinker._store(db, {bgg_id: _link(False) for bgg_id in (BASE, OTHER)} | {EXPANSION: _link(True, BASE)})
+    import_pipeline.run(db, user.id, [
+        {"bgg_id": bgg_id, "name": f"Jogo {bgg_id}"} for bgg_id in (BASE, EXPANSION, OTHER)
+    ], provider="bgg")
+    items = _items(db, user)
+    items[EXPANSION].base_game_id = items[OTHER].id  # Ligação manual
+    db.commit()
+
+    result = await ExpansionLinker().link_user(db, user.id)
+
+    assert (result.fetched, result.linked) == (0, 0)
+    assert bgg_links == []
+    db.refresh(items[EXPANSION])
+    assert items[EXPANSION].base_game_id == items[OTHER].id
+
+
+def test_store_replaces_cached_links(db):
+    ExpansionLinker._store(db, {7_300_010: _link(True, 1)})
+    ExpansionLinker._store(db, {7_300_010: _link(False)})
+
+    row = db.query(BggThingLinks).filter(BggThingLinks.bgg_id == 7_300_010).one()
+    db.refresh(row)
+    assert (row.is_expansion, row.base_bgg_ids) == (False, [])
@@ -0,0 +1,54 @@
+from app.models import BggThingTag, CatalogGame, CatalogMatch
+from app.services.game_tags import game_tags
+from app.services.import_pipeline import import_pipeline
+
+COOP = {"kind": "MECHANIC", "bgg_id": 7_600_100, "name": "Cooperative Game"}
+DICE = {"kind": "MECHANIC", "bgg_id": 7_600_101, "name": "Dice Rolling"}
+
+
+def _title(db, user, provider, external_id, name):
+    import_pipeline.run(db, user.id, [{f"{provider}_id": external_id, "name": name}], provider=provider)
+    column = CatalogGame.bgg_id if provider == "bgg" else CatalogGame.ludopedia_id
+    return db.query(CatalogGame).filter(column == external_id).one()
+
+
+def _link(db, ludopedia_title, bgg_title):
+    match = CatalogMatch(ludopedia_catalog_id=ludopedia_title.id, bgg_catalog_id=bgg_title.id, confidence=1.0)
+    db.add(match)
+    db.commit()
+    return match
+
+
+def test_removed_link_invalidates_the_cached_index(db, make_user):
+    user, other = make_user(), make_user()
+    # Item da Ludopedia com as tags do título ligado do BGG
+    ludopedia_title = _title(db, user, "ludopedia", 7_600_001, "Guardiões do Farol Austral")
+    old_link = _link(db, ludopedia_title, _title(db, other, "bgg", 7_600_001, "Keepers of the Southern Light"))
+    game_tags.store(db, {7_600_001: [COOP]})
+    # Uma ligação mais nova, de outros títulos
+    _link(db, _title(db, other, "ludopedia", 7_600_002, "Vigias do Norte"),
+          _title(db, other, "bgg", 7_600_002, "Northern Watchers"))
+    assert len(game_tags.filter_items(db, user.id, "cooperative-game")) == 1
+    version = game_tags.version(db, user.id)
+
+    db.delete(old_link)
+    db.commit()
+
+    assert game_tags.version(db, user.id) != version
+    assert game_tags.filter_items(db, user.id, "cooperative-game") == set()
+
+
+def test_removed_tag_invalidates_the_cached_index(db, user):
+    _title(db, user, "bgg", 7_600_010, "Dados Cooperativos")
+    game_tags.store(db, {7_600_010: [COOP, DICE]})
+    db.commit()
+    assert len(game_tags.filter_items(db, user.id, "dice-rolling")) == 1
+
+    db.query(BggThingTag).filter(BggThingTag.bgg_id == 7_600_010, BggThingTag.tag_id == (
+        game_tags.get_index(db, user.id).by_slug["dice-rolling"][0]
+    )).delete()
+    db.commit()
+
+    result = game_tags.query(db, user.id, "cooperative-game")
+    assert result["matching"] == 1
+    assert [facet["slug"] for facet in result["facets"]] == ["cooperative-game"]
@@ -0,0 +1,106 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.services.google_oauth import GoogleAuthError, _CertificateCache
+
+
+class _Certs:
+    """Endpoint de chaves falso: conta as buscas e devolve os kids atuais"""
+
+    def __init__(self, *kids, cache_control="public, max-age=3600", age="0"):
+        self.kids = list(kids)
+        self.headers = {"Cache-Control": cache_control, "Age": age}
+        self.calls = 0
+        self.fail = False
+        self.delay = 0.0
+
+    async def __call__(self, request):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            return httpx.Response(503)
+        return httpx.Response(200, headers=self.headers, json={"keys": [{"kid": kid, "n": kid} for kid in self.kids]})
+
+
+@pytest.fixture
+async def certs():
+    endpoint = _Certs("a")
+    async with httpx.AsyncClient(transport=httpx.MockTransport(endpoint)) as client:
+        yield endpoint, _CertificateCache(client)
+
+
+async def test_keys_are_cached_for_max_age_minus_age(certs):
+    endpoint, cache = certs
+    endpoint.headers["Age"] = "600"
+
+    await cache.get("a")
+    await cache.get("a")
+
+    assert endpoint.calls == 1
+    assert cache._expires_at - cache._fetched_at == pytest.approx(3000)
+
+
+async def test_concurrent_first_logins_share_one_fetch(certs):
+    endpoint, cache = certs
+    endpoint.delay = 0.05
+
+    keys = await asyncio.gather(*(cache.get("a") for _ in range(10)))
+
+    assert endpoint.calls == 1
+    assert all(key["kid"] == "a" for key in keys)
+
+
+async def test_refresh_near_expiry_happens_in_the_background(certs):
+    endpoint, cache = certs
+    await cache.get("a")
+    cache._refresh_at = 0.0  # Dentro da margem de renovação
+    endpoint.kids = ["b"]
+    endpoint.delay = 0.05
+
+    # A chave atual responde sem esperar a busca
+    assert (await cache.get("a"))["kid"] == "a"
+    assert not cache._background.done()
+    await cache._background
+
+    assert endpoint.calls == 2
+    assert (await cache.get("b"))["kid"] == "b"
+
+
+async def test_failed_background_refresh_keeps_current_keys(certs):
+    endpoint, cache = certs
+    await cache.get("a")
+    cache._refresh_at = 0.0
+    endpoint.fail = True
+
+    await cache.get("a")
+    await cache._background
+
+    assert (await cache.get("a"))["kid"] == "a"
+
+
+async def test_expired_keys_are_fetched_before_answering(certs):
+    endpoint, cache = certs
+    await cache.get("a")
+    cache._expires_at = 0.0
+    endpoint.kids = ["b"]
+
+    with pytest.raises(GoogleAuthError):
+        await cache.get("a")
+    assert endpoint.calls == 2
+
+
+async def test_unknown_kid_refetches_at_most_once_per_interval(certs):
+    endpoint, cache = certs
+    await cache.get("a")
+    endpoint.kids = ["a", "rotated"]
+
+    # Buscada logo depois: ainda dentro do intervalo mínimo
+    with pytest.raises(GoogleAuthError):
+        await cache.get("rotated")
+    assert endpoint.calls == 1
+
+    cache._fetched_at -= 60
+    assert (await cache.get("rotated"))["kid"] == "rotated"
+    assert endpoint.calls == 2
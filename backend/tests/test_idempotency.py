@@ -0,0 +1,141 @@
+import asyncio
+import sys
+
+import httpx
+import pytest
+
+from app.config import settings
+from app.core.idempotency import IdempotencyMiddleware
+from app.models import CollectionItem
+from app.services.auth_tokens import auth_tokens
+from app.services.idempotency import idempotency
+
+ROUTES = {("POST", "/api/import"): ("import", "import")}
+FLIGHT = "singleflight:{user}:import"
+
+
+def _app(route_seconds: float, background: asyncio.Event):
+    """Rota que demora route_seconds e depois segura um "BackgroundTask" até o evento"""
+
+    async def app(scope, receive, send):
+        await asyncio.sleep(route_seconds)
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": b'{"ok": true}'})
+        await background.wait()
+
+    return IdempotencyMiddleware(app, routes=ROUTES)
+
+
+@pytest.fixture
+def short_lease(monkeypatch):
+    monkeypatch.setattr(settings, "IDEMPOTENCY_LOCK_SECONDS", 0.15)
+
+
+async def test_lock_is_renewed_while_the_route_runs(short_lease, user, auth_headers):
+    background = asyncio.Event()
+    background.set()
+    app = _app(route_seconds=0.6, background=background)
+
+    async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+        first = asyncio.create_task(client.post("/api/import", headers=auth_headers, json={"a": 1}))
+        await asyncio.sleep(0.4)
+        # Bem depois do lease inicial, a execução continua com o lock
+        other = await client.post("/api/import", headers=auth_headers, json={"a": 2})
+        assert other.status_code == 409
+        assert (await first).status_code == 200
+
+
+async def test_lock_is_released_when_the_response_is_sent(short_lease, user, auth_headers):
+    background = asyncio.Event()
+    app = _app(route_seconds=0.1, background=background)
+    flight = FLIGHT.format(user=user.username)
+
+    async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+        first = asyncio.create_task(client.post("/api/import", headers=auth_headers, json={"a": 1}))
+        await asyncio.sleep(0.05)
+        assert await idempotency.get(flight) is not None
+        await asyncio.sleep(0.1)
+        # A "BackgroundTask" ainda roda, mas a resposta já foi entregue
+        assert await idempotency.get(flight) is None
+        background.set()
+        assert (await first).status_code == 200
+
+
+async def test_spreadsheet_upload_is_replayed_by_key(client, auth_headers):
+    csv = b"nome,ano\nAzul,2017\n"
+    headers = {**auth_headers, "Idempotency-Key": "upload-1"}
+
+    # O httpx gera um boundary novo a cada envio
+    first = await client.post("/api/collection/import/upload", headers=headers, files={"file": ("c.csv", csv, "text/csv")})
+    again = await client.post("/api/collection/import/upload", headers=headers, files={"file": ("c.csv", csv, "text/csv")})
+
+    assert first.status_code == again.status_code == 200
+    assert first.json()["imported_count"] == 1
+    assert again.headers["idempotent-replayed"] == "true"
+    assert again.json() == first.json()
+
+
+async def test_oversized_upload_is_streamed_and_rejected(monkeypatch, client, auth_headers):
+    async def read_body(receive):
+        raise AssertionError("o upload não deve ser lido inteiro pelo middleware")
+
+    monkeypatch.setattr(sys.modules["app.core.idempotency"], "_read_body", read_body)
+    monkeypatch.setattr(settings, "MAX_UPLOAD_SIZE", 1024)
+    headers = {**auth_headers, "Idempotency-Key": "upload-big"}
+    csv = b"nome,ano\n" + b"Azul,2017\n" * 1000
+
+    response = await client.post("/api/collection/import/upload", headers=headers, files={"file": ("c.csv", csv, "text/csv")})
+
+    assert response.status_code == 413
+
+
+async def test_repeated_key_replays_the_stored_response(client, db, user, auth_headers):
+    headers = {**auth_headers, "Idempotency-Key": "create-1"}
+
+    first = await client.post("/api/collection/games", headers=headers, json={"name": "Azul"})
+    again = await client.post("/api/collection/games", headers=headers, json={"name": "Azul"})
+
+    assert first.status_code == again.status_code == 201
+    assert "idempotent-replayed" not in first.headers
+    assert again.headers["idempotent-replayed"] == "true"
+    assert again.json() == first.json()
+    assert db.query(CollectionItem).filter(CollectionItem.user_id == user.id).count() == 1
+
+
+async def test_key_reused_with_another_body_is_rejected(client, auth_headers):
+    headers = {**auth_headers, "Idempotency-Key": "create-2"}
+
+    await client.post("/api/collection/games", headers=headers, json={"name": "Azul"})
+    conflict = await client.post("/api/collection/games", headers=headers, json={"name": "Catan"})
+
+    assert conflict.status_code == 422
+
+
+async def test_keys_are_scoped_by_user(client, db, make_user):
+    responses = []
+    for user in (make_user(), make_user()):
+        token = auth_tokens.issue(db, user, with_refresh=False)["access_token"]
+        headers = {"Authorization": f"Bearer {token}", "Idempotency-Key": "same"}
+        responses.append(await client.post("/api/collection/games", headers=headers, json={"name": "Azul"}))
+
+    assert [r.status_code for r in responses] == [201, 201]
+    assert "idempotent-replayed" not in responses[1].headers
+    assert responses[0].json()["id"] != responses[1].json()["id"]
+
+
+async def test_server_errors_are_not_stored(short_lease, user, auth_headers):
+    calls = []
+
+    async def failing(scope, receive, send):
+        calls.append(1)
+        await send({"type": "http.response.start", "status": 500, "headers": []})
+        await send({"type": "http.response.body", "body": b"erro"})
+
+    app = IdempotencyMiddleware(failing, routes=ROUTES)
+    headers = {**auth_headers, "Idempotency-Key": "retry-me"}
+    async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+        for _ in range(2):
+            assert (await client.post("/api/import", headers=headers, json={})).status_code == 500
+
+    # A repetição executou de novo em vez de devolver a falha guardada
+    assert len(calls) == 2
@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta, timezone
+
+from app.models import ImportJob, ImportJobChunk, ImportStatus
+from app.services.import_checkpoint import import_checkpoints
+
+
+def _records(*ids):
+    return [{"ludopedia_id": i, "name": f"Jogo {i}"} for i in ids]
+
+
+async def test_interrupted_import_resumes_from_saved_progress(db, user):
+    checkpoint = import_checkpoints.open(db, user.id, "ludopedia")
+    assert not checkpoint.resumed
+    await checkpoint.add_many(_records(1, 2), "ludopedia_id")
+    await checkpoint.advance_page(1)
+    await checkpoint.add_many(_records(3), "ludopedia_id")
+    await checkpoint.fail("timeout")
+
+    resumed = import_checkpoints.open(db, user.id, "ludopedia")
+
+    assert resumed.id == checkpoint.id
+    assert resumed.resumed and resumed.failed
+    assert resumed.page == 2
+    assert [record["ludopedia_id"] for record in resumed.results] == [1, 2, 3]
+    assert resumed.is_processed(3) and not resumed.is_processed(4)
+
+
+async def test_each_save_appends_only_the_new_games(db, user):
+    checkpoint = import_checkpoints.open(db, user.id, "bgg", source="alguem")
+    await checkpoint.add_many(_records(1, 2), "ludopedia_id")
+    await checkpoint.save()  # Nada novo: nenhum trecho extra
+    await checkpoint.add_many(_records(3), "ludopedia_id")
+
+    chunks = db.query(ImportJobChunk).filter(ImportJobChunk.job_id == checkpoint.id).order_by(ImportJobChunk.id).all()
+    assert [chunk.processed_count for chunk in chunks] == [2, 1]
+
+
+async def test_expired_checkpoint_is_not_resumed(db, user):
+    checkpoint = import_checkpoints.open(db, user.id, "ludopedia")
+    await checkpoint.add_many(_records(1), "ludopedia_id")
+    job = db.get(ImportJob, checkpoint.id)
+    job.updated_at = datetime.now(timezone.utc) - timedelta(hours=25)
+    db.commit()
+
+    fresh = import_checkpoints.open(db, user.id, "ludopedia")
+
+    assert fresh.id != checkpoint.id and not fresh.resumed
+    db.refresh(job)
+    assert job.status == ImportStatus.FAILED
+    assert job.error == "Checkpoint expirado"
+    chunk = db.query(ImportJobChunk).filter(ImportJobChunk.job_id == job.id).one()
+    assert chunk.results == []
+
+
+async def test_completed_import_starts_over(db, user):
+    checkpoint = import_checkpoints.open(db, user.id, "ludopedia")
+    await checkpoint.add_many(_records(1), "ludopedia_id")
+    await checkpoint.complete(1)
+
+    assert checkpoint.finished
+    assert import_checkpoints.open(db, user.id, "ludopedia").id != checkpoint.id
+    job = db.get(ImportJob, checkpoint.id)
+    db.refresh(job)
+    assert (job.status, job.imported_count) == (ImportStatus.COMPLETED, 1)
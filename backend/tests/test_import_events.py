@@ -0,0 +1,58 @@
+import asyncio
+
+from app.services.import_checkpoint import import_checkpoints
+from app.services.import_events import MemoryImportEventBroker, import_events
+
+
+def _events(text: str):
+    """(id, evento) de cada evento do stream; o snapshot não tem id"""
+    events = []
+    for block in text.split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if ": " in line)
+        if "event" in fields:
+            events.append((fields.get("id"), fields["event"]))
+    return events
+
+
+async def test_reconnect_replays_only_events_after_last_event_id(client, db, user, auth_headers):
+    job_id = import_checkpoints.open(db, user.id, "ludopedia").id
+    import_events.publish(job_id, "page", page=1)
+    import_events.publish(job_id, "page", page=2)
+    import_events.publish(job_id, "completed", imported_count=2)
+
+    response = await asyncio.wait_for(
+        client.get(f"/api/imports/{job_id}/events", headers={**auth_headers, "Last-Event-ID": "1"}), 5
+    )
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert _events(response.text) == [(None, "snapshot"), ("2", "page"), ("3", "completed")]
+
+
+async def test_stream_of_finished_import_is_just_the_final_state(client, db, user, auth_headers):
+    checkpoint = import_checkpoints.open(db, user.id, "ludopedia")
+    await checkpoint.complete(0)
+
+    response = await client.get(f"/api/imports/{checkpoint.id}/events", headers=auth_headers)
+
+    assert _events(response.text) == [(None, "completed")]
+
+
+async def test_other_users_imports_are_not_streamed(client, db, make_user, auth_headers):
+    other = make_user()
+    job_id = import_checkpoints.open(db, other.id, "ludopedia").id
+
+    assert (await client.get(f"/api/imports/{job_id}/events", headers=auth_headers)).status_code == 404
+
+
+async def test_live_subscriber_receives_new_events_and_history_is_bounded():
+    broker = MemoryImportEventBroker(history_size=2)
+    for page in range(3):
+        broker.publish(1, "page", {"page": page})
+
+    stream = broker.subscribe(1)
+    # Só os dois últimos ficaram no histórico
+    assert [(await stream.__anext__()).id for _ in range(2)] == [2, 3]
+    broker.publish(1, "completed", {})
+    assert (await stream.__anext__()).event == "completed"
+    await stream.aclose()
+    assert 1 not in broker._subscribers
@@ -0,0 +1,76 @@
+import json
+import logging
+import queue
+import sys
+
+import pytest
+
+from app.core.logging_config import (
+    REDACTED, JsonFormatter, RedactingFilter, SamplingFilter, _QueueHandler, redact,
+)
+
+
+def _record(msg, *args, level=logging.INFO, **extra):
+    record = logging.LogRecord("app.test", level, __file__, 1, msg, args, None)
+    for key, value in extra.items():
+        setattr(record, key, value)
+    return record
+
+
+@pytest.mark.parametrize("text", [
+    "Authorization: Bearer abc.def-123",
+    "url?access_token=abc123&page=2",
+    '{"password": "hunter2"}',
+    "token eyJhbGciOi.eyJzdWIiOi.c2lnbmF0dXJl",
+])
+def test_redact_masks_secrets(text):
+    redacted = redact(text)
+    assert REDACTED in redacted
+    for secret in ("abc.def-123", "abc123", "hunter2", "c2lnbmF0dXJl"):
+        assert secret not in redacted
+
+
+def test_redacting_filter_masks_message_and_extra_fields():
+    record = _record("Chamando %s", "https://x/?app_key=segredo", access_token="t0k3n", user_id=7, url="a?token=xyz")
+
+    assert RedactingFilter().filter(record)
+
+    assert "segredo" not in record.getMessage()
+    assert record.access_token == REDACTED
+    assert record.user_id == 7
+    assert "xyz" not in record.url
+
+
+def test_sampling_filter_keeps_one_debug_line_per_rate():
+    sampler = SamplingFilter(rate=10)
+    kept = [sampler.filter(_record("Jogo", level=logging.DEBUG, sample="jogo")) for _ in range(25)]
+    assert sum(kept) == 3 and kept[0]
+    # Outros níveis e registros sem chave sempre passam
+    assert sampler.filter(_record("Jogo", level=logging.INFO, sample="jogo"))
+    assert sampler.filter(_record("Sem chave", level=logging.DEBUG))
+
+
+def test_json_formatter_includes_extra_fields():
+    line = JsonFormatter().format(_record("Importação %s", "ok", user_id=1, sample="x"))
+    entry = json.loads(line)
+    assert entry["message"] == "Importação ok"
+    assert entry["user_id"] == 1
+    assert entry["level"] == "INFO" and "sample" not in entry
+
+
+def test_queue_handler_resolves_message_and_traceback_before_enqueueing():
+    log_queue = queue.SimpleQueue()
+    handler = _QueueHandler(log_queue)
+    data = {"n": 1}
+    try:
+        raise ValueError("password=segredo")
+    except ValueError:
+        record = logging.LogRecord("app.test", logging.ERROR, __file__, 1, "Estado %s", (data,), None)
+        record.exc_info = sys.exc_info()
+    handler.emit(record)
+    data["n"] = 2
+
+    queued = log_queue.get_nowait()
+    assert queued.msg == "Estado {'n': 1}" and queued.args is None
+    assert queued.exc_info is None
+    assert "ValueError" in queued.exc_text and "segredo" not in queued.exc_text
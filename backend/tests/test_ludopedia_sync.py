@@ -0,0 +1,63 @@
+import asyncio
+
+from app.models import CollectionItem, ImportJob
+from app.services import ludopedia_service
+from app.services.import_pipeline import import_pipeline
+
+
+def _collection(monkeypatch, games):
+    async def get_user_collection(access_token, checkpoint=None):
+        return games
+
+    monkeypatch.setattr(ludopedia_service, "get_user_collection", get_user_collection)
+
+
+async def test_sync_keeps_fields_the_collection_does_not_send(monkeypatch, client, db, user, auth_headers):
+    import_pipeline.run(db, user.id, [{
+        "ludopedia_id": 6_000_001, "name": "Azul", "weight": 1.8, "rating": 7.8,
+        "description": "Do BGG", "year_published": 2017,
+    }], provider="ludopedia")
+    db.commit()
+    # A coleção da Ludopedia só traz o básico
+    _collection(monkeypatch, [{"ludopedia_id": 6_000_001, "name": "Azul", "year_published": 2018}])
+
+    response = await client.post("/api/ludopedia/sync-collection", params={"access_token": "t"}, headers=auth_headers)
+
+    assert response.status_code == 200, response.text
+    assert response.json()["updated"] == 1
+    item = db.query(CollectionItem).filter(CollectionItem.user_id == user.id).one()
+    db.refresh(item.catalog)
+    assert (item.catalog.weight, item.catalog.rating, item.catalog.description) == (1.8, 7.8, "Do BGG")
+    assert item.catalog.year_published == 2018
+
+
+async def test_failed_import_ends_the_event_stream(monkeypatch, client, db, user, auth_headers):
+    fetching = asyncio.Event()
+    release = asyncio.Event()
+
+    async def get_user_collection(access_token, checkpoint=None):
+        fetching.set()
+        await release.wait()
+        return [{"ludopedia_id": 6_000_100, "name": "Quebra"}]
+
+    def run(*args, **kwargs):
+        raise RuntimeError("banco fora do ar")
+
+    monkeypatch.setattr(ludopedia_service, "get_user_collection", get_user_collection)
+    monkeypatch.setattr(import_pipeline, "run", run)
+
+    importing = asyncio.create_task(
+        client.post("/api/ludopedia/import-collection", params={"access_token": "t"}, headers=auth_headers)
+    )
+    await asyncio.wait_for(fetching.wait(), 5)
+    job = db.query(ImportJob).filter(ImportJob.user_id == user.id).one()
+    streaming = asyncio.create_task(client.get(f"/api/imports/{job.id}/events", headers=auth_headers))
+    await asyncio.sleep(0.1)
+    release.set()
+
+    assert (await asyncio.wait_for(importing, 5)).status_code == 500
+    stream = await asyncio.wait_for(streaming, 5)
+    assert "event: snapshot" in stream.text
+    assert "event: failed" in stream.text
+    db.refresh(job)
+    assert job.status.value == "FAILED"
@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.config import settings
+from app.models import CatalogGame, RefreshStatus
+from app.services import bgg_service
+from app.services.import_pipeline import import_pipeline
+from app.services.metadata_refresh import MetadataRefreshScheduler, _RateBudget, metadata_refresh
+
+
+def _catalog(db, bgg_id):
+    return db.query(CatalogGame).filter(CatalogGame.bgg_id == bgg_id).one()
+
+
+def _stale(db, owners, bgg_id, days, **item):
+    """Título do BGG com `owners` donos e sem atualização há `days` dias"""
+    for owner in owners:
+        import_pipeline.run(db, owner.id, [{"bgg_id": bgg_id, "name": f"Jogo {bgg_id}", "rating": 6.0, **item}],
+                            provider="bgg")
+    catalog = _catalog(db, bgg_id)
+    catalog.updated_at = datetime.now(timezone.utc) - timedelta(days=days)
+    db.commit()
+    return catalog.id
+
+
+@pytest.mark.parametrize("start, end, hour, inside", [
+    (5, 9, 5, True), (5, 9, 9, False), (22, 4, 23, True), (22, 4, 3, True), (22, 4, 12, False), (0, 0, 12, True),
+])
+def test_in_window(monkeypatch, start, end, hour, inside):
+    monkeypatch.setattr(settings, "METADATA_REFRESH_WINDOW_START_HOUR", start)
+    monkeypatch.setattr(settings, "METADATA_REFRESH_WINDOW_END_HOUR", end)
+    assert MetadataRefreshScheduler.in_window(datetime(2024, 1, 1, hour, tzinfo=timezone.utc)) is inside
+
+
+def test_page_fills_one_thing_call(monkeypatch):
+    monkeypatch.setattr(settings, "BGG_THING_BATCH_SIZE", 2)
+    queue = [[1, 10, None], [2, None, 20], [3, 30, None], [4, 40, None]]
+
+    assert MetadataRefreshScheduler._page(queue, 0) == ([(1, 10), (3, 30)], [(2, 20)], 3)
+    assert MetadataRefreshScheduler._page(queue, 3) == ([(4, 40)], [], 4)
+
+
+def test_queue_puts_games_for_sale_first_then_most_owned(db, make_user):
+    one, two = make_user(), make_user()
+    oldest = _stale(db, [one], 7_400_001, days=60)
+    most_owned = _stale(db, [one, two], 7_400_002, days=30)
+    for_sale = _stale(db, [one], 7_400_003, days=5, is_for_sale=True)
+    _stale(db, [one], 7_400_004, days=5)  # Recente o bastante
+    ours = {oldest, most_owned, for_sale}
+
+    queue = [entry for entry in MetadataRefreshScheduler.build_queue(db) if entry[0] in ours | {_catalog(db, 7_400_004).id}]
+
+    assert [entry[0] for entry in queue] == [for_sale, most_owned, oldest]
+    assert queue[0] == [for_sale, 7_400_003, None]
+
+
+async def test_run_refreshes_stale_titles(monkeypatch, db, user):
+    refreshed = _stale(db, [user], 7_400_010, days=30, weight=2.0)
+    removed = _stale(db, [user], 7_400_011, days=30)
+
+    async def get_game_stats(bgg_ids):
+        return {7_400_010: {"rating": 8.1, "weight": None, "ranking_position": 12}}
+
+    monkeypatch.setattr(bgg_service, "get_game_stats", get_game_stats)
+    monkeypatch.setattr(metadata_refresh, "_budget", _RateBudget(0))
+
+    run = await metadata_refresh.run(ignore_window=True, force=True)
+
+    assert run.status == RefreshStatus.COMPLETED
+    assert run.refreshed_count >= 1 and run.missing_count >= 1
+    db.expire_all()
+    game = db.get(CatalogGame, refreshed)
+    # Campo que o BGG não devolveu mantém o valor
+    assert (game.rating, game.weight, game.ranking_position) == (8.1, 2.0, 12)
+    # Removido do BGG: sai da fila, sem perder os dados
+    assert db.get(CatalogGame, removed).rating == 6.0
+    assert {refreshed, removed}.isdisjoint(entry[0] for entry in MetadataRefreshScheduler.build_queue(db))
@@ -0,0 +1,77 @@
+import threading
+
+import httpx
+import pytest
+
+from app.core import metrics
+from app.core.metrics import Counter, Histogram, InstrumentedTransport, Registry
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("latency_seconds", "Latência", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        histogram.observe(value, "/a")
+    registry = Registry()
+    registry.register(histogram)
+
+    lines = registry.render().splitlines()
+
+    assert lines[:2] == ["# HELP latency_seconds Latência", "# TYPE latency_seconds histogram"]
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{route="/a",le="1.0"} 3' in lines
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 4' in lines
+    assert 'latency_seconds_count{route="/a"} 4' in lines
+    assert histogram.count("/a") == 4
+
+
+def test_label_values_are_escaped():
+    counter = Counter("c_total", "C", ("name",))
+    counter.inc('a"b\\c')
+    assert list(counter.samples()) == ['c_total{name="a\\"b\\\\c"} 1']
+
+
+def test_concurrent_increments_are_not_lost():
+    counter = Counter("c_total", "C", ("name",))
+
+    def work():
+        for _ in range(10000):
+            counter.inc("x")
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert counter.value("x") == 80000
+
+
+async def test_requests_are_counted_by_route_template(client, auth_headers):
+    before = metrics.http_requests_total.value("GET", "/api/collection/games/{game_id}", "404")
+    await client.get("/api/collection/games/999999999", headers=auth_headers)
+
+    assert metrics.http_requests_total.value("GET", "/api/collection/games/{game_id}", "404") == before + 1
+    response = await client.get("/metrics")
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'route="/api/collection/games/{game_id}"' in response.text
+
+
+async def test_provider_calls_are_timed_and_errors_counted():
+    def handler(request):
+        return httpx.Response(503 if "thing" in request.url.path else 200)
+
+    transport = InstrumentedTransport("fake", httpx.MockTransport(handler))
+    async with httpx.AsyncClient(transport=transport, base_url="http://provider") as client:
+        await client.get("/xmlapi2/thing?id=1")
+        await client.get("/xmlapi2/search")
+
+    assert metrics.provider_requests_total.value("fake", "thing", "503") >= 1
+    assert metrics.provider_errors_total.value("fake", "thing") >= 1
+    assert metrics.provider_errors_total.value("fake", "search") == 0
+    assert metrics.provider_request_duration_seconds.count("fake", "search") >= 1
+
+
+@pytest.mark.parametrize("hit, result", [(True, "hit"), (False, "miss")])
+def test_record_cache(hit, result):
+    before = metrics.cache_requests_total.value("test_cache", result)
+    metrics.record_cache("test_cache", hit)
+    assert metrics.cache_requests_total.value("test_cache", result) == before + 1
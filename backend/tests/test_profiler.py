@@ -0,0 +1,63 @@
+import time
+
+import httpx
+import pytest
+
+from app.core import profiler
+from app.core.profiler import ProfilerMiddleware, ProfileStore, sign_token, verify_token
+
+
+async def _route(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"[]"})
+
+
+@pytest.fixture
+def store(monkeypatch, tmp_path):
+    store = ProfileStore(str(tmp_path), 5)
+    monkeypatch.setattr(profiler, "profile_store", store)
+    return store
+
+
+@pytest.fixture
+def middleware():
+    return ProfilerMiddleware(_route)
+
+
+@pytest.fixture
+async def client(middleware):
+    async with httpx.AsyncClient(app=middleware, base_url="http://test") as c:
+        yield c
+
+
+def test_token_signature_and_expiry():
+    assert verify_token(sign_token(int(time.time()) + 60))
+    assert not verify_token(sign_token(int(time.time()) - 1))
+    assert not verify_token(f"{int(time.time()) + 60}.forjado")
+
+
+async def test_request_with_token_is_profiled(client, store):
+    response = await client.get("/api/collection/", headers={"X-Profile": sign_token(int(time.time()) + 60)})
+
+    profile_id = response.headers["x-profile-id"]
+    assert [summary["id"] for summary in store.list()] == [profile_id]
+    assert store.path(profile_id) is not None
+
+
+async def test_profile_routes_are_never_profiled(client, middleware, store):
+    token = sign_token(int(time.time()) + 60)
+
+    for path in ("/api/profiles/", "/api/profiles/abc"):
+        response = await client.get(path, params={"__profile": token})
+        assert response.status_code == 200
+        assert "x-profile-id" not in response.headers
+    assert store.list() == []
+    # Nem gastam a cota por minuto
+    assert not middleware.limiter._started
+
+
+async def test_invalid_token_is_reported(client, store):
+    response = await client.get("/api/collection/", headers={"X-Profile": "1.abc"})
+
+    assert response.headers["x-profile-status"] == "invalid-token"
+    assert store.list() == []
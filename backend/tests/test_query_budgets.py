@@ -0,0 +1,96 @@
+"""
+Orçamento de consultas das rotas mais usadas.
+
+A coleção semeada tem jogos, expansões e tags suficientes para um N+1
+estourar o orçamento; os limites são o número atual de consultas com
+uma pequena folga.
+"""
+import random
+
+import pytest
+
+from app.core.db_instrumentation import query_budget
+from app.services.game_tags import game_tags
+from app.services.import_pipeline import import_pipeline
+from benchmarks.seed import catalog_record
+
+COLLECTION_SIZE = 40
+TAGS = [
+    {"kind": "MECHANIC", "bgg_id": 2072, "name": "Dice Rolling"},
+    {"kind": "MECHANIC", "bgg_id": 2023, "name": "Cooperative Game"},
+    {"kind": "CATEGORY", "bgg_id": 1002, "name": "Card Game"},
+]
+
+
+@pytest.fixture
+def collection(db, user):
+    """Coleção do usuário com COLLECTION_SIZE jogos do BGG, um terço com cada tag"""
+    rng = random.Random(7)
+    records = [catalog_record(index, rng) for index in range(COLLECTION_SIZE)]
+    result = import_pipeline.run(db, user.id, records, provider="bgg")
+    game_tags.store(db, {record["bgg_id"]: [TAGS[i % len(TAGS)]] for i, record in enumerate(records)})
+    db.commit()
+    return result.games
+
+
+async def _within_budget(client, budget, method, url, headers, **kwargs):
+    with query_budget(budget):
+        response = await client.request(method, url, headers=headers, **kwargs)
+    assert response.status_code < 400, response.text
+    return response
+
+
+async def test_get_collection_query_budget(client, auth_headers, collection):
+    response = await _within_budget(client, 2, "GET", "/api/collection/", auth_headers)
+    assert response.json()["total_games"] == COLLECTION_SIZE
+
+
+async def test_get_collection_sorted_query_budget(client, auth_headers, collection):
+    await _within_budget(client, 2, "GET", "/api/collection/?sortBy=name&sortOrder=desc", auth_headers)
+
+
+async def test_get_collection_tag_filter_query_budget(client, auth_headers, collection):
+    response = await _within_budget(
+        client, 6, "GET", "/api/collection/", auth_headers, params={"tags": "dice-rolling OR card-game"}
+    )
+    # Dice Rolling e Card Game: todos os jogos menos o terço cooperativo
+    assert response.json()["total_games"] == sum(1 for i in range(COLLECTION_SIZE) if i % len(TAGS) != 1)
+
+
+async def test_get_game_query_budget(client, auth_headers, collection):
+    await _within_budget(client, 2, "GET", f"/api/collection/games/{collection[0]['id']}", auth_headers)
+
+
+async def test_similar_games_query_budget(client, auth_headers, collection):
+    await _within_budget(client, 10, "GET", f"/api/collection/games/{collection[0]['id']}/similar", auth_headers)
+
+
+async def test_analytics_query_budget(client, auth_headers, collection):
+    await _within_budget(client, 3, "GET", "/api/collection/analytics", auth_headers)
+    # Segunda chamada sai do cache
+    await _within_budget(client, 1, "GET", "/api/collection/analytics", auth_headers)
+
+
+async def test_tags_query_budget(client, auth_headers, collection):
+    response = await _within_budget(
+        client, 5, "GET", "/api/collection/tags", auth_headers, params={"q": "cooperative-game AND NOT dice-rolling"}
+    )
+    assert response.json()["matching"] > 0
+
+
+async def test_create_game_query_budget(client, auth_headers, collection):
+    await _within_budget(client, 4, "POST", "/api/collection/games", auth_headers, json={"name": "Jogo manual"})
+
+
+async def test_update_game_query_budget(client, auth_headers, collection):
+    await _within_budget(
+        client, 4, "PUT", f"/api/collection/games/{collection[0]['id']}", auth_headers, json={"notes": "Sem cartas"}
+    )
+
+
+async def test_me_query_budget(client, auth_headers):
+    await _within_budget(client, 1, "GET", "/api/auth/me", auth_headers)
+
+
+async def test_list_imports_query_budget(client, auth_headers):
+    await _within_budget(client, 2, "GET", "/api/imports/", auth_headers)
@@ -0,0 +1,101 @@
+import sys
+
+import httpx
+import pytest
+
+from app.config import settings
+from app.core.rate_limit import RateLimitMiddleware, route_group
+from app.services.rate_limit import Bucket, MemoryTokenBuckets, parse_rule
+
+# app.services reexporta a instância com o mesmo nome do módulo
+rate_limit_module = sys.modules["app.services.rate_limit"]
+
+
+def test_parse_rule():
+    assert parse_rule("60/minute") == (60, 60)
+    assert parse_rule(" 5 / second ") == (5, 1)
+    with pytest.raises(ValueError):
+        parse_rule("60 per minute")
+
+
+def test_route_group():
+    assert route_group("POST", "/api/auth/login") == "auth"
+    assert route_group("GET", "/api/collection/search/bgg") == "search"
+    assert route_group("GET", "/api/collection/") == "default"
+    assert route_group("GET", "/health") is None
+    assert route_group("OPTIONS", "/api/collection/") is None
+
+
+def test_bucket_allows_burst_then_refills():
+    buckets = MemoryTokenBuckets(max_keys=10)
+    bucket = Bucket("ratelimit:test:ip:1", limit=3, period=3)  # 1 token/s
+
+    results = [buckets.consume([bucket], now=100.0) for _ in range(4)]
+    assert [allowed for allowed, *_ in results] == [True, True, True, False]
+    allowed, _, remaining, retry_after, _ = results[-1]
+    assert retry_after == pytest.approx(1.0)
+
+    allowed, _, remaining, _, _ = buckets.consume([bucket], now=101.0)
+    assert allowed and remaining == pytest.approx(0.0)
+
+
+def test_buckets_are_consumed_together_or_not_at_all():
+    buckets = MemoryTokenBuckets(max_keys=10)
+    ip = Bucket("ratelimit:test:ip:1", limit=10, period=10)
+    user = Bucket("ratelimit:test:user:1", limit=1, period=10)
+
+    assert buckets.consume([ip, user], now=0.0)[0]
+    allowed, chosen, *_ = buckets.consume([ip, user], now=0.0)
+    assert not allowed and chosen == 1
+    # A recusa não gastou o token do balde por IP
+    assert buckets.consume([ip], now=0.0)[2] == pytest.approx(8.0)
+
+
+def test_lru_drops_oldest_keys():
+    buckets = MemoryTokenBuckets(max_keys=2)
+    for key in ("a", "b", "c"):
+        buckets.consume([Bucket(key, 1, 1)], now=0.0)
+    assert list(buckets._buckets) == ["b", "c"]
+
+
+@pytest.fixture
+def limited(monkeypatch):
+    """Middleware com 2 requisições por minuto por IP no grupo default"""
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(settings, "RATE_LIMIT_BACKEND", "memory")
+    monkeypatch.setattr(settings, "RATE_LIMITS", {"default": {"ip": "2/minute"}})
+    service = rate_limit_module.RateLimitService()
+    monkeypatch.setattr(sys.modules["app.core.rate_limit"], "rate_limit", service)
+
+    async def ok(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    return RateLimitMiddleware(ok)
+
+
+async def test_middleware_rejects_with_retry_after(limited):
+    async with httpx.AsyncClient(app=limited, base_url="http://test") as client:
+        first = await client.get("/api/collection/")
+        await client.get("/api/collection/")
+        rejected = await client.get("/api/collection/")
+
+    assert first.status_code == 200
+    assert first.headers["ratelimit-limit"] == "2"
+    assert first.headers["ratelimit-remaining"] == "1"
+    assert rejected.status_code == 429
+    assert int(rejected.headers["retry-after"]) >= 1
+
+
+async def test_rejections_carry_cors_headers_and_preflight_is_not_limited(limited, client):
+    origin = {"Origin": "http://localhost:3000"}
+    preflight = {**origin, "Access-Control-Request-Method": "GET"}
+
+    for _ in range(3):
+        assert (await client.options("/api/collection/", headers=preflight)).status_code == 200
+    await client.get("/api/collection/", headers=origin)
+    await client.get("/api/collection/", headers=origin)
+    rejected = await client.get("/api/collection/", headers=origin)
+
+    assert rejected.status_code == 429
+    assert "access-control-allow-origin" in rejected.headers
@@ -0,0 +1,74 @@
+import pytest
+
+from app.config import settings
+from app.models import CatalogGame, CollectionItem
+from app.services.game_tags import game_tags
+from app.services.import_pipeline import import_pipeline
+from app.services.similar_games import SimilarGamesEngine
+
+COOP = {"kind": "MECHANIC", "bgg_id": 7_500_100, "name": "Cooperative Game"}
+DICE = {"kind": "MECHANIC", "bgg_id": 7_500_101, "name": "Dice Rolling"}
+AUCTION = {"kind": "MECHANIC", "bgg_id": 7_500_102, "name": "Auction/Bidding"}
+FANTASY = {"kind": "CATEGORY", "bgg_id": 7_500_103, "name": "Fantasy"}
+
+# bgg_id -> (tags, campos numéricos)
+GAMES = {
+    7_500_001: ([COOP, DICE, FANTASY], {"weight": 2.5, "min_players": 1, "max_players": 4, "max_playtime": 60}),
+    7_500_002: ([COOP, DICE, FANTASY], {"weight": 2.6, "min_players": 1, "max_players": 4, "max_playtime": 45}),
+    7_500_003: ([COOP, FANTASY], {"weight": 2.4, "min_players": 2, "max_players": 4, "max_playtime": 60}),
+    7_500_004: ([AUCTION], {"weight": 4.5, "min_players": 3, "max_players": 5, "max_playtime": 180}),
+}
+
+
+@pytest.fixture(autouse=True)
+def small_shards(monkeypatch):
+    monkeypatch.setattr(settings, "SIMILARITY_SHARD_SIZE", 2)
+    monkeypatch.setattr(settings, "SIMILARITY_REFRESH_SECONDS", 0)
+
+
+def _add(db, user, games, **item):
+    game_tags.store(db, {bgg_id: tags for bgg_id, (tags, _) in games.items()})
+    import_pipeline.run(db, user.id, [
+        {"bgg_id": bgg_id, "name": f"Jogo {bgg_id}", **fields, **item} for bgg_id, (_, fields) in games.items()
+    ], provider="bgg")
+    db.commit()
+    return {bgg_id: db.query(CatalogGame.id).filter(CatalogGame.bgg_id == bgg_id).scalar() for bgg_id in games}
+
+
+def test_most_similar_titles_come_first(db, user):
+    ids = _add(db, user, GAMES)
+    engine = SimilarGamesEngine()
+
+    ranked = engine.similar(db, ids[7_500_001], limit=3)
+
+    assert [catalog_id for catalog_id, _ in ranked[:2]] == [ids[7_500_002], ids[7_500_003]]
+    assert ranked[0][1] > 0.9 and ids[7_500_001] not in dict(ranked)
+    scores = dict(engine.similar(db, ids[7_500_001], limit=50))
+    assert scores.get(ids[7_500_004], 0) < scores[ids[7_500_003]]
+    assert len(engine._shards) > 1
+
+
+def test_new_titles_are_added_without_rebuilding(monkeypatch, db, user):
+    ids = _add(db, user, {bgg_id: GAMES[bgg_id] for bgg_id in (7_500_001, 7_500_004)})
+    engine = SimilarGamesEngine()
+    engine.similar(db, ids[7_500_001])
+    monkeypatch.setattr(engine, "build", lambda db: pytest.fail("índice remontado"))
+
+    # Igual ao título consultado
+    new = _add(db, user, {7_500_005: GAMES[7_500_001]})
+
+    assert engine.similar(db, ids[7_500_001], limit=1)[0][0] == new[7_500_005]
+
+
+async def test_for_sale_scope_ranks_the_users_games_for_sale(client, db, user, auth_headers):
+    _add(db, user, {7_500_001: GAMES[7_500_001]})
+    _add(db, user, {bgg_id: GAMES[bgg_id] for bgg_id in (7_500_003, 7_500_004)}, is_for_sale=True)
+    item = db.query(CollectionItem).join(CollectionItem.catalog).filter(
+        CollectionItem.user_id == user.id, CatalogGame.bgg_id == 7_500_001,
+    ).one()
+
+    response = await client.get(f"/api/collection/games/{item.id}/similar", params={"scope": "for_sale"},
+                                headers=auth_headers)
+
+    assert response.status_code == 200, response.text
+    assert [game["bgg_id"] for game in response.json()] == [7_500_003, 7_500_004]
@@ -0,0 +1,105 @@
+"""Migração games -> catalog_games + collection_items, num banco separado"""
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.migrations import split_game_catalog
+from app.models import CatalogGame, CollectionItem, User
+
+LEGACY_SCHEMA = """
+CREATE TABLE games (
+    id INTEGER PRIMARY KEY, user_id INTEGER, ludopedia_id INTEGER, bgg_id INTEGER, name VARCHAR NOT NULL,
+    description TEXT, year_published INTEGER, game_type VARCHAR, min_players INTEGER, max_players INTEGER,
+    min_playtime INTEGER, max_playtime INTEGER, min_age INTEGER, rating FLOAT, weight FLOAT,
+    ranking_position INTEGER, image_url VARCHAR, base_game_id INTEGER, "order" INTEGER,
+    is_for_trade BOOLEAN, is_for_sale BOOLEAN, condition VARCHAR, price FLOAT, purchase_price FLOAT,
+    notes TEXT, created_at DATETIME, updated_at DATETIME
+)
+"""
+CREATED = datetime(2024, 1, 1)
+
+
+@pytest.fixture
+def legacy_db(tmp_path, monkeypatch):
+    """Banco próprio com a tabela legada e dois usuários"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    Session = sessionmaker(bind=engine)
+    monkeypatch.setattr(split_game_catalog, "engine", engine)
+    monkeypatch.setattr(split_game_catalog, "SessionLocal", Session)
+    Base.metadata.create_all(engine)
+
+    with Session() as db:
+        db.add_all([
+            User(id=1, email="a@example.com", username="a", hashed_password="-"),
+            User(id=2, email="b@example.com", username="b", hashed_password="-"),
+        ])
+        db.commit()
+    with engine.begin() as connection:
+        connection.execute(text(LEGACY_SCHEMA))
+        for game_id in range(1, 11):
+            _insert_legacy(connection, game_id, bgg_id=100 + game_id if game_id % 3 else None,
+                           base_game_id=1 if game_id == 3 else None)
+    yield engine, Session
+    engine.dispose()
+
+
+def _insert_legacy(connection, game_id, bgg_id=None, base_game_id=None):
+    connection.execute(
+        text(
+            "INSERT INTO games (id, user_id, bgg_id, name, game_type, is_for_trade, is_for_sale, "
+            "created_at, base_game_id) VALUES (:id, :user_id, :bgg_id, :name, 'BASE', 0, 0, :created, :base)"
+        ),
+        {"id": game_id, "user_id": 1 + game_id % 2, "bgg_id": bgg_id, "name": f"Jogo {game_id}",
+         "created": CREATED, "base": base_game_id},
+    )
+
+
+def test_copies_games_keeping_ids(legacy_db):
+    _, Session = legacy_db
+    assert split_game_catalog.migrate(batch_size=4) == 10
+
+    with Session() as db:
+        items = {item.id: item for item in db.query(CollectionItem)}
+        assert sorted(items) == list(range(1, 11))
+        assert items[3].base_game_id == 1
+        # Jogos com ID de provedor compartilham o título; os demais ficam privados
+        assert items[2].catalog.owner_id is None and items[2].bgg_id == 102
+        assert items[3].catalog.owner_id == items[3].user_id
+        assert db.query(CatalogGame).count() == 10
+
+    assert split_game_catalog.migrate(batch_size=4) == 0
+
+
+def test_rerun_applies_legacy_updates_deletes_and_inserts(legacy_db):
+    engine, Session = legacy_db
+    split_game_catalog.migrate(batch_size=4)
+
+    with engine.begin() as connection:
+        connection.execute(
+            text("UPDATE games SET name = 'Jogo 2 editado', notes = 'n', updated_at = :at WHERE id = 2"),
+            {"at": datetime(2024, 2, 1)},
+        )
+        connection.execute(text("DELETE FROM games WHERE id IN (1, 4)"))
+        _insert_legacy(connection, 11)
+
+    assert split_game_catalog.migrate(batch_size=4) == 1
+
+    with Session() as db:
+        items = {item.id: item for item in db.query(CollectionItem)}
+        assert sorted(items) == [2, 3, 5, 6, 7, 8, 9, 10, 11]
+        # Expansão do jogo apagado perde o vínculo
+        assert items[3].base_game_id is None
+        # A edição legada vai para uma cópia privada do título compartilhado
+        assert items[2].notes == "n"
+        assert items[2].name == "Jogo 2 editado"
+        assert items[2].catalog.owner_id == items[2].user_id
+        shared = db.query(CatalogGame).filter(CatalogGame.bgg_id == 102, CatalogGame.owner_id.is_(None)).one()
+        assert shared.name == "Jogo 2"
+
+    # Nada mudou desde a última execução
+    assert split_game_catalog.migrate(batch_size=4) == 0
+    with Session() as db:
+        assert db.query(CollectionItem).count() == 9
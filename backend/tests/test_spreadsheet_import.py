@@ -0,0 +1,40 @@
+from app.models import CatalogGame, CollectionItem
+from app.services.catalog_service import catalog_service
+
+
+async def _upload(client, headers, csv: bytes):
+    return await client.post("/api/collection/import/upload", headers=headers, files={"file": ("c.csv", csv, "text/csv")})
+
+
+async def test_row_with_both_ids_reuses_title_found_by_either_id(client, db, user, auth_headers):
+    # Título compartilhado só com o ID da Ludopedia
+    shared = catalog_service.resolve_many(db, [{"ludopedia_id": 5_000_005, "name": "Both"}], "ludopedia_id")[5_000_005]
+    db.commit()
+
+    response = await _upload(client, auth_headers, b"nome,bgg,ludopedia\nBoth,5000100,5000005\n")
+
+    assert response.status_code == 200, response.text
+    assert response.json()["imported_count"] == 1
+    item = db.query(CollectionItem).filter(CollectionItem.user_id == user.id).one()
+    assert item.catalog_id == shared["id"]
+
+
+async def test_unknown_ids_become_private_titles(client, db, user, auth_headers):
+    response = await _upload(client, auth_headers, b"nome,bgg,descricao\nFake Title,5777777,spam\n")
+
+    assert response.status_code == 200, response.text
+    assert db.query(CatalogGame).filter(CatalogGame.bgg_id == 5_777_777, CatalogGame.owner_id.is_(None)).count() == 0
+    item = db.query(CollectionItem).filter(CollectionItem.user_id == user.id).one()
+    assert item.catalog.owner_id == user.id
+
+
+def test_provider_record_with_both_ids_does_not_conflict(db):
+    catalog_service.resolve_many(db, [{"bgg_id": 5_000_200, "name": "Outro"}], "bgg_id")
+    db.commit()
+
+    # Ludopedia nova, mas o BGG já tem título compartilhado: reutiliza, sem violar o índice único
+    rows = catalog_service.resolve_many(
+        db, [{"ludopedia_id": 5_000_201, "bgg_id": 5_000_200, "name": "Outro"}], "ludopedia_id"
+    )
+    db.commit()
+    assert rows[5_000_201]["bgg_id"] == 5_000_200
@@ -0,0 +1,66 @@
+import pytest
+
+from app.services.game_tags import TagQueryError, _Parser
+
+# Itens 0-3: bit i = item i
+EVERYTHING = 0b1111
+BITS = {
+    "coop": 0b0011,
+    "dice": 0b0101,
+    "mechanic:cards": 0b1000,
+}
+
+
+def parse(query: str) -> int:
+    def resolve(term):
+        if term is None:
+            return EVERYTHING
+        if term not in BITS:
+            raise TagQueryError(f"Tag desconhecida: {term}")
+        return BITS[term]
+
+    return _Parser(query, resolve).parse()
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("coop", 0b0011),
+    ("coop AND dice", 0b0001),
+    ("coop dice", 0b0001),  # Termos adjacentes valem como AND
+    ("coop OR dice", 0b0111),
+    ("NOT coop", 0b1100),
+    ("NOT NOT coop", 0b0011),
+    ("coop AND NOT dice", 0b0010),
+    ("coop OR dice AND mechanic:cards", 0b0011),  # AND tem precedência sobre OR
+    ("(coop OR dice) AND NOT coop", 0b0100),
+    ("coop or dice", 0b0111),  # Operadores sem distinção de maiúsculas
+])
+def test_parse(query, expected):
+    assert parse(query) == expected
+
+
+@pytest.mark.parametrize("query", [
+    "",
+    "coop AND",
+    "(coop",
+    "coop)",
+    "OR coop",
+    "unknown-tag",
+])
+def test_invalid_queries(query):
+    with pytest.raises(TagQueryError):
+        parse(query)
+
+
+@pytest.mark.parametrize("query", [
+    "(" * 400 + "coop" + ")" * 400,
+    "NOT " * 1200 + "x",
+    "NOT " * 40 + "coop",
+    "coop OR " * 100 + "dice",
+])
+def test_oversized_queries_are_rejected(query):
+    with pytest.raises(TagQueryError):
+        parse(query)
+
+
+def test_nesting_up_to_the_limit():
+    assert parse("(" * 16 + "NOT " * 16 + "coop" + ")" * 16) == 0b0011